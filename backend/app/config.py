@@ -18,15 +18,121 @@ class Config:
     BUCKET_NAME: str = os.getenv("BUCKET_NAME", "md-converter-bucket")
     AWS_REGION: str = os.getenv("AWS_REGION", "us-east-1")
     
+    # Backend de almacenamiento: "s3", "filesystem" o "memory"
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "s3")
+    STORAGE_FS_ROOT: str = os.getenv("STORAGE_FS_ROOT", "/tmp/s3-mock")
+    STORAGE_FS_TTL_SECONDS: int = int(os.getenv("STORAGE_FS_TTL_SECONDS", "3600"))
+    
     # Presigned URL Configuration
     PRESIGNED_URL_EXPIRY: int = int(os.getenv("URL_EXPIRY", "300"))  # 5 minutos
     
+    # Cache de URLs de descarga por key: se reutilizan mientras les queden
+    # al menos PRESIGN_CACHE_MARGIN_SECONDS de validez
+    PRESIGN_CACHE_SIZE: int = int(os.getenv("PRESIGN_CACHE_SIZE", "1024"))
+    PRESIGN_CACHE_MARGIN_SECONDS: int = int(os.getenv("PRESIGN_CACHE_MARGIN_SECONDS", "30"))
+    
+    # Borrado: todas las versiones del objeto (bucket con versionado) y,
+    # opcionalmente, borrado en segundo plano cuando expira la URL
+    S3_DELETE_ALL_VERSIONS: bool = os.getenv("S3_DELETE_ALL_VERSIONS", "true").lower() == "true"
+    S3_DELETE_AFTER_EXPIRY: bool = os.getenv("S3_DELETE_AFTER_EXPIRY", "false").lower() == "true"
+    S3_DELETE_GRACE_SECONDS: int = int(os.getenv("S3_DELETE_GRACE_SECONDS", "60"))
+    # Intentos por key de un borrado diferido (backoff desde GRACE_SECONDS)
+    S3_DELETE_MAX_RETRIES: int = int(os.getenv("S3_DELETE_MAX_RETRIES", "5"))
+    
+    # Entrada subida directo al bucket (presigned PUT): prefijo de las
+    # keys y borrado después de leerla
+    S3_INPUT_PREFIX: str = os.getenv("S3_INPUT_PREFIX", "inputs/")
+    S3_DELETE_INPUT: bool = os.getenv("S3_DELETE_INPUT", "true").lower() == "true"
+    
+    # Precalentamiento en el init de Lambda (handler.prime); por defecto
+    # solo dentro de Lambda
+    PRIME_ON_INIT: bool = os.getenv(
+        "PRIME_ON_INIT", "true" if os.getenv("AWS_LAMBDA_FUNCTION_NAME") else "false"
+    ).lower() == "true"
+    
+    # Muestras por etapa para p50/p95 en health_check
+    STATS_WINDOW: int = int(os.getenv("STATS_WINDOW", "256"))
+    
+    # Respuestas en streaming (handler.stream_handler): tamaño mínimo de
+    # cada chunk después del primero
+    STREAM_CHUNK_BYTES: int = int(os.getenv("STREAM_CHUNK_BYTES", "16384"))
+    
+    # Modo pipeline (ver app/storage/pipeline.py): el DOCX se sube por
+    # partes mientras se genera; partes en espera acotadas por la cola
+    UPLOAD_PIPELINE: bool = os.getenv("UPLOAD_PIPELINE", "false").lower() == "true"
+    UPLOAD_PART_SIZE_MB: int = int(os.getenv("UPLOAD_PART_SIZE_MB", "8"))
+    UPLOAD_WORKERS: int = int(os.getenv("UPLOAD_WORKERS", "4"))
+    UPLOAD_QUEUE_PARTS: int = int(os.getenv("UPLOAD_QUEUE_PARTS", "4"))
+    
+    # Layout de keys (ver app/storage/key_layout.py): segmentos en orden,
+    # ej: "hash" o "tenant,hash,date"; vacío = keys en la raíz
+    S3_KEY_LAYOUT: list = [
+        segment.strip().lower()
+        for segment in os.getenv("S3_KEY_LAYOUT", "").split(",")
+        if segment.strip()
+    ]
+    S3_KEY_SHARD_CHARS: int = int(os.getenv("S3_KEY_SHARD_CHARS", "2"))
+    S3_DEFAULT_TENANT: str = os.getenv("S3_DEFAULT_TENANT", "default")
+    
     # Conversion Configuration
     MAX_FILE_SIZE_MB: int = int(os.getenv("MAX_FILE_SIZE_MB", "10"))
     MAX_FILE_SIZE_BYTES: int = MAX_FILE_SIZE_MB * 1024 * 1024
     
-    # Supported formats
-    SUPPORTED_OUTPUT_FORMATS: list = ["docx", "html"]
+    # Formatos habilitados (deben existir en app.converter.formats)
+    SUPPORTED_OUTPUT_FORMATS: list = [
+        name.strip().lower()
+        for name in os.getenv("OUTPUT_FORMATS", "docx,html,txt").split(",")
+        if name.strip()
+    ]
+    
+    # DOCX backend: "fast" (builder propio) o "htmldocx"
+    DOCX_BACKEND: str = os.getenv("DOCX_BACKEND", "fast")
+    DOCX_TABLE_STYLE: str = os.getenv("DOCX_TABLE_STYLE", "")  # ej: "Table Grid"
+    DOCX_STREAMING: bool = os.getenv("DOCX_STREAMING", "false").lower() == "true"
+    
+    # Tabla de contenido (backend "fast"; también se pide con "toc" en el body)
+    DOCX_TOC: bool = os.getenv("DOCX_TOC", "false").lower() == "true"
+    DOCX_TOC_LEVELS: int = int(os.getenv("DOCX_TOC_LEVELS", "3"))
+    DOCX_TOC_TITLE: str = os.getenv("DOCX_TOC_TITLE", "Contenido")
+    
+    # Imágenes: threads de decodificación, resolución al ancho de página,
+    # calidad JPEG al re-encodear (requiere Pillow), tamaño máximo de cada
+    # imagen y cache por proceso (límite de entradas y de MB)
+    IMAGE_WORKERS: int = int(os.getenv("IMAGE_WORKERS", "4"))
+    IMAGE_DPI: int = int(os.getenv("IMAGE_DPI", "150"))
+    IMAGE_QUALITY: int = int(os.getenv("IMAGE_QUALITY", "85"))
+    IMAGE_MAX_MB: int = int(os.getenv("IMAGE_MAX_MB", "10"))
+    IMAGE_MAX_BYTES: int = IMAGE_MAX_MB * 1024 * 1024
+    IMAGE_CACHE_SIZE: int = int(os.getenv("IMAGE_CACHE_SIZE", "64"))
+    IMAGE_CACHE_MB: int = int(os.getenv("IMAGE_CACHE_MB", "64"))
+    
+    # Resaltado de sintaxis en bloques de código (requiere Pygments)
+    CODE_HIGHLIGHT: bool = os.getenv("CODE_HIGHLIGHT", "false").lower() == "true"
+    CODE_HIGHLIGHT_STYLE: str = os.getenv("CODE_HIGHLIGHT_STYLE", "default")
+    
+    # LLM output normalizer (reparaciones activas por defecto)
+    NORMALIZE_FIXES: list = [
+        fix.strip()
+        for fix in os.getenv(
+            "NORMALIZE_FIXES", "line_endings,zero_width,fences,table_separator"
+        ).split(",")
+        if fix.strip()
+    ]
+    
+    # Pathological input protection
+    PRESCAN_POLICY: str = os.getenv("PRESCAN_POLICY", "normalize")  # o "reject"
+    MAX_NESTING_DEPTH: int = int(os.getenv("MAX_NESTING_DEPTH", "20"))
+    MAX_LINE_LENGTH: int = int(os.getenv("MAX_LINE_LENGTH", "10000"))
+    MAX_TABLE_COLUMNS: int = int(os.getenv("MAX_TABLE_COLUMNS", "64"))
+    MAX_TABLE_CELLS: int = int(os.getenv("MAX_TABLE_CELLS", "20000"))
+    MAX_INLINE_MARKERS: int = int(os.getenv("MAX_INLINE_MARKERS", "500"))  # por párrafo
+    CONVERSION_CPU_BUDGET_SECONDS: float = float(os.getenv("CONVERSION_CPU_BUDGET_SECONDS", "20"))
+    
+    # Incremental rendering
+    INCREMENTAL_CACHE_SIZE: int = int(os.getenv("INCREMENTAL_CACHE_SIZE", "2048"))
+    
+    # Response Configuration
+    COMPRESSION_MIN_BYTES: int = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
     
     # Environment
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
@@ -53,6 +159,22 @@ class Config:
             raise ValueError(
                 "URL_EXPIRY debe estar entre 60 y 3600 segundos"
             )
+        
+        if cls.STORAGE_BACKEND.lower() not in ("s3", "filesystem", "memory"):
+            raise ValueError(
+                "STORAGE_BACKEND debe ser 's3', 'filesystem' o 'memory'"
+            )
+        
+        unknown = set(cls.S3_KEY_LAYOUT) - {"hash", "date", "tenant"}
+        if unknown:
+            raise ValueError(
+                f"S3_KEY_LAYOUT tiene segmentos desconocidos: {', '.join(sorted(unknown))}"
+            )
+        
+        if cls.UPLOAD_PART_SIZE_MB < 5:
+            raise ValueError(
+                "UPLOAD_PART_SIZE_MB debe ser al menos 5 (mínimo de S3)"
+            )
     
     @classmethod
     def get_config_dict(cls) -> dict:
@@ -66,6 +188,15 @@ class Config:
             "region": cls.AWS_REGION,
             "url_expiry": cls.PRESIGNED_URL_EXPIRY,
             "max_file_size_mb": cls.MAX_FILE_SIZE_MB,
+            "docx_backend": cls.DOCX_BACKEND,
+            "docx_streaming": cls.DOCX_STREAMING,
+            "docx_toc": cls.DOCX_TOC,
+            "storage_backend": cls.STORAGE_BACKEND,
+            "s3_key_layout": ",".join(cls.S3_KEY_LAYOUT) or "flat",
+            "upload_pipeline": cls.UPLOAD_PIPELINE,
+            "prescan_policy": cls.PRESCAN_POLICY,
+            "conversion_cpu_budget_seconds": cls.CONVERSION_CPU_BUDGET_SECONDS,
+            "compression_min_bytes": cls.COMPRESSION_MIN_BYTES,
             "environment": cls.ENVIRONMENT,
             "log_level": cls.LOG_LEVEL
         }
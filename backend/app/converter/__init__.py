@@ -2,22 +2,48 @@
 Módulo de conversión de formatos.
 
 Provee funciones para convertir entre Markdown, HTML y DOCX.
+Los conversores se importan al primer uso (PEP 562) para que importar
+el paquete no cargue python-docx ni htmldocx.
 """
 
-from .markdown_to_html import convert as md_to_html
-from .html_to_docx import convert as html_to_docx
+import importlib
+
 from .exceptions import (
     ConversionError,
     MarkdownConversionError,
     HTMLConversionError,
-    InvalidInputError
+    InvalidInputError,
+    InputTooComplexError,
+    ConversionTimeoutError
 )
 
+_LAZY_EXPORTS = {
+    "md_to_html": (".markdown_to_html", "convert"),
+    "html_to_docx": (".html_to_docx", "convert"),
+    "html_to_text": (".html_to_text", "convert"),
+    "render_incremental": (".incremental", "render"),
+    "patch_docx": (".docx_patch", "patch"),
+}
+
 __all__ = [
     "md_to_html",
     "html_to_docx",
+    "html_to_text",
+    "render_incremental",
+    "patch_docx",
     "ConversionError",
     "MarkdownConversionError",
     "HTMLConversionError",
-    "InvalidInputError"
-]
\ No newline at end of file
+    "InvalidInputError",
+    "InputTooComplexError",
+    "ConversionTimeoutError"
+]
+
+
+def __getattr__(name):
+    if name not in _LAZY_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, attribute = _LAZY_EXPORTS[name]
+    value = getattr(importlib.import_module(module_name, __name__), attribute)
+    globals()[name] = value
+    return value
@@ -0,0 +1,82 @@
+"""
+Resaltado de sintaxis opcional para bloques de código en DOCX.
+
+Usa Pygments si está instalado. Los tokens se agrupan en segmentos con
+el mismo estilo visual (color, negrita, cursiva) para que cada bloque
+tenga la menor cantidad posible de runs; los espacios se absorben en el
+segmento anterior porque no tienen color visible.
+"""
+
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from pygments import lex
+    from pygments.lexers import get_lexer_by_name
+    from pygments.styles import get_style_by_name
+    from pygments.util import ClassNotFound
+except ImportError:  # Pygments es opcional: sin él no hay resaltado
+    lex = None
+
+from app.config import config
+
+
+# (color hex o None, negrita, cursiva); None = sin formato propio
+StyleKey = Optional[Tuple[Optional[str], bool, bool]]
+
+_token_styles: Dict[tuple, StyleKey] = {}
+
+
+def available() -> bool:
+    """Indica si Pygments está instalado."""
+    return lex is not None
+
+
+def segments(code: str, language: Optional[str]) -> Optional[List[Tuple[str, StyleKey]]]:
+    """
+    Divide código en segmentos de igual estilo.
+
+    Args:
+        code: Texto del bloque de código
+        language: Nombre del lenguaje (ej: "python")
+
+    Returns:
+        Lista de (texto, estilo) o None si no hay resaltado disponible
+        para ese lenguaje
+    """
+    if lex is None or not language:
+        return None
+
+    lexer = _lexer(language.lower())
+    if lexer is None:
+        return None
+
+    result: List[list] = []
+    for token_type, value in lex(code, lexer):
+        if not value:
+            continue
+        if result and (not value.strip() or result[-1][1] == _style_key(token_type)):
+            result[-1][0] += value
+        else:
+            result.append([value, _style_key(token_type)])
+
+    return [(text, key) for text, key in result]
+
+
+@lru_cache(maxsize=64)
+def _lexer(language: str):
+    try:
+        # stripnl=False: el texto debe quedar idéntico al del bloque
+        return get_lexer_by_name(language, stripnl=False, ensurenl=False)
+    except ClassNotFound:
+        return None
+
+
+def _style_key(token_type) -> StyleKey:
+    """Estilo visual de un tipo de token, calculado una vez por tipo."""
+    cache_key = (config.CODE_HIGHLIGHT_STYLE, token_type)
+    if cache_key not in _token_styles:
+        style = get_style_by_name(config.CODE_HIGHLIGHT_STYLE).style_for_token(token_type)
+        key = (style["color"] or None, bool(style["bold"]), bool(style["italic"]))
+        _token_styles[cache_key] = key if key != (None, False, False) else None
+    return _token_styles[cache_key]
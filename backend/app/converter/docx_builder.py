@@ -0,0 +1,1189 @@
+"""
+Constructor rápido de DOCX para el HTML que genera markdown_to_html.
+
+htmldocx es un conversor HTML genérico: limpia el HTML con BeautifulSoup,
+interpreta CSS que nunca emitimos y crea un proxy de python-docx por cada
+run. Nuestro HTML siempre viene de Python-Markdown con un conjunto de tags
+conocido, así que este módulo lo recorre con html.parser y una tabla de
+despacho por tag, agregando elementos lxml directamente al body.
+
+El resultado es equivalente al de htmldocx (mismos estilos, formato de
+runs, links, tablas e imágenes) sin sus runs y párrafos vacíos.
+"""
+
+import copy  # copy.copy de lxml copia el subárbol completo
+import os
+import re
+import unicodedata
+from html.parser import HTMLParser
+from io import BytesIO
+from typing import Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+from docx.enum.style import WD_STYLE_TYPE
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml.ns import nsmap, qn
+from docx.oxml.parser import oxml_parser
+from docx.oxml.shape import CT_Inline
+from docx.shared import RGBColor
+from lxml import etree
+
+from app.config import config
+from . import code_highlight, images, style_index
+from .events import END, START, TEXT
+
+
+# Mismos valores que htmldocx (pulgadas -> twips)
+LIST_INDENT_TWIPS = 720
+MAX_INDENT_TWIPS = 7920
+HEADING_MAX_LEVEL = 9
+CODE_FONT = "Courier"
+CODE_BLOCK_STYLE = "macro"
+CODE_CHAR_STYLE = "Macro Text Char"
+LINK_COLOR = "0000EE"
+TOC_STYLE = "TOC Heading"
+BOOKMARK_MAX_LENGTH = 40  # límite de Word para nombres de bookmark
+
+# Reparto del ancho de tabla: cada columna pesa según su texto más
+# largo, acotado para que ninguna quede ilegible ni acapare la página
+MIN_COLUMN_WEIGHT = 4
+MAX_COLUMN_WEIGHT = 40
+
+_EMUS_PER_TWIP = 635
+
+_W_NSMAP = {"w": nsmap["w"]}
+
+_P = qn("w:p")
+_PPR = qn("w:pPr")
+_PSTYLE = qn("w:pStyle")
+_PBDR = qn("w:pBdr")
+_BOTTOM = qn("w:bottom")
+_SPACING = qn("w:spacing")
+_IND = qn("w:ind")
+_JC = qn("w:jc")
+_R = qn("w:r")
+_RPR = qn("w:rPr")
+_RSTYLE = qn("w:rStyle")
+_RFONTS = qn("w:rFonts")
+_B = qn("w:b")
+_I = qn("w:i")
+_STRIKE = qn("w:strike")
+_COLOR = qn("w:color")
+_U = qn("w:u")
+_VERT_ALIGN = qn("w:vertAlign")
+_T = qn("w:t")
+_BR = qn("w:br")
+_TAB = qn("w:tab")
+_DRAWING = qn("w:drawing")
+_HYPERLINK = qn("w:hyperlink")
+_ANCHOR = qn("w:anchor")
+_HISTORY = qn("w:history")
+_BOOKMARK_START = qn("w:bookmarkStart")
+_BOOKMARK_END = qn("w:bookmarkEnd")
+_ID = qn("w:id")
+_NAME = qn("w:name")
+_FLD_CHAR = qn("w:fldChar")
+_FLD_CHAR_TYPE = qn("w:fldCharType")
+_INSTR_TEXT = qn("w:instrText")
+_UPDATE_FIELDS = qn("w:updateFields")
+_TBL = qn("w:tbl")
+_TBLPR = qn("w:tblPr")
+_TBLSTYLE = qn("w:tblStyle")
+_TBLW = qn("w:tblW")
+_TBLLOOK = qn("w:tblLook")
+_TBLGRID = qn("w:tblGrid")
+_GRIDCOL = qn("w:gridCol")
+_TR = qn("w:tr")
+_TRPR = qn("w:trPr")
+_TBLHEADER = qn("w:tblHeader")
+_TC = qn("w:tc")
+_TCPR = qn("w:tcPr")
+_TCW = qn("w:tcW")
+_VAL = qn("w:val")
+_W = qn("w:w")
+_TYPE = qn("w:type")
+_ASCII = qn("w:ascii")
+_HANSI = qn("w:hAnsi")
+_LEFT = qn("w:left")
+_LINE = qn("w:line")
+_LINE_RULE = qn("w:lineRule")
+_SZ = qn("w:sz")
+_SPACE = qn("w:space")
+_R_ID = qn("r:id")
+_XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+
+# Tag inline -> propiedad de run (mismo mapeo que htmldocx)
+_FONT_STYLES = {
+    "b": "bold",
+    "strong": "bold",
+    "em": "italic",
+    "i": "italic",
+    "u": "underline",
+    "s": "strike",
+    "sup": "superscript",
+    "sub": "subscript",
+    "code": "code",
+    "pre": "code",
+    "th": "bold",
+}
+
+_ALIGNMENTS = {"center": "center", "right": "right", "justify": "both"}
+
+_SKIPPED_TAGS = {"head", "script", "style", "title"}
+
+_NEWLINE_EDGES = (re.compile(r"^\s*\n+\s*"), re.compile(r"\s*\n+\s*$"))
+_NEWLINE = re.compile(r"\s*\n\s*")
+_SPACES = re.compile(r"\s+")
+_TEXT_BREAKS = re.compile(r"(\n|\t)")
+_NOT_WORD = re.compile(r"[^A-Za-z0-9]+")
+
+# Elementos de w:settings que el esquema ubica después de w:updateFields
+_AFTER_UPDATE_FIELDS = frozenset((
+    "hdrShapeDefaults", "footnotePr", "endnotePr", "compat", "docVars", "rsids",
+    "mathPr", "attachedSchema", "themeFontLang", "clrSchemeMapping",
+    "doNotIncludeSubdocsInStats", "doNotAutoCompressPictures", "forceUpgrade",
+    "captions", "readModeInkLockDown", "smartTagType", "schemaLibrary",
+    "shapeDefaults", "doNotEmbedSmartTags", "decimalSymbol", "listSeparator",
+))
+
+
+def add_html(
+    document,
+    html: str,
+    toc: bool = False,
+    bookmarks: Optional["Bookmarks"] = None
+) -> List[dict]:
+    """
+    Agrega HTML al final del cuerpo de un documento.
+
+    Args:
+        document: Objeto Document de python-docx
+        html: String con HTML generado por markdown_to_html
+        toc: Insertar una tabla de contenido al inicio
+        bookmarks: Bookmarks ya usados en el documento (ver Bookmarks)
+
+    Returns:
+        Índice de encabezados (ver DocxBuilder.headings)
+    """
+    builder = DocxBuilder(document, toc=toc, bookmarks=bookmarks)
+    builder.feed(html)
+    builder.close()
+    return builder.headings
+
+
+def add_events(document, events: Iterable[tuple], toc: bool = False) -> List[dict]:
+    """
+    Agrega al documento un flujo de eventos (ver events.py).
+
+    Los eventos se consumen a medida que se generan: el HTML completo
+    nunca existe en memoria.
+
+    Args:
+        document: Objeto Document de python-docx
+        events: Iterable de eventos (tipo, valor, attrs)
+        toc: Insertar una tabla de contenido al inicio
+
+    Returns:
+        Índice de encabezados (ver DocxBuilder.headings)
+    """
+    builder = DocxBuilder(document, toc=toc)
+    builder.consume(events)
+    builder.close()
+    return builder.headings
+
+
+class Bookmarks:
+    """
+    Nombres e ids de bookmark usados en un documento.
+
+    Un builder numera sus bookmarks desde 1; cuando varios builders
+    escriben en el mismo documento (ej: docx_patch, un builder por
+    bloque) comparten una instancia para no repetir ids ni nombres.
+    """
+
+    def __init__(self):
+        self.names: set = set()
+        self.last_id = 0
+
+    def name(self, text: str) -> str:
+        """Nombre de bookmark único y válido para Word (ASCII, máx. 40)."""
+        ascii_text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+        slug = _NOT_WORD.sub("_", ascii_text).strip("_").lower() or "seccion"
+        base = ("h_" + slug)[:BOOKMARK_MAX_LENGTH]
+        name = base
+        counter = 1
+        while name in self.names:
+            counter += 1
+            suffix = f"_{counter}"
+            name = base[:BOOKMARK_MAX_LENGTH - len(suffix)] + suffix
+        self.names.add(name)
+        return name
+
+    def next_id(self) -> str:
+        self.last_id += 1
+        return str(self.last_id)
+
+
+def renumber_bookmarks(body) -> None:
+    """
+    Vuelve a numerar los bookmarks de encabezado en orden de documento.
+
+    Los ids quedan 1..n y los nombres se derivan otra vez del texto de
+    cada encabezado, igual que si el documento se hubiera armado de una
+    sola vez (ver docx_patch.patch).
+
+    Args:
+        body: Elemento w:body del documento
+    """
+    bookmarks = Bookmarks()
+    for start in list(body.iter(_BOOKMARK_START)):
+        paragraph = start.getparent()
+        old_id = start.get(_ID)
+        text = "".join(
+            node.text or "" if node.tag == _T else " "
+            for node in paragraph.iter(_T, _TAB, _BR)
+        )
+        new_id = bookmarks.next_id()
+        start.set(_NAME, bookmarks.name(_collapse_whitespace(text).strip()))
+        start.set(_ID, new_id)
+        for end in paragraph.iter(_BOOKMARK_END):
+            if end.get(_ID) == old_id:
+                end.set(_ID, new_id)
+                break
+
+
+class DocxBuilder(HTMLParser):
+    """
+    Parser HTML que escribe WordprocessingML directamente.
+
+    Cada tag de inicio y cierre se resuelve con una tabla de despacho.
+    El formato inline activo se mantiene como contadores, y las
+    propiedades de run (rPr) se construyen una vez por combinación.
+    El builder no depende de lo que ya hay en el documento: cada
+    llamada empieza sin párrafo abierto.
+
+    Los encabezados se indexan mientras se construyen: cada uno lleva un
+    bookmark, y con toc=True la tabla de contenido se completa con el
+    índice al cerrar, sin recorrer el documento otra vez.
+
+    Attributes:
+        document: Objeto Document de python-docx
+        headings: Índice de encabezados [{"level", "text", "anchor"}],
+            anchor es el nombre del bookmark
+    """
+
+    def __init__(self, document, toc: bool = False, bookmarks: Optional[Bookmarks] = None):
+        """
+        Inicializa el builder.
+
+        Args:
+            document: Objeto Document de python-docx
+            toc: Insertar una tabla de contenido al inicio
+            bookmarks: Bookmarks compartidos con otros builders del
+                mismo documento (default: nuevos, numerados desde 1)
+        """
+        super().__init__(convert_charrefs=True)
+        self.document = document
+        self._part = document.part
+        self._container = document.element.body
+        self._anchor = self._container.sectPr
+        self._paragraph = None
+        self._fresh_item = False
+        self._formats: Dict[str, int] = {}
+        self._link: Optional[str] = None
+        self._link_rids: Optional[Dict[str, str]] = None
+        self._next_rid = 1
+        self._lists: List[str] = []
+        self._pre = 0
+        self._code: Optional[List[str]] = None
+        self._code_language: Optional[str] = None
+        self._code_rpr: Dict[tuple, etree._Element] = {}
+        self._skip = 0
+        self._tables: List[dict] = []
+        self._styles: Dict[str, Optional[str]] = {}
+        self._style_index = style_index.for_document(document)
+        self._rpr_cache: Dict[tuple, Optional[etree._Element]] = {}
+        self._block_width: Optional[int] = None
+        self.headings: List[dict] = []
+        self._heading: Optional[dict] = None
+        self._bookmarks = bookmarks if bookmarks is not None else Bookmarks()
+        self._images: List[tuple] = []
+        self._media: Dict[str, tuple] = {}
+        self._shape_id: Optional[int] = None
+        self._toc: Optional[list] = self._start_toc() if toc else None
+
+        self._start_handlers: Dict[str, Callable[[str, dict], None]] = {
+            "p": self._start_paragraph,
+            "pre": self._start_pre,
+            "code": self._start_code,
+            "li": self._start_item,
+            "ul": self._start_list,
+            "ol": self._start_list,
+            "br": self._start_break,
+            "hr": self._start_rule,
+            "a": self._start_link,
+            "img": self._start_image,
+            "table": self._start_table,
+            "thead": self._start_head,
+            "tr": self._start_row,
+            "td": self._start_cell,
+            "th": self._start_cell,
+        }
+        for level in range(1, 7):
+            self._start_handlers[f"h{level}"] = self._start_heading
+
+        self._end_handlers: Dict[str, Callable[[str], None]] = {
+            "p": self._end_block,
+            "pre": self._end_pre,
+            "li": self._end_block,
+            "ul": self._end_list,
+            "ol": self._end_list,
+            "a": self._end_link,
+            "table": self._end_table,
+            "thead": self._end_head,
+            "tr": self._end_row,
+            "td": self._end_cell,
+            "th": self._end_cell,
+        }
+        for level in range(1, 7):
+            self._end_handlers[f"h{level}"] = self._end_heading
+
+    def pop_completed(self, final: bool = False) -> list:
+        """
+        Retira del body los elementos de primer nivel ya terminados.
+
+        Permite escribir el documento en streaming: mientras haya una
+        tabla en construcción no se retira nada, y el párrafo abierto
+        (que todavía puede recibir runs) queda hasta el final.
+
+        Args:
+            final: Retirar también el párrafo abierto (después de close)
+
+        Returns:
+            Elementos retirados, en orden de documento
+        """
+        if self._tables:
+            return []
+        self._resolve_images()
+        body = self.document.element.body
+        keep = None if final else self._paragraph
+        completed = [
+            element for element in body
+            if element is not self._anchor and element is not keep
+        ]
+        for element in completed:
+            body.remove(element)
+        return completed
+
+    # ==========================================
+    # Eventos de html.parser
+    # ==========================================
+
+    def consume(self, events: Iterable[tuple]) -> None:
+        """
+        Procesa eventos de la representación intermedia.
+
+        Args:
+            events: Iterable de eventos (tipo, valor, attrs)
+        """
+        handle_starttag = self.handle_starttag
+        handle_endtag = self.handle_endtag
+        handle_data = self.handle_data
+        for kind, value, attrs in events:
+            if kind == TEXT:
+                handle_data(value)
+            elif kind == START:
+                handle_starttag(value, attrs)
+            elif kind == END:
+                handle_endtag(value)
+            else:
+                self.handle_startendtag(value, attrs)
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag in _SKIPPED_TAGS:
+            self._skip += 1
+            return
+        if self._skip:
+            return
+
+        if tag in _FONT_STYLES:
+            key = _FONT_STYLES[tag]
+            self._formats[key] = self._formats.get(key, 0) + 1
+
+        handler = self._start_handlers.get(tag)
+        if handler is not None:
+            handler(tag, dict(attrs))
+
+    def handle_startendtag(self, tag: str, attrs: list) -> None:
+        # <br/>, <img/>, <hr/>: no abren formato
+        if self._skip:
+            return
+        handler = self._start_handlers.get(tag)
+        if handler is not None:
+            handler(tag, dict(attrs))
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in _SKIPPED_TAGS:
+            self._skip = max(self._skip - 1, 0)
+            return
+        if self._skip:
+            return
+
+        if tag in _FONT_STYLES:
+            key = _FONT_STYLES[tag]
+            if self._formats.get(key):
+                self._formats[key] -= 1
+
+        handler = self._end_handlers.get(tag)
+        if handler is not None:
+            handler(tag)
+
+    def handle_data(self, data: str) -> None:
+        if self._skip:
+            return
+
+        if self._code is not None:
+            self._code.append(data)
+            return
+
+        if not self._pre:
+            data = _collapse_whitespace(data)
+            if not data:
+                return
+
+        if self._heading is not None:
+            self._heading["text"].append(data)
+
+        if self._tables:
+            self._tables[-1]["chars"] += len(data)
+
+        if self._paragraph is None:
+            self._new_paragraph()
+
+        if self._link is not None:
+            self._add_link_run(data)
+        else:
+            self._add_run(data)
+
+    # ==========================================
+    # Bloques
+    # ==========================================
+
+    def _start_paragraph(self, tag: str, attrs: dict) -> None:
+        if self._fresh_item:
+            # <li><p>: el primer párrafo de un ítem "loose" es el ítem
+            self._fresh_item = False
+        elif self._lists:
+            self._new_paragraph(indent=self._list_indent())
+        else:
+            self._new_paragraph()
+        self._apply_alignment(attrs)
+
+    def _start_heading(self, tag: str, attrs: dict) -> None:
+        level = int(tag[1])
+        paragraph = self._new_paragraph(style=f"Heading {min(level, HEADING_MAX_LEVEL)}")
+        self._apply_alignment(attrs)
+        self._heading = {"level": level, "text": [], "paragraph": paragraph}
+
+    def _end_heading(self, tag: str) -> None:
+        heading = self._heading
+        if heading is not None:
+            self._heading = None
+            text = "".join(heading["text"]).strip()
+            anchor = self._bookmarks.name(text)
+            self._add_bookmark(heading["paragraph"], anchor)
+            self.headings.append({"level": heading["level"], "text": text, "anchor": anchor})
+        self._end_block(tag)
+
+    def _start_pre(self, tag: str, attrs: dict) -> None:
+        self._pre += 1
+        if self._pre == 1:
+            # El contenido se junta y se escribe completo al cerrar
+            self._new_paragraph(style=CODE_BLOCK_STYLE)
+            self._code = []
+            self._code_language = None
+
+    def _start_code(self, tag: str, attrs: dict) -> None:
+        if self._code is not None:
+            for name in (attrs.get("class") or "").split():
+                if name.startswith("language-"):
+                    self._code_language = name[len("language-"):]
+
+    def _end_pre(self, tag: str) -> None:
+        self._pre = max(self._pre - 1, 0)
+        if not self._pre and self._code is not None:
+            self._add_code_block("".join(self._code), self._code_language)
+            self._code = None
+        self._end_block(tag)
+
+    def _start_list(self, tag: str, attrs: dict) -> None:
+        self._lists.append(tag)
+
+    def _end_list(self, tag: str) -> None:
+        if tag in self._lists:
+            del self._lists[len(self._lists) - 1 - self._lists[::-1].index(tag)]
+        self._paragraph = None
+        self._fresh_item = False
+
+    def _start_item(self, tag: str, attrs: dict) -> None:
+        style = "List Number" if self._lists and self._lists[-1] == "ol" else "List Bullet"
+        self._new_paragraph(style=style, indent=self._list_indent(), line_spacing=True)
+        self._fresh_item = True
+
+    def _end_block(self, tag: str) -> None:
+        self._paragraph = None
+        self._fresh_item = False
+
+    def _start_break(self, tag: str, attrs: dict) -> None:
+        if self._paragraph is None:
+            self._new_paragraph()
+        # El salto va en el último run del párrafo, como en htmldocx
+        last = self._paragraph[-1] if len(self._paragraph) else None
+        if last is None or last.tag != _R:
+            last = self._add_run("")
+        etree.SubElement(last, _BR)
+
+    def _start_rule(self, tag: str, attrs: dict) -> None:
+        paragraph = self._new_paragraph()
+        border = etree.SubElement(self._get_ppr(paragraph), _PBDR)
+        etree.SubElement(border, _BOTTOM, {
+            _VAL: "single", _SZ: "6", _SPACE: "1", _COLOR: "auto"
+        })
+        self._paragraph = None
+
+    def _new_paragraph(
+        self,
+        style: Optional[str] = None,
+        indent: Optional[int] = None,
+        line_spacing: bool = False
+    ):
+        """
+        Crea un párrafo al final del contenedor actual.
+
+        Args:
+            style: Nombre del estilo de párrafo (opcional)
+            indent: Sangría izquierda en twips (opcional)
+            line_spacing: Si True fija interlineado simple (listas)
+
+        Returns:
+            Elemento w:p creado
+        """
+        paragraph = oxml_parser.makeelement(_P, nsmap=_W_NSMAP)
+
+        style_id = self._style_id(style) if style else None
+        if style_id or indent is not None or line_spacing:
+            ppr = etree.SubElement(paragraph, _PPR)
+            if style_id:
+                etree.SubElement(ppr, _PSTYLE, {_VAL: style_id})
+            if line_spacing:
+                etree.SubElement(ppr, _SPACING, {_LINE: "240", _LINE_RULE: "auto"})
+            if indent is not None:
+                etree.SubElement(ppr, _IND, {_LEFT: str(indent)})
+
+        self._insert(paragraph)
+        self._paragraph = paragraph
+        self._fresh_item = False
+        return paragraph
+
+    def _insert(self, element) -> None:
+        if self._anchor is not None:
+            self._anchor.addprevious(element)
+        else:
+            self._container.append(element)
+
+    def _get_ppr(self, paragraph):
+        ppr = paragraph.find(_PPR)
+        if ppr is None:
+            ppr = etree.Element(_PPR)
+            paragraph.insert(0, ppr)
+        return ppr
+
+    def _apply_alignment(self, attrs: dict) -> None:
+        alignment = _text_align(attrs.get("style"))
+        if alignment and self._paragraph is not None:
+            # jc va después de pStyle/spacing/ind en el esquema
+            etree.SubElement(self._get_ppr(self._paragraph), _JC, {_VAL: alignment})
+
+    def _list_indent(self) -> int:
+        return min(len(self._lists) * LIST_INDENT_TWIPS, MAX_INDENT_TWIPS)
+
+    def _style_id(self, name: str) -> Optional[str]:
+        """Resuelve el id de un estilo por nombre (índice de la plantilla)."""
+        if name not in self._styles:
+            style_id = self._style_index.style_id(name)
+            if style_id is None:
+                # Estilos agregados al documento después de la plantilla
+                try:
+                    style_id = self.document.styles[name].style_id
+                except KeyError:
+                    pass
+            self._styles[name] = style_id
+        return self._styles[name]
+
+    # ==========================================
+    # Índice de encabezados y tabla de contenido
+    # ==========================================
+
+    def close(self) -> None:
+        super().close()
+        self._resolve_images()
+        if self._toc is not None:
+            self._finish_toc()
+
+    def _add_bookmark(self, paragraph, name: str) -> None:
+        """Envuelve el contenido del párrafo en un bookmark."""
+        bookmark_id = self._bookmarks.next_id()
+        start = etree.Element(_BOOKMARK_START, {_ID: bookmark_id, _NAME: name})
+        ppr = paragraph.find(_PPR)
+        paragraph.insert(1 if ppr is not None else 0, start)
+        etree.SubElement(paragraph, _BOOKMARK_END, {_ID: bookmark_id})
+
+    def _start_toc(self) -> list:
+        """
+        Inserta el campo TOC al inicio del contenido.
+
+        El resultado del campo (las entradas) se completa al cerrar con
+        el índice de encabezados; Word lo recalcula con números de página
+        al abrir el documento (updateFields).
+
+        Returns:
+            [párrafo de apertura, párrafo de cierre]
+        """
+        title = self._new_paragraph(style=TOC_STYLE)
+        self._add_run(config.DOCX_TOC_TITLE)
+
+        begin = self._new_paragraph()
+        self._add_field_char(begin, "begin")
+        instr = etree.SubElement(etree.SubElement(begin, _R), _INSTR_TEXT)
+        instr.text = f' TOC \\o "1-{config.DOCX_TOC_LEVELS}" \\h \\z \\u '
+        instr.set(_XML_SPACE, "preserve")
+        self._add_field_char(begin, "separate")
+
+        end = self._new_paragraph()
+        self._add_field_char(end, "end")
+        self._paragraph = None
+
+        settings = self.document.settings.element
+        if settings.find(_UPDATE_FIELDS) is None:
+            update = etree.Element(_UPDATE_FIELDS, {_VAL: "true"})
+            # El esquema de settings.xml es una secuencia: va antes de compat
+            following = next(
+                (child for child in settings if etree.QName(child).localname in _AFTER_UPDATE_FIELDS),
+                None
+            )
+            if following is not None:
+                following.addprevious(update)
+            else:
+                settings.append(update)
+        return [title, begin, end]
+
+    def _finish_toc(self) -> None:
+        """Escribe una entrada con hipervínculo interno por encabezado."""
+        _, begin, end = self._toc
+        self._toc = None
+        if end.getparent() is None:
+            # Ya se escribió (writer en streaming): Word lo completa al abrir
+            return
+
+        previous = begin
+        for heading in self.headings:
+            if heading["level"] > config.DOCX_TOC_LEVELS:
+                continue
+            entry = oxml_parser.makeelement(_P, nsmap=_W_NSMAP)
+            style_id = self._style_id(f"toc {heading['level']}")
+            ppr = etree.SubElement(entry, _PPR)
+            if style_id:
+                etree.SubElement(ppr, _PSTYLE, {_VAL: style_id})
+            else:
+                indent = (heading["level"] - 1) * LIST_INDENT_TWIPS
+                etree.SubElement(ppr, _IND, {_LEFT: str(indent)})
+            link = etree.SubElement(entry, _HYPERLINK, {
+                _ANCHOR: heading["anchor"], _HISTORY: "1"
+            })
+            _append_text(etree.SubElement(link, _R), heading["text"])
+            previous.addnext(entry)
+            previous = entry
+
+    def _add_field_char(self, paragraph, kind: str) -> None:
+        run = etree.SubElement(paragraph, _R)
+        etree.SubElement(run, _FLD_CHAR, {_FLD_CHAR_TYPE: kind})
+
+    # ==========================================
+    # Runs y links
+    # ==========================================
+
+    def _add_run(self, text: str):
+        """
+        Agrega un run con el formato inline activo al párrafo actual.
+
+        Args:
+            text: Texto del run (\\n y \\t se convierten en w:br / w:tab)
+
+        Returns:
+            Elemento w:r creado
+        """
+        run = etree.SubElement(self._paragraph, _R)
+        rpr = self._run_properties()
+        if rpr is not None:
+            run.append(copy.copy(rpr))
+        _append_text(run, text)
+        self._fresh_item = False
+        return run
+
+    def _run_properties(self):
+        """Propiedades de run para el formato activo, construidas una vez."""
+        key = tuple(sorted(name for name, count in self._formats.items() if count))
+        if key in self._rpr_cache:
+            return self._rpr_cache[key]
+
+        rpr = None
+        if key:
+            rpr = oxml_parser.makeelement(_RPR, nsmap=_W_NSMAP)
+            if "code" in key:
+                etree.SubElement(rpr, _RFONTS, {_ASCII: CODE_FONT, _HANSI: CODE_FONT})
+            if "bold" in key:
+                etree.SubElement(rpr, _B)
+            if "italic" in key:
+                etree.SubElement(rpr, _I)
+            if "strike" in key:
+                etree.SubElement(rpr, _STRIKE)
+            if "underline" in key:
+                etree.SubElement(rpr, _U, {_VAL: "single"})
+            if "superscript" in key:
+                etree.SubElement(rpr, _VERT_ALIGN, {_VAL: "superscript"})
+            elif "subscript" in key:
+                etree.SubElement(rpr, _VERT_ALIGN, {_VAL: "subscript"})
+
+        self._rpr_cache[key] = rpr
+        return rpr
+
+    def _start_link(self, tag: str, attrs: dict) -> None:
+        self._link = attrs.get("href")
+
+    def _end_link(self, tag: str) -> None:
+        self._link = None
+
+    def _add_link_run(self, text: str) -> None:
+        """Agrega un hyperlink externo (mismo formato que htmldocx)."""
+        rId = self._link_rid(self._link)
+
+        hyperlink = etree.SubElement(self._paragraph, _HYPERLINK, {_R_ID: rId})
+        run = etree.SubElement(hyperlink, _R)
+        rpr = etree.SubElement(run, _RPR)
+        etree.SubElement(rpr, _COLOR, {_VAL: LINK_COLOR})
+        etree.SubElement(rpr, _U, {_VAL: "single"})
+        _append_text(run, text)
+        self._fresh_item = False
+
+    def _link_rid(self, href: str) -> str:
+        """
+        rId de la relación externa a href, agregada si no existe.
+
+        part.relate_to recorre todas las relaciones de la parte en cada
+        llamada (cuadrático en la cantidad de links): acá se indexan una
+        vez por builder y las nuevas se agregan directo.
+        """
+        rels = self._part.rels
+        if self._link_rids is None:
+            self._link_rids = {
+                rel.target_ref: rId for rId, rel in rels.items()
+                if rel.is_external and rel.reltype == RT.HYPERLINK
+            }
+        rId = self._link_rids.get(href)
+        if rId is None:
+            while f"rId{self._next_rid}" in rels:
+                self._next_rid += 1
+            rId = f"rId{self._next_rid}"
+            rels.add_relationship(RT.HYPERLINK, href, rId, is_external=True)
+            self._link_rids[href] = rId
+        return rId
+
+    # ==========================================
+    # Bloques de código
+    # ==========================================
+
+    def _add_code_block(self, code: str, language: Optional[str]) -> None:
+        """
+        Escribe un bloque de código en el párrafo abierto por <pre>.
+
+        Todo el bloque comparte un estilo de carácter y las líneas se
+        separan con w:br, así que sin resaltado es un único run. Con
+        resaltado hay un run por segmento de tokens de igual estilo.
+
+        Args:
+            code: Texto del bloque tal como viene en el HTML
+            language: Lenguaje de la clase language-* (opcional)
+        """
+        if code.endswith("\n"):
+            # El salto final del fence no es una línea del bloque
+            code = code[:-1]
+
+        parts = code_highlight.segments(code, language) if config.CODE_HIGHLIGHT else None
+        if parts is None:
+            parts = [(code, None)]
+
+        for text, key in parts:
+            run = etree.SubElement(self._paragraph, _R)
+            run.append(copy.copy(self._code_properties(key)))
+            _append_text(run, text)
+
+    def _code_properties(self, key):
+        """
+        rPr de código para un estilo de token, construido una vez.
+
+        Cada estilo de token es un estilo de carácter del documento
+        (basado en el de código), así cada run solo lleva un w:rStyle.
+        """
+        if key not in self._code_rpr:
+            rpr = oxml_parser.makeelement(_RPR, nsmap=_W_NSMAP)
+            style_id = self._code_style_id(key)
+            if style_id:
+                etree.SubElement(rpr, _RSTYLE, {_VAL: style_id})
+            else:
+                etree.SubElement(rpr, _RFONTS, {_ASCII: CODE_FONT, _HANSI: CODE_FONT})
+            self._code_rpr[key] = rpr
+        return self._code_rpr[key]
+
+    def _code_style_id(self, key=None) -> Optional[str]:
+        """
+        Estilo de carácter para código (o para un estilo de token).
+
+        Los estilos que la plantilla no tiene se crean una vez por documento.
+
+        Args:
+            key: (color, negrita, cursiva) de code_highlight, o None
+
+        Returns:
+            Id del estilo
+        """
+        if key is None:
+            name = CODE_CHAR_STYLE
+        else:
+            color, bold, italic = key
+            name = " ".join(filter(None, [
+                "Code", color or "Auto", "Bold" if bold else "", "Italic" if italic else ""
+            ]))
+
+        style_id = self._style_id(name)
+        if style_id is None:
+            style = self.document.styles.add_style(name, WD_STYLE_TYPE.CHARACTER)
+            if key is None:
+                style.font.name = CODE_FONT
+            else:
+                self._code_style_id()
+                style.base_style = self.document.styles[CODE_CHAR_STYLE]
+                if color:
+                    style.font.color.rgb = RGBColor.from_string(color)
+                style.font.bold = bold or None
+                style.font.italic = italic or None
+            style_id = self._styles[name] = style.style_id
+        return style_id
+
+    # ==========================================
+    # Imágenes
+    # ==========================================
+
+    def _start_image(self, tag: str, attrs: dict) -> None:
+        """
+        Reserva el run de la imagen y la procesa en el pool (images.py).
+
+        El dibujo se completa en _resolve_images, antes de retirar o
+        cerrar el documento, así las imágenes se decodifican en paralelo.
+        """
+        src = attrs.get("src") or ""
+        future = images.submit(src, images.max_pixels(self._available_width()))
+
+        if self._paragraph is None:
+            self._new_paragraph()
+        run = etree.SubElement(self._paragraph, _R)
+        self._images.append((run, src, future, self._run_properties()))
+        self._fresh_item = False
+
+    def _resolve_images(self) -> None:
+        """Inserta las imágenes pendientes; las idénticas comparten media."""
+        pending, self._images = self._images, []
+        for run, src, future, rpr in pending:
+            inline = None
+            processed = future.result()
+            if processed is not None:
+                try:
+                    inline = self._picture(*processed)
+                except Exception:
+                    inline = None
+
+            if inline is None:
+                # Mismo placeholder que htmldocx, sin exponer rutas locales
+                if src.startswith("data:"):
+                    name = "data"
+                elif _is_url(src):
+                    name = src
+                else:
+                    name = os.path.basename(urlparse(src).path)
+                if rpr is not None:
+                    run.append(copy.copy(rpr))
+                _append_text(run, f"<image: {name}>")
+            else:
+                etree.SubElement(run, _DRAWING).append(inline)
+
+    def _picture(self, data: bytes, digest: str):
+        """
+        w:inline para una imagen, limitada al ancho disponible.
+
+        Una sola parte media (y una relación) por contenido distinto.
+        """
+        media = self._media.get(digest)
+        if media is None:
+            r_id, image = self._part.get_or_add_image(BytesIO(data))
+            cx, cy = image.scaled_dimensions()
+            width = self._available_width()
+            if cx > width:
+                cx, cy = width, int(cy * width / cx)
+            media = self._media[digest] = (r_id, image.filename, cx, cy)
+
+        if self._shape_id is None:
+            self._shape_id = self._part.next_id
+        else:
+            self._shape_id += 1
+        r_id, filename, cx, cy = media
+        return CT_Inline.new_pic_inline(self._shape_id, r_id, filename, cx, cy)
+
+    # ==========================================
+    # Tablas
+    # ==========================================
+
+    def _start_table(self, tag: str, attrs: dict) -> None:
+        # Se guarda el contexto y las celdas se construyen sueltas;
+        # el w:tbl se arma completo, en una pasada, al cerrar la tabla
+        self._tables.append({
+            "container": self._container,
+            "anchor": self._anchor,
+            "lists": self._lists,
+            "rows": [],
+            "row": None,
+            "head": False,
+            "lengths": [],
+            "chars": 0,
+            "alignment": None,
+        })
+        self._lists = []
+        self._paragraph = None
+
+    def _start_head(self, tag: str, attrs: dict) -> None:
+        if self._tables:
+            self._tables[-1]["head"] = True
+
+    def _end_head(self, tag: str) -> None:
+        if self._tables:
+            self._tables[-1]["head"] = False
+
+    def _start_row(self, tag: str, attrs: dict) -> None:
+        if self._tables:
+            table = self._tables[-1]
+            table["row"] = {"cells": [], "header": table["head"], "all_th": True}
+            table["rows"].append(table["row"])
+
+    def _end_row(self, tag: str) -> None:
+        if self._tables:
+            self._tables[-1]["row"] = None
+
+    def _start_cell(self, tag: str, attrs: dict) -> None:
+        if not self._tables:
+            return
+        table = self._tables[-1]
+        if table["row"] is None:
+            self._start_row("tr", {})
+
+        row = table["row"]
+        row["all_th"] = row["all_th"] and tag == "th"
+        cell = oxml_parser.makeelement(_TC, nsmap=_W_NSMAP)
+        row["cells"].append(cell)
+        table["chars"] = 0
+        table["alignment"] = _text_align(attrs.get("style"))
+        self._container = cell
+        self._anchor = None
+        self._paragraph = None
+
+    def _end_cell(self, tag: str) -> None:
+        if not self._tables:
+            return
+        table = self._tables[-1]
+        cell = self._container
+
+        # Una celda debe terminar en un párrafo o Word la marca como corrupta
+        if not len(cell) or cell[-1].tag != _P:
+            cell.append(oxml_parser.makeelement(_P, nsmap=_W_NSMAP))
+
+        if table["alignment"]:
+            for paragraph in cell.iterchildren(_P):
+                if paragraph.find(f"{_PPR}/{_JC}") is None:
+                    etree.SubElement(self._get_ppr(paragraph), _JC, {_VAL: table["alignment"]})
+
+        # Largo del contenido por columna, para repartir el ancho
+        column = len(table["row"]["cells"]) - 1 if table["row"] else 0
+        lengths = table["lengths"]
+        if column >= len(lengths):
+            lengths.extend([0] * (column + 1 - len(lengths)))
+        lengths[column] = max(lengths[column], table["chars"])
+
+        self._container = table["container"]
+        self._paragraph = None
+
+    def _end_table(self, tag: str) -> None:
+        if not self._tables:
+            return
+        table = self._tables.pop()
+        self._container = table["container"]
+        self._anchor = table["anchor"]
+        self._lists = table["lists"]
+        self._paragraph = None
+
+        rows = [row for row in table["rows"] if row["cells"]]
+        if rows:
+            self._insert(self._build_table(rows, table["lengths"]))
+
+    def _build_table(self, rows: List[dict], lengths: List[int]):
+        """
+        Arma un w:tbl completo a partir de las celdas ya construidas.
+
+        Todo se resuelve una vez por tabla (estilo, grilla, anchos) y las
+        filas se escriben en una sola pasada: el costo es lineal en la
+        cantidad de celdas, sin el acceso por (fila, columna) de python-docx.
+
+        Args:
+            rows: Filas ({"cells", "header", "all_th"}) con elementos w:tc
+            lengths: Largo máximo del texto de cada columna
+
+        Returns:
+            Elemento w:tbl
+        """
+        columns = len(rows[0]["cells"])
+        widths = _column_widths(lengths[:columns] + [0] * (columns - len(lengths)),
+                                _twips(self._available_width()))
+
+        tbl = oxml_parser.makeelement(_TBL, nsmap=_W_NSMAP)
+        tblPr = etree.SubElement(tbl, _TBLPR)
+        style_id = self._style_id(config.DOCX_TABLE_STYLE) if config.DOCX_TABLE_STYLE else None
+        if style_id:
+            etree.SubElement(tblPr, _TBLSTYLE, {_VAL: style_id})
+        etree.SubElement(tblPr, _TBLW, {_TYPE: "auto", _W: "0"})
+        etree.SubElement(tblPr, _TBLLOOK, {
+            qn("w:firstColumn"): "1", qn("w:firstRow"): "1",
+            qn("w:lastColumn"): "0", qn("w:lastRow"): "0",
+            qn("w:noHBand"): "0", qn("w:noVBand"): "1", _VAL: "04A0"
+        })
+
+        grid = etree.SubElement(tbl, _TBLGRID)
+        for width in widths:
+            etree.SubElement(grid, _GRIDCOL, {_W: str(width)})
+
+        # Una celda de tcPr por columna; cada celda recibe una copia
+        cell_properties = []
+        for width in widths:
+            tcPr = oxml_parser.makeelement(_TCPR, nsmap=_W_NSMAP)
+            etree.SubElement(tcPr, _TCW, {_TYPE: "dxa", _W: str(width)})
+            cell_properties.append(tcPr)
+
+        # Word solo repite las filas de encabezado iniciales y contiguas
+        leading_header = True
+        for row in rows:
+            tr = etree.SubElement(tbl, _TR)
+            leading_header = leading_header and (row["header"] or row["all_th"])
+            if leading_header:
+                trPr = etree.SubElement(tr, _TRPR)
+                etree.SubElement(trPr, _TBLHEADER)
+
+            # Las filas más cortas se completan, las más largas se recortan
+            cells = row["cells"][:columns]
+            while len(cells) < columns:
+                empty = oxml_parser.makeelement(_TC, nsmap=_W_NSMAP)
+                etree.SubElement(empty, _P)
+                cells.append(empty)
+            for cell, tcPr in zip(cells, cell_properties):
+                cell.insert(0, copy.copy(tcPr))
+                tr.append(cell)
+
+        return tbl
+
+    def _available_width(self) -> int:
+        """Ancho entre márgenes de la última sección, en EMU."""
+        if self._block_width is None:
+            section = self.document.sections[-1]
+            self._block_width = (
+                section.page_width - section.left_margin - section.right_margin
+            )
+        return self._block_width
+
+
+def _collapse_whitespace(text: str) -> str:
+    """
+    Normaliza espacios fuera de <pre> igual que htmldocx.
+
+    Quita saltos de línea (y su espacio) al inicio y al final, convierte
+    los intermedios en un espacio y colapsa espacios repetidos.
+    """
+    if "\n" in text:
+        text = _NEWLINE_EDGES[0].sub("", text)
+        text = _NEWLINE_EDGES[1].sub("", text)
+        text = _NEWLINE.sub(" ", text)
+    return _SPACES.sub(" ", text)
+
+
+def _append_text(run, text: str) -> None:
+    """Agrega texto a un run, con w:br / w:tab para saltos y tabs."""
+    if "\n" not in text and "\t" not in text:
+        if text:
+            _append_t(run, text)
+        return
+
+    for piece in _TEXT_BREAKS.split(text):
+        if piece == "\n":
+            etree.SubElement(run, _BR)
+        elif piece == "\t":
+            etree.SubElement(run, _TAB)
+        elif piece:
+            _append_t(run, piece)
+
+
+def _append_t(run, text: str) -> None:
+    t = etree.SubElement(run, _T)
+    t.text = text
+    if text[0].isspace() or text[-1].isspace():
+        t.set(_XML_SPACE, "preserve")
+
+
+def _text_align(style: Optional[str]) -> Optional[str]:
+    """Valor de w:jc para un atributo style con text-align."""
+    if not style or "text-align" not in style:
+        return None
+    for declaration in style.split(";"):
+        name, _, value = declaration.partition(":")
+        if name.strip() == "text-align":
+            return _ALIGNMENTS.get(value.strip())
+    return None
+
+
+def _column_widths(lengths: List[int], total: int) -> List[int]:
+    """
+    Reparte el ancho disponible según el largo del contenido de cada columna.
+
+    Args:
+        lengths: Largo máximo del texto de cada columna
+        total: Ancho disponible en twips
+
+    Returns:
+        Ancho de cada columna en twips (suman como máximo total)
+    """
+    weights = [
+        min(max(length, MIN_COLUMN_WEIGHT), MAX_COLUMN_WEIGHT) for length in lengths
+    ]
+    scale = total / sum(weights)
+    return [int(weight * scale) for weight in weights]
+
+
+def _twips(emu: int) -> int:
+    return int(round(emu / float(_EMUS_PER_TWIP)))
+
+
+def _is_url(src: str) -> bool:
+    parts = urlparse(src)
+    return all([parts.scheme, parts.netloc, parts.path])
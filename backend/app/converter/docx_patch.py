@@ -0,0 +1,340 @@
+"""
+Parcheo incremental de DOCX a partir de un render anterior.
+
+El documento se construye bloque a bloque y guarda un mapa de bloques
+(hash del bloque Markdown -> cantidad de elementos del body) como una
+parte customXml. Con ese mapa, un nuevo Markdown solo re-renderiza los
+bloques que cambiaron; el resto de document.xml, estilos, numeración y
+media del DOCX anterior se reutilizan tal cual.
+
+El mapa registra el backend DOCX que lo generó: la cantidad de elementos
+por bloque depende del backend, así que un mapa de otro backend no se usa.
+"""
+
+from io import BytesIO
+from typing import List, Optional
+
+from docx import Document
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.opc.packuri import PackURI
+from docx.opc.part import Part
+from docx.oxml import OxmlElement
+from docx.text.paragraph import Paragraph
+from lxml import etree
+
+from app.config import config
+from .docx_builder import Bookmarks, renumber_bookmarks
+from .html_to_docx import BACKEND_HTMLDOCX, BulkTableHtmlToDocx, add_html
+from .incremental import block_hash, find_global_features, render_blocks, split_blocks
+from .markdown_to_html import convert as md_to_html
+
+
+BLOCK_MAP_NAMESPACE = "urn:md-converter:block-map"
+
+_REF_ATTRIBUTES = (
+    "//@*[namespace-uri()="
+    "'http://schemas.openxmlformats.org/officeDocument/2006/relationships']"
+)
+_DISPOSABLE_RELTYPES = (RT.HYPERLINK, RT.IMAGE)
+
+
+class _BlockParser(BulkTableHtmlToDocx):
+    """
+    Parser htmldocx que arranca cada bloque sin depender del anterior.
+
+    En un documento completo, el espacio entre tags que sigue a un bloque
+    cae como run vacío en el último párrafo del bloque previo. Aquí ese
+    espacio va a un párrafo descartable, así el resultado de un bloque
+    es el mismo sin importar qué bloque lo precede.
+    """
+
+    def set_initial_attrs(self, document=None):
+        super().set_initial_attrs(document)
+        self.paragraph = Paragraph(OxmlElement("w:p"), document)
+
+
+def render(markdown_text: str) -> dict:
+    """
+    Convierte Markdown a DOCX guardando el mapa de bloques.
+
+    Args:
+        markdown_text: String con contenido Markdown
+
+    Returns:
+        Dict con:
+            docx: bytes del archivo DOCX
+            block_map: Lista de {"hash": str, "elements": int}
+            mode: "full"
+            rendered_blocks / reused_blocks: Contadores de trabajo
+
+    Raises:
+        ValueError: Si el input es None o vacío
+        TypeError: Si el input no es string
+    """
+    _validate(markdown_text)
+    return _full_render(markdown_text)
+
+
+def patch(
+    previous_docx: bytes,
+    markdown_text: str,
+    block_map: Optional[List[dict]] = None
+) -> dict:
+    """
+    Actualiza un DOCX anterior re-renderizando solo los bloques cambiados.
+
+    Si el DOCX no trae mapa de bloques (o no coincide con su body), o el
+    Markdown tiene construcciones globales, se hace un render completo.
+
+    Args:
+        previous_docx: Bytes del DOCX generado por render() o patch()
+        markdown_text: Nuevo contenido Markdown
+        block_map: Mapa de bloques cacheado (opcional, si no se lee del DOCX)
+
+    Returns:
+        Dict con la misma forma que render(), con mode "patch" o "full"
+
+    Raises:
+        ValueError: Si el input es None o vacío
+        TypeError: Si el input no es string
+    """
+    _validate(markdown_text)
+
+    if find_global_features(markdown_text):
+        return _full_render(markdown_text)
+
+    document = Document(BytesIO(previous_docx))
+    if block_map is None:
+        block_map = read_block_map(document)
+
+    body = document.element.body
+    children = _content_children(body)
+    if not block_map or sum(b["elements"] for b in block_map) != len(children):
+        return _full_render(markdown_text)
+
+    blocks = split_blocks(markdown_text)
+    hashes = [block_hash(block) for block in blocks]
+    previous_hashes = [b["hash"] for b in block_map]
+
+    prefix = 0
+    limit = min(len(hashes), len(previous_hashes))
+    while prefix < limit and hashes[prefix] == previous_hashes[prefix]:
+        prefix += 1
+
+    suffix = 0
+    while (
+        suffix < limit - prefix
+        and hashes[-1 - suffix] == previous_hashes[-1 - suffix]
+    ):
+        suffix += 1
+
+    # Elementos del body que pertenecen a los bloques reemplazados
+    start = sum(b["elements"] for b in block_map[:prefix])
+    stop = len(children) - sum(
+        b["elements"] for b in block_map[len(block_map) - suffix:]
+    )
+    anchor = children[stop] if stop < len(children) else None
+    for element in children[start:stop]:
+        body.remove(element)
+
+    end = len(hashes) - suffix
+    html_blocks = render_blocks(blocks[prefix:end], hashes[prefix:end])
+    new_entries = []
+    for key, html in zip(hashes[prefix:end], html_blocks):
+        elements = _append_block(document, html, Bookmarks())
+        if anchor is not None:
+            for element in elements:
+                anchor.addprevious(element)
+        new_entries.append({"hash": key, "elements": len(elements)})
+
+    new_map = (
+        block_map[:prefix]
+        + new_entries
+        + block_map[len(block_map) - suffix:]
+    )
+
+    # Los bloques nuevos numeran sus bookmarks desde 1 y los eliminados
+    # dejan huecos: se renumeran todos en orden, como en un render completo
+    renumber_bookmarks(body)
+    _drop_unused_relationships(document)
+
+    return {
+        "docx": _save(document, new_map),
+        "block_map": new_map,
+        "mode": "patch",
+        "rendered_blocks": len(new_entries),
+        "reused_blocks": prefix + suffix
+    }
+
+
+def read_block_map(document: Document) -> Optional[List[dict]]:
+    """
+    Lee el mapa de bloques guardado en un documento.
+
+    Args:
+        document: Objeto Document de python-docx
+
+    Returns:
+        Lista de {"hash": str, "elements": int} o None si no existe
+        o fue generado con otro backend
+    """
+    part = _find_block_map_part(document)
+    if part is None:
+        return None
+
+    root = etree.fromstring(part.blob)
+    # Los mapas sin atributo son anteriores al backend rápido
+    if root.get("backend", BACKEND_HTMLDOCX) != config.DOCX_BACKEND:
+        return None
+
+    return [
+        {"hash": block.get("hash"), "elements": int(block.get("elements"))}
+        for block in root.iter(f"{{{BLOCK_MAP_NAMESPACE}}}block")
+    ]
+
+
+def _validate(markdown_text: str) -> None:
+    if markdown_text is None or markdown_text == "":
+        raise ValueError("El contenido Markdown no puede estar vacío")
+    if not isinstance(markdown_text, str):
+        raise TypeError("El contenido debe ser un string")
+
+
+def _full_render(markdown_text: str) -> dict:
+    """
+    Render completo, bloque a bloque cuando es posible.
+
+    Args:
+        markdown_text: String con contenido Markdown
+
+    Returns:
+        Dict con docx, block_map y contadores
+    """
+    document = Document()
+
+    if find_global_features(markdown_text):
+        # Links por referencia o footnotes cruzan bloques: sin mapa
+        add_html(document, md_to_html(markdown_text))
+        return {
+            "docx": _save(document, []),
+            "block_map": [],
+            "mode": "full",
+            "rendered_blocks": 1,
+            "reused_blocks": 0
+        }
+
+    blocks = split_blocks(markdown_text)
+    hashes = [block_hash(block) for block in blocks]
+
+    # Un builder por bloque, con ids y nombres de bookmark compartidos
+    bookmarks = Bookmarks()
+    block_map = []
+    for key, html in zip(hashes, render_blocks(blocks, hashes)):
+        elements = _append_block(document, html, bookmarks)
+        block_map.append({"hash": key, "elements": len(elements)})
+
+    return {
+        "docx": _save(document, block_map),
+        "block_map": block_map,
+        "mode": "full",
+        "rendered_blocks": len(block_map),
+        "reused_blocks": 0
+    }
+
+
+def _content_children(body) -> list:
+    """Hijos del body sin el sectPr final."""
+    sectPr = body.sectPr
+    return [child for child in body if child is not sectPr]
+
+
+def _append_block(document: Document, html: str, bookmarks: Bookmarks) -> list:
+    """
+    Renderiza un bloque al final del body.
+
+    Args:
+        document: Objeto Document de python-docx
+        html: HTML de un bloque de primer nivel
+        bookmarks: Bookmarks ya usados en el documento
+
+    Returns:
+        Lista de elementos agregados al body
+    """
+    body = document.element.body
+    tail = 1 if body.sectPr is not None else 0
+    before = len(body) - tail
+
+    if config.DOCX_BACKEND == BACKEND_HTMLDOCX:
+        parser = _BlockParser()
+        parser.add_html_to_document(html + "\n", document)
+    else:
+        add_html(document, html, bookmarks=bookmarks)
+
+    return body[before:len(body) - tail]
+
+
+def _drop_unused_relationships(document: Document) -> None:
+    """
+    Elimina hyperlinks e imágenes que ya no se referencian.
+
+    Las imágenes sin relación no se escriben al guardar, así la media de
+    bloques eliminados no queda huérfana en el paquete.
+    """
+    part = document.part
+    referenced = set(document.element.xpath(_REF_ATTRIBUTES))
+
+    for rId, rel in list(part.rels.items()):
+        if rel.reltype in _DISPOSABLE_RELTYPES and rId not in referenced:
+            part.drop_rel(rId)
+
+
+def _find_block_map_part(document: Document) -> Optional[Part]:
+    for rel in document.part.rels.values():
+        if rel.reltype != RT.CUSTOM_XML or rel.is_external:
+            continue
+        part = rel.target_part
+        if part.blob and BLOCK_MAP_NAMESPACE.encode("utf-8") in part.blob[:200]:
+            return part
+    return None
+
+
+def _save(document: Document, block_map: List[dict]) -> bytes:
+    """
+    Guarda el documento reemplazando la parte con el mapa de bloques.
+
+    Args:
+        document: Objeto Document de python-docx
+        block_map: Mapa de bloques a persistir
+
+    Returns:
+        bytes: Contenido del archivo DOCX
+    """
+    existing = _find_block_map_part(document)
+    if existing is not None:
+        for rId, rel in list(document.part.rels.items()):
+            if not rel.is_external and rel.target_part is existing:
+                document.part.rels.pop(rId)
+
+    root = etree.Element(
+        f"{{{BLOCK_MAP_NAMESPACE}}}blockMap",
+        nsmap={None: BLOCK_MAP_NAMESPACE},
+        backend=config.DOCX_BACKEND
+    )
+    for entry in block_map:
+        etree.SubElement(
+            root,
+            f"{{{BLOCK_MAP_NAMESPACE}}}block",
+            hash=entry["hash"],
+            elements=str(entry["elements"])
+        )
+
+    package = document.part.package
+    partname = PackURI(package.next_partname("/customXml/item%d.xml"))
+    blob = etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True)
+    document.part.relate_to(Part(partname, "application/xml", blob, package), RT.CUSTOM_XML)
+
+    buffer = BytesIO()
+    document.save(buffer)
+    buffer.seek(0)
+
+    return buffer.read()
@@ -0,0 +1,163 @@
+"""
+Escritura de DOCX en streaming.
+
+document.save() necesita el árbol lxml completo del documento y lo
+serializa al final. Acá word/document.xml se escribe directamente en la
+entrada del zip a medida que el builder completa cada elemento de primer
+nivel, y el elemento se descarta: en memoria queda solo lo que todavía
+está abierto. Las partes estáticas (numbering, settings, theme, fuentes)
+se copian tal cual del template cacheado, sin volver a serializarlas.
+"""
+
+import re
+import zipfile
+from functools import lru_cache
+from io import BytesIO
+from itertools import islice
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+from docx import Document
+from docx.api import _default_docx_path
+from docx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+from docx.opc.pkgwriter import _ContentTypesItem
+from docx.oxml.parser import oxml_parser
+from lxml import etree
+
+from .docx_builder import DocxBuilder
+
+
+# Eventos procesados entre cada vaciado del body al zip
+FLUSH_EVENTS = 512
+
+# Partes que el builder puede modificar: siempre se serializan
+_MUTABLE_PARTS = {"/word/styles.xml", "/word/numbering.xml"}
+# Con tabla de contenido se activa updateFields
+_TOC_PARTS = _MUTABLE_PARTS | {"/word/settings.xml"}
+
+_XMLNS = re.compile(rb' xmlns:(\w+)="([^"]*)"')
+
+
+def write(
+    events: Iterable[tuple],
+    output: BinaryIO,
+    template_path: Optional[str] = None,
+    custom_styles: Optional[dict] = None,
+    toc: bool = False
+) -> List[dict]:
+    """
+    Arma un DOCX desde un flujo de eventos escribiéndolo en streaming.
+
+    La tabla de contenido ya se escribió cuando se conocen los
+    encabezados: queda el campo vacío y Word lo completa al abrir.
+
+    Args:
+        events: Iterable de eventos (ver events.py)
+        output: Archivo binario (o BytesIO) donde se escribe el zip
+        template_path: Ruta a un DOCX plantilla (opcional)
+        custom_styles: Diccionario con estilos personalizados (opcional)
+        toc: Insertar una tabla de contenido al inicio
+
+    Returns:
+        Índice de encabezados (ver DocxBuilder.headings)
+    """
+    from .html_to_docx import _apply_custom_styles
+
+    template_bytes, static_parts = _template(template_path or _default_docx_path())
+    document = Document(BytesIO(template_bytes))
+    root = document.element
+    sect_pr = root.body.sectPr
+    builder = DocxBuilder(document, toc=toc)
+    header, footer = _shell(root)
+    redundant = {prefix.encode(): uri.encode() for prefix, uri in root.nsmap.items() if prefix}
+
+    def flush(final: bool = False) -> None:
+        if custom_styles:
+            _apply_custom_styles(document, custom_styles)
+        completed = builder.pop_completed(final)
+        if completed:
+            entry.write(b"".join(_serialize(element, redundant) for element in completed))
+
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive:
+        with archive.open("word/document.xml", "w") as entry:
+            entry.write(header)
+            events = iter(events)
+            while True:
+                batch = list(islice(events, FLUSH_EVENTS))
+                if not batch:
+                    break
+                builder.consume(batch)
+                flush()
+            builder.close()
+            flush(final=True)
+            if sect_pr is not None:
+                entry.write(_serialize(sect_pr, redundant))
+            entry.write(footer)
+
+        _write_package(archive, document, static_parts, _TOC_PARTS if toc else _MUTABLE_PARTS)
+    return builder.headings
+
+
+def _write_package(
+    archive: zipfile.ZipFile,
+    document,
+    static_parts: Dict[str, bytes],
+    mutable_parts: set = _MUTABLE_PARTS
+) -> None:
+    """Escribe content types, relaciones y el resto de las partes."""
+    package = document.part.package
+    parts = package.parts
+    for part in parts:
+        part.before_marshal()
+
+    archive.writestr(CONTENT_TYPES_URI.membername, _ContentTypesItem.from_parts(parts).blob)
+    archive.writestr(PACKAGE_URI.rels_uri.membername, package.rels.xml)
+    for part in parts:
+        if part is not document.part:
+            partname = str(part.partname)
+            blob = static_parts.get(partname)
+            if blob is None or partname in mutable_parts:
+                blob = part.blob
+            archive.writestr(part.partname.membername, blob)
+        if len(part.rels):
+            archive.writestr(part.partname.rels_uri.membername, part.rels.xml)
+
+
+@lru_cache(maxsize=8)
+def _template(path: str) -> Tuple[bytes, Dict[str, bytes]]:
+    """
+    Lee una plantilla una sola vez por proceso.
+
+    Returns:
+        Tupla (bytes del archivo, contenido de cada parte por partname)
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    with zipfile.ZipFile(BytesIO(data)) as archive:
+        parts = {"/" + name: archive.read(name) for name in archive.namelist()}
+    return data, parts
+
+
+def _shell(root) -> Tuple[bytes, bytes]:
+    """Apertura y cierre de w:document/w:body con sus namespaces."""
+    shell = oxml_parser.makeelement(root.tag, attrib=dict(root.attrib), nsmap=root.nsmap)
+    etree.SubElement(shell, root.body.tag)
+    xml = etree.tostring(shell, xml_declaration=True, encoding="UTF-8", standalone=True)
+    body = f"{root.body.prefix}:body".encode()
+    head, _, tail = xml.partition(b"<" + body + b"/>")
+    return head + b"<" + body + b">", b"</" + body + b">" + tail
+
+
+def _serialize(element, redundant: Dict[bytes, bytes]) -> bytes:
+    """
+    Serializa un elemento sin repetir los namespaces declarados en la raíz.
+
+    etree.tostring declara en el primer tag todos los namespaces en
+    alcance; dentro de w:document ya están declarados.
+    """
+    xml = etree.tostring(element, encoding="UTF-8")
+    end = xml.index(b">")
+    start_tag = _XMLNS.sub(
+        lambda m: b"" if redundant.get(m.group(1)) == m.group(2) else m.group(0),
+        xml[:end]
+    )
+    return start_tag + xml[end:]
@@ -0,0 +1,175 @@
+"""
+Representación intermedia como flujo de eventos.
+
+En vez de un string HTML completo, el Markdown se entrega como una
+secuencia perezosa de eventos (inicio/fin de bloque o marca inline,
+tags vacíos y texto). El documento se parsea en tramos de bloques de
+primer nivel (ver incremental.split_blocks), así que en memoria solo
+vive el tramo actual y la pila de elementos abiertos.
+
+Cada evento es una tupla (tipo, valor, attrs):
+    (START, "strong", [])            apertura de bloque o marca inline
+    (END, "strong", None)            cierre
+    (EMPTY, "img", [("src", "...")]) tag autocerrado (<img/>)
+    (TEXT, "texto", None)            texto con entidades ya decodificadas
+"""
+
+from html import escape
+from html.parser import HTMLParser
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from .exceptions import ConversionError, MarkdownConversionError
+from .incremental import find_global_features, split_blocks
+from .markdown_to_html import DEFAULT_EXTENSIONS, convert, engine
+
+
+START = "start"
+END = "end"
+EMPTY = "empty"
+TEXT = "text"
+
+Event = Tuple[str, str, Optional[list]]
+
+# Tamaño aproximado de cada tramo que se convierte de una vez
+CHUNK_CHARS = 8192
+
+# Separador entre bloques, igual al de markdown.Markdown.convert
+_BLOCK_SEPARATOR = (TEXT, "\n", None)
+
+
+def from_markdown(markdown_text: str, extensions: Optional[list] = None) -> Iterator[Event]:
+    """
+    Genera los eventos de un documento Markdown, tramo a tramo.
+
+    Los documentos con efectos globales (links por referencia, footnotes,
+    HTML crudo) se convierten completos, igual que en incremental.render.
+
+    Args:
+        markdown_text: String con contenido Markdown
+        extensions: Lista de extensiones de markdown (opcional)
+
+    Yields:
+        Eventos en orden de documento
+
+    Raises:
+        MarkdownConversionError: Si falla la conversión de un bloque
+    """
+    if extensions is None:
+        extensions = DEFAULT_EXTENSIONS
+
+    if find_global_features(markdown_text):
+        try:
+            html = convert(markdown_text, extensions)
+        except ConversionError:
+            raise
+        except Exception as e:
+            raise MarkdownConversionError(f"Error al convertir Markdown: {str(e)}", e)
+        yield from from_html(html)
+        return
+
+    parser = _EventParser()
+    with engine(extensions) as md:
+        for index, chunk in enumerate(_chunks(split_blocks(markdown_text))):
+            try:
+                html = md.convert(chunk)
+            except ConversionError:
+                raise
+            except Exception as e:
+                raise MarkdownConversionError(f"Error al convertir Markdown: {str(e)}", e)
+            md.reset()
+
+            if index:
+                yield _BLOCK_SEPARATOR
+            parser.feed(html)
+            parser.close()
+            parser.reset()
+            yield from parser.drain()
+
+
+def _chunks(blocks: Iterable[str]) -> Iterator[str]:
+    """
+    Agrupa bloques consecutivos hasta CHUNK_CHARS caracteres.
+
+    Cada md.convert tiene un costo fijo (preprocesadores, serializador,
+    postprocesadores): convertir bloque por bloque es más lento que el
+    documento completo en documentos chicos.
+    """
+    pending: List[str] = []
+    size = 0
+    for block in blocks:
+        pending.append(block)
+        size += len(block)
+        if size >= CHUNK_CHARS:
+            yield "\n\n".join(pending)
+            pending = []
+            size = 0
+    if pending:
+        yield "\n\n".join(pending)
+
+
+def from_html(html: str) -> Iterator[Event]:
+    """
+    Adaptador: eventos de un string HTML ya generado.
+
+    Args:
+        html: String con HTML
+
+    Yields:
+        Eventos en orden de documento
+    """
+    parser = _EventParser()
+    parser.feed(html)
+    parser.close()
+    yield from parser.drain()
+
+
+def to_html(events: Iterable[Event]) -> str:
+    """
+    Adaptador: serializa eventos de vuelta a HTML.
+
+    Args:
+        events: Eventos (de from_markdown o from_html)
+
+    Returns:
+        str: HTML equivalente al que genera markdown_to_html.convert
+    """
+    parts: List[str] = []
+    for kind, value, attrs in events:
+        if kind == TEXT:
+            parts.append(escape(value, quote=False))
+        elif kind == END:
+            parts.append(f"</{value}>")
+        else:
+            parts.append(f"<{value}{_attributes(attrs)}{' /' if kind == EMPTY else ''}>")
+    return "".join(parts)
+
+
+def _attributes(attrs: Optional[list]) -> str:
+    return "".join(
+        f' {name}' if value is None else f' {name}="{escape(value)}"'
+        for name, value in attrs or ()
+    )
+
+
+class _EventParser(HTMLParser):
+    """HTMLParser que acumula eventos hasta que se consumen."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._events: List[Event] = []
+
+    def drain(self) -> List[Event]:
+        events, self._events = self._events, []
+        return events
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        self._events.append((START, tag, attrs))
+
+    def handle_startendtag(self, tag: str, attrs: list) -> None:
+        self._events.append((EMPTY, tag, attrs))
+
+    def handle_endtag(self, tag: str) -> None:
+        self._events.append((END, tag, None))
+
+    def handle_data(self, data: str) -> None:
+        self._events.append((TEXT, data, None))
@@ -51,6 +51,37 @@ class InvalidInputError(ConversionError):
     pass
 
 
+class InputTooComplexError(InvalidInputError):
+    """
+    Error cuando el input excede los límites de complejidad
+    
+    Se lanza desde el pre-escaneo cuando la política es rechazar
+    (anidamiento, largo de línea, ancho de tabla, marcadores inline)
+    """
+    def __init__(
+        self,
+        message: str,
+        metric: str = None,
+        value: int = None,
+        limit: int = None
+    ):
+        self.metric = metric
+        self.value = value
+        self.limit = limit
+        super().__init__(message)
+
+
+class ConversionTimeoutError(ConversionError):
+    """
+    Error cuando la conversión excede su presupuesto de CPU
+    
+    Evita que una entrada patológica consuma todo el timeout de Lambda
+    """
+    def __init__(self, message: str, budget: float = None):
+        self.budget = budget
+        super().__init__(message)
+
+
 class StorageError(Exception):
     """
     Error relacionado con almacenamiento (S3, etc)
@@ -61,4 +92,41 @@ class StorageError(Exception):
         self.message = message
         self.bucket = bucket
         self.key = key
-        super().__init__(self.message)
\ No newline at end of file
+        super().__init__(self.message)
+
+
+class ObjectNotFoundError(StorageError):
+    """
+    El objeto pedido no existe (o ya se borró)
+    """
+    pass
+
+
+class FileTooLargeError(StorageError):
+    """
+    El objeto supera el tamaño máximo permitido
+    
+    Attributes:
+        size: Tamaño del objeto en bytes (o lo leído hasta cortar)
+        limit: Máximo permitido en bytes
+    """
+    def __init__(self, message: str, size: int = None, limit: int = None, key: str = None):
+        self.size = size
+        self.limit = limit
+        super().__init__(message, key=key)
+
+
+class DeleteError(StorageError):
+    """
+    Alguno de los objetos de un borrado no se pudo eliminar
+    
+    Attributes:
+        errors: Lista de {"Key", "VersionId", "Code", "Message"} (mismo
+            formato que los Errors de DeleteObjects), uno por objeto
+        deleted: Cantidad de objetos que sí se eliminaron
+    """
+    def __init__(self, message: str, errors: list = None, deleted: int = 0, bucket: str = None):
+        self.errors = errors or []
+        self.deleted = deleted
+        first = self.errors[0].get("Key") if self.errors else None
+        super().__init__(message, bucket=bucket, key=first)
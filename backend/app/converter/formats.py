@@ -0,0 +1,221 @@
+"""
+Registro de formatos de salida.
+
+Cada formato declara su Content-Type, sus capacidades y la ruta
+("modulo:funcion") del renderer que convierte el HTML intermedio. El
+renderer se importa recién la primera vez que se usa, así que los
+backends que un request no pide no suman al cold start.
+"""
+
+import importlib
+import threading
+from typing import BinaryIO, Callable, Dict, Iterable, List, Optional
+
+from app.config import config
+from .exceptions import ConversionError
+
+
+DEFAULT_CONTENT_TYPE = "application/octet-stream"
+
+
+class OutputFormat:
+    """
+    Descripción de un formato de salida.
+
+    Attributes:
+        name: Nombre del formato, igual a la extensión del archivo
+        content_type: MIME type
+        renderer: Ruta "modulo:funcion" que recibe HTML y retorna str o
+            bytes; None si no hay backend (solo se conoce el Content-Type)
+        event_renderer: Ruta "modulo:funcion" que consume el flujo de
+            eventos de events.from_markdown (opcional)
+        stream_renderer: Ruta "modulo:funcion" que recibe eventos y un
+            archivo de salida y escribe el resultado a medida que lo
+            genera (opcional, para el modo pipeline)
+        inline: El resultado va en el body de la respuesta, no a S3
+        conditional: Soporta ETag / 304
+        incremental: Soporta render incremental por bloques
+        outline: Los renderers aceptan toc=bool y outline=list (índice
+            de encabezados que se completa al renderizar)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        content_type: str,
+        renderer: Optional[str] = None,
+        event_renderer: Optional[str] = None,
+        stream_renderer: Optional[str] = None,
+        inline: bool = False,
+        conditional: bool = False,
+        incremental: bool = False,
+        outline: bool = False
+    ):
+        self.name = name
+        self.content_type = content_type
+        self.renderer = renderer
+        self.event_renderer = event_renderer
+        self.stream_renderer = stream_renderer
+        self.inline = inline
+        self.conditional = conditional
+        self.incremental = incremental
+        self.outline = outline
+
+    @property
+    def available(self) -> bool:
+        """Hay un backend capaz de producir este formato."""
+        return self.inline or self.renderer is not None
+
+    def __repr__(self) -> str:
+        return f"OutputFormat({self.name!r})"
+
+
+_registry: Dict[str, OutputFormat] = {}
+_renderers: Dict[tuple, Callable] = {}
+_lock = threading.Lock()
+
+
+def register(output_format: OutputFormat) -> OutputFormat:
+    """
+    Registra (o reemplaza) un formato de salida.
+
+    Args:
+        output_format: Formato a registrar
+
+    Returns:
+        El mismo formato, para usar como expresión
+    """
+    with _lock:
+        _registry[output_format.name] = output_format
+        for kind in ("renderer", "event_renderer", "stream_renderer"):
+            _renderers.pop((output_format.name, kind), None)
+    return output_format
+
+
+def get(name: str) -> Optional[OutputFormat]:
+    """Formato registrado con ese nombre o None."""
+    return _registry.get(name.lower())
+
+
+def supported() -> List[str]:
+    """
+    Formatos que se pueden pedir en output_format.
+
+    Son los registrados con backend disponible y habilitados en
+    config.SUPPORTED_OUTPUT_FORMATS, en el orden de la configuración.
+    """
+    return [
+        name for name in config.SUPPORTED_OUTPUT_FORMATS
+        if name in _registry and _registry[name].available
+    ]
+
+
+def content_type(name: str) -> str:
+    """
+    Content-Type de un formato o extensión.
+
+    Args:
+        name: Nombre del formato (ej: "docx")
+
+    Returns:
+        str: MIME type, o application/octet-stream si no está registrado
+    """
+    output_format = get(name)
+    return output_format.content_type if output_format else DEFAULT_CONTENT_TYPE
+
+
+def render(name: str, html: str, **options) -> bytes:
+    """
+    Convierte el HTML intermedio al formato pedido.
+
+    Args:
+        name: Formato de salida con renderer
+        html: HTML generado por markdown_to_html
+        **options: Opciones que el renderer declara (ej: toc, outline)
+
+    Returns:
+        bytes: Contenido del archivo (los renderers de texto se codifican
+        en UTF-8)
+
+    Raises:
+        ConversionError: Si el formato no tiene renderer
+    """
+    result = _renderer(name, "renderer")(html, **options)
+    return result.encode("utf-8") if isinstance(result, str) else result
+
+
+def render_events(name: str, events: Iterable[tuple], **options) -> bytes:
+    """
+    Convierte un flujo de eventos al formato pedido, sin HTML intermedio.
+
+    Args:
+        name: Formato de salida con event_renderer
+        events: Eventos de events.from_markdown
+        **options: Opciones que el renderer declara (ej: toc, outline)
+
+    Returns:
+        bytes: Contenido del archivo
+
+    Raises:
+        ConversionError: Si el formato no tiene event_renderer
+    """
+    result = _renderer(name, "event_renderer")(events, **options)
+    return result.encode("utf-8") if isinstance(result, str) else result
+
+
+def render_to(name: str, events: Iterable[tuple], output: BinaryIO, **options) -> None:
+    """
+    Escribe el formato pedido en output a medida que se genera.
+
+    Args:
+        name: Formato de salida con stream_renderer
+        events: Eventos de events.from_markdown (o events.from_html)
+        output: Archivo binario de escritura, no necesita ser seekable
+        **options: Opciones que el renderer declara (ej: toc, outline)
+
+    Raises:
+        ConversionError: Si el formato no tiene stream_renderer
+    """
+    _renderer(name, "stream_renderer")(events, output, **options)
+
+
+def _renderer(name: str, kind: str) -> Callable:
+    """Importa el renderer la primera vez y lo deja cacheado."""
+    renderer = _renderers.get((name, kind))
+    if renderer is not None:
+        return renderer
+
+    output_format = get(name)
+    path = getattr(output_format, kind, None) if output_format else None
+    if path is None:
+        raise ConversionError(f"No hay renderer para el formato: {name}")
+
+    module_name, _, function_name = path.partition(":")
+    renderer = getattr(importlib.import_module(module_name), function_name)
+    with _lock:
+        _renderers[(name, kind)] = renderer
+    return renderer
+
+
+register(OutputFormat(
+    "html",
+    "text/html",
+    inline=True,
+    conditional=True,
+    incremental=True
+))
+register(OutputFormat(
+    "docx",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    renderer="app.converter.html_to_docx:convert",
+    event_renderer="app.converter.html_to_docx:convert_events",
+    stream_renderer="app.converter.html_to_docx:write_events",
+    outline=True
+))
+register(OutputFormat(
+    "txt",
+    "text/plain",
+    renderer="app.converter.html_to_text:convert"
+))
+# Sin backend: solo se conoce el Content-Type para archivos existentes
+register(OutputFormat("pdf", "application/pdf"))
@@ -3,21 +3,53 @@ Módulo para convertir HTML a DOCX.
 
 Este módulo NO tiene dependencias de AWS ni S3.
 Retorna bytes que pueden ser guardados donde sea necesario.
+El backend se elige con DOCX_BACKEND: "fast" (docx_builder) o "htmldocx".
+Con DOCX_STREAMING (u opción streaming=True) el backend "fast" escribe
+word/document.xml directo al zip (ver docx_stream.py); write_events
+escribe ese zip en un archivo cualquiera (modo pipeline).
+El backend "fast" además indexa los encabezados (bookmarks, tabla de
+contenido con DOCX_TOC u opción toc=True); el índice se devuelve en la
+lista outline si se pasa una.
 """
 
+import html as html_lib
+import re
+
 from htmldocx import HtmlToDocx
 from io import BytesIO
 from docx import Document
-from typing import Optional
+from docx.document import Document as DocumentObject
+from typing import BinaryIO, Iterable, List, Optional
+
+from app.config import config
+from . import docx_builder, docx_stream, images, style_index
+from .events import from_html, to_html
+from .exceptions import ConversionError
+
+
+BACKEND_FAST = "fast"
+BACKEND_HTMLDOCX = "htmldocx"
+BACKENDS = (BACKEND_FAST, BACKEND_HTMLDOCX)
+
+_IMG_SRC = re.compile(r'<img\b[^>]*?\ssrc="([^"]*)"')
 
 
-def convert(html: str, custom_styles: Optional[dict] = None) -> bytes:
+def convert(
+    html: str,
+    custom_styles: Optional[dict] = None,
+    streaming: Optional[bool] = None,
+    toc: Optional[bool] = None,
+    outline: Optional[list] = None
+) -> bytes:
     """
     Convierte HTML a archivo DOCX (formato Word).
 
     Args:
         html: String con contenido HTML
         custom_styles: Diccionario con estilos personalizados (opcional)
+        streaming: Escribir en streaming (default: DOCX_STREAMING)
+        toc: Insertar tabla de contenido (default: DOCX_TOC)
+        outline: Lista donde se agregan los encabezados (opcional)
 
     Returns:
         bytes: Contenido del archivo DOCX en memoria
@@ -36,14 +68,19 @@ def convert(html: str, custom_styles: Optional[dict] = None) -> bytes:
     if not html or html.strip() == "":
         raise ValueError("El contenido HTML no puede estar vacío")
 
+    if _streaming(streaming):
+        return convert_events(
+            from_html(html), custom_styles, streaming=True, toc=toc, outline=outline
+        )
+
     try:
         # Word vacío
         document = Document()
 
-        parser = HtmlToDocx()
-
         # HTML a DOCX
-        parser.add_html_to_document(html, document)
+        headings = add_html(document, html, toc=_toc(toc))
+        if outline is not None:
+            outline.extend(headings)
 
         if custom_styles:
             _apply_custom_styles(document, custom_styles)
@@ -55,11 +92,114 @@ def convert(html: str, custom_styles: Optional[dict] = None) -> bytes:
 
         return buffer.read()
 
+    except ConversionError:
+        raise
+    except Exception as e:
+        raise Exception(f"Error al convertir HTML a DOCX: {str(e)}")
+
+
+def convert_events(
+    events: Iterable[tuple],
+    custom_styles: Optional[dict] = None,
+    streaming: Optional[bool] = None,
+    toc: Optional[bool] = None,
+    outline: Optional[list] = None
+) -> bytes:
+    """
+    Convierte un flujo de eventos (ver events.py) a DOCX.
+
+    Con el backend "fast" el documento se arma a medida que llegan los
+    eventos, así el parseo del Markdown y la construcción del DOCX se
+    intercalan bloque a bloque. htmldocx necesita el HTML completo.
+
+    Args:
+        events: Iterable de eventos, ej: events.from_markdown(texto)
+        custom_styles: Diccionario con estilos personalizados (opcional)
+        streaming: Escribir en streaming (default: DOCX_STREAMING)
+        toc: Insertar tabla de contenido (default: DOCX_TOC)
+        outline: Lista donde se agregan los encabezados (opcional)
+
+    Returns:
+        bytes: Contenido del archivo DOCX en memoria
+
+    Raises:
+        ConversionError: Si falla la conversión (incluye errores de Markdown)
+    """
+    toc = _toc(toc)
+    try:
+        if _streaming(streaming):
+            buffer = BytesIO()
+            headings = docx_stream.write(events, buffer, custom_styles=custom_styles, toc=toc)
+            if outline is not None:
+                outline.extend(headings)
+            return buffer.getvalue()
+
+        document = Document()
+
+        if config.DOCX_BACKEND == BACKEND_FAST:
+            headings = docx_builder.add_events(document, events, toc=toc)
+        else:
+            headings = add_html(document, to_html(events))
+        if outline is not None:
+            outline.extend(headings)
+
+        if custom_styles:
+            _apply_custom_styles(document, custom_styles)
+
+        buffer = BytesIO()
+        document.save(buffer)
+        return buffer.getvalue()
+
+    except ConversionError:
+        raise
+    except Exception as e:
+        raise Exception(f"Error al convertir HTML a DOCX: {str(e)}")
+
+
+def write_events(
+    events: Iterable[tuple],
+    output: BinaryIO,
+    custom_styles: Optional[dict] = None,
+    toc: Optional[bool] = None,
+    outline: Optional[list] = None
+) -> None:
+    """
+    Escribe el DOCX de un flujo de eventos en un archivo a medida que se arma.
+
+    Con el backend "fast" el zip se escribe en streaming, así output
+    (ej: una subida por partes) recibe datos durante todo el build;
+    htmldocx arma el documento entero y lo escribe al final.
+
+    Args:
+        events: Iterable de eventos, ej: events.from_markdown(texto)
+        output: Archivo binario de escritura (no necesita ser seekable)
+        custom_styles: Diccionario con estilos personalizados (opcional)
+        toc: Insertar tabla de contenido (default: DOCX_TOC)
+        outline: Lista donde se agregan los encabezados (opcional)
+
+    Raises:
+        ConversionError: Si falla la conversión (incluye errores de Markdown)
+    """
+    if config.DOCX_BACKEND != BACKEND_FAST:
+        output.write(convert_events(events, custom_styles, toc=toc, outline=outline))
+        return
+
+    try:
+        headings = docx_stream.write(events, output, custom_styles=custom_styles, toc=_toc(toc))
+    except ConversionError:
+        raise
     except Exception as e:
         raise Exception(f"Error al convertir HTML a DOCX: {str(e)}")
+    if outline is not None:
+        outline.extend(headings)
 
 
-def convert_with_template(html: str, template_path: Optional[str] = None) -> bytes:
+def convert_with_template(
+    html: str,
+    template_path: Optional[str] = None,
+    streaming: Optional[bool] = None,
+    toc: Optional[bool] = None
+) -> bytes:
     """
     Convierte HTML a DOCX usando una plantilla base.
 
@@ -68,17 +208,23 @@ def convert_with_template(html: str, template_path: Optional[str] = None) -> byt
     Args:
         html: String con contenido HTML
         template_path: Ruta a archivo DOCX plantilla (opcional)
+        streaming: Escribir en streaming (default: DOCX_STREAMING)
+        toc: Insertar tabla de contenido (default: DOCX_TOC)
 
     Returns:
         bytes: Contenido del archivo DOCX
     """
+    if _streaming(streaming):
+        buffer = BytesIO()
+        docx_stream.write(from_html(html), buffer, template_path=template_path, toc=_toc(toc))
+        return buffer.getvalue()
+
     if template_path:
         document = Document(template_path)
     else:
         document = Document()
 
-    parser = HtmlToDocx()
-    parser.add_html_to_document(html, document)
+    add_html(document, html, toc=_toc(toc))
 
     buffer = BytesIO()
     document.save(buffer)
@@ -87,6 +233,112 @@ def convert_with_template(html: str, template_path: Optional[str] = None) -> byt
     return buffer.read()
 
 
+def add_html(
+    document: Document,
+    html: str,
+    backend: Optional[str] = None,
+    toc: bool = False,
+    bookmarks: Optional[docx_builder.Bookmarks] = None
+) -> List[dict]:
+    """
+    Agrega contenido HTML al final del cuerpo de un documento existente.
+
+    Args:
+        document: Objeto Document de python-docx
+        html: String con contenido HTML
+        backend: "fast" o "htmldocx" (default: configuración)
+        toc: Insertar tabla de contenido (solo backend "fast")
+        bookmarks: Bookmarks ya usados en el documento (solo backend
+            "fast", ver docx_builder.Bookmarks)
+
+    Returns:
+        Índice de encabezados [{"level", "text", "anchor"}]; vacío con
+        htmldocx, que no indexa encabezados
+
+    Raises:
+        ValueError: Si el backend no existe
+    """
+    backend = backend or config.DOCX_BACKEND
+
+    if backend == BACKEND_FAST:
+        return docx_builder.add_html(document, html, toc=toc, bookmarks=bookmarks)
+    elif backend == BACKEND_HTMLDOCX:
+        parser = BulkTableHtmlToDocx()
+        parser.add_html_to_document(html, document)
+        return []
+    else:
+        raise ValueError(f"Backend DOCX no soportado: {backend}")
+
+
+class BulkTableHtmlToDocx(HtmlToDocx):
+    """
+    HtmlToDocx que arma las tablas con docx_builder en una sola pasada.
+
+    htmldocx llena cada celda con table.cell(fila, columna), y python-docx
+    reconstruye la grilla completa en cada acceso: el costo crece de forma
+    cuadrática con la cantidad de celdas. Los estilos de párrafo se
+    resuelven con el índice de la plantilla (ver style_index.py) y las
+    imágenes pasan por la etapa de images.py.
+    """
+
+    def add_html_to_document(self, html, document):
+        # htmldocx resuelve el estilo de cada párrafo por nombre
+        style_index.install(document)
+        # Todas las imágenes se procesan en paralelo antes de recorrer el HTML
+        section = document.sections[-1]
+        self._image_width = section.page_width - section.left_margin - section.right_margin
+        width_px = images.max_pixels(self._image_width)
+        self._images = {
+            src: images.submit(src, width_px)
+            for src in map(html_lib.unescape, _IMG_SRC.findall(html))
+        }
+        super().add_html_to_document(html, document)
+
+    def handle_img(self, current_attrs):
+        future = getattr(self, "_images", {}).get(current_attrs.get("src"))
+        processed = future.result() if future is not None else None
+        if not self.include_images or processed is None:
+            # Placeholder (o imagen omitida) igual que htmldocx
+            super().handle_img(current_attrs)
+            return
+
+        image = BytesIO(processed[0])
+        if isinstance(self.doc, DocumentObject):
+            shape = self.doc.add_picture(image)
+        else:
+            shape = self.doc.add_paragraph().add_run().add_picture(image)
+        if shape.width > self._image_width:
+            shape.height = int(shape.height * self._image_width / shape.width)
+            shape.width = self._image_width
+
+    def handle_table(self):
+        table_soup = self.tables[self.table_no]
+
+        # Un builder por parser: el estilo de tabla se resuelve una vez
+        if getattr(self, "_table_builder", None) is None:
+            self._table_builder = docx_builder.DocxBuilder(self.document)
+        self._table_builder.reset()
+        self._table_builder.feed(str(table_soup))
+        self._table_builder.close()
+
+        # Igual que htmldocx: se ignoran los tags hasta el cierre de la tabla
+        self.instances_to_skip = len(table_soup.find_all("table"))
+        self.skip_tag = "table"
+        self.skip = True
+        self.table = None
+
+
+def _streaming(streaming: Optional[bool]) -> bool:
+    """El writer en streaming solo existe para el backend "fast"."""
+    if streaming is None:
+        streaming = config.DOCX_STREAMING
+    return streaming and config.DOCX_BACKEND == BACKEND_FAST
+
+
+def _toc(toc: Optional[bool]) -> bool:
+    return config.DOCX_TOC if toc is None else toc
+
+
 def _apply_custom_styles(document: Document, styles: dict) -> None:
     """
     Aplica estilos personalizados al documento.
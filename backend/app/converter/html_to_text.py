@@ -0,0 +1,112 @@
+"""
+Módulo para convertir HTML a texto plano.
+
+Pensado para el HTML que genera markdown_to_html: conserva la estructura
+(párrafos, listas, tablas y bloques de código) con saltos de línea y
+sin ningún marcado.
+Este módulo NO tiene dependencias de AWS.
+"""
+
+import re
+from html.parser import HTMLParser
+from typing import List
+
+
+_BLOCK_TAGS = {
+    "p", "h1", "h2", "h3", "h4", "h5", "h6", "pre", "blockquote",
+    "ul", "ol", "table", "hr", "div",
+}
+_SPACES = re.compile(r"[ \t\r\n]+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+
+def convert(html: str) -> str:
+    """
+    Convierte HTML a texto plano.
+
+    Args:
+        html: String con contenido HTML
+
+    Returns:
+        str: Texto plano con bloques separados por una línea en blanco
+
+    Raises:
+        ValueError: Si el HTML está vacío
+        TypeError: Si el input no es string
+
+    Examples:
+        >>> convert("<h1>Título</h1><ul><li>uno</li></ul>")
+        'Título\\n\\n- uno\\n'
+    """
+    if not isinstance(html, str):
+        raise TypeError("El contenido debe ser un string")
+    if not html or html.strip() == "":
+        raise ValueError("El contenido HTML no puede estar vacío")
+
+    parser = _TextParser()
+    parser.feed(html)
+    parser.close()
+    return parser.text()
+
+
+class _TextParser(HTMLParser):
+    """Recorre el HTML acumulando texto y saltos de línea."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._parts: List[str] = []
+        self._lists: List[list] = []
+        self._pre = 0
+        self._cells = 0
+
+    def text(self) -> str:
+        text = "".join(self._parts)
+        text = "\n".join(line.rstrip().replace(" \t", "\t") for line in text.split("\n"))
+        return _BLANK_LINES.sub("\n\n", text).strip("\n") + "\n"
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag in _BLOCK_TAGS and not self._lists:
+            self._parts.append("\n\n")
+        if tag in ("ul", "ol"):
+            self._lists.append([tag, 0])
+            self._parts.append("\n")
+        elif tag == "li":
+            kind = self._lists[-1] if self._lists else ["ul", 0]
+            kind[1] += 1
+            indent = "  " * max(len(self._lists) - 1, 0)
+            marker = f"{kind[1]}." if kind[0] == "ol" else "-"
+            self._parts.append(f"\n{indent}{marker} ")
+        elif tag == "br":
+            self._parts.append("\n")
+        elif tag == "pre":
+            self._pre += 1
+        elif tag == "tr":
+            self._cells = 0
+            self._parts.append("\n")
+        elif tag in ("td", "th"):
+            if self._cells:
+                self._parts.append("\t")
+            self._cells += 1
+        elif tag == "hr":
+            self._parts.append("---")
+        elif tag == "img":
+            alt = dict(attrs).get("alt")
+            if alt:
+                self._parts.append(alt)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in ("ul", "ol") and self._lists:
+            self._lists.pop()
+        elif tag == "pre":
+            self._pre = max(self._pre - 1, 0)
+        if tag in _BLOCK_TAGS and not self._lists:
+            self._parts.append("\n\n")
+
+    def handle_data(self, data: str) -> None:
+        if not self._pre:
+            data = _SPACES.sub(" ", data)
+            if data == " " and (not self._parts or self._parts[-1].endswith(("\n", " ", "\t"))):
+                return
+            if self._parts and self._parts[-1].endswith(("\n", "\t")):
+                data = data.lstrip(" ")
+        self._parts.append(data)
@@ -0,0 +1,262 @@
+"""
+Etapa de imágenes para el DOCX.
+
+Cada imagen (URI data:, URL o ruta local) se obtiene y procesa en un
+pool de threads mientras el builder sigue con el resto del documento:
+se reduce al ancho de página (a IMAGE_DPI) y se re-encodea con
+IMAGE_QUALITY. El resultado queda en un cache por proceso (acotado en
+entradas y en bytes), así la misma imagen en otro request no se vuelve
+a decodificar. Las imágenes de más de IMAGE_MAX_MB no se insertan.
+
+El procesamiento usa Pillow (en requirements.txt); si falta en el
+entorno las imágenes se insertan tal cual (igual se cachean y se
+deduplican).
+"""
+
+import base64
+import hashlib
+import os
+import threading
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import BytesIO
+from typing import Optional, Tuple
+from urllib.parse import unquote_to_bytes, urlparse
+
+try:
+    from PIL import Image
+except ImportError:  # sin Pillow (entorno incompleto) no se reducen las imágenes
+    Image = None
+
+from app.config import config
+
+
+FETCH_TIMEOUT = 10
+EMUS_PER_INCH = 914400
+
+# Formatos que se re-encodean (las animaciones y vectoriales quedan igual)
+_REENCODE_FORMATS = frozenset(("PNG", "JPEG", "BMP", "GIF", "TIFF", "WEBP"))
+
+# (contenido, sha1 del contenido); None si la imagen no se pudo obtener
+Processed = Optional[Tuple[bytes, str]]
+
+_cache: "OrderedDict[tuple, Tuple[bytes, str]]" = OrderedDict()
+_cache_bytes = 0
+_hits = 0
+_misses = 0
+_lock = threading.Lock()
+_pool: Optional[ThreadPoolExecutor] = None
+
+
+def available() -> bool:
+    """Indica si Pillow está instalado."""
+    return Image is not None
+
+
+def max_pixels(width_emu: int) -> int:
+    """Ancho máximo en píxeles para un ancho en EMU (a IMAGE_DPI)."""
+    return max(1, int(width_emu * config.IMAGE_DPI / EMUS_PER_INCH))
+
+
+def submit(src: str, width_px: int) -> Future:
+    """
+    Obtiene y procesa una imagen en el pool.
+
+    Args:
+        src: URI data:, URL o ruta local
+        width_px: Ancho máximo en píxeles
+
+    Returns:
+        Future con el resultado de get
+    """
+    global _pool
+    if config.IMAGE_WORKERS <= 1:
+        future: Future = Future()
+        future.set_result(get(src, width_px))
+        return future
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(
+                    max_workers=config.IMAGE_WORKERS, thread_name_prefix="image"
+                )
+    return _pool.submit(get, src, width_px)
+
+
+def get(src: str, width_px: int) -> Processed:
+    """
+    Imagen lista para insertar, desde el cache o procesándola.
+
+    Los fallos no se cachean: un error transitorio al descargar no deja
+    la imagen rota en los siguientes requests del proceso.
+
+    Args:
+        src: URI data:, URL o ruta local
+        width_px: Ancho máximo en píxeles
+
+    Returns:
+        (contenido, sha1) o None si no se pudo obtener
+    """
+    global _cache_bytes, _hits, _misses
+    key = _cache_key(src, width_px)
+    if key is None:
+        return None
+
+    with _lock:
+        if key in _cache:
+            _hits += 1
+            _cache.move_to_end(key)
+            return _cache[key]
+        _misses += 1
+
+    data = load(src)
+    if data is None:
+        return None
+    data = process(data, width_px)
+    result = (data, hashlib.sha1(data).hexdigest())
+
+    max_bytes = config.IMAGE_CACHE_MB * 1024 * 1024
+    if len(data) > max_bytes:
+        return result
+    with _lock:
+        if key not in _cache:
+            _cache[key] = result
+            _cache_bytes += len(data)
+        while len(_cache) > config.IMAGE_CACHE_SIZE or _cache_bytes > max_bytes:
+            _, (evicted, _) = _cache.popitem(last=False)
+            _cache_bytes -= len(evicted)
+    return result
+
+
+def load(src: str) -> Optional[bytes]:
+    """
+    Lee el contenido de una imagen (hasta IMAGE_MAX_BYTES).
+
+    Returns:
+        bytes o None si no se pudo obtener o supera el máximo
+    """
+    if not src:
+        return None
+    limit = config.IMAGE_MAX_BYTES
+    if src.startswith("data:"):
+        data = _decode_data_uri(src)
+    elif _is_url(src):
+        try:
+            with urllib.request.urlopen(src, timeout=FETCH_TIMEOUT) as response:
+                data = response.read(limit + 1)
+        except Exception:
+            return None
+    else:
+        try:
+            with open(src, "rb") as f:
+                data = f.read(limit + 1)
+        except OSError:
+            return None
+    if data is not None and len(data) > limit:
+        return None
+    return data
+
+
+def process(data: bytes, width_px: int) -> bytes:
+    """
+    Reduce la imagen al ancho máximo y la re-encodea.
+
+    Las imágenes sin transparencia se guardan como JPEG con
+    IMAGE_QUALITY; las que tienen transparencia siguen siendo PNG. Si el
+    resultado no es más chico se conserva el original.
+
+    Args:
+        data: Contenido de la imagen
+        width_px: Ancho máximo en píxeles
+
+    Returns:
+        bytes: Imagen procesada (la original sin Pillow o si falla)
+    """
+    if Image is None:
+        return data
+    try:
+        with Image.open(BytesIO(data)) as image:
+            if image.format not in _REENCODE_FORMATS or getattr(image, "n_frames", 1) > 1:
+                return data
+            resized = image.width > width_px
+            if resized:
+                height = max(1, round(image.height * width_px / image.width))
+                image = image.resize((width_px, height), Image.LANCZOS)
+
+            output = BytesIO()
+            if image.mode in ("RGBA", "LA", "P") and _has_alpha(image):
+                image.save(output, format="PNG", optimize=True)
+            else:
+                image.convert("RGB").save(
+                    output, format="JPEG", quality=config.IMAGE_QUALITY, optimize=True
+                )
+            result = output.getvalue()
+    except Exception:
+        return data
+    return result if resized or len(result) < len(data) else data
+
+
+def cache_info() -> dict:
+    """Aciertos, fallos y tamaño del cache de imágenes procesadas."""
+    with _lock:
+        return {
+            "hits": _hits,
+            "misses": _misses,
+            "size": len(_cache),
+            "max_size": config.IMAGE_CACHE_SIZE,
+            "bytes": _cache_bytes,
+            "max_bytes": config.IMAGE_CACHE_MB * 1024 * 1024,
+        }
+
+
+def clear_cache() -> None:
+    """Vacía el cache de imágenes procesadas."""
+    global _cache_bytes, _hits, _misses
+    with _lock:
+        _cache.clear()
+        _cache_bytes = _hits = _misses = 0
+
+
+def _cache_key(src: str, width_px: int) -> Optional[tuple]:
+    """
+    Clave de cache: hash de la fuente (y de la versión del archivo local).
+
+    Returns:
+        Tupla o None si la ruta local no existe
+    """
+    if not src:
+        return None
+    version = None
+    if not src.startswith("data:") and not _is_url(src):
+        try:
+            stat = os.stat(src)
+        except OSError:
+            return None
+        version = (stat.st_mtime_ns, stat.st_size)
+    digest = hashlib.sha1(src.encode("utf-8", "surrogatepass")).hexdigest()
+    return (digest, version, width_px, config.IMAGE_QUALITY)
+
+
+def _decode_data_uri(src: str) -> Optional[bytes]:
+    """Contenido de un URI data:image/...; None si no es una imagen."""
+    header, separator, payload = src[5:].partition(",")
+    if not separator or not header.lower().startswith("image/"):
+        return None
+    try:
+        if header.lower().endswith(";base64"):
+            return base64.b64decode(payload)
+        return unquote_to_bytes(payload)
+    except ValueError:
+        return None
+
+
+def _has_alpha(image) -> bool:
+    if image.mode == "P":
+        return "transparency" in image.info
+    return True
+
+
+def _is_url(src: str) -> bool:
+    parts = urlparse(src)
+    return all([parts.scheme, parts.netloc, parts.path])
@@ -0,0 +1,307 @@
+"""
+Renderizado incremental de Markdown a HTML para previews en vivo.
+
+Divide el documento en bloques de primer nivel, cachea el HTML de cada
+bloque por su hash y solo re-renderiza los bloques que cambiaron.
+Los documentos con efectos globales (links por referencia, footnotes,
+abreviaciones, HTML crudo) se convierten completos como fallback.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Iterator, List, Optional
+
+from app.config import config
+from .markdown_to_html import DEFAULT_EXTENSIONS, convert, engine
+
+
+# Definiciones que afectan a bloques distintos del que las contiene
+_GLOBAL_PATTERNS = [
+    ("reference_links", re.compile(r"^ {0,3}\[[^\]^][^\]]*\]:\s*\S", re.MULTILINE)),
+    ("footnotes", re.compile(r"\[\^[^\]]+\]")),
+    ("abbreviations", re.compile(r"^ {0,3}\*\[[^\]]+\]:", re.MULTILINE)),
+    ("raw_html", re.compile(r"^ {0,3}<[a-zA-Z!/]", re.MULTILINE)),
+]
+
+_FENCE = re.compile(r"^(`{3,}|~{3,})")
+_LIST_MARKER = re.compile(r"^ {0,3}(?:[*+-]|\d+[.)])[ \t]")
+
+_block_cache: "OrderedDict[str, str]" = OrderedDict()
+_block_cache_lock = threading.Lock()
+_cache_hits = 0
+_cache_misses = 0
+
+
+def split_blocks(markdown_text: str) -> List[str]:
+    """
+    Divide Markdown en bloques de primer nivel en una sola pasada.
+
+    Un bloque termina en una línea en blanco seguida de una línea sin
+    indentación. Los bloques que Python-Markdown fusionaría con el
+    anterior (listas y citas separadas por líneas en blanco, contenido
+    indentado, code fences) se mantienen juntos.
+
+    Args:
+        markdown_text: String con contenido Markdown
+
+    Returns:
+        Lista de bloques en orden (sin bloques vacíos)
+    """
+    blocks = []
+    current: List[str] = []
+    has_list = has_quote = False
+    fence = None
+    pending_blank = False
+
+    for line in markdown_text.split("\n"):
+        stripped = line.rstrip("\r")
+
+        if fence is not None:
+            current.append(line)
+            if stripped.rstrip(" ") == fence:
+                fence = None
+            continue
+
+        if not stripped.strip():
+            if current:
+                pending_blank = True
+                current.append(line)
+            continue
+
+        starts_list = bool(_LIST_MARKER.match(stripped))
+        starts_quote = stripped.lstrip(" ").startswith(">")
+
+        if pending_blank and not stripped[0].isspace():
+            merges = (starts_list and has_list) or (starts_quote and has_quote)
+            if not merges:
+                blocks.append("\n".join(current))
+                current = []
+                has_list = has_quote = False
+        pending_blank = False
+
+        current.append(line)
+        has_list = has_list or starts_list
+        has_quote = has_quote or starts_quote
+
+        match = _FENCE.match(stripped)
+        if match:
+            fence = match.group(1)
+
+    if current:
+        blocks.append("\n".join(current))
+
+    return [block.strip("\n") for block in blocks if block.strip()]
+
+
+def find_global_features(markdown_text: str) -> Optional[str]:
+    """
+    Detecta construcciones con efecto en todo el documento.
+
+    Args:
+        markdown_text: String con contenido Markdown
+
+    Returns:
+        Nombre de la primera construcción encontrada o None
+    """
+    for name, pattern in _GLOBAL_PATTERNS:
+        if pattern.search(markdown_text):
+            return name
+    return None
+
+
+def block_hash(block: str, extensions: Optional[list] = None) -> str:
+    """
+    Hash de un bloque, incluyendo las extensiones usadas para renderizarlo.
+
+    Args:
+        block: Texto Markdown del bloque
+        extensions: Lista de extensiones de markdown (opcional)
+
+    Returns:
+        str: Hash hexadecimal corto
+    """
+    digest = hashlib.blake2b(digest_size=12)
+    digest.update("|".join(map(str, extensions or DEFAULT_EXTENSIONS)).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(block.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def render(
+    markdown_text: str,
+    previous_blocks: Optional[List[str]] = None,
+    extensions: Optional[list] = None
+) -> dict:
+    """
+    Renderiza Markdown reutilizando el HTML cacheado de cada bloque.
+
+    Si se pasan los hashes de bloques del render anterior, retorna
+    solo un patch con los bloques que cambiaron.
+
+    Args:
+        markdown_text: String con contenido Markdown
+        previous_blocks: Hashes de bloques que el cliente ya tiene (opcional)
+        extensions: Lista de extensiones de markdown (opcional)
+
+    Returns:
+        Dict con una de estas formas:
+            {"mode": "full", "html": str, "blocks": [...], "fallback": str|None}
+            {"mode": "patch", "blocks": [...],
+             "patch": {"start": int, "delete": int, "html": [...]}}
+
+        En fallback "blocks" es una lista vacía: el siguiente request
+        debe enviarse sin previous_blocks.
+
+    Raises:
+        ValueError: Si el input es None o vacío
+        TypeError: Si el input no es string
+    """
+    if markdown_text is None or markdown_text == "":
+        raise ValueError("El contenido Markdown no puede estar vacío")
+    if not isinstance(markdown_text, str):
+        raise TypeError("El contenido debe ser un string")
+
+    fallback = find_global_features(markdown_text)
+    if fallback:
+        return {
+            "mode": "full",
+            "html": convert(markdown_text, extensions),
+            "blocks": [],
+            "fallback": fallback
+        }
+
+    blocks = split_blocks(markdown_text)
+    hashes = [block_hash(block, extensions) for block in blocks]
+
+    if previous_blocks is None:
+        html_blocks = render_blocks(blocks, hashes, extensions)
+        return {
+            "mode": "full",
+            "html": "\n".join(html_blocks),
+            "blocks": hashes,
+            "fallback": None
+        }
+
+    # Las ediciones en un editor son locales: basta recortar prefijo y
+    # sufijo comunes para obtener un único rango cambiado en O(n)
+    prefix = 0
+    limit = min(len(hashes), len(previous_blocks))
+    while prefix < limit and hashes[prefix] == previous_blocks[prefix]:
+        prefix += 1
+
+    suffix = 0
+    while (
+        suffix < limit - prefix
+        and hashes[-1 - suffix] == previous_blocks[-1 - suffix]
+    ):
+        suffix += 1
+
+    end = len(hashes) - suffix
+    changed = render_blocks(blocks[prefix:end], hashes[prefix:end], extensions)
+
+    return {
+        "mode": "patch",
+        "blocks": hashes,
+        "patch": {
+            "start": prefix,
+            "delete": len(previous_blocks) - suffix - prefix,
+            "html": changed
+        }
+    }
+
+
+def cache_info() -> dict:
+    """
+    Estadísticas del cache de bloques.
+
+    Returns:
+        Dict con hits, misses, size y max_size
+    """
+    with _block_cache_lock:
+        return {
+            "hits": _cache_hits,
+            "misses": _cache_misses,
+            "size": len(_block_cache),
+            "max_size": config.INCREMENTAL_CACHE_SIZE
+        }
+
+
+def cache_clear() -> None:
+    """Vacía el cache de bloques y reinicia sus contadores."""
+    global _cache_hits, _cache_misses
+    with _block_cache_lock:
+        _block_cache.clear()
+        _cache_hits = _cache_misses = 0
+
+
+def render_blocks(
+    blocks: List[str],
+    hashes: List[str],
+    extensions: Optional[list] = None
+) -> List[str]:
+    """
+    Renderiza bloques usando el cache LRU por hash.
+
+    Args:
+        blocks: Bloques Markdown
+        hashes: Hash de cada bloque
+        extensions: Lista de extensiones de markdown
+
+    Returns:
+        Lista con el HTML de cada bloque
+    """
+    result = []
+    with engine(extensions) as md:
+        for block, key in zip(blocks, hashes):
+            result.append(_render_block(md, block, key))
+
+    return result
+
+
+def iter_html(markdown_text: str, extensions: Optional[list] = None) -> Iterator[str]:
+    """
+    Genera el HTML bloque a bloque, a medida que se renderiza.
+
+    Es la base de las respuestas en streaming: el primer bloque sale
+    sin esperar al resto. Concatenar lo generado da el mismo HTML que
+    render(); con efectos globales se genera el documento completo de
+    una vez.
+
+    Args:
+        markdown_text: String con contenido Markdown
+        extensions: Lista de extensiones de markdown (opcional)
+
+    Yields:
+        str: HTML de cada bloque (con el separador entre bloques)
+    """
+    if find_global_features(markdown_text):
+        yield convert(markdown_text, extensions)
+        return
+
+    with engine(extensions) as md:
+        for index, block in enumerate(split_blocks(markdown_text)):
+            html = _render_block(md, block, block_hash(block, extensions))
+            yield html if index == 0 else "\n" + html
+
+
+def _render_block(md, block: str, key: str) -> str:
+    """HTML de un bloque desde el cache LRU, o renderizado con md."""
+    global _cache_hits, _cache_misses
+
+    with _block_cache_lock:
+        html = _block_cache.get(key)
+        if html is not None:
+            _block_cache.move_to_end(key)
+            _cache_hits += 1
+            return html
+        _cache_misses += 1
+
+    html = md.convert(block)
+    md.reset()
+    with _block_cache_lock:
+        _block_cache[key] = html
+        while len(_block_cache) > config.INCREMENTAL_CACHE_SIZE:
+            _block_cache.popitem(last=False)
+    return html
@@ -5,8 +5,30 @@ Este módulo NO tiene dependencias de AWS, es lógica pura.
 Puede ser testeado sin infraestructura.
 """
 
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
 import markdown
-from typing import Optional
+
+from .exceptions import ConversionError
+
+
+# Extensiones por defecto si no se especifican
+DEFAULT_EXTENSIONS = [
+    "fenced_code",      # Para ```code blocks```
+    "tables",           # Para tablas
+    "nl2br",            # Convierte \n en <br> (me salvó)
+    "sane_lists",       # Listas más consistentes
+]
+
+# Pool de instancias Markdown reutilizables, por combinación de extensiones.
+# Crear markdown.Markdown carga y registra todas las extensiones, reset()
+# es mucho más barato.
+_engine_pool: dict = {}
+_engine_pool_lock = threading.Lock()
+_engines_created = 0
+_engines_in_use = 0
 
 
 def convert(markdown_text: str, extensions: Optional[list] = None) -> str:
@@ -40,26 +62,79 @@ def convert(markdown_text: str, extensions: Optional[list] = None) -> str:
     if not markdown_text:
         raise ValueError("El contenido Markdown no puede estar vacío")
 
-    # Extensiones por defecto si no se especifican
     if extensions is None:
-        extensions = [
-            "fenced_code",      # Para ```code blocks```
-            "tables",           # Para tablas
-            "nl2br",            # Convierte \n en <br> (me salvó)
-            "sane_lists",       # Listas más consistentes
-        ]
+        extensions = DEFAULT_EXTENSIONS
 
     try:
-        html = markdown.markdown(
-            markdown_text,
-            extensions=extensions,
-            output_format="html5"
-        )
-        return html
+        with engine(extensions) as md:
+            return md.convert(markdown_text)
+    except ConversionError:
+        raise
     except Exception as e:
         raise Exception(f"Error al convertir Markdown: {str(e)}")
 
 
+@contextmanager
+def engine(extensions: Optional[list] = None) -> Iterator[markdown.Markdown]:
+    """
+    Presta una instancia Markdown del pool y la devuelve reseteada.
+
+    Las extensiones pasadas como objetos (no strings) no se pueden usar
+    como clave del pool, en ese caso se crea una instancia nueva.
+
+    Args:
+        extensions: Lista de extensiones de markdown (opcional)
+
+    Yields:
+        markdown.Markdown: Instancia lista para convert()
+    """
+    if extensions is None:
+        extensions = DEFAULT_EXTENSIONS
+
+    key = tuple(extensions) if all(isinstance(e, str) for e in extensions) else None
+
+    global _engines_created, _engines_in_use
+
+    md = None
+    with _engine_pool_lock:
+        idle = _engine_pool.get(key) if key is not None else None
+        if idle:
+            md = idle.pop()
+            _engines_in_use += 1
+
+    if md is None:
+        md = markdown.Markdown(extensions=extensions, output_format="html5")
+        with _engine_pool_lock:
+            _engines_created += 1
+            _engines_in_use += 1
+
+    try:
+        yield md
+    finally:
+        md.reset()
+        with _engine_pool_lock:
+            _engines_in_use -= 1
+            if key is not None:
+                _engine_pool.setdefault(key, []).append(md)
+
+
+def pool_info() -> dict:
+    """
+    Estado del pool de engines Markdown.
+
+    Returns:
+        Dict con created (instancias creadas), in_use (prestadas ahora),
+        idle (disponibles) y configurations (combinaciones de extensiones)
+    """
+    with _engine_pool_lock:
+        return {
+            "created": _engines_created,
+            "in_use": _engines_in_use,
+            "idle": sum(len(engines) for engines in _engine_pool.values()),
+            "configurations": len(_engine_pool)
+        }
+
+
 def convert_with_metadata(markdown_text: str) -> dict:
     """
     Convierte Markdown a HTML y extrae metadata si existe.
@@ -0,0 +1,290 @@
+"""
+Normalizador de salida de LLMs previo a la conversión.
+
+Repara en una sola pasada (O(n)) los defectos más comunes del Markdown
+generado por LLMs, que de otra forma producen parseos costosos o
+incorrectos: saltos de línea mezclados, caracteres de ancho cero,
+code fences sin cerrar o con cierre distinto y tablas sin fila
+separadora. Funciona en streaming (feed/close) y reporta cada
+reparación aplicada.
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from app.config import config
+
+
+FIX_LINE_ENDINGS = "line_endings"
+FIX_ZERO_WIDTH = "zero_width"
+FIX_FENCES = "fences"
+FIX_TABLE_SEPARATOR = "table_separator"
+
+ALL_FIXES = (FIX_LINE_ENDINGS, FIX_ZERO_WIDTH, FIX_FENCES, FIX_TABLE_SEPARATOR)
+
+# ZWSP, word joiner y BOM siempre sobran. ZWJ/ZWNJ solo junto a ASCII:
+# dentro de emojis o escrituras no latinas sí tienen significado.
+_ZERO_WIDTH = re.compile(
+    "[\u200b\u2060\ufeff]"
+    "|(?<=[\x00-\x7f])[\u200c\u200d]"
+    "|[\u200c\u200d](?=[\x00-\x7f])"
+)
+_FENCE_OPEN = re.compile(r"^(`{3,}|~{3,})")
+_TABLE_ROW = re.compile(r"^\s*\|.*\|\s*$")
+_TABLE_SEPARATOR = re.compile(r"^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$")
+
+
+def resolve_options(options: Union[None, bool, list, dict] = None) -> Dict[str, bool]:
+    """
+    Traduce la opción del request a un dict de reparaciones activas.
+
+    Args:
+        options: None (configuración), bool (todas o ninguna), lista de
+            nombres a activar, o dict nombre -> bool sobre los defaults
+
+    Returns:
+        Dict con cada reparación y si está activa
+
+    Raises:
+        ValueError: Si se nombra una reparación desconocida
+    """
+    enabled = {fix: fix in config.NORMALIZE_FIXES for fix in ALL_FIXES}
+
+    if options is None:
+        return enabled
+    if isinstance(options, bool):
+        return {fix: options for fix in ALL_FIXES}
+
+    names = options if isinstance(options, list) else list(options)
+    unknown = [name for name in names if name not in ALL_FIXES]
+    if unknown:
+        raise ValueError(f"Reparaciones desconocidas: {', '.join(map(str, unknown))}")
+
+    if isinstance(options, list):
+        return {fix: fix in options for fix in ALL_FIXES}
+
+    enabled.update({fix: bool(value) for fix, value in options.items()})
+    return enabled
+
+
+class Normalizer:
+    """
+    Normalizador incremental: recibe chunks y emite texto reparado.
+
+    Attributes:
+        options: Reparaciones activas
+        fixes: Conteo de reparaciones aplicadas por tipo
+    """
+
+    def __init__(self, options: Union[None, bool, list, dict] = None):
+        """
+        Inicializa el normalizador.
+
+        Args:
+            options: Reparaciones a aplicar (ver resolve_options)
+        """
+        self.options = resolve_options(options)
+        self.fixes: Dict[str, int] = {}
+        self._partial: List[str] = []
+        self._carry_cr = False
+        self._fence: Optional[str] = None
+        self._previous_blank = True
+        self._header: Optional[str] = None
+
+    def feed(self, chunk: str) -> str:
+        """
+        Procesa un chunk y retorna las líneas completas ya reparadas.
+
+        Args:
+            chunk: Fragmento de texto de cualquier tamaño
+
+        Returns:
+            Texto normalizado listo para emitir (puede ser vacío)
+        """
+        if self._carry_cr:
+            chunk = "\r" + chunk
+            self._carry_cr = False
+        if chunk.endswith("\r"):
+            # Puede ser la mitad de un \r\n partido entre chunks
+            chunk = chunk[:-1]
+            self._carry_cr = True
+
+        if "\r" in chunk:
+            if self.options[FIX_LINE_ENDINGS]:
+                crlf = chunk.count("\r\n")
+                chunk = chunk.replace("\r\n", "\n")
+                lone = chunk.count("\r")
+                chunk = chunk.replace("\r", "\n")
+                self._count(FIX_LINE_ENDINGS, crlf + lone)
+
+        if "\n" not in chunk:
+            self._partial.append(chunk)
+            return ""
+
+        pieces = chunk.split("\n")
+        pieces[0] = "".join(self._partial) + pieces[0]
+        self._partial = [pieces.pop()]
+
+        output: List[str] = []
+        for line in pieces:
+            self._line(line, output)
+
+        return "".join(line + "\n" for line in output)
+
+    def close(self) -> str:
+        """
+        Procesa el resto pendiente y cierra estructuras abiertas.
+
+        Returns:
+            Texto normalizado final (sin salto de línea agregado)
+        """
+        if self._carry_cr:
+            self._carry_cr = False
+            if self.options[FIX_LINE_ENDINGS]:
+                self._count(FIX_LINE_ENDINGS, 1)
+                text = self.feed("\n")
+            else:
+                self._partial.append("\r")
+                text = ""
+        else:
+            text = ""
+
+        output: List[str] = []
+        last = "".join(self._partial)
+        self._partial = []
+        if last:
+            self._line(last, output)
+
+        if self._header is not None:
+            output.append(self._header)
+            self._header = None
+
+        if self._fence is not None and self.options[FIX_FENCES]:
+            output.append(self._fence)
+            self._count(FIX_FENCES, 1)
+            self._fence = None
+
+        tail = "\n".join(output)
+        if tail and not last:
+            # El texto original terminaba en salto de línea: se conserva
+            tail += "\n"
+
+        return text + tail
+
+    def _line(self, line: str, output: List[str]) -> None:
+        """
+        Repara una línea completa y la agrega a la salida.
+
+        Args:
+            line: Línea sin salto final
+            output: Lista donde se emiten las líneas reparadas
+        """
+        if self._fence is not None:
+            stripped = line.rstrip()
+            if stripped == self._fence:
+                self._fence = None
+            elif (
+                self.options[FIX_FENCES]
+                and len(stripped) > len(self._fence)
+                and stripped == stripped[0] * len(stripped)
+                and stripped[0] == self._fence[0]
+            ):
+                # Cierre más largo (válido en CommonMark): Python-Markdown
+                # exige exactamente el mismo fence
+                line = self._fence
+                self._fence = None
+                self._count(FIX_FENCES, 1)
+            output.append(line)
+            return
+
+        if self.options[FIX_ZERO_WIDTH] and not line.isascii():
+            line, removed = _ZERO_WIDTH.subn("", line)
+            if removed:
+                self._count(FIX_ZERO_WIDTH, removed)
+
+        if self._header is not None:
+            header = self._header
+            self._header = None
+            output.append(header)
+            if _is_table_row(line):
+                columns = header.strip().strip("|").count("|") + 1
+                output.append("|" + "|".join(["---"] * columns) + "|")
+                self._count(FIX_TABLE_SEPARATOR, 1)
+
+        elif (
+            self.options[FIX_TABLE_SEPARATOR]
+            and self._previous_blank
+            and _is_table_row(line)
+        ):
+            # Posible encabezado de tabla: se decide con la línea siguiente
+            self._header = line
+            self._previous_blank = False
+            return
+
+        if line[:1] in "`~":
+            match = _FENCE_OPEN.match(line)
+            if match:
+                self._fence = match.group(1)
+
+        self._previous_blank = not line.strip()
+        output.append(line)
+
+    def _count(self, fix: str, amount: int) -> None:
+        if amount:
+            self.fixes[fix] = self.fixes.get(fix, 0) + amount
+
+
+def _is_table_row(line: str) -> bool:
+    """Fila de tabla con pipes en ambos extremos que no es separadora."""
+    return (
+        "|" in line
+        and bool(_TABLE_ROW.match(line))
+        and not _TABLE_SEPARATOR.match(line)
+    )
+
+
+def normalize(
+    markdown_text: str,
+    options: Union[None, bool, list, dict] = None
+) -> Tuple[str, Dict[str, int]]:
+    """
+    Normaliza un documento completo.
+
+    Args:
+        markdown_text: String con contenido Markdown
+        options: Reparaciones a aplicar (ver resolve_options)
+
+    Returns:
+        Tupla (markdown normalizado, conteo de reparaciones por tipo)
+
+    Examples:
+        >>> normalize("```\\ncode")
+        ('```\\ncode\\n```', {'fences': 1})
+    """
+    normalizer = Normalizer(options)
+    text = normalizer.feed(markdown_text) + normalizer.close()
+    return text, normalizer.fixes
+
+
+def normalize_stream(
+    chunks: Iterable[str],
+    options: Union[None, bool, list, dict] = None
+) -> Iterable[str]:
+    """
+    Versión generadora: normaliza chunks a medida que llegan.
+
+    Args:
+        chunks: Iterable de fragmentos de texto
+        options: Reparaciones a aplicar (ver resolve_options)
+
+    Yields:
+        Fragmentos de texto normalizado
+    """
+    normalizer = Normalizer(options)
+    for chunk in chunks:
+        text = normalizer.feed(chunk)
+        if text:
+            yield text
+    tail = normalizer.close()
+    if tail:
+        yield tail
@@ -0,0 +1,410 @@
+"""
+Pre-escaneo de Markdown para evitar entradas patológicas.
+
+Python-Markdown y htmldocx tienen comportamiento superlineal (o agotan la
+recursión) con ciertas entradas que los LLMs producen de vez en cuando:
+miles de citas o listas anidadas, tablas enormes en una sola línea o
+corridas de énfasis sin cerrar. Este módulo mide esas dimensiones en una
+sola pasada lineal y rechaza o normaliza lo que excede los límites.
+También provee un presupuesto de tiempo de CPU para la conversión.
+"""
+
+import re
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+from app.config import config
+from .exceptions import ConversionTimeoutError, InputTooComplexError
+
+
+POLICY_NORMALIZE = "normalize"
+POLICY_REJECT = "reject"
+
+_FENCE = re.compile(r"^(`{3,}|~{3,})")
+_QUOTE_PREFIX = re.compile(r"^[ ]{0,3}(?:>[ ]?)+")
+_INLINE_MARKERS = re.compile(r"(?<!\\)([\[\]`_*])")
+_INLINE_MARKER_CHARS = "[]`_*"
+# Ítem de lista o encabezado: su texto se procesa aparte del anterior
+_BLOCK_START = re.compile(r"(?:[-*+]|\d{1,9}[.)]|#{1,6})(?:[ \t]|$)")
+
+
+def default_limits() -> dict:
+    """
+    Límites vigentes según la configuración.
+
+    inline_markers cuenta por párrafo (o ítem de lista, fila de tabla):
+    Python-Markdown procesa el texto inline de cada uno de una vez y su
+    costo crece de forma superlineal con los marcadores sin cerrar, así
+    que 20 líneas seguidas de 999 "[" son un solo caso patológico.
+    table_cells acota filas x columnas de cada tabla.
+
+    Returns:
+        Dict con depth, line_length, table_columns, table_cells e
+        inline_markers
+    """
+    return {
+        "depth": config.MAX_NESTING_DEPTH,
+        "line_length": config.MAX_LINE_LENGTH,
+        "table_columns": config.MAX_TABLE_COLUMNS,
+        "table_cells": config.MAX_TABLE_CELLS,
+        "inline_markers": config.MAX_INLINE_MARKERS
+    }
+
+
+def scan(markdown_text: str, limits: Optional[dict] = None) -> dict:
+    """
+    Mide el Markdown sin modificarlo.
+
+    Args:
+        markdown_text: String con contenido Markdown
+        limits: Límites a evaluar (los que falten: configuración)
+
+    Returns:
+        Dict con métricas máximas y la lista de violaciones
+    """
+    _, report = _process(markdown_text, _limits(limits), normalize=False)
+    return report
+
+
+def enforce(
+    markdown_text: str,
+    policy: Optional[str] = None,
+    limits: Optional[dict] = None
+) -> Tuple[str, dict]:
+    """
+    Aplica los límites: rechaza o normaliza según la política.
+
+    Normalizar significa: recortar anidamiento al máximo, partir líneas
+    largas en espacios, fusionar columnas sobrantes en la última celda,
+    cortar las tablas con demasiadas celdas (las filas restantes quedan
+    como texto) y escapar los marcadores inline de las líneas con las que
+    un párrafo supera el máximo.
+
+    Args:
+        markdown_text: String con contenido Markdown
+        policy: "normalize" o "reject" (default: configuración)
+        limits: Límites a aplicar (los que falten: configuración)
+
+    Returns:
+        Tupla (markdown resultante, reporte del escaneo)
+
+    Raises:
+        InputTooComplexError: Si la política es "reject" y hay violaciones
+    """
+    policy = policy or config.PRESCAN_POLICY
+    limits = _limits(limits)
+
+    if policy == POLICY_REJECT:
+        report = scan(markdown_text, limits)
+        if report["violations"]:
+            first = report["violations"][0]
+            raise InputTooComplexError(
+                f"El contenido excede el límite de {first}",
+                metric=first,
+                value=report[f"max_{first}"],
+                limit=limits[first]
+            )
+        return markdown_text, report
+
+    text, report = _process(markdown_text, limits, normalize=True)
+    return text, report
+
+
+@contextmanager
+def time_budget(seconds: Optional[float] = None) -> Iterator[None]:
+    """
+    Limita el tiempo de CPU del bloque con un timer de perfilado.
+
+    Usa SIGPROF, por lo que solo se aplica en el hilo principal (donde
+    Lambda ejecuta el handler). En otros hilos el bloque corre sin límite.
+
+    Args:
+        seconds: Segundos de CPU permitidos (default: configuración, 0 desactiva)
+
+    Raises:
+        ConversionTimeoutError: Si el bloque excede el presupuesto
+    """
+    if seconds is None:
+        seconds = config.CONVERSION_CPU_BUDGET_SECONDS
+
+    if not seconds or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def _expired(signum, frame):
+        raise ConversionTimeoutError(
+            f"La conversión excedió el presupuesto de {seconds}s de CPU",
+            budget=seconds
+        )
+
+    previous_handler = signal.signal(signal.SIGPROF, _expired)
+    signal.setitimer(signal.ITIMER_PROF, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, previous_handler)
+
+
+def remaining_budget(started: float, seconds: Optional[float] = None) -> float:
+    """
+    Presupuesto de CPU restante para encadenar etapas bajo un mismo límite.
+
+    Args:
+        started: time.process_time() al iniciar la primera etapa
+        seconds: Presupuesto total (default: configuración)
+
+    Returns:
+        Segundos restantes (mínimo 1ms), o 0 si el presupuesto está desactivado
+    """
+    if seconds is None:
+        seconds = config.CONVERSION_CPU_BUDGET_SECONDS
+    if not seconds:
+        return 0
+    return max(seconds - (time.process_time() - started), 0.001)
+
+
+def _limits(limits: Optional[dict]) -> dict:
+    """Límites pedidos completados con los de la configuración."""
+    if not limits:
+        return default_limits()
+    return {**default_limits(), **limits}
+
+
+def _process(markdown_text: str, limits: dict, normalize: bool) -> Tuple[str, dict]:
+    """
+    Pasada única sobre las líneas: mide y, si corresponde, normaliza.
+
+    Las líneas dentro de un code fence no se miden (no pasan por el
+    parser inline). Si el fence nunca se cierra, Python-Markdown no lo
+    trata como código, así que esas líneas se procesan al final; cada
+    línea se procesa como máximo dos veces.
+
+    Args:
+        markdown_text: String con contenido Markdown
+        limits: Límites a aplicar
+        normalize: Si True construye el texto normalizado
+
+    Returns:
+        Tupla (texto resultante, reporte)
+    """
+    report = {
+        "max_depth": 0,
+        "max_line_length": 0,
+        "max_table_columns": 0,
+        "max_table_cells": 0,
+        "max_inline_markers": 0,
+        "violations": [],
+        "normalized": False
+    }
+
+    output: List[str] = []
+    fence = None
+    fenced: List[str] = []
+    block = _new_block()
+
+    for line in markdown_text.split("\n"):
+        if fence is not None:
+            fenced.append(line)
+            if line.rstrip() == fence:
+                output.extend(fenced)
+                fence = None
+                fenced = []
+            continue
+
+        match = _FENCE.match(line)
+        if match:
+            fence = match.group(1)
+            fenced = [line]
+            block = _new_block()
+            continue
+
+        output.append(_check_line(line, limits, report, normalize, block, output))
+
+    if fence is not None:
+        block = _new_block()
+        for line in fenced:
+            output.append(_check_line(line, limits, report, normalize, block, output))
+
+    report["violations"] = [
+        metric for metric in limits if report[f"max_{metric}"] > limits[metric]
+    ]
+    report["normalized"] = normalize and bool(report["violations"])
+
+    return ("\n".join(output) if normalize else markdown_text), report
+
+
+def _new_block() -> dict:
+    """Estado del bloque actual (párrafo, lista o tabla) entre líneas."""
+    return {
+        "lines": 0, "header_columns": 0, "table": False, "cells": 0,
+        "markers": 0, "first": 0, "escaped": False
+    }
+
+
+def _check_line(
+    line: str,
+    limits: dict,
+    report: dict,
+    normalize: bool,
+    block: dict,
+    output: List[str]
+) -> str:
+    """
+    Mide una línea y la normaliza si excede algún límite.
+
+    Args:
+        line: Línea de Markdown fuera de code fences
+        limits: Límites a aplicar
+        report: Reporte a actualizar con los máximos
+        normalize: Si True retorna la línea corregida
+        block: Estado del bloque al que pertenece la línea (se actualiza)
+        output: Líneas ya procesadas (se escapan las del mismo párrafo)
+
+    Returns:
+        La línea (normalizada si corresponde)
+    """
+    # Anidamiento: marcadores de cita más niveles de indentación
+    quote = _QUOTE_PREFIX.match(line)
+    quote_prefix = quote.group(0) if quote else ""
+    quote_depth = quote_prefix.count(">")
+    rest = line[len(quote_prefix):]
+    content = rest.lstrip(" \t")
+    indent_text = rest[:len(rest) - len(content)]
+    indent = len(indent_text.expandtabs(4))
+    depth = quote_depth + indent // 4
+
+    if not content:
+        # Línea en blanco: termina el bloque
+        block.update(_new_block())
+        report["max_depth"] = max(report["max_depth"], depth)
+        report["max_line_length"] = max(report["max_line_length"], len(line))
+        return line
+
+    length = len(line)
+    columns = line.count("|") - 1 if "|" in line else 0
+
+    # Tablas: encabezado con "|" seguido de la fila separadora
+    separator = "-" in content and set(content.rstrip()) <= set("|:- ")
+    split_table = False
+    if block["lines"] == 1 and block["header_columns"] and separator:
+        block["table"] = True
+        block["cells"] = block["header_columns"]
+    if block["table"]:
+        if not separator:
+            block["cells"] += max(columns, 1)
+            report["max_table_cells"] = max(report["max_table_cells"], block["cells"])
+            if normalize and block["cells"] > limits["table_cells"]:
+                # Una línea en blanco corta la tabla; el resto queda como párrafo
+                split_table = True
+                block.update(_new_block())
+    elif block["lines"] == 0:
+        block["header_columns"] = max(columns, 1) if "|" in line else 0
+    block["lines"] += 1
+
+    # Marcadores inline acumulados en el párrafo (una fila de tabla o un
+    # ítem de lista se procesan aparte)
+    if block["table"] or _BLOCK_START.match(content) or block["lines"] == 1:
+        block.update(markers=0, first=len(output), escaped=False)
+    previous = block["markers"]
+    markers = sum(line.count(char) for char in _INLINE_MARKER_CHARS)
+    if previous + markers > limits["inline_markers"]:
+        # Conteo exacto (sin marcadores escapados) solo si hace falta
+        markers = len(_INLINE_MARKERS.findall(line))
+    escape = block["escaped"] or previous + markers > limits["inline_markers"]
+    if normalize and escape and not block["escaped"]:
+        # Un corchete sin cerrar busca su cierre en todo el resto del
+        # párrafo: se escapa el párrafo entero, no solo desde esta línea
+        for index in range(block["first"], len(output)):
+            output[index] = _escape_markers(output[index])
+        block["escaped"] = True
+    block["markers"] = 0 if normalize and escape else previous + markers
+
+    report["max_depth"] = max(report["max_depth"], depth)
+    report["max_line_length"] = max(report["max_line_length"], length)
+    report["max_table_columns"] = max(report["max_table_columns"], columns)
+    report["max_inline_markers"] = max(report["max_inline_markers"], previous + markers)
+
+    if not normalize:
+        return line
+
+    if depth > limits["depth"]:
+        quote_depth = min(quote_depth, limits["depth"])
+        levels = min(indent // 4, limits["depth"] - quote_depth)
+        quote_prefix = "> " * quote_depth
+        indent_text = " " * (levels * 4 + indent % 4)
+        line = quote_prefix + indent_text + content
+
+    if columns > limits["table_columns"]:
+        line = _merge_columns(line, limits["table_columns"])
+
+    if escape:
+        line = _escape_markers(line)
+
+    if len(line) > limits["line_length"]:
+        line = _wrap(line, limits["line_length"])
+
+    if split_table:
+        line = "\n" + line
+
+    return line
+
+
+def _escape_markers(line: str) -> str:
+    """Escapa los marcadores inline (no el de ítem de lista o encabezado)."""
+    keep = len(line) - len(line.lstrip(" \t>"))
+    start = _BLOCK_START.match(line, keep)
+    keep = start.end() if start else keep
+    return line[:keep] + _INLINE_MARKERS.sub(r"\\\1", line[keep:])
+
+
+def _merge_columns(line: str, max_columns: int) -> str:
+    """
+    Fusiona las celdas sobrantes de una fila en la última permitida.
+
+    Args:
+        line: Fila de tabla Markdown
+        max_columns: Columnas máximas
+
+    Returns:
+        Fila con como máximo max_columns celdas
+    """
+    stripped = line.strip()
+    leading = stripped.startswith("|")
+    trailing = stripped.endswith("|")
+    cells = stripped.strip("|").split("|")
+
+    kept = cells[:max_columns - 1]
+    kept.append(" ".join(cell.strip() for cell in cells[max_columns - 1:]))
+
+    if set(stripped) <= set("|:- "):
+        # Fila separadora: la celda fusionada sigue siendo un separador
+        kept[-1] = "---"
+
+    return ("|" if leading else "") + "|".join(kept) + ("|" if trailing else "")
+
+
+def _wrap(line: str, width: int) -> str:
+    """
+    Parte una línea larga en espacios (o en seco si no hay espacios).
+
+    Args:
+        line: Línea a partir
+        width: Largo máximo por línea
+
+    Returns:
+        Las líneas resultantes unidas por saltos de línea
+    """
+    pieces = []
+    start = 0
+    while len(line) - start > width:
+        cut = line.rfind(" ", start, start + width)
+        if cut <= start:
+            cut = start + width
+        pieces.append(line[start:cut])
+        start = cut + 1 if line[cut:cut + 1] == " " else cut
+    pieces.append(line[start:])
+    return "\n".join(pieces)
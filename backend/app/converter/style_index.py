@@ -0,0 +1,163 @@
+"""
+Índice de estilos por plantilla.
+
+python-docx resuelve cada estilo por nombre con una búsqueda lineal en
+styles.xml, y para decidir si es el estilo por defecto recorre todos los
+estilos otra vez. htmldocx lo hace por cada párrafo (cada ítem de lista
+y cada encabezado). El índice se arma una vez por plantilla (mismo
+styles.xml = mismo índice) y responde en O(1).
+"""
+
+import threading
+import weakref
+from typing import Dict, Optional, Tuple
+
+from docx.oxml.ns import nsmap, qn
+from docx.styles import BabelFish
+from lxml import etree
+
+
+# Índices distintos que se guardan (una entrada por plantilla)
+MAX_TEMPLATES = 16
+
+_STYLE = qn("w:style")
+_NAME = qn("w:name")
+_VAL = qn("w:val")
+_TYPE = qn("w:type")
+_STYLE_ID = qn("w:styleId")
+_DEFAULT = qn("w:default")
+
+# Huella de styles.xml: ids, tipos, defaults y nombres en orden (en C,
+# mucho más barato que armar el índice o serializar el XML)
+_FINGERPRINT = etree.XPath(
+    "w:style/@w:styleId | w:style/@w:type | w:style/@w:default | w:style/w:name/@w:val",
+    namespaces={"w": nsmap["w"]},
+    smart_strings=False
+)
+
+_by_template: Dict[tuple, "StyleIndex"] = {}
+_by_part: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+class StyleIndex:
+    """
+    Nombre de estilo -> (id, tipo) y estilo por defecto de cada tipo.
+
+    El índice refleja los estilos de la plantilla: los que se agregan
+    después al documento no están y se resuelven con python-docx.
+    """
+
+    def __init__(self, styles_element):
+        """
+        Arma el índice recorriendo styles.xml una sola vez.
+
+        Args:
+            styles_element: Elemento w:styles
+        """
+        self._by_name: Dict[str, Tuple[str, str]] = {}
+        self._defaults: Dict[str, str] = {}
+
+        for style in styles_element.iterchildren(_STYLE):
+            style_id = style.get(_STYLE_ID)
+            style_type = style.get(_TYPE, "paragraph")
+            name = style.find(_NAME)
+            if name is not None:
+                self._by_name.setdefault(name.get(_VAL), (style_id, style_type))
+            if style.get(_DEFAULT) in ("1", "true", "on"):
+                # Como en la especificación, gana el último por defecto
+                self._defaults[style_type] = style_id
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+    def style_id(self, name: str) -> Optional[str]:
+        """
+        Id del estilo con ese nombre (nombres de UI como "Heading 1").
+
+        Returns:
+            Id del estilo o None si la plantilla no lo tiene
+        """
+        entry = self._by_name.get(BabelFish.ui2internal(name))
+        return entry[0] if entry else None
+
+    def resolver(self, fallback):
+        """
+        Reemplazo de DocumentPart.get_style_id con la misma semántica.
+
+        Args:
+            fallback: get_style_id original, para objetos estilo y
+                nombres que no están en el índice (incluye el error)
+
+        Returns:
+            Función (style_or_name, style_type) -> id o None
+        """
+        def get_style_id(style_or_name, style_type):
+            if not isinstance(style_or_name, str):
+                return fallback(style_or_name, style_type)
+
+            entry = self._by_name.get(BabelFish.ui2internal(style_or_name))
+            if entry is None:
+                return fallback(style_or_name, style_type)
+
+            style_id, xml_type = entry
+            if xml_type != style_type.xml_value:
+                raise ValueError(f"Style '{style_or_name}' is not of type {style_type}")
+            # El estilo por defecto no se escribe (igual que python-docx)
+            return None if style_id == self._defaults.get(xml_type) else style_id
+
+        return get_style_id
+
+
+def for_document(document) -> StyleIndex:
+    """
+    Índice de estilos de un documento, compartido entre documentos que
+    salen de la misma plantilla.
+
+    Args:
+        document: Objeto Document de python-docx
+
+    Returns:
+        StyleIndex del styles.xml del documento
+    """
+    styles_part = document.part._styles_part
+    index = _by_part.get(styles_part)
+    if index is not None:
+        return index
+
+    element = styles_part.element
+    key = tuple(_FINGERPRINT(element))
+    with _lock:
+        index = _by_template.get(key)
+        if index is None:
+            if len(_by_template) >= MAX_TEMPLATES:
+                _by_template.clear()
+            index = _by_template[key] = StyleIndex(element)
+        _by_part[styles_part] = index
+    return index
+
+
+def install(document) -> StyleIndex:
+    """
+    Hace que python-docx resuelva los estilos del documento con el índice.
+
+    Afecta solo a esta instancia de Document (paragraph.style = ...,
+    add_paragraph(style=...), add_heading, etc.).
+
+    Args:
+        document: Objeto Document de python-docx
+
+    Returns:
+        StyleIndex instalado
+    """
+    index = for_document(document)
+    part = document.part
+    if "get_style_id" not in vars(part):
+        part.get_style_id = index.resolver(part.get_style_id)
+    return index
+
+
+def cache_info() -> dict:
+    """Cantidad de plantillas indexadas."""
+    with _lock:
+        return {"templates": len(_by_template), "max_templates": MAX_TEMPLATES}
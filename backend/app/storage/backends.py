@@ -0,0 +1,729 @@
+"""
+Backends de almacenamiento.
+
+Todos cumplen el mismo protocolo (StorageBackend): put, put_stream,
+presign, delete y exists sobre keys generadas por key_layout, más
+presign_put y open para los archivos de entrada que sube el cliente,
+y subida por partes (create_multipart, upload_part, complete_multipart,
+abort_multipart) para el modo pipeline (ver pipeline.py). presign_many
+firma varias keys en una llamada (ver presign.py).
+S3Client arma la URL de descarga y los borrados diferidos sobre
+cualquiera de ellos; el backend se elige con STORAGE_BACKEND:
+
+    s3          Bucket real (boto3)
+    filesystem  Árbol de directorios local con limpieza por antigüedad
+    memory      Diccionario en memoria, para benchmarks y pruebas de
+                carga sin disco ni red
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from io import BytesIO
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, List, Optional, Protocol, Tuple, Union
+from urllib.parse import quote, unquote, urlparse
+
+from app.config import config
+from app.converter.exceptions import DeleteError, ObjectNotFoundError, StorageError
+from .presign import QuerySigner
+
+
+# Máximo de keys por llamada DeleteObjects (límite de S3)
+DELETE_BATCH_SIZE = 1000
+
+# Key de prueba para resolver la URL base del bucket
+_PROBE_KEY = "presign-probe"
+
+# Key o (key, version_id)
+ObjectRef = Union[str, Tuple[str, Optional[str]]]
+
+
+class StorageBackend(Protocol):
+    """Operaciones que S3Client necesita de un almacenamiento."""
+
+    def put(self, key: str, content: bytes, content_type: str) -> Optional[str]:
+        """Guarda un objeto; retorna su versión si el backend las tiene."""
+
+    def put_stream(self, key: str, stream: BinaryIO, content_type: str) -> Optional[str]:
+        """Guarda un objeto leyendo de un archivo binario, sin cargarlo entero."""
+
+    def presign(self, key: str, expires_in: int) -> str:
+        """URL de descarga válida por expires_in segundos."""
+
+    def presign_many(self, keys: List[str], expires_in: int) -> List[str]:
+        """URLs de descarga de varias keys, en el mismo orden."""
+
+    def presign_put(self, key: str, expires_in: int, content_type: str) -> str:
+        """URL para que el cliente suba el objeto (PUT) directamente."""
+
+    def open(self, key: str) -> Tuple[BinaryIO, int, Optional[str]]:
+        """Stream de lectura, tamaño en bytes y versión leída; ObjectNotFoundError si no existe."""
+
+    def create_multipart(self, key: str, content_type: str) -> str:
+        """Inicia una subida por partes; retorna su upload_id."""
+
+    def upload_part(self, key: str, upload_id: str, number: int, data: bytes) -> str:
+        """Sube la parte number (desde 1); retorna su ETag."""
+
+    def complete_multipart(self, key: str, upload_id: str, etags: List[str]) -> Optional[str]:
+        """Une las partes en orden; retorna la versión si el backend las tiene."""
+
+    def abort_multipart(self, key: str, upload_id: str) -> None:
+        """Descarta una subida por partes sin completar."""
+
+    def delete(self, objects: Iterable[ObjectRef], all_versions: bool = False) -> int:
+        """Elimina objetos; retorna cuántos (o cuántas versiones) se borraron."""
+
+    def exists(self, key: str) -> bool:
+        """Indica si el objeto existe."""
+
+    def key_from_url(self, url: str) -> str:
+        """Key de un objeto a partir de su URL (o la key misma)."""
+
+
+def _split(objects: Iterable[ObjectRef]) -> List[Tuple[str, Optional[str]]]:
+    return [item if isinstance(item, tuple) else (item, None) for item in objects]
+
+
+def _shared_prefixes(keys: List[str]) -> Iterable[Tuple[str, List[str]]]:
+    """
+    Agrupa keys ordenadas por directorio, con el prefijo común de cada grupo.
+
+    Una key sola usa la key entera como prefijo.
+    """
+    groups: Dict[str, List[str]] = {}
+    for key in keys:
+        groups.setdefault(key.rpartition("/")[0], []).append(key)
+    for group in groups.values():
+        yield (os.path.commonprefix(group) if len(group) > 1 else group[0]), group
+
+
+def _error_code(error: BaseException) -> str:
+    """Código de error de S3 (ej: "AccessDenied") de una excepción de botocore."""
+    while error is not None:
+        response = getattr(error, "response", None)
+        if isinstance(response, dict):
+            return response.get("Error", {}).get("Code", "")
+        error = error.__cause__
+    return ""
+
+
+class S3Backend:
+    """
+    Bucket de S3.
+
+    Las URLs de descarga se firman con un QuerySigner compartido: la URL
+    base del bucket (estilo de dirección, endpoint) se resuelve una vez
+    con boto3 y cada URL es solo la firma SigV4 de su key. Sin
+    credenciales (cliente anónimo) se usa generate_presigned_url.
+
+    Con el bucket versionado, all_versions=True borra todas las versiones
+    y delete markers (un DeleteObject sin versión solo agrega un marker y
+    el almacenamiento sigue ocupado). Los borrados van en lotes de
+    DELETE_BATCH_SIZE keys por DeleteObjects.
+
+    Attributes:
+        s3: Cliente boto3
+    """
+
+    def __init__(self, s3=None):
+        """
+        Args:
+            s3: Cliente boto3 (default: uno nuevo en AWS_REGION)
+        """
+        if s3 is None:
+            import boto3
+            s3 = boto3.client("s3", region_name=config.AWS_REGION)
+        self.s3 = s3
+        self._bases: Dict[str, Tuple[str, str, str]] = {}
+        self._signer: Optional[Tuple[tuple, QuerySigner]] = None
+        self._signer_generation = 0
+
+    def put(self, key: str, content: bytes, content_type: str) -> Optional[str]:
+        response = self.s3.put_object(
+            Bucket=config.BUCKET_NAME,
+            Key=key,
+            Body=content,
+            ContentType=content_type
+        )
+        return response.get("VersionId")
+
+    def put_stream(self, key: str, stream: BinaryIO, content_type: str) -> Optional[str]:
+        # upload_fileobj usa multipart por encima del umbral de boto3
+        self.s3.upload_fileobj(
+            stream,
+            config.BUCKET_NAME,
+            key,
+            ExtraArgs={"ContentType": content_type}
+        )
+        return None
+
+    def presign(self, key: str, expires_in: int) -> str:
+        return self.presign_many([key], expires_in)[0]
+
+    def presign_many(self, keys: List[str], expires_in: int) -> List[str]:
+        signer = self._query_signer()
+        if signer is None:
+            return [self._generate_presigned_url(key, expires_in) for key in keys]
+        origin, host, prefix = self._base(config.BUCKET_NAME)
+        now = datetime.now(timezone.utc)
+        urls = []
+        for key in keys:
+            path = prefix + quote(key, safe="/~")
+            urls.append(f"{origin}{path}?{signer.sign(host, path, expires_in, now)}")
+        return urls
+
+    def _generate_presigned_url(self, key: str, expires_in: int) -> str:
+        return self.s3.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": config.BUCKET_NAME,
+                "Key": key
+            },
+            ExpiresIn=expires_in
+        )
+
+    def _base(self, bucket: str) -> Tuple[str, str, str]:
+        """
+        Origen, host y prefijo de ruta de las URLs del bucket.
+
+        Se firma una key de prueba con boto3 y se le quita la key: así
+        se respeta el estilo de dirección y el endpoint configurados.
+        """
+        base = self._bases.get(bucket)
+        if base is None:
+            parts = urlparse(self._generate_presigned_url(_PROBE_KEY, 60))
+            prefix = parts.path[:-len(_PROBE_KEY)]
+            base = (f"{parts.scheme}://{parts.netloc}", parts.netloc, prefix)
+            self._bases[bucket] = base
+        return base
+
+    def _query_signer(self) -> Optional[QuerySigner]:
+        """Signer para las credenciales actuales (se renuevan solas)."""
+        credentials = getattr(getattr(self.s3, "_request_signer", None), "_credentials", None)
+        if credentials is None:
+            return None
+        frozen = tuple(credentials.get_frozen_credentials())
+        cached = self._signer
+        if cached is None or cached[0] != frozen:
+            access_key, secret_key, token = frozen
+            cached = (frozen, QuerySigner(
+                access_key, secret_key, self.s3.meta.region_name, token=token
+            ))
+            self._signer = cached
+            self._signer_generation += 1
+        return cached[1]
+
+    def signer_generation(self) -> int:
+        """
+        Cambia cada vez que se renuevan las credenciales de firma.
+
+        PresignService descarta su cache cuando cambia.
+        """
+        self._query_signer()
+        return self._signer_generation
+
+    def presign_put(self, key: str, expires_in: int, content_type: str) -> str:
+        return self.s3.generate_presigned_url(
+            "put_object",
+            Params={
+                "Bucket": config.BUCKET_NAME,
+                "Key": key,
+                "ContentType": content_type
+            },
+            ExpiresIn=expires_in
+        )
+
+    def open(self, key: str) -> Tuple[BinaryIO, int, Optional[str]]:
+        try:
+            response = self.s3.get_object(Bucket=config.BUCKET_NAME, Key=key)
+        except self.s3.exceptions.NoSuchKey:
+            raise ObjectNotFoundError(
+                f"No existe el archivo: {key}", bucket=config.BUCKET_NAME, key=key
+            )
+        except Exception as e:
+            raise StorageError(
+                f"Error al leer archivo: {str(e)}", bucket=config.BUCKET_NAME, key=key
+            )
+        return response["Body"], response["ContentLength"], response.get("VersionId")
+
+    def create_multipart(self, key: str, content_type: str) -> str:
+        response = self.s3.create_multipart_upload(
+            Bucket=config.BUCKET_NAME,
+            Key=key,
+            ContentType=content_type
+        )
+        return response["UploadId"]
+
+    def upload_part(self, key: str, upload_id: str, number: int, data: bytes) -> str:
+        response = self.s3.upload_part(
+            Bucket=config.BUCKET_NAME,
+            Key=key,
+            UploadId=upload_id,
+            PartNumber=number,
+            Body=data
+        )
+        return response["ETag"]
+
+    def complete_multipart(self, key: str, upload_id: str, etags: List[str]) -> Optional[str]:
+        response = self.s3.complete_multipart_upload(
+            Bucket=config.BUCKET_NAME,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": [
+                {"ETag": etag, "PartNumber": number}
+                for number, etag in enumerate(etags, start=1)
+            ]}
+        )
+        return response.get("VersionId")
+
+    def abort_multipart(self, key: str, upload_id: str) -> None:
+        self.s3.abort_multipart_upload(
+            Bucket=config.BUCKET_NAME,
+            Key=key,
+            UploadId=upload_id
+        )
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.s3.head_object(Bucket=config.BUCKET_NAME, Key=key)
+            return True
+        except self.s3.exceptions.ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise StorageError(
+                f"Error al consultar archivo: {str(e)}",
+                bucket=config.BUCKET_NAME,
+                key=key
+            )
+
+    def delete(self, objects: Iterable[ObjectRef], all_versions: bool = False) -> int:
+        """
+        Raises:
+            DeleteError: Con cada objeto que S3 no pudo eliminar
+        """
+        refs: List[dict] = []
+        unversioned: List[str] = []
+        for key, version_id in _split(objects):
+            if version_id is not None:
+                refs.append({"Key": key, "VersionId": version_id})
+            else:
+                unversioned.append(key)
+
+        if unversioned and all_versions:
+            try:
+                listed = self._object_versions(unversioned)
+            except Exception as e:
+                # Sin el listado no se borra nada de lo que no tiene versión
+                code = _error_code(e)
+                errors = [{"Key": key, "Code": code, "Message": str(e)} for key in unversioned]
+                deleted = 0
+                try:
+                    deleted = self._delete_objects(refs)
+                except DeleteError as batch_error:
+                    errors = batch_error.errors + errors
+                    deleted = batch_error.deleted
+                raise DeleteError(
+                    f"Error al listar versiones: {str(e)}",
+                    errors=errors, deleted=deleted, bucket=config.BUCKET_NAME
+                )
+            found = {obj["Key"] for obj in listed}
+            refs.extend(listed)
+            unversioned = [key for key in unversioned if key not in found]
+        refs.extend({"Key": key} for key in dict.fromkeys(unversioned))
+
+        return self._delete_objects(refs)
+
+    def key_from_url(self, url: str) -> str:
+        """
+        Key a partir de una URL presigned (virtual-hosted o path style).
+        """
+        parts = urlparse(url)
+        if not parts.scheme or not parts.netloc:
+            return url
+        path = unquote(parts.path.lstrip("/"))
+        bucket_prefix = config.BUCKET_NAME + "/"
+        if not parts.netloc.startswith(config.BUCKET_NAME + ".") and path.startswith(bucket_prefix):
+            path = path[len(bucket_prefix):]
+        return path
+
+    def _delete_objects(self, objects: List[dict]) -> int:
+        deleted = 0
+        errors: List[dict] = []
+        for start in range(0, len(objects), DELETE_BATCH_SIZE):
+            batch = objects[start:start + DELETE_BATCH_SIZE]
+            try:
+                response = self.s3.delete_objects(
+                    Bucket=config.BUCKET_NAME,
+                    Delete={"Objects": batch, "Quiet": True}
+                )
+            except Exception as e:
+                # Falló la llamada entera (ej: AccessDenied): los lotes
+                # siguientes fallarían igual
+                code = _error_code(e)
+                errors.extend(
+                    {**obj, "Code": code, "Message": str(e)}
+                    for obj in objects[start:]
+                )
+                break
+            batch_errors = response.get("Errors", [])
+            errors.extend(batch_errors)
+            deleted += len(batch) - len(batch_errors)
+
+        if errors:
+            first = errors[0]
+            raise DeleteError(
+                f"Error al eliminar archivo: {first.get('Code')} {first.get('Message', '')}".strip(),
+                errors=errors,
+                deleted=deleted,
+                bucket=config.BUCKET_NAME
+            )
+        return deleted
+
+    def _object_versions(self, keys: List[str]) -> List[dict]:
+        """
+        Versiones y delete markers de cada key.
+
+        Las keys de un mismo directorio se listan juntas, por su prefijo
+        común, en lugar de un ListObjectVersions por key. Ese listado se
+        corta después de tantas páginas como keys tiene el grupo (lo que
+        costaría listarlas de a una): las keys que no llegó a cubrir se
+        listan por separado.
+        """
+        objects: List[dict] = []
+        for prefix, group in _shared_prefixes(sorted(set(keys))):
+            if len(group) == 1:
+                self._list_versions(prefix, group, objects)
+                continue
+            pending = self._list_versions(prefix, group, objects, max_pages=len(group))
+            for key in pending:
+                self._list_versions(key, [key], objects)
+        return objects
+
+    def _list_versions(
+        self,
+        prefix: str,
+        keys: List[str],
+        objects: List[dict],
+        max_pages: Optional[int] = None
+    ) -> List[str]:
+        """
+        Agrega a objects las versiones de keys listadas bajo prefix.
+
+        ListObjectVersions filtra por prefijo: se descartan las keys que
+        solo comparten el prefijo.
+
+        Returns:
+            Keys sin listar completas porque se alcanzó max_pages
+        """
+        wanted = set(keys)
+        start = len(objects)
+        paginator = self.s3.get_paginator("list_object_versions")
+        try:
+            for number, page in enumerate(
+                paginator.paginate(Bucket=config.BUCKET_NAME, Prefix=prefix), start=1
+            ):
+                entries = page.get("Versions", []) + page.get("DeleteMarkers", [])
+                objects.extend(
+                    {"Key": entry["Key"], "VersionId": entry["VersionId"]}
+                    for entry in entries if entry["Key"] in wanted
+                )
+                if max_pages is not None and number >= max_pages and page.get("IsTruncated"):
+                    # El listado va en orden de key: las anteriores al
+                    # marcador de la página siguiente están completas
+                    last = page.get("NextKeyMarker", "")
+                    pending = [key for key in keys if key >= last]
+                    objects[start:] = [obj for obj in objects[start:] if obj["Key"] < last]
+                    return pending
+        except Exception as e:
+            raise StorageError(
+                f"Error al listar versiones: {str(e)}",
+                bucket=config.BUCKET_NAME,
+                key=prefix
+            ) from e
+        return []
+
+
+class FilesystemBackend:
+    """
+    Árbol de directorios local (desarrollo y modo mock).
+
+    La key es la ruta relativa, así el árbol replica el layout del
+    bucket; las keys sin directorio van a un shard por hash para que
+    ningún directorio crezca sin límite. Los archivos más viejos que
+    ttl se borran de forma oportunista al guardar (como mucho una
+    pasada cada ttl/4).
+
+    Attributes:
+        root: Directorio raíz
+        ttl: Segundos que se conserva cada archivo (0 = sin limpieza)
+    """
+
+    def __init__(self, root: Path, ttl: Optional[int] = None, shard_chars: int = 2):
+        """
+        Args:
+            root: Directorio raíz (se crea si no existe)
+            ttl: Segundos de vida (default: STORAGE_FS_TTL_SECONDS)
+            shard_chars: Caracteres hex del shard para keys sin directorio
+        """
+        self.root = Path(root)
+        self.root.mkdir(exist_ok=True, parents=True)
+        self.ttl = config.STORAGE_FS_TTL_SECONDS if ttl is None else ttl
+        self._shard_chars = shard_chars
+        self._next_cleanup = 0.0
+        self._lock = threading.Lock()
+
+    def put(self, key: str, content: bytes, content_type: str) -> Optional[str]:
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True, parents=True)
+        with open(path, "wb") as f:
+            f.write(content)
+        self._maybe_cleanup()
+        return None
+
+    def put_stream(self, key: str, stream: BinaryIO, content_type: str) -> Optional[str]:
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True, parents=True)
+        # Archivo temporal + rename: nunca queda un archivo a medio escribir
+        fd, temp = tempfile.mkstemp(dir=path.parent, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                shutil.copyfileobj(stream, f)
+            os.replace(temp, path)
+        except BaseException:
+            os.unlink(temp)
+            raise
+        self._maybe_cleanup()
+        return None
+
+    def presign(self, key: str, expires_in: int) -> str:
+        return f"file://{self._path(key).absolute()}"
+
+    def presign_many(self, keys: List[str], expires_in: int) -> List[str]:
+        return [self.presign(key, expires_in) for key in keys]
+
+    def presign_put(self, key: str, expires_in: int, content_type: str) -> str:
+        # En local el cliente escribe el archivo en esta ruta
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True, parents=True)
+        return f"file://{path.absolute()}"
+
+    def open(self, key: str) -> Tuple[BinaryIO, int, Optional[str]]:
+        try:
+            stream = open(self._path(key), "rb")
+        except FileNotFoundError:
+            raise ObjectNotFoundError(f"No existe el archivo: {key}", key=key)
+        return stream, os.fstat(stream.fileno()).st_size, None
+
+    def create_multipart(self, key: str, content_type: str) -> str:
+        self._path(key).parent.mkdir(exist_ok=True, parents=True)
+        return uuid.uuid4().hex
+
+    def upload_part(self, key: str, upload_id: str, number: int, data: bytes) -> str:
+        # Cada parte en su archivo oculto junto al destino; la TTL limpia
+        # las de subidas abandonadas
+        with open(self._part_path(key, upload_id, number), "wb") as f:
+            f.write(data)
+        return str(number)
+
+    def complete_multipart(self, key: str, upload_id: str, etags: List[str]) -> Optional[str]:
+        path = self._path(key)
+        parts = [self._part_path(key, upload_id, number) for number in range(1, len(etags) + 1)]
+        fd, temp = tempfile.mkstemp(dir=path.parent, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for part in parts:
+                    with open(part, "rb") as source:
+                        shutil.copyfileobj(source, f)
+            os.replace(temp, path)
+        except BaseException:
+            os.unlink(temp)
+            raise
+        self.abort_multipart(key, upload_id)
+        self._maybe_cleanup()
+        return None
+
+    def abort_multipart(self, key: str, upload_id: str) -> None:
+        prefix = f".part-{upload_id}-"
+        for part in self._path(key).parent.glob(prefix + "*"):
+            part.unlink()
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).is_file()
+
+    def delete(self, objects: Iterable[ObjectRef], all_versions: bool = False) -> int:
+        deleted = 0
+        for key, _ in _split(objects):
+            try:
+                self._path(key).unlink()
+                deleted += 1
+            except FileNotFoundError:
+                pass
+        return deleted
+
+    def key_from_url(self, url: str) -> str:
+        """Key relativa a root de una URL file:// (o la key misma)."""
+        if not url.startswith("file://"):
+            return url
+        path = Path(url[len("file://"):])
+        try:
+            return path.relative_to(self.root.absolute()).as_posix()
+        except ValueError:
+            raise StorageError(f"Archivo fuera del almacenamiento: {url}")
+
+    def cleanup(self, now: Optional[float] = None) -> int:
+        """
+        Borra los archivos más viejos que ttl y los directorios vacíos.
+
+        Returns:
+            int: Cantidad de archivos borrados
+        """
+        if not self.ttl:
+            return 0
+        limit = (now or time.time()) - self.ttl
+        removed = 0
+        for directory, subdirs, files in os.walk(self.root, topdown=False):
+            for name in files:
+                path = os.path.join(directory, name)
+                try:
+                    if os.stat(path).st_mtime < limit:
+                        os.unlink(path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+            if directory != str(self.root):
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    pass
+        return removed
+
+    def _maybe_cleanup(self) -> None:
+        if not self.ttl:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_cleanup:
+                return
+            self._next_cleanup = now + self.ttl / 4
+        self.cleanup()
+
+    def _path(self, key: str) -> Path:
+        if ".." in key.split("/") or key.startswith("/"):
+            raise StorageError(f"Key inválida: {key}", key=key)
+        if "/" not in key:
+            shard = hashlib.sha1(key.encode("utf-8")).hexdigest()[:self._shard_chars]
+            return self.root / shard / key
+        return self.root / key
+
+    def _part_path(self, key: str, upload_id: str, number: int) -> Path:
+        return self._path(key).parent / f".part-{upload_id}-{number:05d}"
+
+
+class MemoryBackend:
+    """
+    Objetos en un diccionario del proceso.
+
+    Sin disco ni red: sirve para correr el handler completo con mucha
+    concurrencia en benchmarks y pruebas de carga.
+    """
+
+    def __init__(self):
+        self._objects: Dict[str, Tuple[bytes, str]] = {}
+        self._uploads: Dict[str, Tuple[str, Dict[int, bytes]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._objects)
+
+    def put(self, key: str, content: bytes, content_type: str) -> Optional[str]:
+        with self._lock:
+            self._objects[key] = (bytes(content), content_type)
+        return None
+
+    def put_stream(self, key: str, stream: BinaryIO, content_type: str) -> Optional[str]:
+        return self.put(key, stream.read(), content_type)
+
+    def presign(self, key: str, expires_in: int) -> str:
+        return f"memory://{config.BUCKET_NAME}/{quote(key)}"
+
+    def presign_many(self, keys: List[str], expires_in: int) -> List[str]:
+        return [self.presign(key, expires_in) for key in keys]
+
+    def presign_put(self, key: str, expires_in: int, content_type: str) -> str:
+        return self.presign(key, expires_in)
+
+    def open(self, key: str) -> Tuple[BinaryIO, int, Optional[str]]:
+        try:
+            content, _ = self._objects[key]
+        except KeyError:
+            raise ObjectNotFoundError(f"No existe el archivo: {key}", key=key)
+        return BytesIO(content), len(content), None
+
+    def create_multipart(self, key: str, content_type: str) -> str:
+        upload_id = uuid.uuid4().hex
+        with self._lock:
+            self._uploads[upload_id] = (content_type, {})
+        return upload_id
+
+    def upload_part(self, key: str, upload_id: str, number: int, data: bytes) -> str:
+        with self._lock:
+            self._uploads[upload_id][1][number] = bytes(data)
+        return str(number)
+
+    def complete_multipart(self, key: str, upload_id: str, etags: List[str]) -> Optional[str]:
+        with self._lock:
+            content_type, parts = self._uploads.pop(upload_id)
+        content = b"".join(parts[number] for number in range(1, len(etags) + 1))
+        return self.put(key, content, content_type)
+
+    def abort_multipart(self, key: str, upload_id: str) -> None:
+        with self._lock:
+            self._uploads.pop(upload_id, None)
+
+    def exists(self, key: str) -> bool:
+        return key in self._objects
+
+    def delete(self, objects: Iterable[ObjectRef], all_versions: bool = False) -> int:
+        deleted = 0
+        with self._lock:
+            for key, _ in _split(objects):
+                deleted += self._objects.pop(key, None) is not None
+        return deleted
+
+    def get(self, key: str) -> Tuple[bytes, str]:
+        """Contenido y Content-Type de un objeto (KeyError si no existe)."""
+        return self._objects[key]
+
+    def key_from_url(self, url: str) -> str:
+        prefix = f"memory://{config.BUCKET_NAME}/"
+        return unquote(url[len(prefix):]) if url.startswith(prefix) else url
+
+
+BACKENDS = {
+    "s3": S3Backend,
+    "filesystem": lambda: FilesystemBackend(config.STORAGE_FS_ROOT),
+    "memory": MemoryBackend,
+}
+
+
+def create(name: Optional[str] = None) -> StorageBackend:
+    """
+    Crea el backend configurado.
+
+    Args:
+        name: "s3", "filesystem" o "memory" (default: STORAGE_BACKEND)
+
+    Raises:
+        ValueError: Si el backend no existe
+    """
+    name = (name or config.STORAGE_BACKEND).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Backend de almacenamiento no soportado: {name}")
+    return BACKENDS[name]()
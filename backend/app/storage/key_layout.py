@@ -0,0 +1,77 @@
+"""
+Layout de las keys de los archivos subidos.
+
+S3 escala la tasa de requests por prefijo: con todas las keys en la raíz
+del bucket, las escrituras sostenidas terminan en 503 SlowDown. El layout
+se arma con segmentos configurables (S3_KEY_LAYOUT, en orden):
+
+    hash    Shard por los primeros caracteres hex del uuid (ej: "a7/")
+    date    Partición por fecha UTC (ej: "2024/05/31/"), útil para
+            lifecycle y análisis por prefijo
+    tenant  Prefijo por cliente (ej: "acme/")
+
+Sin segmentos las keys quedan como antes: "{uuid}.{ext}". El modo mock
+usa la misma key como ruta relativa dentro de su directorio.
+"""
+
+import re
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.config import config
+
+
+LAYOUT_SEGMENTS = ("hash", "date", "tenant")
+
+_TENANT_UNSAFE = re.compile(r"[^A-Za-z0-9_-]+")
+MAX_TENANT_LENGTH = 64
+
+
+def build_key(
+    file_extension: str,
+    tenant: Optional[str] = None,
+    now: Optional[datetime] = None,
+    file_id: Optional[str] = None
+) -> str:
+    """
+    Genera la key de un archivo nuevo según S3_KEY_LAYOUT.
+
+    Args:
+        file_extension: Extensión sin punto (ej: "docx")
+        tenant: Identificador del cliente (solo con el segmento tenant)
+        now: Fecha de la partición (default: ahora, UTC)
+        file_id: Identificador del archivo (default: uuid4 nuevo)
+
+    Returns:
+        str: Key, ej: "a7/2024/05/31/a7c1...e2.docx"
+
+    Raises:
+        ValueError: Si S3_KEY_LAYOUT tiene un segmento desconocido
+    """
+    file_id = file_id or str(uuid.uuid4())
+    prefix = []
+    for segment in config.S3_KEY_LAYOUT:
+        if segment == "hash":
+            prefix.append(file_id.replace("-", "")[:config.S3_KEY_SHARD_CHARS])
+        elif segment == "date":
+            prefix.append((now or datetime.now(timezone.utc)).strftime("%Y/%m/%d"))
+        elif segment == "tenant":
+            prefix.append(tenant_prefix(tenant))
+        else:
+            raise ValueError(f"Segmento de S3_KEY_LAYOUT desconocido: {segment}")
+    return "/".join(prefix + [f"{file_id}.{file_extension}"])
+
+
+def tenant_prefix(tenant: Optional[str]) -> str:
+    """
+    Prefijo seguro para un tenant (sin "/", "..", ni caracteres raros).
+
+    Args:
+        tenant: Identificador recibido (header o configuración)
+
+    Returns:
+        str: Prefijo, o S3_DEFAULT_TENANT si no queda nada utilizable
+    """
+    cleaned = _TENANT_UNSAFE.sub("-", tenant or "").strip("-")[:MAX_TENANT_LENGTH]
+    return cleaned or config.S3_DEFAULT_TENANT
@@ -0,0 +1,239 @@
+"""
+Subida en paralelo con la conversión (modo pipeline).
+
+Sin pipeline el DOCX se arma entero y recién después se sube: la latencia
+es build + upload. PipelinedUpload es un archivo binario de solo escritura
+que el writer en streaming (docx_stream) usa como salida del zip: cada vez
+que junta UPLOAD_PART_SIZE_MB la parte pasa por una cola acotada a threads
+que la suben con multipart mientras el build sigue usando la CPU. Con
+documentos grandes la latencia se acerca a max(build, upload).
+
+La cola acotada es la contrapresión: si la red va más lenta que el build,
+write() espera y en memoria quedan como mucho
+(UPLOAD_QUEUE_PARTS + UPLOAD_WORKERS + 1) partes. Un documento que no
+llega a una parte se sube con un solo put, sin multipart.
+"""
+
+import logging
+import queue
+import threading
+from typing import Dict, List, Optional
+
+from app.config import config
+from app.converter.exceptions import StorageError
+
+
+# S3 rechaza partes menores a 5 MB (salvo la última)
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+_DONE = None
+
+logger = logging.getLogger(__name__)
+
+
+class PipelinedUpload:
+    """
+    Archivo de escritura que sube su contenido por partes.
+
+    No es seekable: zipfile lo detecta y escribe las entradas con data
+    descriptor. Usar como context manager: si el bloque termina con
+    excepción la subida se aborta y la excepción sigue su curso; si no,
+    close() completa la subida.
+
+    Attributes:
+        key: Key del objeto
+        version_id: Versión del objeto al completar (si el backend tiene)
+    """
+
+    def __init__(
+        self,
+        backend,
+        key: str,
+        content_type: str,
+        part_size: Optional[int] = None,
+        workers: Optional[int] = None,
+        queue_parts: Optional[int] = None
+    ):
+        """
+        Args:
+            backend: Backend con subida por partes (ver backends.py)
+            key: Key del objeto
+            content_type: MIME type del objeto
+            part_size: Bytes por parte (default: UPLOAD_PART_SIZE_MB)
+            workers: Threads de subida (default: UPLOAD_WORKERS)
+            queue_parts: Partes en espera como máximo (default: UPLOAD_QUEUE_PARTS)
+        """
+        self.backend = backend
+        self.key = key
+        self.content_type = content_type
+        self.part_size = part_size or config.UPLOAD_PART_SIZE_MB * 1024 * 1024
+        self.version_id: Optional[str] = None
+        self._workers = max(1, workers or config.UPLOAD_WORKERS)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, queue_parts or config.UPLOAD_QUEUE_PARTS))
+        self._threads: List[threading.Thread] = []
+        self._buffer = bytearray()
+        self._position = 0
+        self._parts = 0
+        self._etags: Dict[int, str] = {}
+        self._upload_id: Optional[str] = None
+        self._error: Optional[BaseException] = None
+        self._closed = False
+
+    def __enter__(self) -> "PipelinedUpload":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return False
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def write(self, data) -> int:
+        """
+        Agrega datos; cada parte completa se encola para subir.
+
+        Raises:
+            StorageError: Si falló la subida de una parte anterior
+        """
+        if self._closed:
+            raise ValueError("Escritura en una subida cerrada")
+        self._check()
+        self._buffer += data
+        self._position += len(data)
+        while len(self._buffer) >= self.part_size:
+            part = bytes(self._buffer[:self.part_size])
+            del self._buffer[:self.part_size]
+            self._enqueue(part)
+        return len(data)
+
+    def close(self) -> None:
+        """
+        Sube lo que queda y completa la subida.
+
+        Raises:
+            StorageError: Si falló alguna parte (la subida se aborta)
+        """
+        if self._closed:
+            return
+        if self._upload_id is None:
+            # No se llegó a una parte: un put alcanza
+            self._closed = True
+            try:
+                self.version_id = self.backend.put(self.key, bytes(self._buffer), self.content_type)
+            except Exception as e:
+                raise StorageError(
+                    f"Error al subir archivo: {str(e)}", bucket=config.BUCKET_NAME, key=self.key
+                )
+            return
+
+        if self._buffer:
+            self._enqueue(bytes(self._buffer))
+            self._buffer.clear()
+        self._closed = True
+        self._stop()
+        if self._error is not None:
+            self._abort_upload()
+            self._check()
+        try:
+            self.version_id = self.backend.complete_multipart(
+                self.key, self._upload_id, [self._etags[n] for n in range(1, self._parts + 1)]
+            )
+        except Exception as e:
+            self._abort_upload()
+            raise StorageError(
+                f"Error al completar subida: {str(e)}", bucket=config.BUCKET_NAME, key=self.key
+            )
+
+    def abort(self) -> None:
+        """Descarta la subida (las partes ya subidas se borran)."""
+        if self._closed:
+            return
+        self._closed = True
+        self._buffer.clear()
+        if self._upload_id is not None:
+            self._stop(drain=True)
+            self._abort_upload()
+
+    def _enqueue(self, part: bytes) -> None:
+        if self._upload_id is None:
+            self._start()
+        self._parts += 1
+        # Bloquea si la cola está llena (contrapresión sobre el build)
+        while True:
+            try:
+                self._queue.put((self._parts, part), timeout=0.1)
+                return
+            except queue.Full:
+                self._check()
+
+    def _start(self) -> None:
+        try:
+            self._upload_id = self.backend.create_multipart(self.key, self.content_type)
+        except Exception as e:
+            raise StorageError(
+                f"Error al iniciar subida: {str(e)}", bucket=config.BUCKET_NAME, key=self.key
+            )
+        for index in range(self._workers):
+            thread = threading.Thread(
+                target=self._run, name=f"upload-part-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _DONE:
+                return
+            if self._error is not None:
+                continue
+            number, data = item
+            try:
+                self._etags[number] = self.backend.upload_part(
+                    self.key, self._upload_id, number, data
+                )
+            except BaseException as e:
+                self._error = e
+
+    def _stop(self, drain: bool = False) -> None:
+        if drain:
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    break
+        for _ in self._threads:
+            self._queue.put(_DONE)
+        for thread in self._threads:
+            thread.join()
+
+    def _abort_upload(self) -> None:
+        try:
+            self.backend.abort_multipart(self.key, self._upload_id)
+        except Exception as e:
+            # No se relanza: taparía el error que causó el abort. Las partes
+            # quedan hasta la regla abort-incomplete-multipart del bucket
+            logger.warning(
+                f"No se pudo abortar la subida por partes {self._upload_id} "
+                f"de {self.key}: {str(e)}"
+            )
+
+    def _check(self) -> None:
+        if self._error is not None:
+            raise StorageError(
+                f"Error al subir parte: {str(self._error)}",
+                bucket=config.BUCKET_NAME,
+                key=self.key
+            )
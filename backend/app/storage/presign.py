@@ -0,0 +1,212 @@
+"""
+Firma de URLs de descarga en lote y cache de URLs.
+
+generate_presigned_url de boto3 resuelve el endpoint (reglas de
+endpoints de botocore), arma un request y lo firma en cada llamada; en
+respuestas con varios formatos o lotes de archivos ese costo se paga por
+URL. Acá:
+
+    QuerySigner     Firma SigV4 por query string compartida: la clave de
+                    firma se deriva una vez por día y la URL base del
+                    bucket se resuelve una sola vez
+    PresignService  Firma muchas keys en una llamada (presign_many del
+                    backend) y cachea cada URL hasta poco antes de que
+                    venza, así el mismo objeto reutiliza su URL
+"""
+
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote
+
+from app.config import config
+
+
+ALGORITHM = "AWS4-HMAC-SHA256"
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+
+
+class QuerySigner:
+    """
+    Firma SigV4 de URLs GET por query string (presigned) para S3.
+
+    Es lo mismo que S3SigV4QueryAuth de botocore, sin armar un
+    AWSRequest por URL y con la clave de firma cacheada por fecha.
+
+    Attributes:
+        region: Región de la firma
+        service: Servicio de la firma (s3)
+    """
+
+    def __init__(
+        self,
+        access_key: str,
+        secret_key: str,
+        region: str,
+        token: Optional[str] = None,
+        service: str = "s3"
+    ):
+        self.region = region
+        self.service = service
+        self._access_key = access_key
+        self._secret_key = secret_key
+        self._token = token
+        self._signing_key: Tuple[str, bytes] = ("", b"")
+
+    def sign(self, host: str, path: str, expires_in: int, now: Optional[datetime] = None) -> str:
+        """
+        Query string firmada para GET host/path.
+
+        Args:
+            host: Host del endpoint (ej: "bucket.s3.amazonaws.com")
+            path: Ruta ya codificada, con "/" inicial
+            expires_in: Validez en segundos
+            now: Momento de la firma (default: ahora, UTC)
+
+        Returns:
+            str: Query string con X-Amz-Signature al final
+        """
+        now = now or datetime.now(timezone.utc)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        date = amz_date[:8]
+        scope = f"{date}/{self.region}/{self.service}/aws4_request"
+
+        params = [
+            ("X-Amz-Algorithm", ALGORITHM),
+            ("X-Amz-Credential", f"{self._access_key}/{scope}"),
+            ("X-Amz-Date", amz_date),
+            ("X-Amz-Expires", str(expires_in)),
+            ("X-Amz-SignedHeaders", "host"),
+        ]
+        if self._token:
+            params.append(("X-Amz-Security-Token", self._token))
+        query = "&".join(
+            f"{quote(name, safe='-_.~')}={quote(value, safe='-_.~')}"
+            for name, value in sorted(params)
+        )
+
+        canonical_request = "\n".join((
+            "GET", path, query, f"host:{host}", "", "host", UNSIGNED_PAYLOAD
+        ))
+        string_to_sign = "\n".join((
+            ALGORITHM,
+            amz_date,
+            scope,
+            hashlib.sha256(canonical_request.encode("utf-8")).hexdigest()
+        ))
+        signature = hmac.new(
+            self._key(date), string_to_sign.encode("utf-8"), hashlib.sha256
+        ).hexdigest()
+        return f"{query}&X-Amz-Signature={signature}"
+
+    def _key(self, date: str) -> bytes:
+        cached_date, key = self._signing_key
+        if cached_date != date:
+            key = ("AWS4" + self._secret_key).encode("utf-8")
+            for part in (date, self.region, self.service, "aws4_request"):
+                key = hmac.new(key, part.encode("utf-8"), hashlib.sha256).digest()
+            self._signing_key = (date, key)
+        return key
+
+
+class PresignService:
+    """
+    URLs de descarga en lote con cache por key.
+
+    Una URL cacheada se reutiliza si le queda al menos expires_in menos
+    PRESIGN_CACHE_MARGIN_SECONDS de validez (y nunca menos que ese
+    margen): la URL devuelta vence como mucho margen segundos antes de
+    lo pedido. Si el backend renovó sus credenciales (signer_generation)
+    el cache se descarta entero: las URLs firmadas con la sesión anterior
+    dejan de valer cuando esa sesión vence.
+
+    Attributes:
+        backend: Backend de almacenamiento (ver backends.py)
+    """
+
+    def __init__(self, backend, cache_size: Optional[int] = None, margin: Optional[int] = None):
+        """
+        Args:
+            backend: Backend con presign (y opcionalmente presign_many)
+            cache_size: URLs cacheadas (default: PRESIGN_CACHE_SIZE, 0 = sin cache)
+            margin: Segundos mínimos de validez para reutilizar una URL
+                (default: PRESIGN_CACHE_MARGIN_SECONDS)
+        """
+        self.backend = backend
+        self._cache_size = config.PRESIGN_CACHE_SIZE if cache_size is None else cache_size
+        self._margin = config.PRESIGN_CACHE_MARGIN_SECONDS if margin is None else margin
+        self._cache: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._generation: Optional[int] = None
+
+    def url(self, key: str, expires_in: Optional[int] = None) -> str:
+        """URL de descarga de una key (ver urls)."""
+        return self.urls([key], expires_in)[key]
+
+    def urls(self, keys: Iterable[str], expires_in: Optional[int] = None) -> Dict[str, str]:
+        """
+        URLs de descarga de varias keys, firmando solo las que no están
+        en cache.
+
+        Args:
+            keys: Keys de los objetos
+            expires_in: Validez en segundos (default: URL_EXPIRY)
+
+        Returns:
+            Dict key -> URL, en el orden de keys
+        """
+        if expires_in is None:
+            expires_in = config.PRESIGNED_URL_EXPIRY
+        now = time.time()
+        min_remaining = max(expires_in - self._margin, self._margin)
+        signer_generation = getattr(self.backend, "signer_generation", None)
+        generation = signer_generation() if signer_generation is not None else None
+        result: Dict[str, Optional[str]] = {}
+        missing: List[str] = []
+        with self._lock:
+            if generation != self._generation:
+                self._cache.clear()
+                self._generation = generation
+            for key in keys:
+                cached = self._cache.get(key)
+                if cached is not None and cached[1] - now >= min_remaining:
+                    self._cache.move_to_end(key)
+                    self._hits += 1
+                    result[key] = cached[0]
+                elif key not in result:
+                    self._misses += 1
+                    result[key] = None
+                    missing.append(key)
+
+        if missing:
+            presign_many = getattr(self.backend, "presign_many", None)
+            if presign_many is not None:
+                signed = presign_many(missing, expires_in)
+            else:
+                signed = [self.backend.presign(key, expires_in) for key in missing]
+            with self._lock:
+                for key, url in zip(missing, signed):
+                    result[key] = url
+                    if self._cache_size:
+                        self._cache[key] = (url, now + expires_in)
+                        self._cache.move_to_end(key)
+                while len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+        return result
+
+    def invalidate(self, keys: Iterable[str]) -> None:
+        """Descarta las URLs cacheadas de objetos borrados."""
+        with self._lock:
+            for key in keys:
+                self._cache.pop(key, None)
+
+    def cache_info(self) -> Dict[str, int]:
+        """Aciertos, fallos y tamaño del cache de URLs."""
+        with self._lock:
+            return {"hits": self._hits, "misses": self._misses, "size": len(self._cache)}
@@ -3,15 +3,45 @@ Cliente de S3 con soporte para mock local.
 
 Este módulo maneja la carga de archivos a S3 y generación de URLs,
 también puede funcionar en modo mock para desarrollo local sin AWS.
+El almacenamiento en sí lo resuelve un backend (ver backends.py): S3,
+un árbol de directorios local o memoria, según STORAGE_BACKEND.
+
+El borrado es real: con el bucket versionado se eliminan todas las
+versiones del objeto (un DeleteObject sin versión solo agrega un delete
+marker y el almacenamiento sigue ocupado). Los borrados masivos se
+agrupan en llamadas DeleteObjects de hasta 1000 keys, y con
+S3_DELETE_AFTER_EXPIRY cada archivo subido se borra en segundo plano
+cuando vence su URL (la regla de lifecycle queda como respaldo).
 """
 
-import uuid
-import os
-from typing import Optional
+import codecs
+import heapq
+import logging
+import threading
+import time
+from typing import BinaryIO, Callable, Dict, Iterable, List, Optional, Tuple
 from pathlib import Path
 
 from app.config import config
-from app.converter.exceptions import StorageError
+from app.converter import formats as output_formats
+from app.converter.exceptions import DeleteError, FileTooLargeError, InvalidInputError, StorageError
+from . import backends
+from .backends import FilesystemBackend, StorageBackend
+from .key_layout import build_key
+from .pipeline import PipelinedUpload
+from .presign import PresignService
+
+
+# Archivos de entrada (ver create_upload / read_input)
+INPUT_CONTENT_TYPE = "text/markdown; charset=utf-8"
+READ_CHUNK_BYTES = 256 * 1024
+
+# Errores de borrado que no se arreglan reintentando
+PERMANENT_DELETE_ERRORS = frozenset((
+    "AccessDenied", "AllAccessDisabled", "InvalidBucketName", "NoSuchBucket"
+))
+
+logger = logging.getLogger(__name__)
 
 
 class S3Client:
@@ -21,42 +51,57 @@ class S3Client:
     Attributes:
         use_mock: Si es True se simula S3 en lo que es guardar archivos localmente
         mock_dir: Directorio para archivos cuando use_mock=True
+        backend: Backend de almacenamiento (ver backends.py)
+        s3: Cliente boto3, o None si el backend no es S3
+        presigner: URLs de descarga en lote con cache (ver presign.py)
     """
     
-    def __init__(self, use_mock: bool = None):
+    def __init__(self, use_mock: bool = None, backend: Optional[StorageBackend] = None):
         """
         Inicializa el cliente S3.
         
         Args:
-            use_mock: Fuerza modo mock. Si es None se detecta automáticamente.
+            use_mock: Fuerza modo mock (backend filesystem en mock_dir). Si
+                es None se detecta automáticamente.
+            backend: Backend a usar; tiene prioridad sobre use_mock
         """
         if use_mock is None:
             self.use_mock = config.ENVIRONMENT == "development"
         else:
             self.use_mock = use_mock
         
-        self.mock_dir = Path("/tmp/s3-mock")
+        self.mock_dir = Path(config.STORAGE_FS_ROOT)
         
-        if self.use_mock:
-            self.mock_dir.mkdir(exist_ok=True, parents=True)
-            self.s3 = None  
+        if backend is not None:
+            self.use_mock = not isinstance(backend, backends.S3Backend)
+        elif self.use_mock:
+            backend = FilesystemBackend(self.mock_dir)
         else:
-            import boto3
-            self.s3 = boto3.client("s3", region_name=config.AWS_REGION)
+            backend = backends.S3Backend()
+        self.backend = backend
+        self.s3 = getattr(backend, "s3", None)
+        
+        self.presigner = PresignService(backend)
+        self.deferred = DeferredDeletes(self)
     
     def upload_and_get_url(
         self,
         content: bytes,
         file_extension: str,
-        expires_in: Optional[int] = None
+        expires_in: Optional[int] = None,
+        tenant: Optional[str] = None
     ) -> str:
         """
         Sube archivo a S3 y retorna URL presigned.
         
+        La key sigue S3_KEY_LAYOUT (ver key_layout.py); en modo mock la
+        misma key es la ruta dentro de mock_dir.
+        
         Args:
             content: Contenido del archivo en bytes
             file_extension: Extensión sin punto (ej: "docx", "html")
             expires_in: Tiempo de expiración en segundos (opcional)
+            tenant: Cliente, para el segmento tenant del layout (opcional)
         
         Returns:
             str: URL presigned para descargar el archivo
@@ -64,16 +109,85 @@ class S3Client:
         Raises:
             StorageError: Si hay error al subir o generar URL
         """
-        if expires_in is None:
-            expires_in = config.PRESIGNED_URL_EXPIRY
+        return self._upload(
+            lambda key, content_type: self.backend.put(key, content, content_type),
+            file_extension, expires_in, tenant
+        )
+    
+    def upload_stream_and_get_url(
+        self,
+        stream: BinaryIO,
+        file_extension: str,
+        expires_in: Optional[int] = None,
+        tenant: Optional[str] = None
+    ) -> str:
+        """
+        Igual que upload_and_get_url, leyendo el contenido de un archivo
+        binario sin cargarlo entero en memoria.
+        
+        Args:
+            stream: Archivo binario abierto (se lee hasta el final)
+            file_extension: Extensión sin punto
+            expires_in: Tiempo de expiración en segundos (opcional)
+            tenant: Cliente, para el segmento tenant del layout (opcional)
+        
+        Returns:
+            str: URL presigned para descargar el archivo
+        
+        Raises:
+            StorageError: Si hay error al subir o generar URL
+        """
+        return self._upload(
+            lambda key, content_type: self.backend.put_stream(key, stream, content_type),
+            file_extension, expires_in, tenant
+        )
+    
+    def upload_pipelined(
+        self,
+        write: Callable[[BinaryIO], object],
+        file_extension: str,
+        expires_in: Optional[int] = None,
+        tenant: Optional[str] = None
+    ) -> Tuple[str, int]:
+        """
+        Sube el archivo mientras se genera (ver pipeline.py).
         
-        file_key = f"{uuid.uuid4()}.{file_extension}"
+        write recibe un archivo de solo escritura, no seekable; cada parte
+        completa se sube en segundo plano mientras write sigue escribiendo.
+        
+        Args:
+            write: Función que escribe el archivo en la salida que recibe
+            file_extension: Extensión sin punto
+            expires_in: Tiempo de expiración en segundos (opcional)
+            tenant: Cliente, para el segmento tenant del layout (opcional)
+        
+        Returns:
+            Tupla (URL presigned, tamaño en bytes)
+        
+        Raises:
+            StorageError: Si hay error al subir o generar URL
+            Exception: Lo que levante write (la subida se aborta)
+        """
+        file_key = build_key(file_extension, tenant=tenant)
+        upload = PipelinedUpload(self.backend, file_key, self._get_content_type(file_key))
+        with upload:
+            write(upload)
         
         try:
-            if self.use_mock:
-                return self._upload_mock(content, file_key)
-            else:
-                return self._upload_s3(content, file_key, expires_in)
+            return self._publish(file_key, upload.version_id, expires_in), upload.tell()
+        except Exception as e:
+            raise StorageError(
+                f"Error al generar URL: {str(e)}",
+                bucket=config.BUCKET_NAME,
+                key=file_key
+            )
+    
+    def _upload(self, put, file_extension: str, expires_in: Optional[int], tenant: Optional[str]) -> str:
+        file_key = build_key(file_extension, tenant=tenant)
+        
+        try:
+            version_id = put(file_key, self._get_content_type(file_key))
+            return self._publish(file_key, version_id, expires_in)
                 
         except Exception as e:
             raise StorageError(
@@ -82,53 +196,156 @@ class S3Client:
                 key=file_key
             )
     
-    def _upload_mock(self, content: bytes, file_key: str) -> str:
+    def _publish(self, file_key: str, version_id: Optional[str], expires_in: Optional[int]) -> str:
+        """URL de descarga de un archivo recién subido (y su borrado diferido)."""
+        if expires_in is None:
+            expires_in = config.PRESIGNED_URL_EXPIRY
+        
+        url = self.presigner.url(file_key, expires_in)
+        if config.S3_DELETE_AFTER_EXPIRY:
+            self.deferred.schedule(
+                file_key,
+                version_id,
+                delay=expires_in + config.S3_DELETE_GRACE_SECONDS
+            )
+        return url
+    
+    def get_urls(self, file_urls: Iterable[str], expires_in: Optional[int] = None) -> Dict[str, str]:
         """
-        Guarda archivo localmente (modo mock).
+        URLs de descarga de varios archivos ya subidos, firmadas en lote.
+        
+        Un archivo pedido de nuevo reutiliza su URL mientras le quede
+        validez (ver PresignService).
         
         Args:
-            content: Contenido en bytes
-            file_key: Nombre del archivo
+            file_urls: URLs o keys de los archivos
+            expires_in: Tiempo de expiración en segundos (opcional)
         
         Returns:
-            str: URL simulada (file://)
+            Dict URL o key recibida -> URL de descarga
+        
+        Raises:
+            StorageError: Si no se pudo firmar alguna URL
         """
-        file_path = self.mock_dir / file_key
+        keys = {file_url: self._key_from_url(file_url) for file_url in file_urls}
+        try:
+            urls = self.presigner.urls(keys.values(), expires_in)
+        except Exception as e:
+            raise StorageError(f"Error al generar URLs: {str(e)}", bucket=config.BUCKET_NAME)
+        return {file_url: urls[key] for file_url, key in keys.items()}
+    
+    def create_upload(
+        self,
+        file_extension: str = "md",
+        expires_in: Optional[int] = None,
+        tenant: Optional[str] = None
+    ) -> Dict[str, object]:
+        """
+        Reserva una key de entrada y firma una URL para subirla con PUT.
+        
+        El cliente sube el Markdown crudo (sin escapar en JSON, sin el
+        límite de payload de API Gateway/Lambda) y después pide la
+        conversión con input_key.
+        
+        Args:
+            file_extension: Extensión del archivo de entrada
+            expires_in: Validez de la URL en segundos (default: URL_EXPIRY)
+            tenant: Cliente, para el segmento tenant del layout (opcional)
         
-        with open(file_path, "wb") as f:
-            f.write(content)
+        Returns:
+            Dict con upload_url, input_key, content_type (el PUT debe
+            enviar ese Content-Type, es parte de la firma) y expires_in
         
-        return f"file://{file_path.absolute()}"
+        Raises:
+            StorageError: Si no se pudo firmar la URL
+        """
+        if expires_in is None:
+            expires_in = config.PRESIGNED_URL_EXPIRY
+        
+        input_key = config.S3_INPUT_PREFIX + build_key(file_extension, tenant=tenant)
+        content_type = INPUT_CONTENT_TYPE
+        try:
+            upload_url = self.backend.presign_put(input_key, expires_in, content_type)
+        except Exception as e:
+            raise StorageError(
+                f"Error al generar URL de subida: {str(e)}",
+                bucket=config.BUCKET_NAME,
+                key=input_key
+            )
+        return {
+            "upload_url": upload_url,
+            "input_key": input_key,
+            "content_type": content_type,
+            "expires_in": expires_in
+        }
     
-    def _upload_s3(self, content: bytes, file_key: str, expires_in: int) -> str:
+    def read_input(self, input_key: str, max_bytes: int) -> str:
         """
-        Sube archivo a S3 real.
+        Lee en streaming un archivo de entrada subido con create_upload.
+        
+        El tamaño se valida antes de leer (ContentLength) y mientras se
+        lee, así nunca se cargan más de max_bytes. Con S3_DELETE_INPUT el
+        archivo se borra en segundo plano después de leerlo (la versión
+        leída, sin listar versiones).
         
         Args:
-            content: Contenido en bytes
-            file_key: Key en S3
-            expires_in: Segundos de expiración
+            input_key: Key devuelta por create_upload
+            max_bytes: Tamaño máximo permitido
         
         Returns:
-            str: URL presigned
+            str: Contenido decodificado como UTF-8
+        
+        Raises:
+            ObjectNotFoundError: Si el archivo no existe
+            FileTooLargeError: Si supera max_bytes
+            InvalidInputError: Si la key no es de entrada o no es UTF-8
         """
-        self.s3.put_object(
-            Bucket=config.BUCKET_NAME,
-            Key=file_key,
-            Body=content,
-            ContentType=self._get_content_type(file_key)
-        )
+        if (
+            not isinstance(input_key, str)
+            or not input_key.startswith(config.S3_INPUT_PREFIX)
+            or ".." in input_key.split("/")
+        ):
+            raise InvalidInputError("input_key inválida")
         
-        url = self.s3.generate_presigned_url(
-            "get_object",
-            Params={
-                "Bucket": config.BUCKET_NAME,
-                "Key": file_key
-            },
-            ExpiresIn=expires_in
-        )
+        stream, size, version_id = self.backend.open(input_key)
+        try:
+            if size > max_bytes:
+                raise FileTooLargeError(
+                    "Archivo de entrada demasiado grande",
+                    size=size, limit=max_bytes, key=input_key
+                )
+            decoder = codecs.getincrementaldecoder("utf-8")()
+            parts: List[str] = []
+            read = 0
+            while True:
+                chunk = stream.read(READ_CHUNK_BYTES)
+                if not chunk:
+                    break
+                read += len(chunk)
+                if read > max_bytes:
+                    raise FileTooLargeError(
+                        "Archivo de entrada demasiado grande",
+                        size=read, limit=max_bytes, key=input_key
+                    )
+                parts.append(decoder.decode(chunk))
+            parts.append(decoder.decode(b"", final=True))
+        except UnicodeDecodeError:
+            raise InvalidInputError("El archivo de entrada debe estar en UTF-8")
+        finally:
+            stream.close()
         
-        return url
+        if config.S3_DELETE_INPUT:
+            self.deferred.schedule(input_key, version_id)
+        return "".join(parts)
+    
+    def exists(self, file_url: str) -> bool:
+        """
+        Indica si un archivo existe.
+        
+        Args:
+            file_url: URL del archivo o key
+        """
+        return self.backend.exists(self._key_from_url(file_url))
     
     def _get_content_type(self, filename: str) -> str:
         """
@@ -141,43 +358,222 @@ class S3Client:
             str: MIME type
         """
         extension = filename.split(".")[-1].lower()
-        
-        content_types = {
-            "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            "html": "text/html",
-            "pdf": "application/pdf",
-            "txt": "text/plain"
-        }
-        
-        return content_types.get(extension, "application/octet-stream")
+        return output_formats.content_type(extension)
     
-    def delete_file(self, file_url: str) -> bool:
+    def delete_file(
+        self,
+        file_url: str,
+        version_id: Optional[str] = None,
+        all_versions: Optional[bool] = None
+    ) -> bool:
         """
         Elimina archivo de S3 o mock.
         
         Args:
-            file_url: URL del archivo
+            file_url: URL del archivo (presigned o file://) o key en S3
+            version_id: Versión a eliminar (opcional)
+            all_versions: Eliminar todas las versiones y delete markers
+                (default: S3_DELETE_ALL_VERSIONS; se ignora con version_id)
         
         Returns:
             bool: True si se eliminó exitosamente
+        
+        Raises:
+            StorageError: Si S3 rechaza el borrado
+        """
+        self.delete_files([(file_url, version_id)], all_versions)
+        return True
+    
+    def delete_files(
+        self,
+        file_urls: Iterable,
+        all_versions: Optional[bool] = None
+    ) -> int:
         """
+        Elimina varios archivos con DeleteObjects (hasta 1000 por llamada).
+        
+        Args:
+            file_urls: URLs o keys; también tuplas (key, version_id)
+            all_versions: Eliminar todas las versiones de cada key sin
+                versión explícita (default: S3_DELETE_ALL_VERSIONS)
+        
+        Returns:
+            int: Cantidad de objetos (o versiones) eliminados
+        
+        Raises:
+            DeleteError: Si S3 rechaza alguno de los borrados (errors
+                tiene el detalle por objeto)
+            StorageError: Si falla el backend
+        """
+        if all_versions is None:
+            all_versions = config.S3_DELETE_ALL_VERSIONS
+        objects = [
+            (self._key_from_url(item[0]), item[1]) if isinstance(item, tuple)
+            else self._key_from_url(item)
+            for item in file_urls
+        ]
+        self.presigner.invalidate(item[0] if isinstance(item, tuple) else item for item in objects)
         try:
-            if self.use_mock:
-                if file_url.startswith("file://"):
-                    file_path = Path(file_url.replace("file://", ""))
-                    if file_path.exists():
-                        file_path.unlink()
-                    return True
+            return self.backend.delete(objects, all_versions=all_versions)
+        except StorageError:
+            raise
+        except Exception as e:
+            raise StorageError(f"Error al eliminar archivos: {str(e)}")
+    
+    def _key_from_url(self, file_url: str) -> str:
+        """Key a partir de una URL del backend o de la key misma."""
+        return self.backend.key_from_url(file_url)
+
+
+class DeferredDeletes:
+    """
+    Cola de borrados diferidos que se vacía en segundo plano.
+    
+    Un thread daemon duerme hasta el próximo vencimiento y borra en
+    lotes lo que ya venció. En Lambda el thread queda congelado entre
+    invocaciones y continúa en la siguiente; lo que no llegue a borrarse
+    antes de que se recicle el entorno lo elimina la regla de lifecycle.
+    
+    Si un borrado falla solo se reintentan las keys que fallaron, con
+    backoff exponencial desde S3_DELETE_GRACE_SECONDS y hasta
+    S3_DELETE_MAX_RETRIES intentos. Los errores permanentes (permisos,
+    bucket inexistente) descartan la key: reintentar no los arregla.
+    """
+    
+    def __init__(self, client: "S3Client"):
+        """
+        Args:
+            client: Cliente con el que se ejecutan los borrados
+        """
+        self._client = client
+        self._pending: List[Tuple[float, str, Optional[str], int]] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._pending)
+    
+    def schedule(self, file_url: str, version_id: Optional[str] = None, delay: float = 0) -> None:
+        """
+        Programa el borrado de un archivo.
+        
+        Args:
+            file_url: URL o key del archivo
+            version_id: Versión a eliminar (opcional)
+            delay: Segundos hasta el borrado
+        """
+        self._push([(time.monotonic() + delay, file_url, version_id, 0)])
+    
+    def flush(self, force: bool = False) -> int:
+        """
+        Borra los archivos vencidos (todos con force=True).
+        
+        Returns:
+            int: Cantidad de objetos eliminados
+        
+        Raises:
+            StorageError: Si falló algún borrado (lo reintentable ya
+                quedó reprogramado)
+        """
+        now = time.monotonic()
+        with self._lock:
+            due: Dict[Tuple[str, Optional[str]], int] = {}
+            while self._pending and (force or self._pending[0][0] <= now):
+                _, file_url, version_id, attempts = heapq.heappop(self._pending)
+                due[(file_url, version_id)] = max(attempts, due.get((file_url, version_id), 0))
+        if not due:
+            return 0
+        
+        try:
+            return self._client.delete_files(
+                [(url, version_id) if version_id else url for url, version_id in due]
+            )
+        except DeleteError as e:
+            self._retry(now, due, e.errors)
+            raise
+        except StorageError as e:
+            # Sin detalle por objeto: se reintenta todo el lote
+            self._retry(now, due, None, str(e))
+            raise
+    
+    def _retry(
+        self,
+        now: float,
+        due: Dict[Tuple[str, Optional[str]], int],
+        errors: Optional[List[dict]],
+        message: str = ""
+    ) -> None:
+        """
+        Reprograma con backoff las keys que fallaron.
+        
+        Args:
+            now: Momento del vaciado
+            due: (url, versión) -> intentos previos de cada borrado
+            errors: Errors por objeto de DeleteError; None si falló todo
+            message: Mensaje cuando errors es None
+        """
+        errors = errors or []
+        by_version = {(error.get("Key"), error.get("VersionId")): error for error in errors}
+        by_key = {error.get("Key"): error for error in errors}
+        
+        retry = []
+        for (file_url, version_id), attempts in due.items():
+            key = self._client._key_from_url(file_url)
+            if not errors:
+                error = {"Message": message}
+            elif version_id is not None:
+                error = by_version.get((key, version_id))
             else:
-                pass
+                # Con all_versions una key se expande en sus versiones
+                error = by_key.get(key)
+            if error is None:
+                continue
             
-            return True
-            
-        except Exception as e:
-            raise StorageError(f"Error al eliminar archivo: {str(e)}")
+            code = error.get("Code", "")
+            attempts += 1
+            if code in PERMANENT_DELETE_ERRORS or attempts >= config.S3_DELETE_MAX_RETRIES:
+                logger.warning(
+                    f"Borrado descartado tras {attempts} intento(s): {key} "
+                    f"{code} {error.get('Message', '')}".strip()
+                )
+                continue
+            delay = config.S3_DELETE_GRACE_SECONDS * 2 ** (attempts - 1)
+            retry.append((now + delay, file_url, version_id, attempts))
+        
+        if retry:
+            self._push(retry)
+    
+    def _push(self, entries: List[Tuple[float, str, Optional[str], int]]) -> None:
+        with self._lock:
+            for entry in entries:
+                heapq.heappush(self._pending, entry)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="s3-deferred-delete", daemon=True
+                )
+                self._thread.start()
+        self._wakeup.set()
+    
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._pending:
+                    self._thread = None
+                    return
+                timeout = max(0.0, self._pending[0][0] - time.monotonic())
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except StorageError:
+                # Lo reintentable ya quedó reprogramado con backoff
+                pass
 
 
 _client_instance = None
+_storage_client = None
 
 
 def get_s3_client(use_mock: bool = None) -> S3Client:
@@ -198,6 +594,24 @@ def get_s3_client(use_mock: bool = None) -> S3Client:
     return _client_instance
 
 
+def get_storage_client() -> S3Client:
+    """
+    Cliente con el backend de STORAGE_BACKEND, uno por proceso.
+    
+    Se reutiliza entre invocaciones (conexiones de boto3 y cola de
+    borrados diferidos incluidas).
+    
+    Returns:
+        S3Client: Instancia del cliente
+    """
+    global _storage_client
+    
+    if _storage_client is None:
+        _storage_client = S3Client(backend=backends.create())
+    
+    return _storage_client
+
+
 def upload_and_get_url(content: bytes, file_extension: str) -> str:
     """
     Atajo para subir archivo y obtener URL.
@@ -2,12 +2,32 @@
 Utilidades generales de la aplicación.
 """
 
-from .response import success, error, validation_error, not_found, internal_error
+from .response import (
+    success,
+    error,
+    raw,
+    validation_error,
+    not_found,
+    internal_error,
+    not_modified,
+    compress,
+    compute_etag,
+    encoded_etag,
+    etag_matches,
+    matching_etag
+)
 
 __all__ = [
     "success",
-    "error", 
+    "error",
+    "raw",
     "validation_error",
     "not_found",
-    "internal_error"
+    "internal_error",
+    "not_modified",
+    "compress",
+    "compute_etag",
+    "encoded_etag",
+    "etag_matches",
+    "matching_etag"
 ]
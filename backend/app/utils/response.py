@@ -2,11 +2,79 @@
 Utilidades para crear respuestas HTTP estandarizadas.
 
 Centraliza el formato de respuestas para Lambda/API Gateway.
+
+Los headers salen de plantillas inmutables armadas una vez por proceso
+(cada respuesta recibe su propia copia) y el body se serializa con orjson
+si está instalado, json de la librería estándar si no. raw() devuelve
+contenido (ej: HTML) directo como body HTTP, sin envolverlo ni escaparlo
+dentro de un JSON.
 """
 
+import base64
+import gzip
+import hashlib
 import json
-from typing import Any, Dict, Optional
-from datetime import datetime
+import time
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional
+from datetime import datetime, timezone
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional, gzip siempre está disponible
+    brotli = None
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional, json siempre está disponible
+    orjson = None
+
+from app.config import config
+
+
+# Plantillas de headers (no se modifican: cada respuesta las copia)
+_CORS = {
+    "Access-Control-Allow-Origin": "*",  # Para CORS
+    "Access-Control-Allow-Methods": "POST, OPTIONS",
+    "Access-Control-Allow-Headers": "Content-Type"
+}
+JSON_HEADERS: Mapping[str, str] = MappingProxyType({
+    "Content-Type": "application/json",
+    **_CORS
+})
+HTML_HEADERS: Mapping[str, str] = MappingProxyType({
+    "Content-Type": "text/html; charset=utf-8",
+    **_CORS
+})
+NOT_MODIFIED_HEADERS: Mapping[str, str] = MappingProxyType({
+    **_CORS,
+    "Access-Control-Allow-Headers": "Content-Type, If-None-Match",
+    "Access-Control-Expose-Headers": "ETag"
+})
+
+# Codificaciones de compress() (ver encoded_etag)
+_ENCODINGS = ("br", "gzip")
+
+# Segundo actual ya formateado (ver _timestamp)
+_second = (0, "")
+
+
+def dumps(body: Any) -> str:
+    """
+    Serializa un body a JSON (orjson si está instalado).
+
+    Los caracteres no ASCII van tal cual en UTF-8, sin escapes \\uXXXX:
+    el HTML con acentos no crece al meterlo en el JSON.
+
+    Args:
+        body: Objeto serializable
+
+    Returns:
+        str: JSON compacto
+    """
+    if orjson is not None:
+        return orjson.dumps(body).decode("utf-8")
+    return json.dumps(body, ensure_ascii=False, separators=(",", ":"))
 
 
 def success(
@@ -33,26 +101,16 @@ def success(
     body = {
         "success": True,
         "data": data,
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": _timestamp()
     }
 
     if message:
         body["message"] = message
 
-    default_headers = {
-        "Content-Type": "application/json",
-        "Access-Control-Allow-Origin": "*",  # Para CORS
-        "Access-Control-Allow-Methods": "POST, OPTIONS",
-        "Access-Control-Allow-Headers": "Content-Type"
-    }
-
-    if headers:
-        default_headers.update(headers)
-
     return {
         "statusCode": status_code,
-        "headers": default_headers,
-        "body": json.dumps(body)
+        "headers": _headers(JSON_HEADERS, headers),
+        "body": dumps(body)
     }
 
 
@@ -82,7 +140,7 @@ def error(
     body = {
         "success": False,
         "error": message,
-        "timestamp": datetime.utcnow().isoformat()
+        "timestamp": _timestamp()
     }
 
     if error_code:
@@ -91,23 +149,67 @@ def error(
     if details:
         body["details"] = details
 
-    default_headers = {
-        "Content-Type": "application/json",
-        "Access-Control-Allow-Origin": "*",
-        "Access-Control-Allow-Methods": "POST, OPTIONS",
-        "Access-Control-Allow-Headers": "Content-Type"
+    return {
+        "statusCode": status_code,
+        "headers": _headers(JSON_HEADERS, headers),
+        "body": dumps(body)
     }
 
-    if headers:
-        default_headers.update(headers)
 
+def raw(
+    content: str,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None,
+    template: Mapping[str, str] = HTML_HEADERS
+) -> dict:
+    """
+    Respuesta con el contenido directo como body HTTP (sin JSON).
+
+    Un HTML de varios MB dentro de {"data": {"html": ...}} se escapa al
+    serializar y el cliente lo vuelve a parsear; en modo raw va tal cual.
+
+    Args:
+        content: Body de la respuesta (ej: HTML)
+        status_code: Código HTTP (default: 200)
+        headers: Headers HTTP adicionales
+        template: Plantilla de headers (default: HTML_HEADERS)
+
+    Returns:
+        Dict con formato esperado por API Gateway
+
+    Example:
+        >>> raw("<h1>Title</h1>", headers={"ETag": etag})
+    """
     return {
         "statusCode": status_code,
-        "headers": default_headers,
-        "body": json.dumps(body)
+        "headers": _headers(template, headers),
+        "body": content
     }
 
 
+def _headers(template: Mapping[str, str], extra: Optional[Dict[str, str]]) -> Dict[str, str]:
+    """Copia de una plantilla de headers con los adicionales."""
+    if extra:
+        return {**template, **extra}
+    return dict(template)
+
+
+def _timestamp() -> str:
+    """
+    Fecha UTC en ISO 8601 con microsegundos, como datetime.isoformat().
+
+    La parte hasta los segundos se formatea una vez por segundo.
+    """
+    global _second
+    now = time.time()
+    second = int(now)
+    cached_second, prefix = _second
+    if cached_second != second:
+        prefix = datetime.fromtimestamp(second, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+        _second = (second, prefix)
+    return f"{prefix}.{int((now - second) * 1_000_000):06d}"
+
+
 def validation_error(field: str, reason: str) -> dict:
     """
     Respuesta específica para errores de validación.
@@ -159,4 +261,199 @@ def internal_error(exception: Exception) -> dict:
         status_code=500,
         error_code="INTERNAL_ERROR",
         details={"exception": str(exception)}
-    )
\ No newline at end of file
+    )
+
+
+def compute_etag(*parts: str, weak: bool = False) -> str:
+    """
+    Calcula un ETag a partir del hash del contenido.
+
+    Un ETag fuerte promete bytes idénticos: solo sirve si el body es
+    determinista (ej: HTML en modo raw). El sobre JSON lleva timestamp,
+    así que su ETag es débil (W/).
+
+    Args:
+        *parts: Fragmentos que identifican la representación
+            (ej: contenido markdown, formato de salida, versión)
+        weak: Generar un ETag débil (W/"...")
+
+    Returns:
+        str: ETag entre comillas, listo para el header
+
+    Example:
+        >>> compute_etag("# Title", "html")
+        '"9f2c..."'
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    etag = f'"{digest.hexdigest()}"'
+    return "W/" + etag if weak else etag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Evalúa un header If-None-Match contra un ETag.
+
+    Usa comparación débil (RFC 9110), por lo que "W/" se ignora. También
+    coinciden las variantes comprimidas del ETag (ver encoded_etag).
+
+    Args:
+        if_none_match: Valor del header If-None-Match (puede ser None)
+        etag: ETag actual del recurso (sin codificación)
+
+    Returns:
+        bool: True si el cliente ya tiene esta representación
+    """
+    return matching_etag(if_none_match, etag) is not None
+
+
+def matching_etag(if_none_match: Optional[str], etag: str) -> Optional[str]:
+    """
+    ETag de If-None-Match que coincide con el recurso, tal como lo envió
+    el cliente (ej: la variante gzip que recibió en la respuesta 200).
+
+    Args:
+        if_none_match: Valor del header If-None-Match (puede ser None)
+        etag: ETag actual del recurso (sin codificación)
+
+    Returns:
+        El ETag para la respuesta 304, o None si no hay coincidencia
+    """
+    if not if_none_match:
+        return None
+
+    opaque = _opaque(etag)
+    variants = {opaque} | {encoded_etag(opaque, encoding) for encoding in _ENCODINGS}
+    for tag in (tag.strip() for tag in if_none_match.split(",")):
+        if tag == "*":
+            return etag
+        if _opaque(tag) in variants:
+            return tag
+    return None
+
+
+def _opaque(etag: str) -> str:
+    """ETag sin el prefijo W/ (comparación débil)."""
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """
+    ETag de la representación comprimida con encoding.
+
+    Un ETag fuerte identifica bytes exactos: el body gzip o brotli lleva
+    su propio ETag, con la codificación agregada dentro de las comillas.
+
+    Example:
+        >>> encoded_etag('"9f2c"', "gzip")
+        '"9f2c-gzip"'
+    """
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def not_modified(etag: str, headers: Optional[Dict[str, str]] = None) -> dict:
+    """
+    Respuesta 304 sin body para peticiones condicionales.
+
+    Args:
+        etag: ETag de la representación vigente
+        headers: Headers HTTP adicionales
+
+    Returns:
+        Dict con status 304
+    """
+    return {
+        "statusCode": 304,
+        "headers": _headers(NOT_MODIFIED_HEADERS, {"ETag": etag, **(headers or {})}),
+        "body": ""
+    }
+
+
+def compress(
+    response: dict,
+    accept_encoding: Optional[str],
+    min_bytes: Optional[int] = None
+) -> dict:
+    """
+    Comprime el body de una respuesta si el cliente lo acepta.
+
+    Prefiere brotli (si está instalado) sobre gzip. Bodies menores
+    al umbral se dejan tal cual, comprimirlos no compensa. Si la
+    respuesta tiene ETag, se reemplaza por el de la codificación.
+
+    Args:
+        response: Respuesta generada por success()/error()
+        accept_encoding: Valor del header Accept-Encoding
+        min_bytes: Tamaño mínimo para comprimir (default: config)
+
+    Returns:
+        Dict con body en base64 y Content-Encoding, o la respuesta original
+    """
+    if min_bytes is None:
+        min_bytes = config.COMPRESSION_MIN_BYTES
+
+    body = response.get("body") or ""
+    raw = body.encode("utf-8")
+    if len(raw) < min_bytes:
+        return response
+
+    encoding = _negotiate_encoding(accept_encoding)
+    if encoding is None:
+        return response
+
+    if encoding == "br":
+        compressed = brotli.compress(raw, quality=5)
+    else:
+        compressed = gzip.compress(raw, compresslevel=6)
+
+    headers = dict(response.get("headers", {}))
+    headers["Content-Encoding"] = encoding
+    headers["Vary"] = "Accept-Encoding"
+    if "ETag" in headers:
+        headers["ETag"] = encoded_etag(headers["ETag"], encoding)
+
+    return {
+        **response,
+        "headers": headers,
+        "body": base64.b64encode(compressed).decode("ascii"),
+        "isBase64Encoded": True
+    }
+
+
+def _negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Elige la codificación según Accept-Encoding y sus q-values.
+
+    Args:
+        accept_encoding: Valor del header Accept-Encoding
+
+    Returns:
+        "br", "gzip" o None si no hay ninguna aceptable
+    """
+    if not accept_encoding:
+        return None
+
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    wildcard = accepted.get("*", 0.0)
+    available = ["br", "gzip"] if brotli is not None else ["gzip"]
+
+    best, best_quality = None, 0.0
+    for encoding in available:
+        quality = accepted.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+
+    return best
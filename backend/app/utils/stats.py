@@ -0,0 +1,119 @@
+"""
+Estadísticas del entorno de ejecución para health_check.
+
+Medir cuesta poco: cada contador es un entero con su propio lock (una
+suma por request, sin contención real) y las latencias van a deques con
+maxlen, cuyo append es atómico. Los percentiles se calculan recién al
+pedir el snapshot, sobre la ventana de las últimas STATS_WINDOW
+muestras de cada etapa.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # resource no existe en Windows
+    resource = None
+
+from app.config import config
+
+
+STARTED = time.time()
+
+
+class Counter:
+    """Contador monotónico seguro entre threads."""
+
+    def __init__(self):
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def increment(self) -> None:
+        with self._lock:
+            self._value += 1
+
+    @property
+    def value(self) -> int:
+        with self._lock:
+            return self._value
+
+
+_counters: Dict[str, Counter] = {}
+_latencies: Dict[str, Deque[float]] = {}
+
+
+def increment(name: str) -> None:
+    """Suma uno al contador name (ej: "conversions")."""
+    counter = _counters.get(name)
+    if counter is None:
+        counter = _counters.setdefault(name, Counter())
+    counter.increment()
+
+
+def observe(stage: str, milliseconds: float) -> None:
+    """Registra la latencia de una etapa en su ventana."""
+    window = _latencies.get(stage)
+    if window is None:
+        window = _latencies.setdefault(stage, deque(maxlen=config.STATS_WINDOW))
+    window.append(milliseconds)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Mide el bloque y lo registra si termina sin excepción."""
+    start = time.perf_counter()
+    yield
+    observe(stage, (time.perf_counter() - start) * 1000)
+
+
+def counters() -> Dict[str, int]:
+    """Valor actual de cada contador."""
+    return {name: counter.value for name, counter in list(_counters.items())}
+
+
+def latencies() -> Dict[str, Dict[str, float]]:
+    """
+    p50/p95 por etapa sobre la ventana actual.
+
+    Returns:
+        Dict etapa -> {"samples", "p50_ms", "p95_ms"}
+    """
+    result = {}
+    for stage, window in list(_latencies.items()):
+        samples = sorted(list(window))
+        if samples:
+            result[stage] = {
+                "samples": len(samples),
+                "p50_ms": round(_percentile(samples, 50), 2),
+                "p95_ms": round(_percentile(samples, 95), 2),
+            }
+    return result
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Pico de memoria residente del proceso en MB (None sin resource)."""
+    if resource is None:
+        return None
+    # ru_maxrss está en KB en Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def uptime_seconds() -> float:
+    """Segundos desde que se cargó el módulo (inicio del entorno)."""
+    return round(time.time() - STARTED, 1)
+
+
+def reset() -> None:
+    """Descarta contadores y latencias (tests)."""
+    _counters.clear()
+    _latencies.clear()
+
+
+def _percentile(samples: list, percent: float) -> float:
+    """Percentil por rango más cercano sobre muestras ordenadas."""
+    rank = max(0, -(-len(samples) * percent // 100) - 1)
+    return samples[int(rank)]
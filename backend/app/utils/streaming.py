@@ -0,0 +1,71 @@
+"""
+Respuestas HTTP en streaming.
+
+Una respuesta en streaming es una tupla (status, headers, chunks), con
+chunks un iterador de bytes que se envían a medida que se generan (ver
+handler.stream_handler y local_server.py). Las respuestas armadas por
+lambda_handler se adaptan a la misma forma con buffered().
+"""
+
+import base64
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from app.config import config
+
+
+StreamingResponse = Tuple[int, Dict[str, str], Iterator[bytes]]
+
+
+def coalesce(parts: Iterable[str], min_bytes: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Agrupa fragmentos de texto en chunks de al menos min_bytes.
+
+    El primer fragmento sale solo, así el primer byte llega lo antes
+    posible; después se junta hasta min_bytes para no mandar un chunk
+    HTTP por cada bloque chico.
+
+    Args:
+        parts: Fragmentos de texto (ej: HTML por bloque)
+        min_bytes: Tamaño mínimo de cada chunk (default: STREAM_CHUNK_BYTES)
+
+    Yields:
+        bytes: Chunks codificados en UTF-8
+    """
+    if min_bytes is None:
+        min_bytes = config.STREAM_CHUNK_BYTES
+
+    pending = []
+    size = 0
+    first = True
+    for part in parts:
+        data = part.encode("utf-8")
+        if first:
+            first = False
+            yield data
+            continue
+        pending.append(data)
+        size += len(data)
+        if size >= min_bytes:
+            yield b"".join(pending)
+            pending = []
+            size = 0
+    if pending:
+        yield b"".join(pending)
+
+
+def buffered(response: dict) -> StreamingResponse:
+    """
+    Adapta una respuesta de API Gateway (body completo) a streaming.
+
+    Args:
+        response: Respuesta de success()/error()/compress()
+
+    Returns:
+        Tupla (status, headers, iterador con un solo chunk)
+    """
+    body = response.get("body") or ""
+    if response.get("isBase64Encoded"):
+        data = base64.b64decode(body)
+    else:
+        data = body.encode("utf-8")
+    return response["statusCode"], dict(response.get("headers", {})), iter([data] if data else [])
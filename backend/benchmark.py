@@ -0,0 +1,550 @@
+#!/usr/bin/env python3
+"""
+Benchmarks del pipeline de conversión, SIN AWS.
+
+Mide el costo de cada etapa con documentos sintéticos parecidos a la
+salida de un LLM. No es un test: imprime tiempos para comparar entre
+versiones en la misma máquina.
+
+ex: python benchmark.py              (todos)
+    python benchmark.py normalizer   (solo uno)
+"""
+
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from docx import Document
+
+from app.converter.html_to_docx import add_html
+from app.converter.markdown_to_html import convert as md_to_html
+from app.converter.normalizer import normalize
+
+
+def llm_document(sections: int = 50) -> str:
+    """Genera un documento Markdown típico de una respuesta larga de LLM."""
+    parts = []
+    for i in range(sections):
+        parts.append(f"## Sección {i}\n")
+        parts.append(
+            f"Este es un párrafo con **negrita**, *cursiva* y `código` "
+            f"número {i}. " * 3 + "\n"
+        )
+        parts.append("- Primer punto\n- Segundo punto\n  - Anidado\n")
+        parts.append("```python\ndef f(x):\n    return x * 2\n```\n")
+        parts.append("| Col A | Col B | Col C |\n|---|---|---|\n| 1 | 2 | 3 |\n| 4 | 5 | 6 |\n")
+    return "\n".join(parts)
+
+
+def timeit(fn: Callable[[], object], repeat: int = 5) -> float:
+    """Mejor tiempo (segundos) de `repeat` ejecuciones."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def header(title: str) -> None:
+    print("\n" + "=" * 60)
+    print(title)
+    print("=" * 60)
+
+
+def bench_normalizer():
+    """Costo del normalizador frente a la conversión Markdown -> HTML."""
+    header("BENCH: Normalizador de salida LLM")
+
+    for sections in (10, 100, 1000):
+        document = llm_document(sections)
+        # Defectos típicos: \r\n, ancho cero y un fence sin cerrar
+        dirty = document.replace("\n", "\r\n").replace("**", "**\u200b") + "\n```\nsin cerrar"
+
+        normalize_time = timeit(lambda: normalize(dirty))
+        convert_time = timeit(lambda: md_to_html(document), repeat=3)
+        size_mb = len(dirty.encode("utf-8")) / (1024 * 1024)
+
+        print(
+            f" {sections:>5} secciones ({size_mb * 1024:7.1f} KB): "
+            f"normalize {normalize_time * 1000:8.2f} ms "
+            f"({size_mb / normalize_time:6.1f} MB/s) | "
+            f"md_to_html {convert_time * 1000:9.2f} ms | "
+            f"overhead {normalize_time / convert_time * 100:5.1f}%"
+        )
+
+
+def bench_docx_backends():
+    """Builder rápido frente a htmldocx para el mismo HTML."""
+    header("BENCH: HTML -> DOCX (fast vs htmldocx)")
+
+    for sections in (10, 100, 500):
+        html = md_to_html(llm_document(sections))
+
+        times = {}
+        for backend in ("htmldocx", "fast"):
+            times[backend] = timeit(
+                lambda: add_html(Document(), html, backend=backend),
+                repeat=1 if backend == "htmldocx" and sections > 100 else 3
+            )
+
+        print(
+            f" {sections:>5} secciones: "
+            f"htmldocx {times['htmldocx'] * 1000:9.2f} ms | "
+            f"fast {times['fast'] * 1000:8.2f} ms | "
+            f"speedup {times['htmldocx'] / times['fast']:5.1f}x"
+        )
+
+    # Muchos links: cada uno es una relación externa de la parte
+    for links in (500, 2000, 4000):
+        html = md_to_html("\n\n".join(
+            f"Ver [fuente {i}](https://example.com/doc/{i}) y [la misma](https://example.com/doc/{i})."
+            for i in range(links // 2)
+        ))
+
+        times = {}
+        for backend in ("htmldocx", "fast"):
+            times[backend] = timeit(
+                lambda: add_html(Document(), html, backend=backend),
+                repeat=1 if backend == "htmldocx" else 3
+            )
+
+        print(
+            f" {links:>5} links:     "
+            f"htmldocx {times['htmldocx'] * 1000:9.2f} ms | "
+            f"fast {times['fast'] * 1000:8.2f} ms | "
+            f"speedup {times['htmldocx'] / times['fast']:5.1f}x"
+        )
+
+
+def markdown_table(rows: int, columns: int = 4) -> str:
+    """Tabla Markdown de comparación con formato inline en las celdas."""
+    lines = [
+        "|" + "|".join(f"Columna {c}" for c in range(columns)) + "|",
+        "|" + "|".join([":--", ":-:", "--:", "---"][c % 4] for c in range(columns)) + "|",
+    ]
+    for r in range(rows):
+        lines.append("|" + "|".join(f"fila {r} **c{c}**" for c in range(columns)) + "|")
+    return "\n".join(lines)
+
+
+def bench_tables():
+    """Escalado de tablas grandes: debe ser lineal en la cantidad de celdas."""
+    header("BENCH: Tablas grandes (4 columnas)")
+
+    for rows in (25, 250, 1000, 2500):
+        html = md_to_html(markdown_table(rows))
+        cells = rows * 4
+
+        line = f" {cells:>6} celdas: "
+        for backend in ("fast", "htmldocx"):
+            elapsed = timeit(lambda: add_html(Document(), html, backend=backend), repeat=1)
+            line += f"| {backend} {elapsed * 1000:9.1f} ms {elapsed / cells * 1e6:7.1f} us/celda "
+        print(line)
+
+
+def bench_code_blocks():
+    """Tamaño de document.xml y tiempo para un bloque de código largo."""
+    from lxml import etree
+
+    from app.config import config
+
+    header("BENCH: Bloque de código de 2000 líneas")
+
+    code = "\n".join(
+        f"def funcion_{i}(x):  # comentario {i}\n    return x * {i}" for i in range(1000)
+    )
+    html = md_to_html(f"```python\n{code}\n```")
+
+    for label, backend, highlight in (
+        ("htmldocx", "htmldocx", False),
+        ("fast", "fast", False),
+        ("fast + resaltado", "fast", True),
+    ):
+        config.CODE_HIGHLIGHT = highlight
+        document = Document()
+        elapsed = timeit(lambda: add_html(Document(), html, backend=backend), repeat=3)
+        add_html(document, html, backend=backend)
+        size = len(etree.tostring(document.element.body))
+        runs = len(document.element.body.findall(".//{*}r"))
+        print(
+            f" {label:<18} {elapsed * 1000:8.2f} ms | "
+            f"body {size / 1024:8.1f} KB | runs {runs:6d}"
+        )
+    config.CODE_HIGHLIGHT = False
+
+
+def bench_style_index():
+    """Resolución de estilos: índice por plantilla vs búsqueda de python-docx."""
+    from app.converter import style_index
+
+    header("BENCH: Índice de estilos (listas y encabezados)")
+    for sections in (100, 1000):
+        html = md_to_html("\n\n".join(
+            f"## Título {i}\n\n- uno\n- dos\n  - anidado\n\n1. primero\n2. segundo"
+            for i in range(sections)
+        ))
+        install = style_index.install
+        for label, patched in (("lineal", lambda document: None), ("índice", install)):
+            style_index.install = patched
+            elapsed = timeit(lambda: add_html(Document(), html, backend="htmldocx"), repeat=3)
+            print(f" {sections:5d} secciones htmldocx {label:<7} {elapsed * 1000:9.1f} ms")
+        style_index.install = install
+        elapsed = timeit(lambda: add_html(Document(), html, backend="fast"), repeat=3)
+        print(f" {sections:5d} secciones fast             {elapsed * 1000:9.1f} ms")
+
+
+def bench_event_pipeline():
+    """Pipeline por etapas (HTML completo) vs flujo de eventos por bloque."""
+    import tracemalloc
+
+    from app.converter import events
+    from app.converter.html_to_docx import convert as html_to_docx, convert_events
+
+    header("BENCH: Pipeline por etapas vs eventos")
+    for sections in (50, 500):
+        markdown_text = llm_document(sections)
+        for label, fn in (
+            ("staged", lambda: html_to_docx(md_to_html(markdown_text))),
+            ("events", lambda: convert_events(events.from_markdown(markdown_text))),
+        ):
+            elapsed = timeit(fn, repeat=3)
+            tracemalloc.start()
+            fn()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(
+                f" {sections:4d} secciones {label:<8} {elapsed * 1000:8.1f} ms | "
+                f"pico {peak / 1024 / 1024:6.1f} MB"
+            )
+
+
+def bench_docx_writer():
+    """document.save() vs escritura de document.xml en streaming."""
+    header("BENCH: Writer DOCX (save vs streaming)")
+    # El árbol lxml vive en memoria de libxml2 (tracemalloc no la ve): se
+    # mide el pico de RSS en un proceso nuevo por caso
+    code = (
+        "import resource, time; from benchmark import llm_document; "
+        "from app.converter import events; "
+        "from app.converter.html_to_docx import convert_events; "
+        "text = llm_document({sections}); "
+        "before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss; "
+        "start = time.perf_counter(); "
+        "convert_events(events.from_markdown(text), streaming={streaming}); "
+        "print(time.perf_counter() - start, "
+        "resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before)"
+    )
+    for sections in (50, 2000):
+        for streaming in (False, True):
+            result = subprocess.run(
+                [sys.executable, "-c", code.format(sections=sections, streaming=streaming)],
+                capture_output=True, text=True, check=True, cwd=Path(__file__).parent
+            )
+            elapsed, rss_kb = result.stdout.split()
+            label = "streaming" if streaming else "save"
+            print(
+                f" {sections:4d} secciones {label:<10} {float(elapsed) * 1000:8.1f} ms | "
+                f"+RSS {int(rss_kb) / 1024:6.1f} MB"
+            )
+
+
+def bench_images():
+    """Reporte con 40 capturas (10 distintas): pool, cache y deduplicación."""
+    import base64
+    import os
+    import struct
+    import zlib
+
+    from app.config import config
+    from app.converter import images
+    from app.converter.html_to_docx import convert as html_to_docx
+
+    def png(width: int, height: int) -> bytes:
+        def chunk(kind, data):
+            return struct.pack(">I", len(data)) + kind + data + struct.pack(
+                ">I", zlib.crc32(kind + data) & 0xFFFFFFFF
+            )
+        rows = b"".join(b"\x00" + os.urandom(3 * width // 8) * 8 for _ in range(height))
+        return (
+            b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(rows, 1))
+            + chunk(b"IEND", b"")
+        )
+
+    header("BENCH: Imágenes embebidas (40 capturas 1920x1080, 10 distintas)")
+    print(f" Pillow: {'sí' if images.available() else 'no (sin reducción)'}")
+    sources = [
+        "data:image/png;base64," + base64.b64encode(png(1920, 1080)).decode()
+        for i in range(10)
+    ]
+    html = "".join(f'<p>Captura {i}</p><p><img src="{sources[i % 10]}"></p>' for i in range(40))
+    workers = config.IMAGE_WORKERS
+    for label, count, warm in (("1 thread", 1, False), (f"{workers} threads", workers, False),
+                               ("cache caliente", workers, True)):
+        config.IMAGE_WORKERS = count
+
+        def run():
+            if not warm:
+                images.clear_cache()
+            return html_to_docx(html)
+
+        run()
+        elapsed = timeit(run, repeat=3)
+        size = len(run())
+        print(f" {label:<16} {elapsed * 1000:8.1f} ms | docx {size / 1024 / 1024:6.1f} MB")
+    config.IMAGE_WORKERS = workers
+
+
+def bench_handler_concurrency():
+    """Handler completo (DOCX) con varios threads y almacenamiento en memoria."""
+    import json
+    from concurrent.futures import ThreadPoolExecutor
+    from types import SimpleNamespace
+
+    from app.storage import s3_client
+    from app.storage.backends import MemoryBackend
+    from handler import lambda_handler
+
+    header("BENCH: Handler concurrente (backend memory, sin disco ni red)")
+    s3_client._storage_client = s3_client.S3Client(backend=MemoryBackend())
+    event = {
+        "httpMethod": "POST",
+        "body": json.dumps({"content": llm_document(20), "output_format": "docx"})
+    }
+    context = SimpleNamespace(aws_request_id="bench")
+    requests = 64
+    for threads in (1, 4, 16):
+        with ThreadPoolExecutor(threads) as pool:
+            start = time.perf_counter()
+            statuses = list(pool.map(
+                lambda _: lambda_handler(event, context)["statusCode"], range(requests)
+            ))
+            elapsed = time.perf_counter() - start
+        assert statuses == [200] * requests
+        print(f" {threads:3d} threads {requests / elapsed:8.1f} req/s")
+    s3_client._storage_client = None
+
+
+def bench_cold_start():
+    """Tiempo de importar el handler en un proceso nuevo (cold start)."""
+    header("BENCH: Cold start (import handler)")
+    code = (
+        "import time; start = time.perf_counter(); import handler; "
+        "print(time.perf_counter() - start)"
+    )
+    for label, extra in (
+        ("handler", ""),
+        ("handler + docx", "; from app.converter import formats; formats.render('docx', '<p>x</p>')"),
+    ):
+        samples = []
+        for _ in range(5):
+            result = subprocess.run(
+                [sys.executable, "-c", code.replace("import handler", "import handler" + extra)],
+                capture_output=True, text=True, check=True, cwd=Path(__file__).parent
+            )
+            samples.append(float(result.stdout.strip().splitlines()[-1]))
+        print(f" {label:<18} {min(samples) * 1000:8.1f} ms")
+
+
+def bench_upload_pipeline():
+    """Build y subida en secuencia vs solapados (multipart por cola acotada)."""
+    from app.converter import events, formats
+    from app.storage.backends import MemoryBackend
+    from app.storage.pipeline import PipelinedUpload
+
+    class SlowBackend(MemoryBackend):
+        """Red simulada: 30 ms por request y 1 MB/s por conexión."""
+
+        @staticmethod
+        def _transfer(data):
+            time.sleep(0.03 + len(data) / (1024 * 1024))
+
+        def put(self, key, content, content_type):
+            self._transfer(content)
+            return super().put(key, content, content_type)
+
+        def upload_part(self, key, upload_id, number, data):
+            self._transfer(data)
+            return super().upload_part(key, upload_id, number, data)
+
+    header("BENCH: Pipeline build + subida (red simulada)")
+    backend = SlowBackend()
+    # Partes chicas para que el DOCX comprimido tenga varias (S3 exige 5 MB)
+    part_size = 64 * 1024
+    for sections in (200, 1000):
+        text = llm_document(sections)
+        size = len(formats.render_events("docx", events.from_markdown(text), streaming=True))
+
+        def build():
+            formats.render_events("docx", events.from_markdown(text), streaming=True)
+
+        def sequential():
+            data = formats.render_events("docx", events.from_markdown(text), streaming=True)
+            backend.put("seq.docx", data, "application/octet-stream")
+
+        def pipelined():
+            with PipelinedUpload(backend, "pipe.docx", "application/octet-stream",
+                                 part_size=part_size) as upload:
+                formats.render_to("docx", events.from_markdown(text), upload)
+
+        print(
+            f" {sections:5d} secciones ({size / 1024:6.0f} KB): "
+            f"build {timeit(build, repeat=3) * 1000:8.1f} ms | "
+            f"secuencial {timeit(sequential, repeat=3) * 1000:8.1f} ms | "
+            f"pipeline {timeit(pipelined, repeat=3) * 1000:8.1f} ms"
+        )
+
+
+def bench_presign():
+    """Costo por URL: generate_presigned_url vs firma compartida vs cache."""
+    import boto3
+
+    from app.storage.backends import S3Backend
+    from app.storage.presign import PresignService
+
+    header("BENCH: URLs presigned (costo por URL)")
+    # Credenciales falsas: firmar no hace requests
+    storage = S3Backend(boto3.client(
+        "s3", region_name="us-east-1",
+        aws_access_key_id="bench", aws_secret_access_key="bench"
+    ))
+    keys = [f"ab/{i:05d}.docx" for i in range(1000)]
+    presigner = PresignService(storage, cache_size=len(keys))
+    presigner.urls(keys)
+
+    cases = (
+        ("generate_presigned_url", lambda: [storage._generate_presigned_url(k, 300) for k in keys]),
+        ("presign_many (lote)", lambda: storage.presign_many(keys, 300)),
+        ("PresignService (cache)", lambda: presigner.urls(keys)),
+    )
+    for label, fn in cases:
+        elapsed = timeit(fn, repeat=3)
+        print(f" {label:<24} {elapsed / len(keys) * 1e6:8.1f} us/URL")
+
+
+def bench_response():
+    """Serialización de respuestas con HTML grande: JSON vs raw."""
+    import json
+
+    from app.utils import response
+
+    header(f"BENCH: Respuestas HTML (JSON: {'orjson' if response.orjson else 'json'})")
+    for sections in (50, 500, 2000):
+        html = md_to_html(llm_document(sections))
+
+        def legacy():
+            # Lo que hacía success() antes: ensure_ascii y separadores por defecto
+            return json.dumps({"success": True, "data": {"html": html}})
+
+        cases = (
+            ("json.dumps (antes)", legacy),
+            ("success()", lambda: response.success({"html": html})["body"]),
+            ("raw()", lambda: response.raw(html)["body"]),
+        )
+        print(f" {len(html.encode('utf-8')) / 1024:8.0f} KB de HTML")
+        for label, fn in cases:
+            elapsed = timeit(fn, repeat=5)
+            size = len(fn().encode("utf-8"))
+            print(f"   {label:<20} {elapsed * 1000:8.2f} ms | body {size / 1024:8.0f} KB")
+
+
+def bench_streaming():
+    """Tiempo al primer byte: respuesta completa vs stream_handler."""
+    import json
+    from types import SimpleNamespace
+
+    from app.converter import incremental
+    from handler import lambda_handler, stream_handler
+
+    header("BENCH: HTML en streaming (tiempo al primer byte)")
+    context = SimpleNamespace(aws_request_id="bench")
+    for sections in (100, 1000):
+        event = {
+            "httpMethod": "POST",
+            "body": json.dumps({"content": llm_document(sections), "output_format": "html"})
+        }
+        # Sin cache de bloques, como un documento nuevo
+        incremental.cache_clear()
+        start = time.perf_counter()
+        lambda_handler(event, context)
+        buffered_time = time.perf_counter() - start
+
+        incremental.cache_clear()
+        start = time.perf_counter()
+        _, _, chunks = stream_handler(event, context)
+        next(chunks)
+        first_byte = time.perf_counter() - start
+        count = 1 + sum(1 for _ in chunks)
+        total = time.perf_counter() - start
+        print(
+            f" {sections:5d} secciones: completa {buffered_time * 1000:8.1f} ms | "
+            f"streaming primer byte {first_byte * 1000:7.1f} ms, "
+            f"total {total * 1000:8.1f} ms ({count} chunks)"
+        )
+
+
+def bench_priming():
+    """Latencia del primer request en un entorno nuevo, con y sin prime()."""
+    header("BENCH: Primer request (PRIME_ON_INIT)")
+    # Proceso nuevo por caso; almacenamiento en memoria para no usar red
+    code = (
+        "import json, time; from types import SimpleNamespace; "
+        "start = time.perf_counter(); import handler; "
+        "init = time.perf_counter() - start; "
+        "from app.storage import s3_client; from app.storage.backends import MemoryBackend; "
+        "s3_client._storage_client = s3_client._storage_client or s3_client.S3Client(backend=MemoryBackend()); "
+        "event = {'httpMethod': 'POST', 'body': json.dumps({'content': '# Hola\\n\\n- a\\n- b', "
+        "'output_format': 'docx'})}; context = SimpleNamespace(aws_request_id='bench'); "
+        "samples = []\n"
+        "for _ in range(2):\n"
+        "    start = time.perf_counter(); handler.lambda_handler(event, context); "
+        "samples.append(time.perf_counter() - start)\n"
+        "print(init, *samples)"
+    )
+    for prime in ("false", "true"):
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).parent,
+            env={**os.environ, "PRIME_ON_INIT": prime, "STORAGE_BACKEND": "memory"}
+        )
+        init, first, second = (float(v) * 1000 for v in result.stdout.split())
+        print(
+            f" PRIME_ON_INIT={prime:<5} init {init:7.1f} ms | "
+            f"primer request {first:7.1f} ms | segundo {second:6.1f} ms"
+        )
+
+
+BENCHMARKS = {
+    "normalizer": bench_normalizer,
+    "docx_backends": bench_docx_backends,
+    "tables": bench_tables,
+    "code_blocks": bench_code_blocks,
+    "style_index": bench_style_index,
+    "event_pipeline": bench_event_pipeline,
+    "docx_writer": bench_docx_writer,
+    "images": bench_images,
+    "handler_concurrency": bench_handler_concurrency,
+    "upload_pipeline": bench_upload_pipeline,
+    "presign": bench_presign,
+    "response": bench_response,
+    "streaming": bench_streaming,
+    "cold_start": bench_cold_start,
+    "priming": bench_priming,
+}
+
+
+if __name__ == "__main__":
+    selected = sys.argv[1:] or list(BENCHMARKS)
+
+    for name in selected:
+        if name not in BENCHMARKS:
+            print(f"Benchmark desconocido: {name}. Opciones: {', '.join(BENCHMARKS)}")
+            sys.exit(1)
+        BENCHMARKS[name]()
@@ -6,14 +6,49 @@ Este es el punto de entrada cuando se ejecuta en Lambda.
 
 import json
 import logging
-from typing import Dict, Any
+import sys
+import time
+from typing import Dict, Any, Iterator, List, Optional
 
 from app.converter.markdown_to_html import convert as md_to_html
-from app.converter.html_to_docx import convert as html_to_docx
-from app.storage.s3_client import S3Client
-from app.utils.response import success, error, validation_error, internal_error
+from app.converter import formats as output_formats
+from app.converter.incremental import (
+    cache_info as incremental_cache_info,
+    iter_html,
+    render as render_incremental
+)
+from app.converter.markdown_to_html import pool_info as engine_pool_info
+from app.converter.events import from_html as html_events, from_markdown as markdown_events
+from app.converter.prescan import enforce as enforce_limits, time_budget, remaining_budget
+from app.converter.normalizer import normalize, resolve_options
+from app.storage import s3_client
+from app.storage.s3_client import get_storage_client
+from app.utils import stats
+from app.utils.streaming import StreamingResponse, buffered, coalesce
+from app.utils.response import (
+    HTML_HEADERS,
+    success,
+    error,
+    raw,
+    validation_error,
+    internal_error,
+    not_modified,
+    compress,
+    compute_etag,
+    matching_etag
+)
 from app.config import config
-from app.converter.exceptions import ConversionError
+from app import __version__
+from app.converter.exceptions import (
+    ConversionError,
+    ConversionTimeoutError,
+    FileTooLargeError,
+    InputTooComplexError,
+    InvalidInputError,
+    MarkdownConversionError,
+    ObjectNotFoundError,
+    StorageError
+)
 
 logger = logging.getLogger()
 logger.setLevel(config.LOG_LEVEL)
@@ -38,13 +73,23 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     Supported conversions:
         - Markdown -> DOCX (output_format: "docx")
         - Markdown -> HTML (output_format: "html")
+        - Markdown -> texto plano (output_format: "txt")
+        - Varios a la vez desde un solo parseo (output_format: ["html", "docx"])
+        
+    El DOCX incluye bookmarks en los encabezados y la respuesta su índice
+    ("outline"); con "toc": true se agrega una tabla de contenido.
+    
+    Con output_format "html" y "raw": true el HTML es el body de la
+    respuesta (text/html) en lugar de ir dentro del JSON.
+    
+    Documentos grandes: {"upload": true} retorna una URL firmada para
+    subir el Markdown crudo con PUT directo al bucket; después se pide la
+    conversión con {"input_key": "..."} en lugar de "content".
     """
     logger.info(f"Request ID: {context.aws_request_id}")
+    request_start = time.perf_counter()
     
-    http_method = event.get("httpMethod")  # REST API
-    if not http_method and "requestContext" in event:
-        # HTTP API v2
-        http_method = event.get("requestContext", {}).get("http", {}).get("method")
+    http_method = _get_method(event)
     
     logger.info(f"HTTP Method: {http_method}")
     
@@ -59,111 +104,682 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         except json.JSONDecodeError:
             return error("JSON inválido en el body", status_code=400)
         
+        if not isinstance(body, dict):
+            return error("JSON inválido en el body", status_code=400)
+        
+        # 2b. Pedido de URL para subir la entrada directo al bucket
+        if body.get("upload") is True:
+            return _create_upload(event)
+        
         # 3. Validacion del input
         markdown_content = body.get("content")
-        output_format = body.get("output_format", "docx").lower()
+        input_key = body.get("input_key")
+        requested_format = body.get("output_format", "docx")
+        formats = _parse_formats(requested_format)
+        multi_format = isinstance(requested_format, list)
+        single = output_formats.get(formats[0]) if formats and len(formats) == 1 else None
+        incremental = bool(body.get("incremental")) and bool(single and single.incremental)
+        previous_blocks = body.get("previous_blocks")
+        toc = body.get("toc")
+        raw_html = body.get("raw")
         
-        # que se provea contenido
-        if not markdown_content:
+        # que se provea contenido (inline o subido con "upload")
+        if markdown_content and input_key is not None:
+            return validation_error("input_key", "Use content o input_key, no ambos")
+        if not markdown_content and input_key is None:
             return validation_error("content", "Campo requerido")
+        if input_key is not None and not isinstance(input_key, str):
+            return validation_error("input_key", "Debe ser un string")
         
-        # formato de salida
-        if output_format not in ["docx", "html"]:
+        # formato(s) de salida
+        if formats is None:
+            supported = ", ".join(f"'{f}'" for f in output_formats.supported())
             return validation_error(
                 "output_format",
-                "Formato de salida inválido. Use: 'docx' o 'html'"
+                f"Formato de salida inválido. Use: {supported} o una lista de ellos"
             )
+        output_format = formats[0]
+        
+        try:
+            normalize_options = resolve_options(body.get("normalize"))
+        except (ValueError, TypeError, AttributeError) as e:
+            return validation_error("normalize", str(e))
+        
+        if previous_blocks is not None and not (
+            isinstance(previous_blocks, list)
+            and all(isinstance(h, str) for h in previous_blocks)
+        ):
+            return validation_error("previous_blocks", "Debe ser una lista de strings")
+        
+        if toc is not None and not isinstance(toc, bool):
+            return validation_error("toc", "Debe ser true o false")
+        
+        if raw_html is not None and not isinstance(raw_html, bool):
+            return validation_error("raw", "Debe ser true o false")
+        if raw_html and (multi_format or not (single and single.inline) or incremental):
+            return validation_error("raw", "Solo para output_format 'html' sin incremental")
+        
+        # 4. Tamaño permitido (la entrada subida se lee en streaming y se
+        #    corta apenas supera el máximo)
+        if input_key is not None:
+            try:
+                markdown_content = get_storage_client().read_input(
+                    input_key, config.MAX_FILE_SIZE_BYTES
+                )
+            except FileTooLargeError:
+                return _too_large()
+            except ObjectNotFoundError:
+                return validation_error("input_key", "No existe el archivo subido")
+            except InvalidInputError as e:
+                return validation_error("input_key", e.message)
+            except StorageError as e:
+                logger.error(f"Input read failed: {str(e)}")
+                return error(
+                    "Error al leer archivo de S3",
+                    status_code=500,
+                    details={"error": str(e)}
+                )
+            if not markdown_content:
+                return validation_error("input_key", "El archivo subido está vacío")
         
-        # 4. Tamaño permitido
         content_size = len(markdown_content.encode('utf-8'))
         if content_size > config.MAX_FILE_SIZE_BYTES:
-            return error(
-                f"Contenido demasiado grande. Máximo: {config.MAX_FILE_SIZE_MB}MB",
-                status_code=413
+            return _too_large()
+        
+        logger.info(f"Processing {content_size} bytes, output: {', '.join(formats)}")
+
+        # 5. Formato condicional: si el cliente ya tiene esta versión, 304 sin convertir
+        conditional = bool(single and single.conditional)
+        if conditional:
+            etag_parts = []
+            if incremental:
+                etag_parts.append(",".join(previous_blocks or ["full"]))
+            if raw_html:
+                etag_parts.append("raw")
+            # Solo el HTML raw tiene bytes deterministas: el sobre JSON
+            # lleva timestamp y su ETag es débil
+            etag = _etag(
+                json.dumps(formats) if multi_format else output_format,
+                markdown_content,
+                normalize_options,
+                *etag_parts,
+                weak=not raw_html
             )
+            matched = matching_etag(_get_header(event, "If-None-Match"), etag)
+            if matched:
+                logger.info("ETag matched, returning 304")
+                return not_modified(matched)
         
-        logger.info(f"Processing {content_size} bytes, output: {output_format}")
+        # 6. Reparación de defectos típicos de LLMs y pre-escaneo de
+        #    entradas patológicas (se rechazan o normalizan)
+        markdown_content, fixes = normalize(markdown_content, normalize_options)
+        if fixes:
+            logger.info(f"Input repaired: {fixes}")
         
-				# En front: https://www.freeformatter.com/json-escape.html#before-output
-				# Se debe formatear correctamente para que sea valido el json
-
-        # 5. Markdown -> HTML
         try:
-            html_content = md_to_html(markdown_content)
-            logger.info("Markdown converted to HTML successfully")
-        except Exception as e:
-            logger.error(f"Markdown conversion failed: {str(e)}")
+            markdown_content, prescan_report = enforce_limits(markdown_content)
+        except InputTooComplexError as e:
+            logger.warning(f"Input rejected by prescan: {e.metric}={e.value}")
             return error(
-                "Error al convertir Markdown",
+                "Contenido demasiado complejo para convertir",
                 status_code=422,
-                details={"error": str(e)}
+                error_code="INPUT_TOO_COMPLEX",
+                details={"metric": e.metric, "value": e.value, "limit": e.limit}
             )
+        if prescan_report["normalized"]:
+            logger.warning(f"Input normalized: {prescan_report['violations']}")
         
-        # 6. Si el output es HTML, se retorna directamente
-        if output_format == "html":
-            logger.info("Returning HTML content directly")
-            return success(
-                data={
-                    "html": html_content,
-                    "output_format": output_format,
-                    "size_bytes": len(html_content.encode('utf-8'))
-                },
-                message="Conversión completada exitosamente"
-            )
+        # 7. Markdown -> HTML (incremental: solo los bloques que cambiaron).
+        #    Un único formato con event_renderer no necesita el HTML: se
+        #    arma en el paso 9 a medida que se parsea cada bloque
+        budget_start = time.process_time()
+        streamed = bool(single and single.event_renderer and not multi_format)
+        html_content = None
+        if not streamed:
+            try:
+                with time_budget(), stats.timed("markdown"):
+                    if incremental:
+                        rendered = render_incremental(markdown_content, previous_blocks)
+                        html_content = rendered.pop("html", None)
+                    else:
+                        html_content = md_to_html(markdown_content)
+                logger.info("Markdown converted to HTML successfully")
+            except ConversionTimeoutError as e:
+                logger.error(f"Markdown conversion timed out: {str(e)}")
+                return _timeout_error(e)
+            except Exception as e:
+                logger.error(f"Markdown conversion failed: {str(e)}")
+                return error(
+                    "Error al convertir Markdown",
+                    status_code=422,
+                    details={"error": str(e)}
+                )
         
-        # 7. HTML -> DOCX
-        try:
-            docx_bytes = html_to_docx(html_content)
-            logger.info(f"HTML converted to DOCX: {len(docx_bytes)} bytes")
-        except Exception as e:
-            logger.error(f"DOCX conversion failed: {str(e)}")
-            return error(
-                "Error al generar documento DOCX",
-                status_code=500,
-                details={"error": str(e)}
+        # 8. Si el output es solo HTML, se retorna directamente (comprimido si aplica)
+        if single and single.inline and not multi_format:
+            logger.info("Returning HTML content directly")
+            if raw_html:
+                # El HTML es el body HTTP, sin escaparlo dentro de un JSON
+                response = raw(
+                    html_content,
+                    headers={"ETag": etag, "Access-Control-Expose-Headers": "ETag"}
+                )
+                _served(request_start)
+                return compress(response, _get_header(event, "Accept-Encoding"))
+            data = {"output_format": output_format}
+            if html_content is not None:
+                data["html"] = html_content
+                data["size_bytes"] = len(html_content.encode('utf-8'))
+            if incremental:
+                data.update(rendered)
+            _add_reports(data, prescan_report, fixes)
+            response = success(
+                data=data,
+                message="Conversión completada exitosamente",
+                headers={
+                    "ETag": etag,
+                    "Access-Control-Expose-Headers": "ETag"
+                }
             )
+            _served(request_start)
+            return compress(response, _get_header(event, "Accept-Encoding"))
         
-        # 8. Subida a S3 y su URL
-        try:
-            s3_client = S3Client(use_mock=False)
-            file_url = s3_client.upload_and_get_url(docx_bytes, output_format)
+        # 9. HTML (o eventos) -> formatos de archivo (con lo que queda del presupuesto de
+        #    CPU, compartido entre todos) y subida a S3
+        results = {}
+        inline = False
+        for file_format in formats:
+            if output_formats.get(file_format).inline:
+                inline = True
+                results[file_format] = {
+                    "html": html_content,
+                    "size_bytes": len(html_content.encode('utf-8'))
+                }
+                continue
+            
+            # Índice de encabezados que el renderer arma en la misma pasada
+            options = {}
+            if output_formats.get(file_format).outline:
+                options = {"toc": toc, "outline": []}
+            
+            # Modo pipeline: las partes del archivo se suben mientras se genera
+            tenant = _get_header(event, "X-Tenant-Id")
+            pipelined = config.UPLOAD_PIPELINE and output_formats.get(file_format).stream_renderer
+            file_url = None
+            try:
+                with time_budget(remaining_budget(budget_start)), stats.timed(f"render_{file_format}"):
+                    if pipelined:
+                        events = (
+                            markdown_events(markdown_content) if streamed
+                            else html_events(html_content)
+                        )
+                        file_url, file_size = get_storage_client().upload_pipelined(
+                            lambda output: output_formats.render_to(
+                                file_format, events, output, **options
+                            ),
+                            file_format,
+                            tenant=tenant
+                        )
+                    elif streamed:
+                        file_bytes = output_formats.render_events(
+                            file_format, markdown_events(markdown_content), **options
+                        )
+                    else:
+                        file_bytes = output_formats.render(file_format, html_content, **options)
+                if file_url is None:
+                    file_size = len(file_bytes)
+                logger.info(f"Converted to {file_format}: {file_size} bytes")
+            except ConversionTimeoutError as e:
+                logger.error(f"{file_format} conversion timed out: {str(e)}")
+                return _timeout_error(e)
+            except MarkdownConversionError as e:
+                logger.error(f"Markdown conversion failed: {str(e)}")
+                return error(
+                    "Error al convertir Markdown",
+                    status_code=422,
+                    details={"error": str(e)}
+                )
+            except StorageError as e:
+                logger.error(f"S3 upload failed: {str(e)}")
+                return error(
+                    "Error al subir archivo a S3",
+                    status_code=500,
+                    details={"error": str(e)}
+                )
+            except Exception as e:
+                logger.error(f"{file_format} conversion failed: {str(e)}")
+                return error(
+                    f"Error al generar documento {file_format.upper()}",
+                    status_code=500,
+                    details={"error": str(e)}
+                )
+            
+            if file_url is None:
+                try:
+                    with stats.timed("upload"):
+                        file_url = get_storage_client().upload_and_get_url(
+                            file_bytes, file_format, tenant=tenant
+                        )
+                except Exception as e:
+                    logger.error(f"S3 upload failed: {str(e)}")
+                    return error(
+                        "Error al subir archivo a S3",
+                        status_code=500,
+                        details={"error": str(e)}
+                    )
             logger.info(f"File uploaded to S3: {file_url}")
-        except Exception as e:
-            logger.error(f"S3 upload failed: {str(e)}")
-            return error(
-                "Error al subir archivo a S3",
-                status_code=500,
-                details={"error": str(e)}
-            )
-        
-        # 9. Respuesta exitosa
-        return success(
-            data={
+            
+            results[file_format] = {
                 "download_url": file_url,
-                "output_format": output_format,
-                "size_bytes": len(docx_bytes),
+                "size_bytes": file_size,
                 "expires_in": config.PRESIGNED_URL_EXPIRY
-            },
-            message="Conversión completada exitosamente"
+            }
+            if options:
+                results[file_format]["outline"] = options["outline"]
+        
+        # 10. Respuesta exitosa
+        if multi_format:
+            data = {"output_format": formats, "formats": results}
+        else:
+            data = {"output_format": output_format, **results[output_format]}
+        _add_reports(data, prescan_report, fixes)
+        
+        response = success(
+            data=data,
+            message="Conversión completada exitosamente",
+            headers=(
+                {"ETag": etag, "Access-Control-Expose-Headers": "ETag"}
+                if conditional else None
+            )
         )
+        if inline:
+            response = compress(response, _get_header(event, "Accept-Encoding"))
+        _served(request_start)
+        return response
         
     except Exception as e:
         logger.exception("Unhandled exception in lambda_handler")
         return internal_error(e)
 
 
+def stream_handler(event: Dict[str, Any], context: Any) -> StreamingResponse:
+    """
+    Variante en streaming del handler para HTML grande.
+    
+    Con output_format "html" el HTML sale bloque a bloque a medida que
+    se renderiza (incremental.iter_html): el primer byte no espera al
+    documento completo ni al sobre JSON. El body es el HTML (text/html),
+    como en el modo "raw". Cualquier otro pedido (otros formatos,
+    incremental, input_key, errores de validación) se resuelve con
+    lambda_handler y se entrega en un solo chunk.
+    
+    Lo usa local_server.py; en Lambda sirve detrás de un adaptador con
+    response streaming (el runtime de Python no lo expone directamente).
+    
+    Args:
+        event: Evento de API Gateway (igual que lambda_handler)
+        context: Contexto de Lambda
+    
+    Returns:
+        Tupla (status, headers, iterador de chunks en bytes)
+    
+    El body es el mismo que en modo "raw", así que comparte su ETag: con
+    If-None-Match vigente responde 304 sin renderizar.
+    """
+    request_start = time.perf_counter()
+    try:
+        body = json.loads(event.get("body") or "{}")
+    except json.JSONDecodeError:
+        body = None
+    
+    markdown_content = body.get("content") if isinstance(body, dict) else None
+    if (
+        _get_method(event) != "POST"
+        or not isinstance(markdown_content, str)
+        or not markdown_content
+        or body.get("output_format") != "html"
+        or any(body.get(field) is not None for field in ("input_key", "incremental", "previous_blocks"))
+        or len(markdown_content.encode("utf-8")) > config.MAX_FILE_SIZE_BYTES
+    ):
+        return buffered(lambda_handler(event, context))
+    
+    try:
+        normalize_options = resolve_options(body.get("normalize"))
+    except (ValueError, TypeError, AttributeError):
+        # lambda_handler arma la respuesta de error
+        return buffered(lambda_handler(event, context))
+    
+    etag = _etag("html", markdown_content, normalize_options, "raw")
+    matched = matching_etag(_get_header(event, "If-None-Match"), etag)
+    if matched:
+        logger.info("ETag matched, returning 304")
+        return buffered(not_modified(matched))
+    
+    try:
+        markdown_content, fixes = normalize(markdown_content, normalize_options)
+        markdown_content, _ = enforce_limits(markdown_content)
+    except InputTooComplexError:
+        return buffered(lambda_handler(event, context))
+    
+    logger.info(f"Streaming {len(markdown_content)} chars as HTML")
+    headers = {**HTML_HEADERS, "ETag": etag, "Access-Control-Expose-Headers": "ETag"}
+    return 200, headers, coalesce(_html_chunks(markdown_content, request_start))
+
+
+def _html_chunks(markdown_content: str, request_start: float) -> Iterator[str]:
+    """
+    HTML por bloque con el presupuesto de CPU del handler.
+    
+    El status ya salió cuando se excede el presupuesto: el stream se
+    corta con un comentario HTML. La conversión se cuenta en las
+    estadísticas (_served) recién al terminar el último bloque.
+    """
+    started = time.process_time()
+    blocks = iter_html(markdown_content)
+    try:
+        while True:
+            try:
+                with time_budget(remaining_budget(started)):
+                    html = next(blocks, None)
+            except ConversionTimeoutError as e:
+                logger.error(f"Streaming conversion timed out: {str(e)}")
+                yield "\n<!-- conversión interrumpida: el contenido es demasiado complejo -->"
+                return
+            if html is None:
+                _served(request_start)
+                return
+            yield html
+    finally:
+        blocks.close()
+
+
+def _etag(
+    output_format: str,
+    markdown_content: str,
+    normalize_options: Dict[str, bool],
+    *extra: str,
+    weak: bool = False
+) -> str:
+    """
+    ETag de una respuesta condicional.
+    
+    Args:
+        output_format: Formato pedido (lista serializada si son varios)
+        markdown_content: Markdown tal como llegó, antes de normalizar
+        normalize_options: Opciones resueltas del normalizador
+        *extra: Variantes de la representación (ej: bloques previos, "raw")
+        weak: ETag débil (respuestas con timestamp en el body)
+    """
+    return compute_etag(
+        __version__,
+        output_format,
+        markdown_content,
+        json.dumps(normalize_options, sort_keys=True),
+        *extra,
+        weak=weak
+    )
+
+
+def _served(request_start: float) -> None:
+    """Cuenta una conversión exitosa y su latencia total."""
+    stats.increment("conversions")
+    stats.observe("total", (time.perf_counter() - request_start) * 1000)
+
+
+def _create_upload(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Respuesta con la URL firmada para subir la entrada (PUT) al bucket.
+    
+    Args:
+        event: Evento de API Gateway (para el header X-Tenant-Id)
+    
+    Returns:
+        Dict con respuesta HTTP para API Gateway
+    """
+    try:
+        upload = get_storage_client().create_upload(
+            "md", tenant=_get_header(event, "X-Tenant-Id")
+        )
+    except Exception as e:
+        logger.error(f"Upload URL failed: {str(e)}")
+        return error(
+            "Error al generar URL de subida",
+            status_code=500,
+            details={"error": str(e)}
+        )
+    upload["max_size_bytes"] = config.MAX_FILE_SIZE_BYTES
+    return success(data=upload, message="Suba el archivo con PUT a upload_url")
+
+
+def _too_large() -> Dict[str, Any]:
+    """Respuesta 413 para entradas que superan MAX_FILE_SIZE_MB."""
+    return error(
+        f"Contenido demasiado grande. Máximo: {config.MAX_FILE_SIZE_MB}MB",
+        status_code=413
+    )
+
+
+def _parse_formats(requested: Any) -> Optional[List[str]]:
+    """
+    Valida output_format: un formato o una lista de formatos.
+    
+    Args:
+        requested: Valor de output_format en el body
+    
+    Returns:
+        Lista de formatos sin repetidos (en el orden pedido) o None si
+        el valor es inválido
+    """
+    values = requested if isinstance(requested, list) else [requested]
+    if not values or not all(isinstance(value, str) for value in values):
+        return None
+    
+    formats = list(dict.fromkeys(value.lower() for value in values))
+    supported = output_formats.supported()
+    if any(f not in supported for f in formats):
+        return None
+    return formats
+
+
+def _add_reports(
+    data: Dict[str, Any],
+    prescan_report: Dict[str, Any],
+    fixes: Dict[str, int]
+) -> None:
+    """Agrega a la respuesta las normalizaciones y reparaciones aplicadas."""
+    if prescan_report["normalized"]:
+        data["normalized"] = prescan_report["violations"]
+    if fixes:
+        data["fixes"] = fixes
+
+
+def _timeout_error(exception: ConversionTimeoutError) -> Dict[str, Any]:
+    """
+    Respuesta para conversiones que exceden el presupuesto de CPU.
+    
+    Args:
+        exception: Error de timeout capturado
+    
+    Returns:
+        Dict con error 422
+    """
+    return error(
+        "La conversión tardó demasiado, el contenido es demasiado complejo",
+        status_code=422,
+        error_code="CONVERSION_TIMEOUT",
+        details={"budget_seconds": exception.budget}
+    )
+
+
+def _get_method(event: Dict[str, Any]) -> Optional[str]:
+    """Método HTTP del evento (REST API o HTTP API v2)."""
+    http_method = event.get("httpMethod")  # REST API
+    if not http_method and "requestContext" in event:
+        # HTTP API v2
+        http_method = event.get("requestContext", {}).get("http", {}).get("method")
+    return http_method
+
+
+def _get_header(event: Dict[str, Any], name: str) -> Optional[str]:
+    """
+    Obtiene un header del evento sin importar mayúsculas.
+    
+    HTTP API v2 entrega los headers en minúsculas, REST API los deja
+    como los envió el cliente.
+    
+    Args:
+        event: Evento de API Gateway
+        name: Nombre del header
+    
+    Returns:
+        Valor del header o None si no existe
+    """
+    headers = event.get("headers") or {}
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return value
+    return None
+
+
 def health_check(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Endpoint de health check.
     
+    Además del estado incluye un snapshot del entorno (ver runtime_stats)
+    para ver caches, pools y latencias en producción sin revisar logs.
+    
     Returns:
-        Respuesta simple indicando que el servicio está funcionando
+        Respuesta indicando que el servicio está funcionando
     """
     return success(
         data={
             "status": "healthy",
-            "version": "0.1.0",
-            "environment": config.ENVIRONMENT
+            "version": __version__,
+            "environment": config.ENVIRONMENT,
+            "runtime": runtime_stats()
         },
         message="Service is running"
-    )
\ No newline at end of file
+    )
+
+
+def runtime_stats() -> Dict[str, Any]:
+    """
+    Snapshot del estado de este entorno de ejecución.
+    
+    Se arma con contadores que ya existen (ver app/utils/stats.py). Los
+    módulos que el entorno todavía no cargó (ej: el
+    builder DOCX si solo se pidió HTML) no se importan: su sección queda
+    afuera, así el health check no suma cold start.
+    
+    Returns:
+        Dict con conversions, latency (p50/p95 por etapa), caches,
+        engine_pool, templates, memory, uptime_seconds y priming
+    """
+    caches = {"markdown_blocks": _hit_rate(incremental_cache_info())}
+    templates = {}
+    
+    images = sys.modules.get("app.converter.images")
+    if images is not None:
+        caches["images"] = _hit_rate(images.cache_info())
+    docx_stream = sys.modules.get("app.converter.docx_stream")
+    if docx_stream is not None:
+        templates["docx_stream"] = docx_stream._template.cache_info()._asdict()
+    style_index = sys.modules.get("app.converter.style_index")
+    if style_index is not None:
+        templates["styles"] = style_index.cache_info()
+    storage_client = s3_client._storage_client
+    if storage_client is not None:
+        caches["presigned_urls"] = _hit_rate(storage_client.presigner.cache_info())
+    
+    return {
+        "conversions": stats.counters().get("conversions", 0),
+        "latency": stats.latencies(),
+        "caches": caches,
+        "engine_pool": engine_pool_info(),
+        "templates": templates,
+        "memory": {"peak_rss_mb": stats.peak_rss_mb()},
+        "uptime_seconds": stats.uptime_seconds(),
+        "priming": _prime_report
+    }
+
+
+def _hit_rate(info: Dict[str, Any]) -> Dict[str, Any]:
+    """Agrega hit_rate a un cache_info con hits y misses."""
+    lookups = info.get("hits", 0) + info.get("misses", 0)
+    return {**info, "hit_rate": round(info.get("hits", 0) / lookups, 3) if lookups else None}
+
+
+# Documento chico con los elementos comunes (encabezados, listas, tabla,
+# código resaltado) para ejercitar cada etapa en el init
+PRIME_MARKDOWN = """# Título
+
+Párrafo con **negrita**, *cursiva*, `código` y [un link](https://example.com).
+
+## Lista
+
+- Uno
+- Dos
+  1. Anidado
+
+| A | B |
+|---|---|
+| 1 | 2 |
+
+```python
+def f(x):
+    return x * 2
+```
+"""
+
+
+# Tiempos de la última ejecución de prime() (para health_check)
+_prime_report: Dict[str, float] = {}
+
+
+def prime() -> Dict[str, float]:
+    """
+    Precalienta el entorno con una conversión mínima (fase de init).
+    
+    Carga las extensiones de Markdown y el pool de engines, parsea la
+    plantilla DOCX (caches de template y estilos), inicializa lxml y crea
+    el cliente de almacenamiento (modelos de boto3 y firma de URLs, sin
+    llamadas de red). Un error en una etapa se registra y no impide el
+    init: el primer request paga ese costo como antes.
+    
+    Returns:
+        Dict etapa -> milisegundos
+    """
+    report: Dict[str, float] = {}
+    
+    def stage(name, fn):
+        start = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            logger.warning(f"Priming stage {name} failed: {str(e)}")
+        report[name] = round((time.perf_counter() - start) * 1000, 2)
+    
+    def storage():
+        client = get_storage_client()
+        presign_many = getattr(client.backend, "presign_many", None)
+        if presign_many is not None:
+            presign_many(["prime"], 60)
+    
+    stage("markdown", lambda: md_to_html(PRIME_MARKDOWN))
+    for name in output_formats.supported():
+        output_format = output_formats.get(name)
+        if output_format.event_renderer:
+            stage(name, lambda: output_formats.render_events(name, markdown_events(PRIME_MARKDOWN)))
+        elif output_format.renderer:
+            stage(name, lambda: output_formats.render(name, md_to_html(PRIME_MARKDOWN)))
+    stage("storage", storage)
+    
+    logger.info(f"Primed in {sum(report.values()):.1f} ms: {report}")
+    _prime_report.clear()
+    _prime_report.update(report)
+    return report
+
+
+if config.PRIME_ON_INIT:
+    prime()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Servidor HTTP local SIN AWS (solo librería estándar).
+
+Expone el handler de Lambda para probar el frontend o hacer pruebas de
+carga en la máquina local:
+
+    POST /convert          lambda_handler (respuesta completa)
+    POST /convert/stream   stream_handler: HTML en chunks
+                           (Transfer-Encoding: chunked)
+    GET  /health           health_check
+
+ex: python local_server.py            (puerto 8000)
+    python local_server.py 9000
+"""
+
+import sys
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from app.utils.streaming import buffered
+from handler import health_check, lambda_handler, stream_handler
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """Traduce cada request HTTP a un evento de API Gateway."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path.split("?")[0] == "/health":
+            self._send(*buffered(health_check(self._event("GET"), self._context())))
+        else:
+            self._send(*buffered({"statusCode": 404, "body": ""}))
+
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        event = self._event("POST")
+        if path == "/convert/stream":
+            self._send(*stream_handler(event, self._context()), chunked=True)
+        elif path in ("/", "/convert"):
+            self._send(*buffered(lambda_handler(event, self._context())))
+        else:
+            self._send(*buffered({"statusCode": 404, "body": ""}))
+
+    def _event(self, method: str) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return {
+            "httpMethod": method,
+            "path": self.path,
+            "headers": dict(self.headers.items()),
+            "body": self.rfile.read(length).decode("utf-8") if length else ""
+        }
+
+    @staticmethod
+    def _context() -> SimpleNamespace:
+        return SimpleNamespace(aws_request_id=str(uuid.uuid4()))
+
+    def _send(self, status: int, headers: dict, chunks, chunked: bool = False) -> None:
+        # 304 (ETag vigente) no lleva body, ni siquiera el chunk final
+        chunked = chunked and status != 304
+        if not chunked:
+            body = b"".join(chunks)
+            headers = {**headers, "Content-Length": str(len(body))}
+            chunks = [body] if body else []
+        else:
+            headers = {**headers, "Transfer-Encoding": "chunked"}
+
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        for chunk in chunks:
+            if chunked:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+                self.wfile.flush()
+            else:
+                self.wfile.write(chunk)
+        if chunked:
+            self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def serve(port: int = 8000, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Crea el servidor (sin arrancarlo).
+
+    Args:
+        port: Puerto (0 = uno libre)
+        host: Interfaz donde escuchar
+
+    Returns:
+        ThreadingHTTPServer listo para serve_forever()
+    """
+    return ThreadingHTTPServer((host, port), RequestHandler)
+
+
+if __name__ == "__main__":
+    server = serve(int(sys.argv[1]) if len(sys.argv) > 1 else 8000)
+    print(f"Escuchando en http://{server.server_address[0]}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
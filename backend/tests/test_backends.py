@@ -0,0 +1,413 @@
+"""
+Tests para los backends de almacenamiento (S3, filesystem y memoria).
+"""
+
+import json
+import os
+import time
+from io import BytesIO
+from types import SimpleNamespace
+
+import pytest
+
+from app.config import config
+from app.converter.exceptions import (
+    DeleteError,
+    FileTooLargeError,
+    InvalidInputError,
+    ObjectNotFoundError,
+    StorageError
+)
+from app.storage import backends, s3_client
+from app.storage.backends import FilesystemBackend, MemoryBackend, S3Backend
+from app.storage.presign import PresignService, QuerySigner
+from app.storage.s3_client import S3Client
+
+
+@pytest.fixture(params=["s3", "filesystem", "memory"])
+def backend(request, tmp_path, monkeypatch):
+    if request.param == "s3":
+        monkeypatch.setattr(config, "BUCKET_NAME", "test-bucket")
+        request.getfixturevalue("mock_s3_bucket")
+        return S3Backend()
+    if request.param == "filesystem":
+        return FilesystemBackend(tmp_path / "storage", ttl=0)
+    return MemoryBackend()
+
+
+class TestProtocol:
+    """Tests que todos los backends cumplen el mismo protocolo."""
+
+    def test_put_exists_delete(self, backend):
+        """Test ciclo completo de un objeto."""
+        backend.put("ab/doc.txt", b"hola", "text/plain")
+
+        assert backend.exists("ab/doc.txt")
+        assert not backend.exists("ab/otro.txt")
+        assert backend.delete(["ab/doc.txt"]) == 1
+        assert not backend.exists("ab/doc.txt")
+
+    def test_put_stream(self, backend):
+        """Test subida desde un archivo binario."""
+        backend.put_stream("big.bin", BytesIO(b"x" * 100_000), "application/octet-stream")
+
+        assert backend.exists("big.bin")
+
+    def test_presign_roundtrip(self, backend):
+        """Test que la URL firmada vuelve a la misma key."""
+        backend.put("t/a b.txt", b"x", "text/plain")
+
+        url = backend.presign("t/a b.txt", 300)
+
+        assert backend.key_from_url(url) == "t/a b.txt"
+
+    def test_multipart(self, backend):
+        """Test subida por partes y abort de una subida sin completar."""
+        first = b"a" * (5 * 1024 * 1024)
+        upload_id = backend.create_multipart("mp/doc.bin", "application/octet-stream")
+        etags = [
+            backend.upload_part("mp/doc.bin", upload_id, 1, first),
+            backend.upload_part("mp/doc.bin", upload_id, 2, b"fin")
+        ]
+        backend.complete_multipart("mp/doc.bin", upload_id, etags)
+        aborted = backend.create_multipart("mp/otro.bin", "application/octet-stream")
+        backend.upload_part("mp/otro.bin", aborted, 1, b"x")
+        backend.abort_multipart("mp/otro.bin", aborted)
+
+        stream, size, _ = backend.open("mp/doc.bin")
+        assert size == len(first) + 3
+        assert stream.read()[-4:] == b"afin"
+        stream.close()
+        assert not backend.exists("mp/otro.bin")
+
+    def test_open(self, backend):
+        """Test lectura en streaming con el tamaño del objeto."""
+        backend.put("in/doc.md", b"# Hola", "text/markdown")
+
+        stream, size, _ = backend.open("in/doc.md")
+
+        assert size == 6
+        assert stream.read() == b"# Hola"
+        stream.close()
+        with pytest.raises(ObjectNotFoundError):
+            backend.open("in/otro.md")
+
+
+class FakePaginator:
+    """Paginador de list_object_versions con páginas fijas."""
+
+    def __init__(self, pages, calls):
+        self._pages = pages
+        self._calls = calls
+
+    def paginate(self, Bucket, Prefix):
+        self._calls.append(Prefix)
+        for page in self._pages:
+            yield {**page, "Versions": [e for e in page["Versions"] if e["Key"].startswith(Prefix)]}
+
+
+class TestObjectVersions:
+    """Tests para el listado de versiones antes de borrar."""
+
+    def _backend(self, pages, calls):
+        return S3Backend(s3=SimpleNamespace(get_paginator=lambda name: FakePaginator(pages, calls)))
+
+    def test_truncated_prefix_listing_falls_back_per_key(self):
+        """Test que un listado por prefijo que excede sus páginas sigue key por key."""
+        version = lambda key, v: {"Key": key, "VersionId": v}
+        pages = [
+            {"Versions": [version("d/a", "1"), version("d/b", "1"), version("d/b", "2")],
+             "IsTruncated": True, "NextKeyMarker": "d/b"},
+            {"Versions": [version("d/b", "3"), version("d/c", "1")],
+             "IsTruncated": True, "NextKeyMarker": "d/c"},
+            {"Versions": [version("d/c", "2"), version("d/x", "1")], "IsTruncated": False},
+        ]
+        calls = []
+
+        objects = self._backend(pages, calls)._object_versions(["d/a", "d/c"])
+
+        # Dos keys: el listado de "d/" se corta en la segunda página y
+        # "d/c" (que podía seguir en la tercera) se lista sola
+        assert calls == ["d/", "d/c"]
+        assert sorted((o["Key"], o["VersionId"]) for o in objects) == [
+            ("d/a", "1"), ("d/c", "1"), ("d/c", "2")
+        ]
+
+
+class TestFilesystemBackend:
+    """Tests para el árbol de directorios local."""
+
+    def test_flat_keys_are_sharded(self, tmp_path):
+        """Test que una key sin directorio va a un shard por hash."""
+        storage = FilesystemBackend(tmp_path, ttl=0)
+
+        storage.put("doc.txt", b"x", "text/plain")
+
+        (path,) = [p for p in tmp_path.rglob("*") if p.is_file()]
+        assert path.parent.parent == tmp_path
+        assert len(path.parent.name) == 2
+
+    def test_ttl_cleanup(self, tmp_path):
+        """Test que la limpieza borra archivos viejos y directorios vacíos."""
+        storage = FilesystemBackend(tmp_path, ttl=60)
+        storage.put("old/a.txt", b"x", "text/plain")
+        storage.put("new/b.txt", b"x", "text/plain")
+        old = time.time() - 120
+        os.utime(tmp_path / "old" / "a.txt", (old, old))
+
+        assert storage.cleanup() == 1
+        assert not (tmp_path / "old").exists()
+        assert storage.exists("new/b.txt")
+
+    def test_rejects_keys_outside_root(self, tmp_path):
+        """Test que una key no puede salir del directorio raíz."""
+        storage = FilesystemBackend(tmp_path / "root", ttl=0)
+
+        with pytest.raises(StorageError):
+            storage.put("../fuera.txt", b"x", "text/plain")
+
+
+class TestInputUpload:
+    """Tests para la entrada subida directo al almacenamiento."""
+
+    @pytest.fixture
+    def client(self, monkeypatch):
+        monkeypatch.setattr(config, "S3_DELETE_INPUT", False)
+        return S3Client(backend=MemoryBackend())
+
+    def test_create_upload(self, client):
+        """Test que la key de entrada queda bajo S3_INPUT_PREFIX."""
+        upload = client.create_upload("md", expires_in=60)
+
+        assert upload["input_key"].startswith(config.S3_INPUT_PREFIX)
+        assert upload["input_key"].endswith(".md")
+        assert client.backend.key_from_url(upload["upload_url"]) == upload["input_key"]
+        assert upload["expires_in"] == 60
+
+    def test_read_input(self, client):
+        """Test lectura UTF-8 en varios chunks (caracteres partidos)."""
+        key = client.create_upload()["input_key"]
+        text = "ñandú " * 100_000
+        client.backend.put(key, text.encode("utf-8"), "text/markdown")
+
+        assert client.read_input(key, 10 * 1024 * 1024) == text
+
+    def test_read_input_too_large(self, client):
+        """Test que una entrada mayor al límite se rechaza."""
+        key = client.create_upload()["input_key"]
+        client.backend.put(key, b"x" * 101, "text/markdown")
+
+        with pytest.raises(FileTooLargeError) as exc:
+            client.read_input(key, 100)
+        assert exc.value.limit == 100
+
+    def test_read_input_rejects_other_keys(self, client):
+        """Test que solo se leen keys de entrada."""
+        client.backend.put("salida.docx", b"PK", "application/octet-stream")
+
+        for key in ("salida.docx", config.S3_INPUT_PREFIX + "../salida.docx"):
+            with pytest.raises(InvalidInputError):
+                client.read_input(key, 100)
+
+    def test_read_input_deletes_after_read(self, client, monkeypatch):
+        """Test que con S3_DELETE_INPUT la entrada se borra después de leerla."""
+        monkeypatch.setattr(config, "S3_DELETE_INPUT", True)
+        key = client.create_upload()["input_key"]
+        client.backend.put(key, b"# Hola", "text/markdown")
+
+        client.read_input(key, 100)
+        client.deferred.flush(force=True)
+
+        assert not client.backend.exists(key)
+
+    def test_read_input_denied_delete_is_dropped(self, client, monkeypatch):
+        """Test que un borrado de entrada sin permisos no queda reintentándose."""
+        monkeypatch.setattr(config, "S3_DELETE_INPUT", True)
+        key = client.create_upload()["input_key"]
+        client.backend.put(key, b"# Hola", "text/markdown")
+
+        calls = []
+
+        def denied(objects, all_versions=False):
+            calls.append(objects)
+            raise DeleteError(
+                "Error al eliminar archivo: AccessDenied",
+                errors=[{"Key": key, "Code": "AccessDenied"}]
+            )
+        monkeypatch.setattr(client.backend, "delete", denied)
+
+        assert client.read_input(key, 100) == "# Hola"
+        # El borrado corre en el thread de la cola (o acá, si no llegó)
+        try:
+            client.deferred.flush(force=True)
+        except StorageError:
+            pass
+        for _ in range(50):
+            if calls and len(client.deferred) == 0:
+                break
+            time.sleep(0.01)
+
+        assert len(calls) == 1
+        assert len(client.deferred) == 0
+
+
+class CountingBackend(MemoryBackend):
+    """Backend en memoria que cuenta las llamadas a presign_many."""
+
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def presign_many(self, keys, expires_in):
+        self.batches.append(list(keys))
+        return super().presign_many(keys, expires_in)
+
+
+class TestPresign:
+    """Tests para la firma en lote y el cache de URLs."""
+
+    def test_signer_matches_botocore(self, monkeypatch):
+        """Test que la firma compartida es la misma que la de botocore."""
+        import datetime as dt
+        from urllib.parse import parse_qs, urlsplit
+        from botocore import auth
+        from botocore.awsrequest import AWSRequest
+        from botocore.credentials import Credentials
+
+        now = dt.datetime(2024, 5, 31, 12, 0, 0)
+        monkeypatch.setattr(auth.datetime, "datetime", type(
+            "FixedDatetime", (dt.datetime,), {"utcnow": classmethod(lambda cls: now)}
+        ))
+        url = "https://test-bucket.s3.amazonaws.com/dir/a%20b%2B%C3%B1.docx"
+        request = AWSRequest(method="GET", url=url)
+        auth.S3SigV4QueryAuth(
+            Credentials("AKID", "secreto", "token/x+y"), "s3", "us-east-1", expires=300
+        ).add_auth(request)
+        signer = QuerySigner("AKID", "secreto", "us-east-1", token="token/x+y")
+
+        query = signer.sign(
+            "test-bucket.s3.amazonaws.com", "/dir/a%20b%2B%C3%B1.docx", 300,
+            now.replace(tzinfo=dt.timezone.utc)
+        )
+
+        assert parse_qs(query) == parse_qs(urlsplit(request.url).query)
+
+    def test_s3_presign_many(self, monkeypatch, mock_s3_bucket):
+        """Test que el lote de S3 respeta el endpoint y las keys."""
+        monkeypatch.setattr(config, "BUCKET_NAME", "test-bucket")
+        storage = S3Backend()
+        keys = ["a.docx", "dir/b c.docx"]
+
+        urls = storage.presign_many(keys, 300)
+
+        assert [storage.key_from_url(url) for url in urls] == keys
+        assert all("X-Amz-Signature=" in url and "X-Amz-Expires=300" in url for url in urls)
+
+    def test_cache_reuses_urls(self):
+        """Test que las URLs cacheadas no se vuelven a firmar."""
+        backend = CountingBackend()
+        presigner = PresignService(backend, cache_size=10, margin=30)
+
+        first = presigner.urls(["a", "b"], 300)
+        second = presigner.urls(["b", "c", "c"], 300)
+
+        assert backend.batches == [["a", "b"], ["c"]]
+        assert second["b"] == first["b"]
+        assert presigner.cache_info() == {"hits": 1, "misses": 3, "size": 3}
+
+    def test_cache_expires_before_url(self, monkeypatch):
+        """Test que no se reutiliza una URL a la que le queda menos del margen."""
+        backend = CountingBackend()
+        presigner = PresignService(backend, cache_size=10, margin=30)
+        clock = [1000.0]
+        monkeypatch.setattr("app.storage.presign.time.time", lambda: clock[0])
+
+        presigner.url("a", 60)
+        clock[0] += 20
+        presigner.url("a", 60)
+        clock[0] += 20
+        presigner.url("a", 60)
+
+        assert backend.batches == [["a"], ["a"]]
+
+    def test_cache_needs_requested_validity(self, monkeypatch):
+        """Test que una URL cacheada no se usa para un expires_in mayor."""
+        backend = CountingBackend()
+        presigner = PresignService(backend, cache_size=10, margin=30)
+        monkeypatch.setattr("app.storage.presign.time.time", lambda: 1000.0)
+
+        presigner.url("a", 60)
+        long = presigner.url("a", 3600)
+
+        assert backend.batches == [["a"], ["a"]]
+        assert presigner.url("a", 60) == long
+
+    def test_credentials_rotation_clears_cache(self):
+        """Test que al renovarse las credenciales no se reutilizan URLs viejas."""
+        backend = CountingBackend()
+        backend.generation = 1
+        backend.signer_generation = lambda: backend.generation
+        presigner = PresignService(backend, cache_size=10, margin=30)
+
+        presigner.urls(["a", "b"], 300)
+        backend.generation = 2
+        presigner.urls(["a"], 300)
+
+        assert backend.batches == [["a", "b"], ["a"]]
+        assert presigner.cache_info()["size"] == 1
+
+    def test_s3_signer_generation_follows_credentials(self, monkeypatch, mock_s3_bucket):
+        """Test que S3Backend cambia de generación cuando cambian las credenciales."""
+        from botocore.credentials import Credentials
+        storage = S3Backend()
+        signer = storage.s3._request_signer
+        monkeypatch.setattr(signer, "_credentials", Credentials("AKID", "secreto", "sesion-1"))
+
+        first = storage.signer_generation()
+        assert storage.signer_generation() == first
+        monkeypatch.setattr(signer, "_credentials", Credentials("AKID2", "secreto2", "sesion-2"))
+
+        assert storage.signer_generation() == first + 1
+
+    def test_delete_invalidates(self):
+        """Test que borrar un archivo descarta su URL cacheada."""
+        client = S3Client(backend=CountingBackend())
+        url = client.upload_and_get_url(b"x", "txt")
+        key = client._key_from_url(url)
+
+        client.delete_file(url)
+
+        assert client.presigner.cache_info()["size"] == 0
+        assert client.get_urls([key])[key] == url
+        assert len(client.backend.batches) == 2
+
+
+class TestSelection:
+    """Tests para la selección del backend por configuración."""
+
+    def test_create_from_config(self, monkeypatch, tmp_path):
+        """Test que STORAGE_BACKEND elige la implementación."""
+        monkeypatch.setattr(config, "STORAGE_FS_ROOT", str(tmp_path))
+        for name, cls in (("memory", MemoryBackend), ("filesystem", FilesystemBackend)):
+            monkeypatch.setattr(config, "STORAGE_BACKEND", name)
+            assert isinstance(backends.create(), cls)
+
+        with pytest.raises(ValueError):
+            backends.create("ftp")
+
+    def test_handler_with_memory_backend(self, mock_lambda_context, monkeypatch):
+        """Test el handler completo sin disco ni red."""
+        from handler import lambda_handler
+        storage = MemoryBackend()
+        monkeypatch.setattr(s3_client, "_storage_client", S3Client(backend=storage))
+
+        response = lambda_handler({
+            "httpMethod": "POST",
+            "body": json.dumps({"content": "# Hola", "output_format": "docx"})
+        }, mock_lambda_context)
+        data = json.loads(response["body"])["data"]
+
+        assert response["statusCode"] == 200
+        content, content_type = storage.get(storage.key_from_url(data["download_url"]))
+        assert content.startswith(b"PK")
+        assert content_type.endswith("wordprocessingml.document")
@@ -0,0 +1,549 @@
+"""
+Tests para el builder rápido de DOCX.
+
+La suite de fidelidad compara el builder contra htmldocx a nivel
+semántico: estilos y propiedades de párrafo, texto y formato de cada
+run, links, tablas e imágenes. Se ignoran los runs y párrafos vacíos
+que htmldocx genera con el espacio entre tags, la alineación de las
+celdas (htmldocx la descarta) y el formato de los bloques de código,
+que se comparan solo por texto.
+"""
+
+import random
+import time
+from io import BytesIO
+
+import pytest
+from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml.ns import qn
+from htmldocx import HtmlToDocx
+
+from app.config import config
+from app.converter import docx_patch, style_index
+from app.converter.docx_builder import add_html as build
+from app.converter.html_to_docx import add_html, convert
+from app.converter.markdown_to_html import convert as md_to_html
+from tests.test_docx_patch import _png_file
+
+
+FIDELITY_SAMPLES = {
+    "headings": "# H1\n\n## H2\n\n###### H6",
+    "inline": "Texto **negrita**, *cursiva*, ***ambas*** y `código` &amp; <sup>2</sup>",
+    "line_breaks": "Primera línea\nsegunda **negrita**\ntercera",
+    "links": "Ver [el sitio](https://example.com) y [otro](https://example.com/b).",
+    "lists": "- uno\n- dos\n    - anidado\n\n1. primero\n2. segundo",
+    "blockquote": "> Cita con **énfasis**",
+    "rule": "Antes\n\n---\n\nDespués",
+    "table": "| A | B |\n|:--|--:|\n| `1` | **2** |\n| 3 |",
+    "code": "```python\ndef f():\n\treturn 1 < 2\n```",
+    "indented_code": "    x = 1\n    y = 2",
+}
+
+
+def _semantic(document) -> list:
+    """Vista semántica del body, independiente de runs vacíos."""
+    result = []
+    for child in document.element.body:
+        if child.tag == qn("w:p"):
+            paragraph = _semantic_paragraph(child)
+            if paragraph:
+                result.append(paragraph)
+        elif child.tag == qn("w:tbl"):
+            rows = tuple(
+                tuple(
+                    tuple(filter(None, (
+                        _semantic_paragraph(p, ignore=(qn("w:jc"),))
+                        for p in tc.iter(qn("w:p"))
+                    )))
+                    for tc in tr.iter(qn("w:tc"))
+                )
+                for tr in child.iter(qn("w:tr"))
+            )
+            result.append(("table", rows))
+    return result
+
+
+def _properties(element, ignore: tuple = ()) -> tuple:
+    if element is None:
+        return ()
+    return tuple(sorted(
+        (child.tag, tuple(sorted(child.attrib.items())), len(child))
+        for child in element
+        if child.tag not in ignore
+    ))
+
+
+def _semantic_paragraph(p, ignore: tuple = ()):
+    runs = []
+    for r in p.iter(qn("w:r")):
+        text = ""
+        for child in r:
+            if child.tag == qn("w:t"):
+                text += child.text or ""
+            elif child.tag == qn("w:br"):
+                text += "\n"
+            elif child.tag == qn("w:tab"):
+                text += "\t"
+            elif child.tag == qn("w:drawing"):
+                text += "[image]"
+        if not text:
+            continue
+        key = (_properties(r.find(qn("w:rPr"))), r.getparent().tag == qn("w:hyperlink"))
+        if runs and runs[-1][0] == key:
+            runs[-1][1] += text
+        else:
+            runs.append([key, text])
+
+    pPr = p.find(qn("w:pPr"))
+    if not runs and (pPr is None or pPr.find(qn("w:pBdr")) is None):
+        return None
+    if _is_code_paragraph(p, runs):
+        text = "".join(text for _, text in runs)
+        return ("code", text[:-1] if text.endswith("\n") else text)
+    return (_properties(pPr, ignore), tuple((key, text) for key, text in runs))
+
+
+def _is_code_paragraph(p, runs) -> bool:
+    """Bloque de código: estilo MacroText (builder) o todo en Courier (htmldocx)."""
+    style = p.find(f"{qn('w:pPr')}/{qn('w:pStyle')}")
+    if style is not None:
+        return style.get(qn("w:val")) == "MacroText"
+    return all(
+        any(child[0] == qn("w:rFonts") for child in key[0]) and not key[1]
+        for key, _ in runs
+    )
+
+
+def _both(html: str):
+    reference = Document()
+    HtmlToDocx().add_html_to_document(html, reference)
+    fast = Document()
+    build(fast, html)
+    return reference, fast
+
+
+def _random_markdown(rng: random.Random) -> str:
+    """Documento aleatorio con el subconjunto que emite el conversor."""
+    inline = [
+        "palabra", "**negrita**", "*cursiva*", "`código`", "***ambas***",
+        "[link](https://example.com/x)", "a & b", "1 < 2", "x  \ny", "texto\nmás",
+    ]
+
+    def text():
+        return " ".join(rng.choice(inline) for _ in range(rng.randint(1, 5)))
+
+    def table():
+        columns = rng.randint(1, 4)
+        rows = ["|" + "|".join(text() for _ in range(columns)) + "|"]
+        rows.append("|" + "|".join(rng.choice(["---", ":--", "--:", ":-:"]) for _ in range(columns)) + "|")
+        for _ in range(rng.randint(1, 4)):
+            rows.append("|" + "|".join(rng.choice(["", text()]) for _ in range(columns)) + "|")
+        return "\n".join(rows)
+
+    blocks = [
+        lambda: "#" * rng.randint(1, 6) + " " + text(),
+        text,
+        lambda: "\n".join(f"- {text()}" for _ in range(rng.randint(1, 4))),
+        lambda: "\n".join(f"{i + 1}. {text()}" for i in range(rng.randint(1, 4))),
+        lambda: "> " + text(),
+        lambda: "---",
+        table,
+        lambda: "```\n" + "\n".join(rng.choice(["x = 1", "  y", "\tz", "a<b>"]) for _ in range(3)) + "\n```",
+    ]
+    return "\n\n".join(rng.choice(blocks)() for _ in range(rng.randint(1, 8)))
+
+
+class TestFidelity:
+    """Tests de equivalencia con htmldocx."""
+
+    @pytest.mark.parametrize("name", sorted(FIDELITY_SAMPLES))
+    def test_sample_matches_htmldocx(self, name):
+        """Test que cada construcción produce el mismo contenido."""
+        reference, fast = _both(md_to_html(FIDELITY_SAMPLES[name]))
+
+        assert _semantic(fast) == _semantic(reference)
+
+    def test_complex_document_matches_htmldocx(self, complex_markdown):
+        """Test con el documento complejo compartido."""
+        reference, fast = _both(md_to_html(complex_markdown))
+
+        assert _semantic(fast) == _semantic(reference)
+
+    def test_image_matches_htmldocx(self, temp_dir):
+        """Test que las imágenes se insertan igual."""
+        image = _png_file(temp_dir / "pixel.png")
+        reference, fast = _both(md_to_html(f"![pixel]({image})"))
+
+        assert _semantic(fast) == _semantic(reference)
+        assert len(fast.inline_shapes) == 1
+
+    def test_missing_image_placeholder(self):
+        """Test placeholder sin exponer la ruta local."""
+        reference, fast = _both(md_to_html("![x](/no/existe/foto.png)"))
+
+        assert _semantic(fast) == _semantic(reference)
+        assert fast.paragraphs[0].text == "<image: foto.png>"
+
+    def test_random_documents_match_htmldocx(self):
+        """Test de equivalencia con documentos aleatorios."""
+        rng = random.Random(2024)
+        for _ in range(40):
+            markdown = _random_markdown(rng)
+            html = md_to_html(markdown)
+            if "<li>\n<p>" in html:
+                # Listas "loose": diferencia intencional (ver TestImprovements)
+                continue
+            reference, fast = _both(html)
+
+            assert _semantic(fast) == _semantic(reference), markdown
+
+
+class TestImprovements:
+    """Diferencias intencionales respecto a htmldocx."""
+
+    def test_no_empty_paragraphs_or_runs(self):
+        """Test que el espacio entre tags no genera contenido vacío."""
+        document = Document()
+        build(document, md_to_html(FIDELITY_SAMPLES["table"] + "\n\nFinal"))
+
+        body = document.element.body
+        assert not [r for r in body.iter(qn("w:r")) if len(r) == 0]
+        assert [p.text for p in document.paragraphs] == ["Final"]
+
+    def test_loose_list_keeps_list_style(self):
+        """Test que los ítems con <p> conservan el estilo de lista."""
+        document = Document()
+        build(document, md_to_html("- uno\n\n- dos"))
+
+        assert [p.style.name for p in document.paragraphs] == ["List Bullet", "List Bullet"]
+        assert [p.text for p in document.paragraphs] == ["uno", "dos"]
+
+    def test_break_after_link_follows_link(self):
+        """Test que el salto después de un link queda después del link."""
+        document = Document()
+        build(document, md_to_html("antes [link](https://example.com)\ndespués"))
+
+        paragraph = document.element.body[0]
+        tags = [child.tag for child in paragraph]
+        assert tags.index(qn("w:hyperlink")) < len(tags) - 2
+        assert paragraph[-2].find(qn("w:br")) is not None
+
+    def test_link_relationships_are_reused(self, tmp_path):
+        """Test que un mismo href comparte su rId y los nuevos no pisan otras relaciones."""
+        document = Document()
+        existing = document.part.relate_to("https://example.com/a", RT.HYPERLINK, is_external=True)
+        build(document, md_to_html(
+            f"[a](https://example.com/a) ![img]({_png_file(tmp_path / 'x.png')}) [b](https://example.com/b) "
+            "[a otra vez](https://example.com/a)"
+        ))
+
+        rels = document.part.rels
+        ids = [h.get(qn("r:id")) for h in document.element.body.iter(qn("w:hyperlink"))]
+        assert ids[0] == ids[2] == existing
+        assert rels[ids[1]].target_ref == "https://example.com/b"
+        assert len(rels) == len(set(rels))
+        hyperlinks = [rel for rel in rels.values() if rel.reltype == RT.HYPERLINK]
+        assert len(hyperlinks) == 2
+
+    def test_builder_is_context_free(self):
+        """Test que agregar HTML no modifica el último párrafo existente."""
+        document = Document()
+        build(document, "<p>uno</p>")
+        before = document.paragraphs[0]._p.xml
+
+        build(document, "\n<p>dos</p>\n")
+
+        assert document.paragraphs[0]._p.xml == before
+        assert [p.text for p in document.paragraphs] == ["uno", "dos"]
+
+
+class TestBackendSwitch:
+    """Tests para la selección de backend."""
+
+    def test_both_backends_produce_valid_docx(self, monkeypatch):
+        """Test que ambos backends generan DOCX legibles."""
+        html = md_to_html(FIDELITY_SAMPLES["lists"])
+        for backend in ("fast", "htmldocx"):
+            monkeypatch.setattr(config, "DOCX_BACKEND", backend)
+            document = Document(BytesIO(convert(html)))
+
+            assert "anidado" in [p.text for p in document.paragraphs]
+
+    def test_unknown_backend_raises_error(self):
+        """Test que un backend desconocido lanza error."""
+        with pytest.raises(ValueError, match="no soportado"):
+            add_html(Document(), "<p>x</p>", backend="otro")
+
+    def test_block_map_from_other_backend_is_ignored(self, monkeypatch):
+        """Test que un mapa de otro backend fuerza render completo."""
+        monkeypatch.setattr(config, "DOCX_BACKEND", "htmldocx")
+        previous = docx_patch.render("# A\n\nTexto")["docx"]
+
+        monkeypatch.setattr(config, "DOCX_BACKEND", "fast")
+        patched = docx_patch.patch(previous, "# A\n\nTexto editado")
+
+        assert patched["mode"] == "full"
+
+
+def _markdown_table(rows: int, columns: int = 4) -> str:
+    lines = [
+        "|" + "|".join(f"Col {c}" for c in range(columns)) + "|",
+        "|" + "|".join(["---"] * columns) + "|",
+    ]
+    for r in range(rows):
+        lines.append("|" + "|".join(f"r{r} c{c}" for c in range(columns)) + "|")
+    return "\n".join(lines)
+
+
+class TestTables:
+    """Tests para la construcción de tablas en una pasada."""
+
+    def _table(self, markdown: str, backend: str = "fast"):
+        document = Document()
+        add_html(document, md_to_html(markdown), backend=backend)
+        return document, document.element.body.find(qn("w:tbl"))
+
+    def test_header_row_repeats(self):
+        """Test que solo la fila de encabezado se repite en cada página."""
+        _, tbl = self._table(_markdown_table(3))
+
+        rows = tbl.findall(qn("w:tr"))
+        assert rows[0].find(f"{qn('w:trPr')}/{qn('w:tblHeader')}") is not None
+        assert all(row.find(qn("w:trPr")) is None for row in rows[1:])
+
+    def test_alignment_from_markdown(self):
+        """Test que la alineación de columnas llega a los párrafos."""
+        document, _ = self._table("| A | B | C |\n|:--|:-:|--:|\n| 1 | 2 | 3 |")
+
+        cells = document.tables[0].rows[1].cells
+        assert [cell.paragraphs[0].alignment for cell in cells] == [None, 1, 2]
+
+    def test_column_widths_follow_content(self):
+        """Test que las columnas con más texto son más anchas."""
+        markdown = "| Id | Descripción |\n|---|---|\n| 1 | " + "texto largo " * 5 + "|"
+        document, tbl = self._table(markdown)
+
+        widths = [int(col.get(qn("w:w"))) for col in tbl.iter(qn("w:gridCol"))]
+        section = document.sections[-1]
+        available = (section.page_width - section.left_margin - section.right_margin) / 635
+        assert widths[1] > widths[0] * 5
+        assert sum(widths) <= available
+        cell_widths = [int(tc.find(f"{qn('w:tcPr')}/{qn('w:tcW')}").get(qn("w:w")))
+                       for tc in tbl.iter(qn("w:tc"))]
+        assert cell_widths == widths * 2
+
+    def test_table_style_uses_style_index(self, monkeypatch):
+        """Test que el estilo configurado sale del índice, sin búsquedas lineales."""
+        monkeypatch.setattr(config, "DOCX_TABLE_STYLE", "Table Grid")
+        document = Document()
+        styles = type(document.styles)
+        lookups = []
+        original = styles.__getitem__
+        monkeypatch.setattr(
+            styles, "__getitem__",
+            lambda self, key: lookups.append(key) or original(self, key)
+        )
+
+        add_html(document, md_to_html("\n\n".join([_markdown_table(2)] * 3)))
+
+        assert lookups == []
+        assert [table.style.name for table in document.tables] == ["Table Grid"] * 3
+
+    def test_unknown_table_style_is_ignored(self, monkeypatch):
+        """Test que un estilo inexistente no rompe la conversión."""
+        monkeypatch.setattr(config, "DOCX_TABLE_STYLE", "No Existe")
+        _, tbl = self._table(_markdown_table(1))
+
+        assert tbl.find(f"{qn('w:tblPr')}/{qn('w:tblStyle')}") is None
+
+    def test_htmldocx_backend_uses_bulk_tables(self):
+        """Test que el backend htmldocx también arma la tabla en una pasada."""
+        document, tbl = self._table(_markdown_table(2), backend="htmldocx")
+
+        assert tbl.find(f"{qn('w:tr')}/{qn('w:trPr')}/{qn('w:tblHeader')}") is not None
+        assert document.tables[0].cell(2, 3).text == "r1 c3"
+
+    def test_table_build_is_linear(self):
+        """Test que el costo por celda no crece con el tamaño de la tabla."""
+        def per_cell(rows):
+            html = md_to_html(_markdown_table(rows))
+            start = time.perf_counter()
+            add_html(Document(), html)
+            return (time.perf_counter() - start) / (rows * 4)
+
+        per_cell(50)  # calentamiento
+        small, large = per_cell(200), per_cell(2000)
+
+        assert large < small * 3
+
+
+CODE_SAMPLE = "```python\ndef f(x):\n    # doble\n    return x * 2\n\n\nprint(f(2))\n```"
+
+
+class TestCodeBlocks:
+    """Tests para los bloques de código compactos."""
+
+    def _code_paragraph(self, markdown: str):
+        document = Document()
+        add_html(document, md_to_html(markdown))
+        return document, document.paragraphs[-1]
+
+    def test_one_paragraph_and_run_per_block(self):
+        """Test que un bloque sin resaltado es un párrafo con un run."""
+        document, paragraph = self._code_paragraph(CODE_SAMPLE)
+
+        assert len(document.paragraphs) == 1
+        assert paragraph.style.name == "macro"
+        assert len(paragraph.runs) == 1
+        assert paragraph.runs[0].style.name == "Macro Text Char"
+        assert paragraph.text == "def f(x):\n    # doble\n    return x * 2\n\n\nprint(f(2))"
+
+    def test_large_block_stays_compact(self):
+        """Test que 2000 líneas no generan runs ni párrafos por línea."""
+        lines = [f"linea_{i} = {i}" for i in range(2000)]
+        document, paragraph = self._code_paragraph("```\n" + "\n".join(lines) + "\n```")
+
+        assert len(paragraph.runs) == 1
+        assert len(paragraph._p.findall(f".//{qn('w:br')}")) == 1999
+
+    def test_character_style_created_when_missing(self):
+        """Test que el estilo de código se crea si la plantilla no lo tiene."""
+        document = Document()
+        style = document.styles["Macro Text Char"]
+        style.element.getparent().remove(style.element)
+
+        add_html(document, md_to_html(CODE_SAMPLE))
+
+        run = document.paragraphs[-1].runs[0]
+        assert run.style.name == "Macro Text Char"
+        assert run.style.font.name == "Courier"
+
+    def test_highlighting_groups_tokens(self, monkeypatch):
+        """Test que el resaltado usa pocos runs con estilos compartidos."""
+        pytest.importorskip("pygments")
+        monkeypatch.setattr(config, "CODE_HIGHLIGHT", True)
+
+        _, paragraph = self._code_paragraph(CODE_SAMPLE)
+
+        runs = paragraph.runs
+        assert paragraph.text == "def f(x):\n    # doble\n    return x * 2\n\n\nprint(f(2))"
+        assert 1 < len(runs) < 20
+        keywords = [run for run in runs if run.text.strip() in ("def", "return")]
+        assert len({run.style.name for run in keywords}) == 1
+        style = keywords[0].style
+        assert style.base_style.name == "Macro Text Char"
+        assert style.font.color.rgb is not None
+        assert all(len(run._r.rPr) == 1 for run in runs)
+
+    def test_unknown_language_is_not_highlighted(self, monkeypatch):
+        """Test que un lenguaje desconocido usa un solo run."""
+        monkeypatch.setattr(config, "CODE_HIGHLIGHT", True)
+
+        _, paragraph = self._code_paragraph("```nolang\nx = 1\ny = 2\n```")
+
+        assert len(paragraph.runs) == 1
+
+
+class TestStyleIndex:
+    """Tests para el índice de estilos por plantilla."""
+    
+    def test_index_is_shared_per_template(self):
+        """Test que documentos de la misma plantilla comparten el índice."""
+        first, second = Document(), Document()
+        
+        assert style_index.for_document(first) is style_index.for_document(second)
+    
+    def test_modified_template_gets_its_own_index(self):
+        """Test que un styles.xml distinto no reutiliza el índice."""
+        document = Document()
+        document.styles.add_style("Custom Para", WD_STYLE_TYPE.PARAGRAPH)
+        
+        index = style_index.for_document(document)
+        
+        assert index is not style_index.for_document(Document())
+        assert index.style_id("Custom Para") == "CustomPara"
+    
+    def test_resolver_matches_python_docx(self):
+        """Test que el índice resuelve igual que python-docx."""
+        document = Document()
+        original = document.part.get_style_id
+        resolve = style_index.for_document(document).resolver(original)
+        
+        for name, style_type in (
+            ("Heading 1", WD_STYLE_TYPE.PARAGRAPH),
+            ("List Bullet", WD_STYLE_TYPE.PARAGRAPH),
+            ("Normal", WD_STYLE_TYPE.PARAGRAPH),
+            ("Table Grid", WD_STYLE_TYPE.TABLE),
+        ):
+            assert resolve(name, style_type) == original(name, style_type)
+        with pytest.raises(ValueError):
+            resolve("Heading 1", WD_STYLE_TYPE.TABLE)
+        with pytest.raises(KeyError):
+            resolve("No Existe", WD_STYLE_TYPE.PARAGRAPH)
+    
+    def test_htmldocx_uses_index(self, monkeypatch):
+        """Test que htmldocx no hace búsquedas lineales por párrafo."""
+        document = Document()
+        styles = type(document.styles)
+        lookups = []
+        original = styles.__getitem__
+        monkeypatch.setattr(
+            styles, "__getitem__",
+            lambda self, key: lookups.append(key) or original(self, key)
+        )
+        
+        add_html(document, md_to_html("# T\n\n- a\n- b\n\n1. x"), backend="htmldocx")
+        
+        assert lookups == []
+        assert [p.style.name for p in document.paragraphs] == [
+            "Heading 1", "List Bullet", "List Bullet", "List Number"
+        ]
+
+
+class TestHeadingIndex:
+    """Tests para el índice de encabezados, bookmarks y tabla de contenido."""
+    
+    def test_headings_are_indexed_with_bookmarks(self):
+        """Test que cada encabezado queda indexado y con su bookmark."""
+        document = Document()
+        
+        headings = build(document, "<h1>Introducción</h1><p>x</p><h2>Introducción</h2>")
+        
+        assert headings == [
+            {"level": 1, "text": "Introducción", "anchor": "h_introduccion"},
+            {"level": 2, "text": "Introducción", "anchor": "h_introduccion_2"},
+        ]
+        names = [b.get(qn("w:name")) for b in document.element.body.iter(qn("w:bookmarkStart"))]
+        assert names == ["h_introduccion", "h_introduccion_2"]
+    
+    def test_bookmark_names_are_valid_for_word(self):
+        """Test nombres ASCII de hasta 40 caracteres."""
+        headings = build(Document(), "<h3>" + "¿Qué? " * 20 + "</h3><h3>!!!</h3>")
+        
+        anchors = [h["anchor"] for h in headings]
+        assert all(len(a) <= 40 and a.isascii() and a[0].isalpha() for a in anchors)
+        assert anchors[1] == "h_seccion"
+    
+    def test_toc_links_to_headings(self):
+        """Test que la tabla de contenido enlaza a los bookmarks."""
+        document = Document(BytesIO(convert("<h1>Uno</h1><h2>Dos</h2><h4>Cuatro</h4>", toc=True)))
+        body = document.element.body
+        
+        instr = body.find(".//" + qn("w:instrText"))
+        assert 'TOC \\o "1-3"' in instr.text
+        links = [h.get(qn("w:anchor")) for h in body.iter(qn("w:hyperlink"))]
+        assert links == ["h_uno", "h_dos"]
+        assert document.settings.element.find(qn("w:updateFields")) is not None
+    
+    def test_streaming_toc_keeps_field_and_outline(self):
+        """Test que en streaming el campo queda para que Word lo complete."""
+        outline = []
+        document = Document(BytesIO(convert("<h1>Uno</h1>", toc=True, outline=outline, streaming=True)))
+        body = document.element.body
+        
+        assert outline == [{"level": 1, "text": "Uno", "anchor": "h_uno"}]
+        assert body.find(".//" + qn("w:instrText")) is not None
+        assert list(body.iter(qn("w:hyperlink"))) == []
+        assert document.settings.element.find(qn("w:updateFields")) is not None
@@ -0,0 +1,235 @@
+"""
+Tests para el parcheo incremental de DOCX.
+
+Valida que el DOCX parcheado sea equivalente a un render completo.
+"""
+
+import re
+import struct
+import zlib
+from io import BytesIO
+
+import pytest
+from docx import Document
+from docx.oxml.ns import qn
+from lxml import etree
+
+from app.converter import docx_patch
+from app.converter.html_to_docx import convert as html_to_docx
+from app.converter.markdown_to_html import convert as md_to_html
+
+
+REPORT = """# Informe
+
+Introducción con [un link](https://example.com/a).
+
+## Sección 1
+
+Contenido de la sección uno.
+
+| Col A | Col B |
+|-------|-------|
+| 1     | 2     |
+
+## Sección 2
+
+- Punto uno
+- Punto dos
+
+Cierre del informe.
+"""
+
+
+def _normalized_body(docx_bytes: bytes) -> str:
+    """Body XML con los rId reemplazados por su destino."""
+    document = Document(BytesIO(docx_bytes))
+    targets = {
+        rId: rel.target_ref for rId, rel in document.part.rels.items()
+    }
+    xml = etree.tostring(document.element.body).decode("utf-8")
+    return re.sub(
+        r'r:(id|embed)="(rId\d+)"',
+        lambda m: f'r:{m.group(1)}="{targets[m.group(2)].split("/")[-1]}"',
+        xml
+    )
+
+
+def _rebuilt(markdown: str) -> bytes:
+    """DOCX de la conversión completa (el camino del handler)."""
+    return html_to_docx(md_to_html(markdown))
+
+
+def _png_file(path) -> str:
+    """Escribe un PNG 1x1 válido y retorna su ruta."""
+    def chunk(kind, data):
+        return (
+            struct.pack(">I", len(data)) + kind + data
+            + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+        )
+    png = (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(b"\x00\xff\x00\x00"))
+        + chunk(b"IEND", b"")
+    )
+    path.write_bytes(png)
+    return str(path)
+
+
+class TestRender:
+    """Tests para el render con mapa de bloques."""
+    
+    def test_render_stores_block_map(self):
+        """Test que el DOCX guarda el mapa de bloques."""
+        result = docx_patch.render(REPORT)
+        
+        document = Document(BytesIO(result["docx"]))
+        assert docx_patch.read_block_map(document) == result["block_map"]
+        assert len(result["block_map"]) == 8
+    
+    def test_render_text_matches_convert(self):
+        """Test que el texto coincide con la conversión normal."""
+        patched = Document(BytesIO(docx_patch.render(REPORT)["docx"]))
+        regular = Document(BytesIO(_rebuilt(REPORT)))
+        
+        texts = [p.text for p in patched.paragraphs if p.text]
+        assert texts == [p.text for p in regular.paragraphs if p.text]
+    
+    def test_render_matches_convert(self):
+        """Test que el body es idéntico a la conversión completa."""
+        result = docx_patch.render(REPORT)
+        
+        assert _normalized_body(result["docx"]) == _normalized_body(_rebuilt(REPORT))
+    
+    def test_empty_input_raises_error(self):
+        """Test que input vacío lanza error."""
+        with pytest.raises(ValueError):
+            docx_patch.render("")
+
+
+def _bookmarks(docx_bytes: bytes) -> list:
+    """(id, nombre) de cada bookmarkStart del body, en orden."""
+    body = Document(BytesIO(docx_bytes)).element.body
+    return [
+        (start.get(qn("w:id")), start.get(qn("w:name")))
+        for start in body.iter(qn("w:bookmarkStart"))
+    ]
+
+
+class TestBookmarks:
+    """Tests para los bookmarks de encabezado con un builder por bloque."""
+    
+    MARKDOWN = "# Intro\n\nTexto.\n\n## Details\n\nUno.\n\n## Details\n\nDos.\n"
+    
+    def test_render_bookmarks_are_unique(self):
+        """Test que render no repite ids ni nombres entre bloques."""
+        bookmarks = _bookmarks(docx_patch.render(self.MARKDOWN)["docx"])
+        
+        assert bookmarks == [("1", "h_intro"), ("2", "h_details"), ("3", "h_details_2")]
+    
+    def test_patch_bookmarks_are_unique(self):
+        """Test que patch renumera los bookmarks en orden de documento."""
+        previous = docx_patch.render(self.MARKDOWN)["docx"]
+        edited = "## Details\n\nNuevo.\n\n" + self.MARKDOWN.replace("Dos.", "Dos editado.")
+        
+        bookmarks = _bookmarks(docx_patch.patch(previous, edited)["docx"])
+        
+        assert [id_ for id_, _ in bookmarks] == ["1", "2", "3", "4"]
+        assert [name for _, name in bookmarks] == [
+            "h_details", "h_intro", "h_details_2", "h_details_3"
+        ]
+
+
+class TestPatch:
+    """Tests para el parcheo de un DOCX anterior."""
+    
+    def test_patch_matches_full_rebuild(self):
+        """Test que el parche es idéntico a reconstruir desde cero."""
+        previous = docx_patch.render(REPORT)["docx"]
+        edited = REPORT.replace(
+            "Contenido de la sección uno.",
+            "Contenido **nuevo** con [otro link](https://example.com/b)."
+        )
+        
+        patched = docx_patch.patch(previous, edited)
+        rebuilt = docx_patch.render(edited)
+        
+        assert patched["mode"] == "patch"
+        assert patched["rendered_blocks"] == 1
+        assert patched["reused_blocks"] == 7
+        assert patched["block_map"] == rebuilt["block_map"]
+        assert _normalized_body(patched["docx"]) == _normalized_body(_rebuilt(edited))
+    
+    def test_patch_insert_and_delete_blocks(self):
+        """Test parches que agregan y quitan bloques."""
+        previous = docx_patch.render(REPORT)["docx"]
+        edited = REPORT.replace("## Sección 2\n", "## Sección 1.5\n\nExtra.\n\n## Sección 2\n")
+        edited = edited.replace("Cierre del informe.\n", "")
+        
+        patched = docx_patch.patch(previous, edited)
+        
+        assert _normalized_body(patched["docx"]) == _normalized_body(_rebuilt(edited))
+    
+    def test_patch_with_repeated_headings_matches_full_rebuild(self):
+        """Test que los bookmarks del parche coinciden con la conversión completa."""
+        markdown = "# Intro\n\nTexto.\n\n## Details\n\nUno.\n\n## Details\n\nDos.\n"
+        previous = docx_patch.render(markdown)["docx"]
+        edited = "## Details\n\nNuevo.\n\n" + markdown.replace("Uno.\n\n## Details\n\n", "")
+        
+        patched = docx_patch.patch(previous, edited)
+        
+        assert patched["mode"] == "patch"
+        assert _normalized_body(patched["docx"]) == _normalized_body(_rebuilt(edited))
+    
+    def test_patch_drops_unused_hyperlinks(self):
+        """Test que los links de bloques eliminados no quedan en el paquete."""
+        previous = docx_patch.render(REPORT)["docx"]
+        edited = REPORT.replace("Introducción con [un link](https://example.com/a).", "Sin links.")
+        
+        document = Document(BytesIO(docx_patch.patch(previous, edited)["docx"]))
+        targets = [rel.target_ref for rel in document.part.rels.values()]
+        
+        assert "https://example.com/a" not in targets
+    
+    def test_patch_reuses_media_parts(self, temp_dir):
+        """Test que las imágenes de bloques sin cambios se reutilizan."""
+        image = _png_file(temp_dir / "pixel.png")
+        markdown = f"Intro\n\n![pixel]({image})\n\nFinal"
+        previous = docx_patch.render(markdown)["docx"]
+        
+        patched = docx_patch.patch(previous, markdown.replace("Final", "Final editado"))
+        
+        document = Document(BytesIO(patched["docx"]))
+        images = [p for p in document.part.package.iter_parts() if "media" in p.partname]
+        assert len(images) == 1
+        assert patched["rendered_blocks"] == 1
+        assert _normalized_body(patched["docx"]) == _normalized_body(
+            _rebuilt(markdown.replace("Final", "Final editado"))
+        )
+    
+    def test_patch_with_external_block_map(self):
+        """Test parche usando un mapa de bloques cacheado."""
+        result = docx_patch.render(REPORT)
+        
+        patched = docx_patch.patch(result["docx"], REPORT, block_map=result["block_map"])
+        
+        assert patched["rendered_blocks"] == 0
+        assert patched["reused_blocks"] == 8
+    
+    def test_docx_without_block_map_is_rebuilt(self):
+        """Test que un DOCX sin mapa se reconstruye completo."""
+        previous = html_to_docx("<p>Viejo</p>")
+        result = docx_patch.patch(previous, REPORT)
+        
+        assert result["mode"] == "full"
+        assert _normalized_body(result["docx"]) == _normalized_body(_rebuilt(REPORT))
+    
+    def test_global_references_trigger_full_render(self):
+        """Test fallback con links por referencia."""
+        previous = docx_patch.render(REPORT)["docx"]
+        edited = REPORT + "\nVer [docs][d].\n\n[d]: https://example.com/docs\n"
+        
+        result = docx_patch.patch(previous, edited)
+        
+        assert result["mode"] == "full"
+        assert result["block_map"] == []
@@ -0,0 +1,116 @@
+"""
+Tests para el writer DOCX en streaming.
+"""
+
+import zipfile
+from io import BytesIO
+
+from docx import Document
+from docx.api import _default_docx_path
+from docx.shared import Pt
+from lxml import etree
+
+from app.config import config
+from app.converter import docx_stream, events
+from app.converter.html_to_docx import convert, convert_events, convert_with_template
+from app.converter.markdown_to_html import convert as md_to_html
+from tests.test_docx_builder import FIDELITY_SAMPLES
+from tests.test_docx_patch import _png_file
+
+
+def _part(docx_bytes: bytes, name: str) -> bytes:
+    with zipfile.ZipFile(BytesIO(docx_bytes)) as archive:
+        return archive.read(name)
+
+
+def _canonical(xml: bytes) -> bytes:
+    return etree.tostring(etree.fromstring(xml), method="c14n")
+
+
+class TestStreamingWriter:
+    """Tests para docx_stream.write."""
+    
+    def test_same_document_as_save(self, complex_markdown):
+        """Test que el XML es equivalente al de document.save()."""
+        for markdown_text in (complex_markdown, *FIDELITY_SAMPLES.values()):
+            saved = convert_events(events.from_markdown(markdown_text), streaming=False)
+            streamed = convert_events(events.from_markdown(markdown_text), streaming=True)
+            
+            assert _canonical(_part(streamed, "word/document.xml")) == \
+                _canonical(_part(saved, "word/document.xml"))
+    
+    def test_opens_in_python_docx(self, complex_markdown):
+        """Test que python-docx puede abrir el archivo generado."""
+        docx_bytes = convert(md_to_html(complex_markdown), streaming=True)
+        
+        document = Document(BytesIO(docx_bytes))
+        
+        assert document.paragraphs[0].text
+        assert document.tables
+    
+    def test_namespaces_declared_once(self):
+        """Test que los elementos no repiten las declaraciones de la raíz."""
+        docx_bytes = convert("<p>a</p><p>b</p>", streaming=True)
+        xml = _part(docx_bytes, "word/document.xml")
+        
+        assert xml.count(b"xmlns:w=") == 1
+    
+    def test_images_and_links_keep_relationships(self, tmp_path):
+        """Test que imágenes e hipervínculos quedan relacionados."""
+        html = (
+            f'<p><img src="{_png_file(tmp_path / "a.png")}" alt="a"></p>'
+            '<p><a href="https://example.com">link</a></p>'
+        )
+        
+        document = Document(BytesIO(convert(html, streaming=True)))
+        targets = [rel.target_ref for rel in document.part.rels.values()]
+        
+        assert "https://example.com" in targets
+        assert document.inline_shapes
+    
+    def test_static_parts_come_from_template(self):
+        """Test que las partes no modificadas se copian sin reserializar."""
+        docx_bytes = convert("<p>x</p>", streaming=True)
+        with zipfile.ZipFile(_default_docx_path()) as template:
+            expected = template.read("word/settings.xml")
+        
+        assert _part(docx_bytes, "word/settings.xml") == expected
+    
+    def test_open_table_is_not_flushed(self, monkeypatch):
+        """Test que una tabla que cruza un vaciado queda completa."""
+        monkeypatch.setattr(docx_stream, "FLUSH_EVENTS", 3)
+        html = md_to_html("text\n\n| A | B |\n|---|---|\n| 1 | 2 |\n\nafter")
+        
+        document = Document(BytesIO(convert(html, streaming=True)))
+        
+        assert [p.text for p in document.paragraphs] == ["text", "after"]
+        assert document.tables[0].cell(1, 1).text == "2"
+    
+    def test_custom_styles_and_template(self, tmp_path):
+        """Test estilos personalizados y plantilla en streaming."""
+        template = Document()
+        template.add_paragraph("Encabezado de plantilla")
+        template_path = str(tmp_path / "template.docx")
+        template.save(template_path)
+        
+        styled = Document(BytesIO(convert("<p>x</p>", {"font_size": Pt(14)}, streaming=True)))
+        from_template = Document(BytesIO(
+            convert_with_template("<p>x</p>", template_path, streaming=True)
+        ))
+        
+        assert styled.paragraphs[0].runs[0].font.size == Pt(14)
+        assert [p.text for p in from_template.paragraphs] == ["Encabezado de plantilla", "x"]
+    
+    def test_config_switch(self, monkeypatch):
+        """Test que DOCX_STREAMING activa el writer por defecto."""
+        calls = []
+        original = docx_stream.write
+        monkeypatch.setattr(config, "DOCX_STREAMING", True)
+        monkeypatch.setattr(
+            docx_stream, "write",
+            lambda *args, **kwargs: calls.append(1) or original(*args, **kwargs)
+        )
+        
+        convert("<p>x</p>")
+        
+        assert calls
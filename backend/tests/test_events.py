@@ -0,0 +1,104 @@
+"""
+Tests para la representación intermedia como flujo de eventos.
+"""
+
+import random
+import zipfile
+from io import BytesIO
+
+import pytest
+from app.converter import events
+from app.converter.exceptions import MarkdownConversionError
+from app.converter.html_to_docx import convert as html_to_docx, convert_events
+from app.converter.markdown_to_html import convert as md_to_html
+from tests.test_docx_builder import FIDELITY_SAMPLES, _random_markdown
+
+
+def _document_xml(docx_bytes: bytes) -> bytes:
+    with zipfile.ZipFile(BytesIO(docx_bytes)) as archive:
+        return archive.read("word/document.xml")
+
+
+class TestEventStream:
+    """Tests para la generación de eventos desde Markdown."""
+    
+    def test_round_trip_matches_convert(self, complex_markdown, monkeypatch):
+        """Test que serializar los eventos da el mismo HTML que convert."""
+        samples = [complex_markdown, *FIDELITY_SAMPLES.values()]
+        rng = random.Random(7)
+        samples += [_random_markdown(rng) for _ in range(20)]
+        
+        for chunk_chars in (1, events.CHUNK_CHARS):
+            monkeypatch.setattr(events, "CHUNK_CHARS", chunk_chars)
+            for markdown_text in samples:
+                html = events.to_html(events.from_markdown(markdown_text))
+                
+                assert html == md_to_html(markdown_text)
+    
+    def test_global_features_fall_back_to_full_document(self):
+        """Test que los links por referencia se resuelven entre bloques."""
+        markdown_text = "See [docs][1].\n\n[1]: https://example.com"
+        
+        html = events.to_html(events.from_markdown(markdown_text))
+        
+        assert 'href="https://example.com"' in html
+    
+    def test_events_are_lazy(self, monkeypatch):
+        """Test que cada tramo se parsea recién cuando se consume."""
+        converted = []
+        original = events.split_blocks
+        monkeypatch.setattr(events, "CHUNK_CHARS", 1)
+        monkeypatch.setattr(
+            events, "split_blocks",
+            lambda text: (converted.append(block) or block for block in original(text))
+        )
+        stream = events.from_markdown("# One\n\nTwo\n\nThree")
+        
+        assert next(stream) == (events.START, "h1", [])
+        assert converted == ["# One"]
+    
+    def test_inline_marks_and_text(self):
+        """Test la forma de los eventos inline."""
+        stream = list(events.from_markdown("a **b** &amp;"))
+        
+        assert stream == [
+            (events.START, "p", []),
+            (events.TEXT, "a ", None),
+            (events.START, "strong", []),
+            (events.TEXT, "b", None),
+            (events.END, "strong", None),
+            (events.TEXT, " &", None),
+            (events.END, "p", None),
+        ]
+    
+    def test_conversion_error_is_wrapped(self, monkeypatch):
+        """Test que un error del parser se reporta como error de Markdown."""
+        def fail(*args, **kwargs):
+            raise RuntimeError("boom")
+        
+        monkeypatch.setattr(events, "split_blocks", lambda text: ["a"])
+        monkeypatch.setattr("markdown.Markdown.convert", fail)
+        
+        with pytest.raises(MarkdownConversionError):
+            list(events.from_markdown("a"))
+
+
+class TestStreamingDocx:
+    """Tests para el DOCX armado directamente desde eventos."""
+    
+    def test_same_document_as_string_pipeline(self, complex_markdown):
+        """Test que el DOCX por eventos es idéntico al del pipeline por etapas."""
+        for markdown_text in (complex_markdown, *FIDELITY_SAMPLES.values()):
+            staged = html_to_docx(md_to_html(markdown_text))
+            streamed = convert_events(events.from_markdown(markdown_text))
+            
+            assert _document_xml(streamed) == _document_xml(staged)
+    
+    def test_htmldocx_backend_uses_html_adapter(self, monkeypatch):
+        """Test que el backend htmldocx recibe el HTML serializado."""
+        from app.config import config
+        monkeypatch.setattr(config, "DOCX_BACKEND", "htmldocx")
+        
+        docx_bytes = convert_events(events.from_markdown("# Title\n\ntext"))
+        
+        assert b"Title" in _document_xml(docx_bytes)
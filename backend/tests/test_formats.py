@@ -0,0 +1,65 @@
+"""
+Tests para el registro de formatos de salida.
+"""
+
+import subprocess
+import sys
+
+import pytest
+from app.config import config
+from app.converter import formats
+from app.converter.exceptions import ConversionError
+
+
+class TestRegistry:
+    """Tests para registro y resolución de formatos."""
+    
+    def test_supported_follows_config(self, monkeypatch):
+        """Test que solo se ofrecen formatos habilitados y con backend."""
+        monkeypatch.setattr(config, "SUPPORTED_OUTPUT_FORMATS", ["txt", "pdf", "odt", "html"])
+        
+        assert formats.supported() == ["txt", "html"]
+    
+    def test_content_types(self):
+        """Test que el registro conoce el Content-Type de cada formato."""
+        assert formats.content_type("TXT") == "text/plain"
+        assert formats.content_type("pdf") == "application/pdf"
+        assert formats.content_type("xyz") == "application/octet-stream"
+    
+    def test_render_encodes_text(self):
+        """Test que los renderers de texto se entregan como bytes."""
+        assert formats.render("txt", "<p>hola</p>") == b"hola\n"
+    
+    def test_render_without_backend_raises(self):
+        """Test que un formato sin renderer no se puede generar."""
+        with pytest.raises(ConversionError):
+            formats.render("pdf", "<p>x</p>")
+    
+    def test_registered_format_is_pluggable(self, monkeypatch):
+        """Test que un formato nuevo se usa sin tocar el handler."""
+        monkeypatch.setattr(formats, "_registry", dict(formats._registry))
+        monkeypatch.setattr(formats, "_renderers", {})
+        monkeypatch.setattr(config, "SUPPORTED_OUTPUT_FORMATS", ["html", "upper"])
+        formats.register(formats.OutputFormat(
+            "upper", "text/plain", renderer="builtins:str"
+        ))
+        
+        assert "upper" in formats.supported()
+        assert formats.render("upper", "<p>x</p>") == b"<p>x</p>"
+
+
+class TestLazyLoading:
+    """Tests para la carga diferida de backends."""
+    
+    def test_handler_import_does_not_load_docx(self):
+        """Test que importar el handler no carga python-docx ni htmldocx."""
+        code = (
+            "import sys, handler; "
+            "print(any(m.split('.')[0] in ('docx', 'htmldocx', 'bs4') for m in sys.modules))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            capture_output=True, text=True, check=True
+        )
+        
+        assert result.stdout.strip() == "False"
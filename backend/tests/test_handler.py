@@ -0,0 +1,418 @@
+"""
+Tests para el handler de Lambda.
+
+Valida el flujo HTTP completo sin infraestructura real.
+"""
+
+import base64
+import gzip
+import json
+
+import pytest
+
+from handler import lambda_handler
+
+
+def _event(body: dict, headers: dict = None) -> dict:
+    return {
+        "httpMethod": "POST",
+        "headers": headers or {"Content-Type": "application/json"},
+        "body": json.dumps(body)
+    }
+
+
+class TestConditionalHTML:
+    """Tests para ETag y respuestas condicionales en HTML."""
+    
+    def test_html_response_has_etag(self, mock_lambda_context):
+        """Test que la respuesta HTML en JSON (con timestamp) incluye un ETag débil."""
+        event = _event({"content": "# Title", "output_format": "html"})
+        response = lambda_handler(event, mock_lambda_context)
+        
+        assert response["statusCode"] == 200
+        assert response["headers"]["ETag"].startswith('W/"')
+    
+    def test_if_none_match_returns_304(self, mock_lambda_context):
+        """Test que un ETag vigente retorna 304 sin body."""
+        event = _event({"content": "# Title", "output_format": "html"})
+        etag = lambda_handler(event, mock_lambda_context)["headers"]["ETag"]
+        
+        event = _event(
+            {"content": "# Title", "output_format": "html"},
+            headers={"if-none-match": etag}
+        )
+        response = lambda_handler(event, mock_lambda_context)
+        
+        assert response["statusCode"] == 304
+        assert response["body"] == ""
+    
+    def test_stale_etag_converts_again(self, mock_lambda_context):
+        """Test que un ETag viejo produce una conversión nueva."""
+        event = _event({"content": "# Old", "output_format": "html"})
+        etag = lambda_handler(event, mock_lambda_context)["headers"]["ETag"]
+        
+        event = _event(
+            {"content": "# New", "output_format": "html"},
+            headers={"If-None-Match": etag}
+        )
+        response = lambda_handler(event, mock_lambda_context)
+        
+        assert response["statusCode"] == 200
+        assert response["headers"]["ETag"] != etag
+    
+    def test_large_html_is_compressed(self, mock_lambda_context):
+        """Test compresión gzip de HTML grande."""
+        content = "Párrafo de prueba con texto.\n\n" * 200
+        event = _event(
+            {"content": content, "output_format": "html"},
+            headers={"accept-encoding": "gzip"}
+        )
+        response = lambda_handler(event, mock_lambda_context)
+        
+        assert response["isBase64Encoded"] is True
+        body = json.loads(gzip.decompress(base64.b64decode(response["body"])))
+        assert "<p>Párrafo de prueba" in body["data"]["html"]
+    
+    def test_compressed_etag_revalidates(self, mock_lambda_context):
+        """Test que el ETag de la respuesta gzip produce 304 con ese ETag."""
+        body = {"content": "Párrafo de prueba con texto.\n\n" * 200, "output_format": "html"}
+        identity = lambda_handler(_event(body), mock_lambda_context)["headers"]["ETag"]
+        etag = lambda_handler(
+            _event(body, headers={"accept-encoding": "gzip"}), mock_lambda_context
+        )["headers"]["ETag"]
+        
+        response = lambda_handler(
+            _event(body, headers={"accept-encoding": "gzip", "if-none-match": etag}),
+            mock_lambda_context
+        )
+        
+        assert etag != identity
+        assert response["statusCode"] == 304
+        assert response["headers"]["ETag"] == etag
+    
+    def test_raw_html_body(self, mock_lambda_context):
+        """Test que con raw el HTML es el body y el ETag distingue el modo."""
+        event = _event({"content": "# Título", "output_format": "html", "raw": True})
+        response = lambda_handler(event, mock_lambda_context)
+        json_etag = lambda_handler(
+            _event({"content": "# Título", "output_format": "html"}), mock_lambda_context
+        )["headers"]["ETag"]
+        
+        assert response["statusCode"] == 200
+        assert response["headers"]["Content-Type"].startswith("text/html")
+        assert "<h1" in response["body"] and "Título" in response["body"]
+        assert response["headers"]["ETag"] != json_etag
+        assert response["headers"]["ETag"].startswith('"')
+    
+    def test_raw_requires_single_html(self, mock_lambda_context):
+        """Test que raw no se acepta para formatos de archivo."""
+        event = _event({"content": "# Título", "output_format": "docx", "raw": True})
+        
+        assert lambda_handler(event, mock_lambda_context)["statusCode"] == 400
+
+
+class TestIncrementalHTML:
+    """Tests para el modo incremental del handler."""
+    
+    def test_incremental_full_then_patch(self, mock_lambda_context):
+        """Test que el segundo request retorna solo el patch."""
+        event = _event({
+            "content": "# Title\n\nBody",
+            "output_format": "html",
+            "incremental": True
+        })
+        first = json.loads(lambda_handler(event, mock_lambda_context)["body"])["data"]
+        
+        assert first["mode"] == "full"
+        assert first["html"] == "<h1>Title</h1>\n<p>Body</p>"
+        
+        event = _event({
+            "content": "# Title\n\nBody edited",
+            "output_format": "html",
+            "incremental": True,
+            "previous_blocks": first["blocks"]
+        })
+        second = json.loads(lambda_handler(event, mock_lambda_context)["body"])["data"]
+        
+        assert second["mode"] == "patch"
+        assert "html" not in second
+        assert second["patch"]["html"] == ["<p>Body edited</p>"]
+    
+    def test_invalid_previous_blocks(self, mock_lambda_context):
+        """Test validación de previous_blocks."""
+        event = _event({
+            "content": "# Title",
+            "output_format": "html",
+            "incremental": True,
+            "previous_blocks": "abc"
+        })
+        response = lambda_handler(event, mock_lambda_context)
+        
+        assert response["statusCode"] == 400
+
+
+class TestPathologicalInput:
+    """Tests para el pre-escaneo en el handler."""
+    
+    def test_deep_nesting_is_normalized(self, mock_lambda_context):
+        """Test que un input patológico se normaliza y se reporta."""
+        event = _event({"content": ">" * 3000 + " deep", "output_format": "html"})
+        response = lambda_handler(event, mock_lambda_context)
+        
+        data = json.loads(response["body"])["data"]
+        assert response["statusCode"] == 200
+        assert data["normalized"] == ["depth"]
+        assert data["html"].count("<blockquote>") == 20
+    
+    def test_reject_policy_returns_422(self, mock_lambda_context, monkeypatch):
+        """Test que con política reject se responde 422."""
+        from app.config import config
+        monkeypatch.setattr(config, "PRESCAN_POLICY", "reject")
+        
+        event = _event({"content": ">" * 3000 + " deep", "output_format": "html"})
+        response = lambda_handler(event, mock_lambda_context)
+        
+        body = json.loads(response["body"])
+        assert response["statusCode"] == 422
+        assert body["error_code"] == "INPUT_TOO_COMPLEX"
+        assert body["details"]["metric"] == "depth"
+    
+    def test_docx_budget_timeout_returns_error_code(self, mock_lambda_context, monkeypatch):
+        """Test que el timeout dentro del parseo por eventos (DOCX) no se reporta como error de Markdown."""
+        import time
+        from app.config import config
+        from app.converter import events
+        
+        def slow_convert(*args):
+            html = convert(*args)
+            started = time.process_time()
+            while time.process_time() - started < 2:
+                pass
+            return html
+        
+        convert = events.convert
+        monkeypatch.setattr(events, "convert", slow_convert)
+        monkeypatch.setattr(config, "CONVERSION_CPU_BUDGET_SECONDS", 0.5)
+        
+        content = "Texto con [referencia].\n\n[referencia]: https://example.com"
+        response = lambda_handler(_event({"content": content}), mock_lambda_context)
+        
+        body = json.loads(response["body"])
+        assert response["statusCode"] == 422
+        assert body["error_code"] == "CONVERSION_TIMEOUT"
+        assert 0 < body["details"]["budget_seconds"] <= 0.5
+
+
+class TestNormalizer:
+    """Tests para el normalizador en el handler."""
+    
+    def test_fixes_are_reported(self, mock_lambda_context):
+        """Test que las reparaciones aplicadas se reportan."""
+        event = _event({"content": "# T\r\n\r\n```\ncode", "output_format": "html"})
+        data = json.loads(lambda_handler(event, mock_lambda_context)["body"])["data"]
+        
+        assert data["fixes"] == {"line_endings": 2, "fences": 1}
+        assert "<code>code" in data["html"]
+    
+    def test_normalizer_can_be_disabled(self, mock_lambda_context):
+        """Test que normalize=false desactiva las reparaciones."""
+        event = _event({
+            "content": "```\ncode",
+            "output_format": "html",
+            "normalize": False
+        })
+        data = json.loads(lambda_handler(event, mock_lambda_context)["body"])["data"]
+        
+        assert "fixes" not in data
+    
+    def test_invalid_option_returns_400(self, mock_lambda_context):
+        """Test que una opción desconocida es error de validación."""
+        event = _event({
+            "content": "# T",
+            "output_format": "html",
+            "normalize": ["magic"]
+        })
+        
+        assert lambda_handler(event, mock_lambda_context)["statusCode"] == 400
+
+
+class TestMultiFormat:
+    """Tests para varios formatos de salida desde un solo parseo."""
+    
+    def test_html_and_files_in_one_response(self, mock_lambda_context, mock_s3_bucket, monkeypatch):
+        """Test que una lista devuelve HTML inline y URLs de descarga."""
+        from app.config import config
+        monkeypatch.setattr(config, "BUCKET_NAME", "test-bucket")
+        event = _event({
+            "content": "# Title\n\nSome **text**",
+            "output_format": ["html", "docx", "txt"]
+        })
+        data = json.loads(lambda_handler(event, mock_lambda_context)["body"])["data"]
+        
+        assert data["output_format"] == ["html", "docx", "txt"]
+        assert "<h1>Title</h1>" in data["formats"]["html"]["html"]
+        assert data["formats"]["docx"]["download_url"]
+        assert data["formats"]["txt"]["size_bytes"] == len(b"Title\n\nSome text\n")
+    
+    def test_single_format_list_keeps_list_shape(self, mock_lambda_context):
+        """Test que una lista de un elemento usa la respuesta multi-formato."""
+        event = _event({"content": "# Title", "output_format": ["HTML", "html"]})
+        response = lambda_handler(event, mock_lambda_context)
+        data = json.loads(response["body"])["data"]
+        
+        assert data["output_format"] == ["html"]
+        assert "<h1>Title</h1>" in data["formats"]["html"]["html"]
+        assert "ETag" in response["headers"]
+    
+    def test_invalid_format_in_list_returns_400(self, mock_lambda_context):
+        """Test que un formato desconocido en la lista es error de validación."""
+        for output_format in (["html", "pdf"], [], "odt", [1]):
+            event = _event({"content": "# T", "output_format": output_format})
+            
+            assert lambda_handler(event, mock_lambda_context)["statusCode"] == 400
+    
+    def test_single_docx_is_built_from_events(self, mock_lambda_context, mock_s3_bucket, monkeypatch):
+        """Test que un DOCX solo se arma desde eventos, sin HTML intermedio."""
+        from app.config import config
+        monkeypatch.setattr(config, "BUCKET_NAME", "test-bucket")
+        monkeypatch.setattr("handler.md_to_html", None)
+        
+        event = _event({"content": "# Title\n\ntext", "output_format": "docx"})
+        response = lambda_handler(event, mock_lambda_context)
+        data = json.loads(response["body"])["data"]
+        
+        assert response["statusCode"] == 200
+        assert data["download_url"]
+    
+    def test_docx_response_includes_outline(self, mock_lambda_context, mock_s3_bucket, monkeypatch):
+        """Test que la respuesta DOCX trae el índice de encabezados."""
+        from app.config import config
+        monkeypatch.setattr(config, "BUCKET_NAME", "test-bucket")
+        
+        event = _event({"content": "# Title\n\ntext\n\n## Part", "toc": True})
+        data = json.loads(lambda_handler(event, mock_lambda_context)["body"])["data"]
+        
+        assert data["outline"] == [
+            {"level": 1, "text": "Title", "anchor": "h_title"},
+            {"level": 2, "text": "Part", "anchor": "h_part"},
+        ]
+    
+    def test_invalid_toc_returns_400(self, mock_lambda_context):
+        """Test validación de toc."""
+        event = _event({"content": "# Title", "toc": "yes"})
+        
+        assert lambda_handler(event, mock_lambda_context)["statusCode"] == 400
+
+
+class TestDirectUpload:
+    """Tests para la conversión de una entrada subida al bucket."""
+    
+    @pytest.fixture
+    def storage(self, monkeypatch):
+        from app.config import config
+        from app.storage import s3_client
+        from app.storage.backends import MemoryBackend
+        monkeypatch.setattr(config, "S3_DELETE_INPUT", False)
+        client = s3_client.S3Client(backend=MemoryBackend())
+        monkeypatch.setattr(s3_client, "_storage_client", client)
+        return client.backend
+    
+    def _upload(self, storage, content: bytes, context) -> str:
+        response = lambda_handler(_event({"upload": True}), context)
+        data = json.loads(response["body"])["data"]
+        assert response["statusCode"] == 200
+        assert data["content_type"].startswith("text/markdown")
+        storage.put(data["input_key"], content, data["content_type"])
+        return data["input_key"]
+    
+    def test_convert_uploaded_input(self, storage, mock_lambda_context):
+        """Test el flujo upload -> PUT -> conversión por input_key."""
+        input_key = self._upload(storage, "# Título\n\nTexto".encode("utf-8"), mock_lambda_context)
+        
+        response = lambda_handler(
+            _event({"input_key": input_key, "output_format": "html"}), mock_lambda_context
+        )
+        
+        assert response["statusCode"] == 200
+        assert "Título" in json.loads(response["body"])["data"]["html"]
+    
+    def test_uploaded_input_too_large(self, storage, mock_lambda_context, monkeypatch):
+        """Test 413 cuando el archivo subido supera el máximo."""
+        from app.config import config
+        monkeypatch.setattr(config, "MAX_FILE_SIZE_BYTES", 10)
+        input_key = self._upload(storage, b"#" * 11, mock_lambda_context)
+        
+        response = lambda_handler(_event({"input_key": input_key}), mock_lambda_context)
+        
+        assert response["statusCode"] == 413
+    
+    def test_missing_or_ambiguous_input(self, storage, mock_lambda_context):
+        """Test validación de input_key."""
+        missing = lambda_handler(_event({"input_key": "inputs/nada.md"}), mock_lambda_context)
+        both = lambda_handler(
+            _event({"input_key": "inputs/nada.md", "content": "# x"}), mock_lambda_context
+        )
+        
+        assert missing["statusCode"] == 400
+        assert both["statusCode"] == 400
+
+
+class TestPriming:
+    """Tests para el precalentamiento del init."""
+    
+    def test_prime_runs_every_stage(self, monkeypatch):
+        """Test que prime convierte cada formato y crea el cliente."""
+        import handler
+        from app.storage import s3_client
+        from app.storage.backends import MemoryBackend
+        monkeypatch.setattr(s3_client, "_storage_client", s3_client.S3Client(backend=MemoryBackend()))
+        
+        report = handler.prime()
+        
+        assert {"markdown", "docx", "txt", "storage"} <= set(report)
+    
+    def test_prime_never_raises(self, monkeypatch):
+        """Test que una etapa que falla no rompe el init."""
+        import handler
+        
+        def broken(*args, **kwargs):
+            raise RuntimeError("sin plantilla")
+        monkeypatch.setattr(handler, "md_to_html", broken)
+        monkeypatch.setattr(handler, "get_storage_client", broken)
+        
+        assert "markdown" in handler.prime()
+
+
+class TestHealthCheck:
+    """Tests para el snapshot de runtime del health check."""
+    
+    @pytest.fixture(autouse=True)
+    def clean_stats(self):
+        from app.utils import stats
+        stats.reset()
+        yield
+        stats.reset()
+    
+    def test_health_check_includes_runtime(self, mock_lambda_context):
+        """Test que health_check expone caches, pool, latencias y memoria."""
+        from handler import health_check
+        response = health_check({}, mock_lambda_context)
+        data = json.loads(response["body"])["data"]
+        
+        assert data["status"] == "healthy"
+        runtime = data["runtime"]
+        assert {"conversions", "latency", "caches", "engine_pool", "memory"} <= set(runtime)
+        assert "markdown_blocks" in runtime["caches"]
+    
+    def test_conversions_and_latency_counted(self, mock_lambda_context):
+        """Test que cada conversión exitosa suma al contador y a la ventana."""
+        from handler import health_check
+        for _ in range(3):
+            lambda_handler(_event({"content": "# Title", "output_format": "html"}), mock_lambda_context)
+        lambda_handler(_event({"output_format": "html"}), mock_lambda_context)
+        
+        runtime = json.loads(health_check({}, mock_lambda_context)["body"])["data"]["runtime"]
+        
+        assert runtime["conversions"] == 3
+        assert runtime["latency"]["total"]["samples"] == 3
+        assert runtime["latency"]["markdown"]["p95_ms"] >= runtime["latency"]["markdown"]["p50_ms"]
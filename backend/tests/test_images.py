@@ -0,0 +1,156 @@
+"""
+Tests para la etapa de imágenes del DOCX.
+"""
+
+import base64
+import struct
+import zlib
+from io import BytesIO
+
+import pytest
+from docx import Document
+from PIL import Image
+from docx.oxml.ns import qn
+
+from app.config import config
+from app.converter import images
+from app.converter.html_to_docx import convert
+
+
+def _png(width: int, height: int) -> bytes:
+    """PNG RGB negro del tamaño pedido."""
+    def chunk(kind, data):
+        return (
+            struct.pack(">I", len(data)) + kind + data
+            + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+        )
+    rows = (b"\x00" + b"\x00" * (3 * width)) * height
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(rows))
+        + chunk(b"IEND", b"")
+    )
+
+
+def _data_uri(data: bytes) -> str:
+    return "data:image/png;base64," + base64.b64encode(data).decode()
+
+
+def _media(document) -> list:
+    return [p for p in document.part.package.iter_parts() if "media" in p.partname]
+
+
+@pytest.fixture(autouse=True)
+def _empty_cache():
+    images.clear_cache()
+    yield
+    images.clear_cache()
+
+
+class TestImageStage:
+    """Tests para obtener, procesar y cachear imágenes."""
+
+    def test_data_uri_is_embedded(self):
+        """Test que una imagen data: se inserta en el documento."""
+        html = f'<p><img src="{_data_uri(_png(2, 2))}" alt="x"></p>'
+
+        document = Document(BytesIO(convert(html)))
+
+        assert len(_media(document)) == 1
+        assert "<image:" not in document.paragraphs[0].text
+
+    def test_invalid_data_uri_uses_placeholder(self):
+        """Test que un data: que no es imagen deja el placeholder."""
+        document = Document(BytesIO(convert('<p><img src="data:text/plain,hola"></p>')))
+
+        assert document.paragraphs[0].text == "<image: data>"
+
+    @pytest.mark.parametrize("backend", ["fast", "htmldocx"])
+    def test_identical_images_share_media_part(self, monkeypatch, backend):
+        """Test que imágenes iguales comparten una sola parte media."""
+        monkeypatch.setattr(config, "DOCX_BACKEND", backend)
+        src = _data_uri(_png(3, 3))
+        html = "".join(f'<p><img src="{src}"></p>' for _ in range(5))
+
+        document = Document(BytesIO(convert(html)))
+
+        assert len(_media(document)) == 1
+        assert len(document.inline_shapes) == 5
+        ids = [e.get("id") for e in document.element.body.iter(qn("wp:docPr"))]
+        assert len(set(ids)) == 5
+
+    def test_wide_image_fits_page_width(self):
+        """Test que una imagen más ancha que la página se limita al ancho."""
+        document = Document(BytesIO(convert(f'<p><img src="{_data_uri(_png(3000, 10))}"></p>')))
+        section = document.sections[-1]
+
+        shape = document.inline_shapes[0]
+        assert shape.width == section.page_width - section.left_margin - section.right_margin
+        assert shape.height < shape.width / 100
+
+    def test_embedded_image_is_downscaled(self):
+        """Test que la imagen insertada en el DOCX se reduce a IMAGE_DPI del ancho de página."""
+        document = Document(BytesIO(convert(f'<p><img src="{_data_uri(_png(3000, 1500))}"></p>')))
+        section = document.sections[-1]
+
+        with Image.open(BytesIO(_media(document)[0].blob)) as image:
+            assert image.width == images.max_pixels(
+                section.page_width - section.left_margin - section.right_margin
+            )
+
+    def test_processed_images_are_cached(self):
+        """Test que la misma imagen no se vuelve a procesar."""
+        src = _data_uri(_png(2, 2))
+
+        first = images.get(src, 100)
+        second = images.get(src, 100)
+
+        assert first is second
+        assert images.cache_info()["hits"] == 1
+        assert images.cache_info()["misses"] == 1
+
+    def test_failed_load_is_not_cached(self, monkeypatch):
+        """Test que un error transitorio no deja la imagen rota en el cache."""
+        results = iter([None, _png(2, 2)])
+        monkeypatch.setattr(images, "load", lambda src: next(results))
+
+        assert images.get("https://example.com/a.png", 100) is None
+        assert images.get("https://example.com/a.png", 100)[0] == _png(2, 2)
+        assert images.cache_info()["size"] == 1
+
+    def test_image_over_max_bytes_is_skipped(self, monkeypatch):
+        """Test que una imagen más grande que IMAGE_MAX_BYTES no se inserta."""
+        monkeypatch.setattr(config, "IMAGE_MAX_BYTES", 1024)
+
+        assert images.load(_data_uri(_png(2, 2))) is not None
+        assert images.load(_data_uri(_png(2000, 2000))) is None
+
+    def test_cache_respects_byte_budget(self, monkeypatch):
+        """Test que el cache descarta entradas al superar IMAGE_CACHE_MB."""
+        monkeypatch.setattr(config, "IMAGE_CACHE_MB", 1)
+        monkeypatch.setattr(images, "process", lambda data, width_px: data)
+        monkeypatch.setattr(images, "load", lambda src: src[-5:].encode() * (80 * 1024))
+
+        for name in "abc":
+            images.get(f"https://example.com/{name}.png", 100)
+
+        info = images.cache_info()
+        assert info["size"] == 2
+        assert info["bytes"] <= info["max_bytes"]
+
+    def test_synchronous_without_workers(self, monkeypatch):
+        """Test que con IMAGE_WORKERS=1 no se usa el pool."""
+        monkeypatch.setattr(config, "IMAGE_WORKERS", 1)
+
+        future = images.submit(_data_uri(_png(1, 1)), 100)
+
+        assert future.done()
+        assert future.result()[0] == _png(1, 1)
+
+    def test_downscale_with_pillow(self):
+        """Test que con Pillow la imagen se reduce al ancho máximo."""
+        data = images.process(_png(1000, 500), 200)
+
+        with Image.open(BytesIO(data)) as image:
+            assert image.size == (200, 100)
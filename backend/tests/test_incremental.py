@@ -0,0 +1,139 @@
+"""
+Tests para el renderizado incremental Markdown -> HTML.
+
+Valida que el resultado por bloques sea idéntico a la conversión completa.
+"""
+
+import pytest
+from app.converter.incremental import (
+    render,
+    split_blocks,
+    find_global_features,
+    cache_info,
+    cache_clear
+)
+from app.converter.markdown_to_html import convert
+
+
+@pytest.fixture(autouse=True)
+def clean_block_cache():
+    """Cada test arranca con el cache de bloques vacío."""
+    cache_clear()
+    yield
+    cache_clear()
+
+
+class TestSplitBlocks:
+    """Tests para la división en bloques de primer nivel."""
+    
+    def test_splits_on_blank_lines(self):
+        """Test que párrafos separados son bloques distintos."""
+        blocks = split_blocks("# Title\n\nParagraph\n\nOther")
+        
+        assert blocks == ["# Title", "Paragraph", "Other"]
+    
+    def test_keeps_fenced_code_together(self):
+        """Test que líneas en blanco dentro de un fence no dividen."""
+        markdown = "```\na\n\n\nb\n```\n\nafter"
+        
+        assert split_blocks(markdown) == ["```\na\n\n\nb\n```", "after"]
+    
+    def test_merges_loose_lists(self):
+        """Test que items separados por línea en blanco siguen juntos."""
+        assert len(split_blocks("- a\n\n- b\n\n- c")) == 1
+    
+    def test_merges_indented_continuation(self):
+        """Test que contenido indentado pertenece al bloque anterior."""
+        assert len(split_blocks("- a\n\n    more\n\nnext")) == 2
+    
+    def test_merges_consecutive_quotes(self):
+        """Test que citas consecutivas se mantienen juntas."""
+        assert len(split_blocks("> a\n\n> b")) == 1
+
+
+class TestGlobalFeatures:
+    """Tests para detección de construcciones globales."""
+    
+    def test_reference_links(self):
+        """Test detección de links por referencia."""
+        assert find_global_features("[a][1]\n\n[1]: https://x.com") == "reference_links"
+    
+    def test_footnotes(self):
+        """Test detección de footnotes."""
+        assert find_global_features("Text[^1]\n\n[^1]: Note") == "footnotes"
+    
+    def test_plain_document(self, sample_markdown):
+        """Test documento sin construcciones globales."""
+        assert find_global_features(sample_markdown) is None
+
+
+class TestRender:
+    """Tests para render completo y por patch."""
+    
+    def test_full_render_matches_convert(self, sample_markdown, complex_markdown):
+        """Test que el HTML por bloques es idéntico al completo."""
+        for markdown in (sample_markdown, complex_markdown):
+            result = render(markdown)
+            
+            assert result["mode"] == "full"
+            assert result["html"] == convert(markdown)
+    
+    def test_fallback_on_reference_links(self):
+        """Test fallback a conversión completa."""
+        markdown = "See [docs][d]\n\n[d]: https://example.com"
+        result = render(markdown)
+        
+        assert result["fallback"] == "reference_links"
+        assert result["blocks"] == []
+        assert result["html"] == convert(markdown)
+    
+    def test_patch_only_contains_changed_block(self):
+        """Test que el patch solo incluye el bloque modificado."""
+        first = render("# Title\n\nOne\n\nTwo\n\nThree")
+        second = render(
+            "# Title\n\nOne edited\n\nTwo\n\nThree",
+            previous_blocks=first["blocks"]
+        )
+        
+        assert second["mode"] == "patch"
+        assert second["patch"] == {
+            "start": 1,
+            "delete": 1,
+            "html": ["<p>One edited</p>"]
+        }
+    
+    def test_patch_insert_and_delete(self):
+        """Test patch para bloques agregados y eliminados."""
+        first = render("A\n\nB\n\nC")
+        
+        inserted = render("A\n\nB\n\nNew\n\nC", previous_blocks=first["blocks"])
+        assert inserted["patch"] == {"start": 2, "delete": 0, "html": ["<p>New</p>"]}
+        
+        deleted = render("A\n\nC", previous_blocks=first["blocks"])
+        assert deleted["patch"] == {"start": 1, "delete": 1, "html": []}
+    
+    def test_patch_applied_equals_full_render(self, complex_markdown):
+        """Test que aplicar el patch reconstruye el HTML completo."""
+        first = render(complex_markdown)
+        edited = complex_markdown.replace("Primer nivel", "Primer nivel editado")
+        second = render(edited, previous_blocks=first["blocks"])
+        
+        previous = [convert(block) for block in split_blocks(complex_markdown)]
+        patch = second["patch"]
+        previous[patch["start"]:patch["start"] + patch["delete"]] = patch["html"]
+        
+        assert "\n".join(previous) == convert(edited)
+    
+    def test_unchanged_blocks_come_from_cache(self):
+        """Test que los bloques repetidos no se re-renderizan."""
+        render("A\n\nB")
+        render("A\n\nB\n\nC")
+        
+        info = cache_info()
+        assert info["hits"] == 2
+        assert info["misses"] == 3
+    
+    def test_empty_input_raises_error(self):
+        """Test que input vacío lanza error."""
+        with pytest.raises(ValueError):
+            render("")
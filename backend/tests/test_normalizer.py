@@ -0,0 +1,151 @@
+"""
+Tests para el normalizador de salida de LLMs.
+
+Valida cada reparación, el modo streaming y la configuración por request.
+"""
+
+import random
+import time
+
+import pytest
+
+from app.converter.markdown_to_html import convert as md_to_html
+from app.converter.normalizer import (
+    Normalizer,
+    normalize,
+    normalize_stream,
+    resolve_options
+)
+
+
+class TestRepairs:
+    """Tests para cada tipo de reparación."""
+    
+    def test_line_endings(self):
+        """Test que \\r\\n y \\r se convierten a \\n."""
+        text, fixes = normalize("a\r\nb\rc")
+        
+        assert text == "a\nb\nc"
+        assert fixes == {"line_endings": 2}
+    
+    def test_zero_width_characters(self):
+        """Test que se eliminan caracteres de ancho cero."""
+        text, fixes = normalize("**​bold﻿**")
+        
+        assert text == "**bold**"
+        assert fixes == {"zero_width": 2}
+    
+    def test_emoji_joiners_are_kept(self):
+        """Test que el ZWJ dentro de emojis se conserva."""
+        family = "\U0001F468‍\U0001F469‍\U0001F467"
+        text, fixes = normalize(f"Familia {family}")
+        
+        assert family in text
+        assert fixes == {}
+    
+    def test_unclosed_fence_is_closed(self):
+        """Test que un fence sin cerrar se cierra al final."""
+        text, fixes = normalize("Intro\n\n```python\nx = 1\n")
+        
+        assert text == "Intro\n\n```python\nx = 1\n```\n"
+        assert fixes == {"fences": 1}
+        assert "<code" in md_to_html(text)
+    
+    def test_longer_closing_fence(self):
+        """Test que un cierre más largo se reescribe al fence exacto."""
+        text, fixes = normalize("```\ncode\n````\n\nAfter")
+        
+        assert text == "```\ncode\n```\n\nAfter"
+        assert fixes == {"fences": 1}
+    
+    def test_shorter_fence_inside_code_is_content(self):
+        """Test que un fence más corto dentro de código no cierra."""
+        markdown = "````\n```\nx\n```\n````"
+        
+        assert normalize(markdown) == (markdown, {})
+    
+    def test_missing_table_separator(self):
+        """Test que se agrega la fila separadora faltante."""
+        text, fixes = normalize("| A | B |\n| 1 | 2 |")
+        
+        assert text == "| A | B |\n|---|---|\n| 1 | 2 |"
+        assert fixes == {"table_separator": 1}
+        assert "<table>" in md_to_html(text)
+    
+    def test_valid_table_untouched(self):
+        """Test que una tabla correcta no cambia."""
+        markdown = "| A | B |\n|---|---|\n| 1 | 2 |"
+        
+        assert normalize(markdown) == (markdown, {})
+    
+    def test_clean_document_untouched(self, complex_markdown):
+        """Test que un documento limpio no cambia."""
+        assert normalize(complex_markdown) == (complex_markdown, {})
+
+
+class TestStreaming:
+    """Tests para el modo incremental."""
+    
+    def test_stream_matches_full(self, complex_markdown):
+        """Test que cualquier partición en chunks da el mismo resultado."""
+        dirty = complex_markdown.replace("\n", "\r\n") + "\n```\nabierto"
+        expected = normalize(dirty)
+        
+        rng = random.Random(7)
+        for _ in range(20):
+            chunks, start = [], 0
+            while start < len(dirty):
+                size = rng.randint(1, 40)
+                chunks.append(dirty[start:start + size])
+                start += size
+            
+            assert "".join(normalize_stream(chunks)) == expected[0]
+    
+    def test_crlf_split_across_chunks(self):
+        """Test \\r\\n partido entre dos chunks."""
+        normalizer = Normalizer()
+        text = normalizer.feed("a\r") + normalizer.feed("\nb") + normalizer.close()
+        
+        assert text == "a\nb"
+        assert normalizer.fixes == {"line_endings": 1}
+
+
+class TestOptions:
+    """Tests para la configuración por request."""
+    
+    def test_disable_all(self):
+        """Test que False desactiva todas las reparaciones."""
+        assert normalize("a\r\nb", False) == ("a\r\nb", {})
+    
+    def test_enable_list(self):
+        """Test que una lista activa solo esas reparaciones."""
+        text, fixes = normalize("a\r\n```\ncode", ["fences"])
+        
+        assert fixes == {"fences": 1}
+        assert "\r\n" in text
+    
+    def test_override_dict(self):
+        """Test que un dict modifica los defaults."""
+        options = resolve_options({"zero_width": False})
+        
+        assert options["zero_width"] is False
+        assert options["fences"] is True
+    
+    def test_unknown_fix_raises_error(self):
+        """Test que una reparación desconocida lanza error."""
+        with pytest.raises(ValueError, match="desconocidas"):
+            resolve_options(["magic"])
+
+
+class TestPerformance:
+    """Tests de performance."""
+    
+    def test_normalize_is_linear(self):
+        """Test que 1 MB se normaliza en poco tiempo."""
+        document = ("Texto con **negrita**\r\n| a | b |\r\n| 1 | 2 |\r\n\r\n" * 25000)
+        
+        start = time.time()
+        normalize(document)
+        duration = time.time() - start
+        
+        assert duration < 1.0
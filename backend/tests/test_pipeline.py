@@ -0,0 +1,147 @@
+"""
+Tests para la subida en paralelo con la conversión (modo pipeline).
+"""
+
+import json
+import threading
+from io import BytesIO
+
+import pytest
+from docx import Document
+
+from app.config import config
+from app.converter import formats
+from app.converter.events import from_markdown
+from app.converter.exceptions import StorageError
+from app.storage import s3_client
+from app.storage.backends import MemoryBackend
+from app.storage.pipeline import PipelinedUpload
+
+
+class RecordingBackend(MemoryBackend):
+    """Backend en memoria que registra los threads y puede fallar."""
+
+    def __init__(self, fail_part: int = None):
+        super().__init__()
+        self.fail_part = fail_part
+        self.part_threads = set()
+        self.aborted = []
+
+    def upload_part(self, key, upload_id, number, data):
+        self.part_threads.add(threading.current_thread().name)
+        if number == self.fail_part:
+            raise ConnectionError("red caída")
+        return super().upload_part(key, upload_id, number, data)
+
+    def abort_multipart(self, key, upload_id):
+        self.aborted.append(upload_id)
+        super().abort_multipart(key, upload_id)
+
+
+class TestPipelinedUpload:
+    """Tests para el archivo de escritura que sube por partes."""
+
+    def test_parts_uploaded_in_background(self):
+        """Test que las partes se suben desde los threads de subida."""
+        backend = RecordingBackend()
+        data = bytes(range(256)) * 40
+
+        with PipelinedUpload(backend, "a/doc.bin", "application/octet-stream",
+                             part_size=1000, workers=3, queue_parts=2) as upload:
+            for start in range(0, len(data), 777):
+                upload.write(data[start:start + 777])
+
+        assert backend.get("a/doc.bin")[0] == data
+        assert upload.tell() == len(data)
+        assert backend.part_threads
+        assert threading.current_thread().name not in backend.part_threads
+
+    def test_small_file_single_put(self):
+        """Test que un archivo menor a una parte no usa multipart."""
+        backend = RecordingBackend()
+
+        with PipelinedUpload(backend, "a/small.bin", "text/plain", part_size=1000) as upload:
+            upload.write(b"hola")
+
+        assert backend.get("a/small.bin")[0] == b"hola"
+        assert not backend.part_threads
+
+    def test_failed_part_aborts(self):
+        """Test que si falla una parte la subida se aborta."""
+        backend = RecordingBackend(fail_part=2)
+
+        with pytest.raises(StorageError):
+            with PipelinedUpload(backend, "a/doc.bin", "text/plain",
+                                 part_size=10, workers=1, queue_parts=1) as upload:
+                for _ in range(50):
+                    upload.write(b"x" * 10)
+
+        assert backend.aborted
+        assert not backend.exists("a/doc.bin")
+
+    def test_producer_error_aborts(self):
+        """Test que un error del build aborta la subida y se propaga."""
+        backend = RecordingBackend()
+
+        with pytest.raises(RuntimeError):
+            with PipelinedUpload(backend, "a/doc.bin", "text/plain", part_size=10) as upload:
+                upload.write(b"x" * 25)
+                raise RuntimeError("falló el build")
+
+        assert len(backend.aborted) == 1
+        assert not backend.exists("a/doc.bin")
+
+    def test_failed_abort_is_logged(self, caplog):
+        """Test que si el abort falla se registra y sigue el error original."""
+        backend = RecordingBackend()
+
+        def broken_abort(key, upload_id):
+            raise RuntimeError("AccessDenied")
+        backend.abort_multipart = broken_abort
+
+        with pytest.raises(ValueError):
+            with PipelinedUpload(backend, "a/doc.bin", "text/plain", part_size=10) as upload:
+                upload.write(b"x" * 25)
+                raise ValueError("falló el build")
+
+        assert "No se pudo abortar" in caplog.text
+
+    def test_docx_written_to_unseekable_output(self):
+        """Test que el writer en streaming produce un DOCX válido por partes."""
+        backend = RecordingBackend()
+        markdown = "\n\n".join(f"## Sección {i}\n\nTexto {i}" for i in range(200))
+        outline = []
+
+        with PipelinedUpload(backend, "a/doc.docx", "application/octet-stream",
+                             part_size=4096) as upload:
+            formats.render_to("docx", from_markdown(markdown), upload, outline=outline)
+
+        document = Document(BytesIO(backend.get("a/doc.docx")[0]))
+        assert document.paragraphs[-1].text == "Texto 199"
+        assert len(outline) == 200
+        assert backend.part_threads
+
+
+class TestHandlerPipeline:
+    """Tests para el handler con UPLOAD_PIPELINE."""
+
+    @pytest.mark.parametrize("output_format", ["docx", ["docx", "html"]])
+    def test_handler_pipeline(self, mock_lambda_context, monkeypatch, output_format):
+        """Test que el DOCX subido en modo pipeline es el mismo documento."""
+        from handler import lambda_handler
+        storage = MemoryBackend()
+        monkeypatch.setattr(s3_client, "_storage_client", s3_client.S3Client(backend=storage))
+        monkeypatch.setattr(config, "UPLOAD_PIPELINE", True)
+
+        response = lambda_handler({
+            "httpMethod": "POST",
+            "body": json.dumps({"content": "# Hola\n\nMundo", "output_format": output_format})
+        }, mock_lambda_context)
+        data = json.loads(response["body"])["data"]
+        data = data.get("formats", {}).get("docx", data)
+
+        assert response["statusCode"] == 200
+        content, _ = storage.get(storage.key_from_url(data["download_url"]))
+        assert data["size_bytes"] == len(content)
+        assert data["outline"][0]["text"] == "Hola"
+        assert Document(BytesIO(content)).paragraphs[-1].text == "Mundo"
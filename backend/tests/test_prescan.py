@@ -0,0 +1,258 @@
+"""
+Tests para el pre-escaneo de entradas patológicas.
+
+Incluye un set de regresión de performance con entradas que antes eran
+lentas (o agotaban la recursión) y un fuzz con semilla fija.
+"""
+
+import random
+import threading
+import time
+
+import pytest
+
+from app.converter.exceptions import ConversionTimeoutError, InputTooComplexError
+from app.converter.html_to_docx import convert as html_to_docx
+from app.converter.markdown_to_html import convert as md_to_html
+from app.converter.prescan import enforce, scan, time_budget
+
+
+LIMITS = {"depth": 8, "line_length": 200, "table_columns": 10, "inline_markers": 50}
+
+
+# Entradas que sin pre-escaneo tardaban segundos o fallaban por recursión
+KNOWN_SLOW_INPUTS = {
+    "nested_blockquotes": ">" * 3000 + " deep",
+    "nested_lists": "\n".join("    " * i + "- item" for i in range(1000)),
+    "unclosed_brackets": "[" * 10000 + "a",
+    "unclosed_underscores": "_a " * 10000,
+    "unclosed_backticks": "`a " * 5000,
+    "unclosed_links": "[a](" * 3000,
+    "single_line_table": (
+        "|" + "|".join("c" for _ in range(3000)) + "|\n"
+        + "|" + "|".join("-" for _ in range(3000)) + "|\n"
+        + "|" + "|".join("x" for _ in range(3000)) + "|"
+    ),
+    "huge_line": "word " * 30000,
+    # Bajo los límites por línea de antes: cada línea pasaba, el párrafo no
+    "bracket_paragraph": "\n".join(["[" * 999] * 20),
+    "large_table": "\n".join(
+        ["|" + "|".join(["cell"] * 64) + "|", "|" + "|".join(["---"] * 64) + "|"]
+        + ["|" + "|".join(["cell"] * 64) + "|"] * 2000
+    ),
+}
+
+
+class TestScan:
+    """Tests para las métricas del escaneo."""
+    
+    def test_plain_document_has_no_violations(self, complex_markdown):
+        """Test que un documento normal pasa los límites por defecto."""
+        report = scan(complex_markdown)
+        
+        assert report["violations"] == []
+        assert report["max_depth"] >= 1
+    
+    def test_measures_depth(self):
+        """Test profundidad de citas y listas."""
+        assert scan("> > > x", LIMITS)["max_depth"] == 3
+        assert scan("- a\n    - b\n        - c", LIMITS)["max_depth"] == 2
+    
+    def test_measures_table_columns(self):
+        """Test ancho de tabla."""
+        assert scan("| a | b | c |", LIMITS)["max_table_columns"] == 3
+    
+    def test_escaped_markers_are_not_counted(self):
+        """Test que marcadores escapados no cuentan."""
+        report = scan("\\*" * 60, LIMITS)
+        
+        assert report["max_inline_markers"] == 0
+    
+    def test_fenced_code_is_not_measured(self):
+        """Test que el contenido de code fences no se mide."""
+        report = scan("```\n" + ">" * 50 + "\n```", LIMITS)
+        
+        assert report["max_depth"] == 0
+    
+    def test_unclosed_fence_is_measured(self):
+        """Test que un fence sin cerrar no esconde contenido."""
+        report = scan("```\n" + ">" * 50, LIMITS)
+        
+        assert "depth" in report["violations"]
+
+
+class TestDefaultLimits:
+    """Tests con los límites de producción (sin LIMITS de prueba)."""
+    
+    @pytest.mark.parametrize("name, metric", [
+        ("bracket_paragraph", "inline_markers"),
+        ("large_table", "table_cells"),
+    ])
+    def test_defaults_flag_known_slow_inputs(self, name, metric):
+        """Test que los límites por defecto detectan las entradas lentas."""
+        assert metric in scan(KNOWN_SLOW_INPUTS[name])["violations"]
+        with pytest.raises(InputTooComplexError):
+            enforce(KNOWN_SLOW_INPUTS[name], policy="reject")
+    
+    def test_markers_count_per_paragraph(self):
+        """Test que los marcadores se suman en el párrafo, no por línea."""
+        paragraph = "\n".join(["[" * 100] * 6)
+        
+        assert scan(paragraph)["max_inline_markers"] == 600
+        assert scan(paragraph.replace("\n", "\n\n"))["max_inline_markers"] == 100
+    
+    def test_list_items_and_table_rows_count_apart(self):
+        """Test que cada ítem o fila de tabla tiene su propia cuenta."""
+        items = "\n".join("- `code` [link](url) **bold**" for _ in range(300))
+        rows = "| a | b |\n|---|---|\n" + "\n".join("| `x` | *y* |" for _ in range(300))
+        
+        assert scan(items)["violations"] == []
+        assert scan(rows)["violations"] == []
+    
+    def test_normalize_escapes_whole_paragraph(self):
+        """Test que se escapa el párrafo entero que supera el máximo."""
+        text, _ = enforce("[" * 300 + "\n" + "[" * 300, policy="normalize")
+        
+        assert text.count("\\[") == 600
+        assert scan(text)["violations"] == []
+    
+    def test_normalize_splits_large_table(self):
+        """Test que una tabla con demasiadas celdas se corta."""
+        text, _ = enforce(KNOWN_SLOW_INPUTS["large_table"], policy="normalize")
+        html = md_to_html(text)
+        
+        assert scan(text)["violations"] == []
+        assert html.count("<td>") <= 20000
+        assert text.count("cell") == 64 * 2001
+
+
+class TestEnforce:
+    """Tests para las políticas reject y normalize."""
+    
+    def test_reject_raises_typed_error(self):
+        """Test que reject lanza InputTooComplexError con contexto."""
+        with pytest.raises(InputTooComplexError) as exc_info:
+            enforce(">" * 20 + " x", policy="reject", limits=LIMITS)
+        
+        assert exc_info.value.metric == "depth"
+        assert exc_info.value.value == 20
+        assert exc_info.value.limit == 8
+    
+    def test_valid_input_is_untouched(self, sample_markdown):
+        """Test que un input válido no cambia."""
+        text, report = enforce(sample_markdown, policy="normalize")
+        
+        assert text == sample_markdown
+        assert report["normalized"] is False
+    
+    def test_normalize_clamps_depth(self):
+        """Test que la normalización recorta el anidamiento."""
+        text, report = enforce(">" * 20 + " x", policy="normalize", limits=LIMITS)
+        
+        assert report["normalized"] is True
+        assert text.count(">") == 8
+        assert text.endswith("x")
+    
+    def test_normalize_merges_table_columns(self):
+        """Test que las columnas sobrantes se fusionan."""
+        row = "|" + "|".join(str(i) for i in range(20)) + "|"
+        text, _ = enforce(row, policy="normalize", limits=LIMITS)
+        
+        assert scan(text, LIMITS)["max_table_columns"] == 10
+        assert text.endswith("9 10 11 12 13 14 15 16 17 18 19|")
+    
+    def test_normalize_wraps_long_lines(self):
+        """Test que las líneas largas se parten en espacios."""
+        text, _ = enforce("palabra " * 100, policy="normalize", limits=LIMITS)
+        
+        assert all(len(line) <= 200 for line in text.split("\n"))
+        assert text.split() == ["palabra"] * 100
+    
+    def test_normalize_escapes_markers(self):
+        """Test que los marcadores inline se escapan."""
+        text, _ = enforce("_a " * 60, policy="normalize", limits=LIMITS)
+        
+        assert "\\_a" in text
+        assert "<em>" not in md_to_html(text)
+
+
+class TestTimeBudget:
+    """Tests para el presupuesto de CPU."""
+    
+    def test_budget_raises_on_busy_loop(self):
+        """Test que el presupuesto corta un bucle de CPU."""
+        with pytest.raises(ConversionTimeoutError) as exc_info:
+            with time_budget(0.05):
+                while True:
+                    pass
+        
+        assert exc_info.value.budget == 0.05
+    
+    def test_budget_allows_fast_work(self):
+        """Test que el trabajo rápido termina normalmente."""
+        with time_budget(5):
+            html = md_to_html("# Rápido")
+        
+        assert "<h1>" in html
+    
+    def test_budget_disabled_outside_main_thread(self):
+        """Test que fuera del hilo principal no se instala el timer."""
+        result = []
+        
+        def work():
+            with time_budget(0.001):
+                start = time.process_time()
+                while time.process_time() - start < 0.05:
+                    pass
+            result.append("done")
+        
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+        
+        assert result == ["done"]
+
+
+@pytest.mark.slow
+class TestKnownSlowInputs:
+    """Regresión de performance para entradas patológicas conocidas."""
+    
+    @pytest.mark.parametrize("name", sorted(KNOWN_SLOW_INPUTS))
+    def test_pipeline_is_bounded(self, name):
+        """Test que pre-escaneo + conversión completa terminan rápido."""
+        start = time.process_time()
+        
+        text, report = enforce(KNOWN_SLOW_INPUTS[name], policy="normalize")
+        html_to_docx(md_to_html(text))
+        
+        assert report["normalized"] is True
+        assert time.process_time() - start < 5.0
+    
+    @pytest.mark.parametrize("name", sorted(KNOWN_SLOW_INPUTS))
+    def test_scan_is_linear(self, name):
+        """Test que el escaneo toma milisegundos incluso en el peor caso."""
+        start = time.process_time()
+        scan(KNOWN_SLOW_INPUTS[name] * 4)
+        
+        assert time.process_time() - start < 0.5
+
+
+class TestFuzz:
+    """Fuzz con semilla fija: la salida normalizada respeta los límites."""
+    
+    FRAGMENTS = [">", "> ", "    ", "\t", "- ", "1. ", "*", "_", "`", "[", "](", "|",
+                 "---", "```", "\n", "\n\n", "texto ", "**", "~~~"]
+    
+    def test_normalized_output_respects_limits(self):
+        """Test que normalizar siempre deja el texto dentro de los límites."""
+        rng = random.Random(1234)
+        
+        for _ in range(300):
+            text = "".join(rng.choice(self.FRAGMENTS) for _ in range(rng.randint(1, 400)))
+            if not text.strip():
+                continue
+            
+            normalized, _ = enforce(text, policy="normalize", limits=LIMITS)
+            
+            assert scan(normalized, LIMITS)["violations"] == []
+            md_to_html(normalized)
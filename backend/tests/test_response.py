@@ -0,0 +1,166 @@
+"""
+Tests para las utilidades de respuesta HTTP.
+
+Valida ETags, respuestas condicionales, compresión y serialización.
+"""
+
+import base64
+import gzip
+import json
+
+from app.utils import response as response_module
+from app.utils.response import (
+    JSON_HEADERS,
+    success,
+    error,
+    raw,
+    compress,
+    compute_etag,
+    etag_matches,
+    not_modified
+)
+
+
+class TestSerialization:
+    """Tests para headers y serialización del body."""
+    
+    def test_headers_are_copies(self):
+        """Test que modificar los headers de una respuesta no toca la plantilla."""
+        first = success({"a": 1}, headers={"ETag": '"x"'})
+        first["headers"]["X-Extra"] = "1"
+        second = error("falló")
+        
+        assert "X-Extra" not in second["headers"]
+        assert "ETag" not in second["headers"]
+        assert dict(JSON_HEADERS) == second["headers"]
+    
+    def test_body_keeps_unicode(self):
+        """Test que el JSON lleva UTF-8 sin escapes y con timestamp ISO."""
+        body = success({"html": "<p>Año ñandú</p>"})["body"]
+        
+        assert "Año ñandú" in body
+        timestamp = json.loads(body)["timestamp"]
+        assert len(timestamp) == 26 and timestamp[10] == "T"
+    
+    def test_stdlib_fallback(self, monkeypatch):
+        """Test que sin orjson se usa json de la librería estándar."""
+        monkeypatch.setattr(response_module, "orjson", None)
+        
+        assert json.loads(success({"n": [1, 2]})["body"])["data"] == {"n": [1, 2]}
+    
+    def test_raw_response(self):
+        """Test que raw devuelve el contenido tal cual como body."""
+        response = raw("<h1>Título</h1>", headers={"ETag": '"e"'})
+        
+        assert response["body"] == "<h1>Título</h1>"
+        assert response["headers"]["Content-Type"] == "text/html; charset=utf-8"
+        assert response["headers"]["ETag"] == '"e"'
+
+
+class TestETag:
+    """Tests para generación y comparación de ETags."""
+    
+    def test_etag_is_quoted_and_stable(self):
+        """Test que el ETag es determinista y entre comillas."""
+        etag1 = compute_etag("# Title", "html")
+        etag2 = compute_etag("# Title", "html")
+        
+        assert etag1 == etag2
+        assert etag1.startswith('"') and etag1.endswith('"')
+    
+    def test_weak_etag(self):
+        """Test que el ETag débil lleva W/ y coincide con y sin prefijo."""
+        etag = compute_etag("# Title", "html", weak=True)
+        
+        assert etag == "W/" + compute_etag("# Title", "html")
+        assert etag_matches(etag, etag)
+        assert etag_matches(etag[2:], etag)
+        assert etag_matches(etag[:-1] + '-gzip"', etag)
+    
+    def test_etag_changes_with_content(self):
+        """Test que contenido distinto produce ETag distinto."""
+        assert compute_etag("# A", "html") != compute_etag("# B", "html")
+    
+    def test_etag_parts_are_delimited(self):
+        """Test que las partes no se confunden al concatenar."""
+        assert compute_etag("ab", "c") != compute_etag("a", "bc")
+    
+    def test_etag_matches_exact(self):
+        """Test coincidencia exacta."""
+        etag = compute_etag("x")
+        assert etag_matches(etag, etag)
+    
+    def test_etag_matches_list_and_weak(self):
+        """Test coincidencia en lista y con prefijo W/."""
+        etag = compute_etag("x")
+        assert etag_matches(f'"other", W/{etag}', etag)
+    
+    def test_etag_matches_wildcard(self):
+        """Test que * coincide siempre."""
+        assert etag_matches("*", compute_etag("x"))
+    
+    def test_etag_no_header(self):
+        """Test sin header no hay coincidencia."""
+        assert not etag_matches(None, compute_etag("x"))
+        assert not etag_matches('"nope"', compute_etag("x"))
+
+
+class TestNotModified:
+    """Tests para la respuesta 304."""
+    
+    def test_not_modified_response(self):
+        """Test que la respuesta 304 no tiene body y lleva el ETag."""
+        response = not_modified('"abc"')
+        
+        assert response["statusCode"] == 304
+        assert response["body"] == ""
+        assert response["headers"]["ETag"] == '"abc"'
+
+
+class TestCompression:
+    """Tests para compresión de respuestas."""
+    
+    def _large_response(self):
+        return success({"html": "<p>texto</p>" * 500})
+    
+    def test_gzip_when_accepted(self):
+        """Test compresión gzip cuando el cliente la acepta."""
+        response = compress(self._large_response(), "gzip, deflate", min_bytes=100)
+        
+        assert response["isBase64Encoded"] is True
+        assert response["headers"]["Content-Encoding"] == "gzip"
+        assert response["headers"]["Vary"] == "Accept-Encoding"
+        
+        body = gzip.decompress(base64.b64decode(response["body"]))
+        assert json.loads(body)["data"]["html"].startswith("<p>texto</p>")
+    
+    def test_compressed_body_has_its_own_etag(self):
+        """Test que el ETag fuerte distingue la representación comprimida."""
+        original = success({"html": "<p>texto</p>" * 500}, headers={"ETag": '"abc"'})
+        
+        response = compress(original, "gzip", min_bytes=100)
+        
+        assert response["headers"]["ETag"] == '"abc-gzip"'
+        assert original["headers"]["ETag"] == '"abc"'
+        assert etag_matches('"abc-gzip"', '"abc"')
+        assert not etag_matches('"abc-deflate"', '"abc"')
+    
+    def test_no_compression_below_threshold(self):
+        """Test que bodies pequeños no se comprimen."""
+        original = success({"html": "<p>x</p>"})
+        response = compress(original, "gzip", min_bytes=10_000)
+        
+        assert response is original
+    
+    def test_no_compression_without_header(self):
+        """Test que sin Accept-Encoding no se comprime."""
+        original = self._large_response()
+        
+        assert compress(original, None, min_bytes=100) is original
+        assert compress(original, "identity", min_bytes=100) is original
+    
+    def test_rejected_encoding(self):
+        """Test que q=0 desactiva la codificación."""
+        original = self._large_response()
+        
+        assert compress(original, "gzip;q=0", min_bytes=100) is original
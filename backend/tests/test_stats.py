@@ -0,0 +1,82 @@
+"""
+Tests para las estadísticas de runtime.
+"""
+
+import threading
+
+import pytest
+
+from app.utils import stats
+
+
+@pytest.fixture(autouse=True)
+def clean_stats():
+    stats.reset()
+    yield
+    stats.reset()
+
+
+class TestStats:
+    """Tests para contadores y percentiles."""
+    
+    def test_counter_does_not_advance_on_read(self):
+        """Test que leer el contador no lo modifica."""
+        stats.increment("conversions")
+        stats.increment("conversions")
+        
+        assert stats.counters() == {"conversions": 2}
+        assert stats.counters() == {"conversions": 2}
+    
+    def test_percentiles_nearest_rank(self):
+        """Test p50/p95 sobre 1..100 ms."""
+        for ms in range(100, 0, -1):
+            stats.observe("render_docx", ms)
+        
+        latency = stats.latencies()["render_docx"]
+        
+        assert latency == {"samples": 100, "p50_ms": 50, "p95_ms": 95}
+    
+    def test_window_is_rolling(self, monkeypatch):
+        """Test que solo cuentan las últimas STATS_WINDOW muestras."""
+        from app.config import config
+        monkeypatch.setattr(config, "STATS_WINDOW", 4)
+        for ms in (1000, 1000, 1, 1, 1, 1):
+            stats.observe("upload", ms)
+        
+        assert stats.latencies()["upload"]["p95_ms"] == 1
+    
+    def test_timed_skips_failures(self):
+        """Test que timed no registra bloques que lanzan."""
+        with pytest.raises(ValueError):
+            with stats.timed("markdown"):
+                raise ValueError
+        
+        assert stats.latencies() == {}
+    
+    def test_counter_is_thread_safe(self):
+        """Test que incrementos concurrentes no se pierden."""
+        def work():
+            for _ in range(10000):
+                stats.increment("conversions")
+        
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert stats.counters() == {"conversions": 80000}
+    
+    def test_engine_pool_counts_balance(self):
+        """Test que el pool vuelve a in_use=0 tras uso concurrente."""
+        from app.converter.markdown_to_html import convert, pool_info
+        
+        threads = [threading.Thread(target=convert, args=("# Hola *mundo*",)) for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        info = pool_info()
+        assert info["in_use"] == 0
+        assert info["idle"] >= 1
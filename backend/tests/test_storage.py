@@ -4,8 +4,12 @@ Tests para el módulo de storage (S3 y mock).
 Valida tanto el comportamiento mock como la integración real con S3.
 """
 
+import time
+from datetime import datetime, timezone
+
 import pytest
 from pathlib import Path
+from app.storage.key_layout import build_key
 from app.storage.s3_client import S3Client, get_s3_client, upload_and_get_url
 from app.converter.exceptions import StorageError
 from moto import mock_s3
@@ -144,6 +148,273 @@ class TestS3ClientReal:
         assert content_type == "application/octet-stream"
 
 
+class TestDelete:
+    """Tests para el borrado real en S3 (moto)."""
+    
+    @pytest.fixture
+    def client(self, mock_s3_bucket, monkeypatch):
+        from app.config import config
+        monkeypatch.setattr(config, "BUCKET_NAME", "test-bucket")
+        mock_s3_bucket.put_bucket_versioning(
+            Bucket="test-bucket",
+            VersioningConfiguration={"Status": "Enabled"}
+        )
+        return S3Client(use_mock=False)
+    
+    @staticmethod
+    def _versions(s3) -> list:
+        response = s3.list_object_versions(Bucket="test-bucket")
+        return response.get("Versions", []) + response.get("DeleteMarkers", [])
+    
+    def test_delete_file_removes_all_versions(self, client, mock_s3_bucket):
+        """Test que el borrado no deja versiones ni delete markers."""
+        url = client.upload_and_get_url(b"v1", "docx")
+        key = url.split("?")[0].rsplit("/", 1)[-1]
+        mock_s3_bucket.put_object(Bucket="test-bucket", Key=key, Body=b"v2")
+        mock_s3_bucket.put_object(Bucket="test-bucket", Key=key + ".bak", Body=b"otro")
+        
+        assert client.delete_file(url) is True
+        
+        assert [v["Key"] for v in self._versions(mock_s3_bucket)] == [key + ".bak"]
+    
+    def test_delete_single_version(self, client, mock_s3_bucket):
+        """Test borrado de una versión puntual."""
+        first = mock_s3_bucket.put_object(Bucket="test-bucket", Key="a.txt", Body=b"1")
+        mock_s3_bucket.put_object(Bucket="test-bucket", Key="a.txt", Body=b"2")
+        
+        client.delete_file("a.txt", version_id=first["VersionId"])
+        
+        body = mock_s3_bucket.get_object(Bucket="test-bucket", Key="a.txt")["Body"].read()
+        assert body == b"2"
+        assert len(self._versions(mock_s3_bucket)) == 1
+    
+    def test_delete_files_batches_requests(self, client, mock_s3_bucket, monkeypatch):
+        """Test que el borrado masivo agrupa hasta 1000 keys por llamada."""
+        keys = [f"doc-{i}.txt" for i in range(2100)]
+        for key in keys:
+            mock_s3_bucket.put_object(Bucket="test-bucket", Key=key, Body=b"x")
+        calls = []
+        delete_objects = client.s3.delete_objects
+        monkeypatch.setattr(client.s3, "delete_objects", lambda **kw: (
+            calls.append(len(kw["Delete"]["Objects"])) or delete_objects(**kw)
+        ))
+        
+        deleted = client.delete_files(keys, all_versions=False)
+        
+        assert deleted == 2100
+        assert calls == [1000, 1000, 100]
+        assert mock_s3_bucket.list_objects_v2(Bucket="test-bucket")["KeyCount"] == 0
+    
+    def _count_listings(self, client, monkeypatch) -> list:
+        """Prefijos de cada llamada a ListObjectVersions."""
+        calls = []
+        list_object_versions = client.s3.list_object_versions
+        monkeypatch.setattr(client.s3, "list_object_versions", lambda **kw: (
+            calls.append(kw.get("Prefix")) or list_object_versions(**kw)
+        ))
+        return calls
+    
+    def test_delete_files_lists_versions_per_prefix(self, client, mock_s3_bucket, monkeypatch):
+        """Test que las keys de un directorio se listan juntas, no una por una."""
+        keys = [f"docs/doc-{i:03d}.txt" for i in range(50)]
+        for key in keys + ["docs/otro.txt"]:
+            mock_s3_bucket.put_object(Bucket="test-bucket", Key=key, Body=b"1")
+            mock_s3_bucket.put_object(Bucket="test-bucket", Key=key, Body=b"2")
+        calls = self._count_listings(client, monkeypatch)
+        
+        assert client.delete_files(keys) == 100
+        
+        assert calls == ["docs/doc-0"]
+        assert {v["Key"] for v in self._versions(mock_s3_bucket)} == {"docs/otro.txt"}
+    
+    def test_read_input_deletes_read_version(self, client, mock_s3_bucket, monkeypatch):
+        """Test que la entrada se borra por versión, sin listar versiones."""
+        from app.config import config
+        monkeypatch.setattr(config, "S3_DELETE_INPUT", True)
+        key = config.S3_INPUT_PREFIX + "doc.md"
+        mock_s3_bucket.put_object(Bucket="test-bucket", Key=key, Body=b"# Hola")
+        calls = self._count_listings(client, monkeypatch)
+        
+        assert client.read_input(key, 100) == "# Hola"
+        client.deferred.flush(force=True)
+        
+        assert calls == []
+        assert self._versions(mock_s3_bucket) == []
+    
+    def test_deferred_delete_after_expiry(self, client, mock_s3_bucket, monkeypatch):
+        """Test que el borrado diferido se ejecuta en segundo plano."""
+        from app.config import config
+        monkeypatch.setattr(config, "S3_DELETE_AFTER_EXPIRY", True)
+        monkeypatch.setattr(config, "S3_DELETE_GRACE_SECONDS", 0)
+        
+        client.upload_and_get_url(b"content", "txt", expires_in=0)
+        
+        for _ in range(50):
+            if not self._versions(mock_s3_bucket):
+                break
+            time.sleep(0.05)
+        assert self._versions(mock_s3_bucket) == []
+        assert len(client.deferred) == 0
+    
+    def test_deferred_flush_force(self, client, mock_s3_bucket):
+        """Test que flush(force=True) borra lo pendiente aunque no venció."""
+        mock_s3_bucket.put_object(Bucket="test-bucket", Key="later.txt", Body=b"x")
+        client.deferred.schedule("later.txt", delay=3600)
+        
+        assert client.deferred.flush() == 0
+        assert client.deferred.flush(force=True) == 1
+        assert self._versions(mock_s3_bucket) == []
+    
+    def _failing_deletes(self, client, monkeypatch, code, keys=None):
+        """delete_objects informa code para keys (o falla entero si keys es None)."""
+        from botocore.exceptions import ClientError
+        delete_objects = client.s3.delete_objects
+        
+        def fake(**kwargs):
+            if keys is None:
+                raise ClientError({"Error": {"Code": code, "Message": code}}, "DeleteObjects")
+            objects = kwargs["Delete"]["Objects"]
+            kwargs["Delete"]["Objects"] = [obj for obj in objects if obj["Key"] not in keys]
+            response = delete_objects(**kwargs)
+            response["Errors"] = [
+                {**obj, "Code": code, "Message": code}
+                for obj in objects if obj["Key"] in keys
+            ]
+            return response
+        monkeypatch.setattr(client.s3, "delete_objects", fake)
+    
+    def test_deferred_retries_only_failed_keys(self, client, mock_s3_bucket, monkeypatch):
+        """Test que un lote parcial reprograma solo las keys que fallaron."""
+        from app.config import config
+        monkeypatch.setattr(config, "S3_DELETE_GRACE_SECONDS", 3600)
+        for key in ("a.txt", "b.txt"):
+            mock_s3_bucket.put_object(Bucket="test-bucket", Key=key, Body=b"x")
+            client.deferred.schedule(key, delay=3600)
+        self._failing_deletes(client, monkeypatch, "InternalError", keys={"b.txt"})
+        
+        with pytest.raises(StorageError):
+            client.deferred.flush(force=True)
+        
+        assert [entry[1:] for entry in client.deferred._pending] == [("b.txt", None, 1)]
+        assert {v["Key"] for v in self._versions(mock_s3_bucket)} == {"b.txt"}
+    
+    def test_deferred_drops_permanent_errors(self, client, mock_s3_bucket, monkeypatch):
+        """Test que AccessDenied no se reintenta."""
+        mock_s3_bucket.put_object(Bucket="test-bucket", Key="a.txt", Body=b"x")
+        client.deferred.schedule("a.txt", delay=3600)
+        self._failing_deletes(client, monkeypatch, "AccessDenied")
+        
+        with pytest.raises(StorageError):
+            client.deferred.flush(force=True)
+        
+        assert len(client.deferred) == 0
+    
+    def test_deferred_retry_cap(self, client, mock_s3_bucket, monkeypatch):
+        """Test que tras S3_DELETE_MAX_RETRIES intentos la key se descarta."""
+        from app.config import config
+        monkeypatch.setattr(config, "S3_DELETE_GRACE_SECONDS", 3600)
+        monkeypatch.setattr(config, "S3_DELETE_MAX_RETRIES", 2)
+        mock_s3_bucket.put_object(Bucket="test-bucket", Key="a.txt", Body=b"x")
+        client.deferred.schedule("a.txt", delay=3600)
+        self._failing_deletes(client, monkeypatch, "SlowDown", keys={"a.txt"})
+        
+        with pytest.raises(StorageError):
+            client.deferred.flush(force=True)
+        due, _, _, attempts = client.deferred._pending[0]
+        assert attempts == 1 and due - time.monotonic() > 3000
+        with pytest.raises(StorageError):
+            client.deferred.flush(force=True)
+        
+        assert len(client.deferred) == 0
+    
+    def test_key_from_presigned_url(self, client):
+        """Test que la key se obtiene de URLs virtual-hosted y path style."""
+        assert client._key_from_url(
+            "https://test-bucket.s3.amazonaws.com/dir/a%20b.docx?X-Amz-Signature=x"
+        ) == "dir/a b.docx"
+        assert client._key_from_url("https://s3.amazonaws.com/test-bucket/a.docx?x=1") == "a.docx"
+        assert client._key_from_url("a.docx") == "a.docx"
+
+
+class TestKeyLayout:
+    """Tests para el layout de keys (shards, fechas y tenants)."""
+    
+    def test_flat_layout_by_default(self, monkeypatch):
+        """Test que sin layout la key queda en la raíz."""
+        from app.config import config
+        monkeypatch.setattr(config, "S3_KEY_LAYOUT", [])
+        
+        assert build_key("docx", file_id="abc") == "abc.docx"
+    
+    def test_composed_layout(self, monkeypatch):
+        """Test segmentos en el orden configurado."""
+        from app.config import config
+        monkeypatch.setattr(config, "S3_KEY_LAYOUT", ["tenant", "hash", "date"])
+        
+        key = build_key(
+            "docx",
+            tenant="../Acme Corp/",
+            now=datetime(2024, 5, 31, tzinfo=timezone.utc),
+            file_id="a7c1e2f0-0000-4000-8000-000000000000"
+        )
+        
+        assert key == "Acme-Corp/a7/2024/05/31/a7c1e2f0-0000-4000-8000-000000000000.docx"
+    
+    def test_missing_tenant_uses_default(self, monkeypatch):
+        """Test tenant vacío o inválido."""
+        from app.config import config
+        monkeypatch.setattr(config, "S3_KEY_LAYOUT", ["tenant"])
+        
+        assert build_key("txt", tenant="///", file_id="x") == "default/x.txt"
+    
+    def test_hash_shards_spread_keys(self, monkeypatch):
+        """Test que los shards reparten las keys entre prefijos."""
+        from app.config import config
+        monkeypatch.setattr(config, "S3_KEY_LAYOUT", ["hash"])
+        
+        prefixes = {build_key("docx").split("/")[0] for _ in range(2000)}
+        
+        assert len(prefixes) > 200
+        assert all(len(p) == 2 for p in prefixes)
+    
+    def test_unknown_segment_fails(self, monkeypatch):
+        """Test segmento desconocido."""
+        from app.config import config
+        monkeypatch.setattr(config, "S3_KEY_LAYOUT", ["region"])
+        
+        with pytest.raises(ValueError):
+            build_key("docx")
+        monkeypatch.setattr(type(config), "S3_KEY_LAYOUT", ["region"])
+        with pytest.raises(ValueError, match="S3_KEY_LAYOUT"):
+            config.validate()
+    
+    def test_mock_mirrors_layout(self, monkeypatch):
+        """Test que el mock guarda el archivo en el mismo árbol que S3."""
+        from app.config import config
+        monkeypatch.setattr(config, "S3_KEY_LAYOUT", ["tenant", "hash"])
+        client = S3Client(use_mock=True)
+        
+        url = client.upload_and_get_url(b"content", "txt", tenant="acme")
+        
+        relative = Path(url.replace("file://", "")).relative_to(client.mock_dir.absolute())
+        assert relative.parts[0] == "acme"
+        assert len(relative.parts) == 3
+        assert client.delete_file(url) is True
+        assert not Path(url.replace("file://", "")).exists()
+    
+    def test_s3_key_uses_layout(self, mock_s3_bucket, monkeypatch):
+        """Test que el objeto en S3 usa el layout."""
+        from app.config import config
+        monkeypatch.setattr(config, "BUCKET_NAME", "test-bucket")
+        monkeypatch.setattr(config, "S3_KEY_LAYOUT", ["hash"])
+        
+        S3Client(use_mock=False).upload_and_get_url(b"content", "docx")
+        
+        key = mock_s3_bucket.list_objects_v2(Bucket="test-bucket")["Contents"][0]["Key"]
+        shard, name = key.split("/")
+        assert name.replace("-", "").startswith(shard)
+
+
 class TestSingletonPattern:
     """Tests para el patrón singleton."""
     
@@ -0,0 +1,164 @@
+"""
+Tests para las respuestas en streaming y el servidor local.
+"""
+
+import http.client
+import json
+import threading
+
+import pytest
+
+from app.converter import incremental
+from app.utils import stats
+from app.utils.streaming import buffered, coalesce
+from handler import lambda_handler, stream_handler
+
+
+def _event(body: dict, headers: dict = None) -> dict:
+    return {
+        "httpMethod": "POST",
+        "headers": {"Content-Type": "application/json", **(headers or {})},
+        "body": json.dumps(body)
+    }
+
+
+DOCUMENT = "\n\n".join(f"## Sección {i}\n\nPárrafo {i} con **negrita**." for i in range(300))
+
+
+class TestChunks:
+    """Tests para la generación de HTML por bloque."""
+
+    def test_iter_html_matches_render(self):
+        """Test que concatenar los bloques da el mismo HTML."""
+        parts = list(incremental.iter_html(DOCUMENT))
+
+        assert len(parts) == 600
+        assert "".join(parts) == incremental.render(DOCUMENT)["html"]
+
+    def test_iter_html_global_fallback(self):
+        """Test que con efectos globales se genera el documento de una vez."""
+        text = "Ver [link][1].\n\n[1]: https://example.com"
+
+        assert list(incremental.iter_html(text)) == [incremental.render(text)["html"]]
+
+    def test_coalesce(self):
+        """Test que el primer chunk sale solo y el resto se agrupa."""
+        chunks = list(coalesce(["a", "bb", "cc", "dd", "e"], min_bytes=4))
+
+        assert chunks == [b"a", b"bbcc", b"dde"]
+
+
+class TestStreamHandler:
+    """Tests para stream_handler."""
+
+    def test_streams_html(self, mock_lambda_context):
+        """Test que el HTML sale en varios chunks como body."""
+        status, headers, chunks = stream_handler(
+            _event({"content": DOCUMENT, "output_format": "html"}), mock_lambda_context
+        )
+        chunks = list(chunks)
+
+        assert status == 200
+        assert headers["Content-Type"].startswith("text/html")
+        assert len(chunks) > 2
+        assert b"".join(chunks).decode("utf-8") == incremental.render(DOCUMENT)["html"]
+
+    def test_other_requests_are_buffered(self, mock_lambda_context):
+        """Test que lo que no es HTML se resuelve con lambda_handler."""
+        event = _event({"content": "", "output_format": "html"})
+
+        status, headers, chunks = stream_handler(event, mock_lambda_context)
+
+        assert status == lambda_handler(event, mock_lambda_context)["statusCode"] == 400
+        assert json.loads(b"".join(chunks))["error_code"] == "VALIDATION_ERROR"
+
+    def test_shares_raw_etag_and_revalidates(self, mock_lambda_context):
+        """Test que el stream lleva el ETag del modo raw y responde 304 con él."""
+        body = {"content": DOCUMENT, "output_format": "html"}
+        raw_etag = lambda_handler(_event({**body, "raw": True}), mock_lambda_context)["headers"]["ETag"]
+
+        _, headers, _ = stream_handler(_event(body), mock_lambda_context)
+        status, not_modified, chunks = stream_handler(
+            _event(body, headers={"If-None-Match": raw_etag}), mock_lambda_context
+        )
+
+        assert headers["ETag"] == raw_etag
+        assert status == 304
+        assert not_modified["ETag"] == raw_etag
+        assert list(chunks) == []
+
+    def test_counts_served_conversion(self, mock_lambda_context):
+        """Test que la conversión se cuenta al terminar el stream."""
+        stats.reset()
+        _, _, chunks = stream_handler(
+            _event({"content": DOCUMENT, "output_format": "html"}), mock_lambda_context
+        )
+
+        assert stats.counters().get("conversions", 0) == 0
+        list(chunks)
+        assert stats.counters()["conversions"] == 1
+        assert "total" in stats.latencies()
+        stats.reset()
+
+    def test_buffered_decodes_base64(self):
+        """Test que buffered entrega el body comprimido en binario."""
+        status, _, chunks = buffered({"statusCode": 200, "body": "aG9sYQ==", "isBase64Encoded": True})
+
+        assert status == 200
+        assert list(chunks) == [b"hola"]
+
+
+class TestLocalServer:
+    """Tests para local_server.py."""
+
+    @pytest.fixture
+    def server(self):
+        from local_server import serve
+        server = serve(0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield server
+        server.shutdown()
+        server.server_close()
+
+    def _request(self, server, method, path, body=None):
+        connection = http.client.HTTPConnection(*server.server_address, timeout=10)
+        connection.request(method, path, body=json.dumps(body) if body else None)
+        response = connection.getresponse()
+        return response, response.read()
+
+    def test_stream_endpoint_is_chunked(self, server):
+        """Test que /convert/stream responde con Transfer-Encoding chunked."""
+        response, body = self._request(
+            server, "POST", "/convert/stream", {"content": DOCUMENT, "output_format": "html"}
+        )
+
+        assert response.status == 200
+        assert response.getheader("Transfer-Encoding") == "chunked"
+        assert body.decode("utf-8") == incremental.render(DOCUMENT)["html"]
+
+    def test_stream_not_modified(self, server):
+        """Test que un 304 del stream sale sin body ni chunked."""
+        body = {"content": DOCUMENT, "output_format": "html"}
+        response, _ = self._request(server, "POST", "/convert/stream", body)
+        connection = http.client.HTTPConnection(*server.server_address, timeout=10)
+        connection.request(
+            "POST", "/convert/stream", body=json.dumps(body),
+            headers={"If-None-Match": response.getheader("ETag")}
+        )
+        not_modified = connection.getresponse()
+
+        assert not_modified.status == 304
+        assert not_modified.getheader("Transfer-Encoding") is None
+        assert not_modified.read() == b""
+
+    def test_convert_and_health(self, server):
+        """Test las rutas con respuesta completa."""
+        response, body = self._request(
+            server, "POST", "/convert", {"content": "# Hola", "output_format": "html"}
+        )
+        health, _ = self._request(server, "GET", "/health")
+
+        assert response.status == 200
+        assert "Hola" in json.loads(body)["data"]["html"]
+        assert health.status == 200
@@ -0,0 +1,45 @@
+"""
+Tests para el módulo de conversión HTML -> texto plano.
+"""
+
+import pytest
+from app.converter.html_to_text import convert
+from app.converter.markdown_to_html import convert as md_to_html
+
+
+class TestHTMLToText:
+    """Tests para conversión de HTML a texto plano."""
+    
+    def test_blocks_are_separated(self):
+        """Test que encabezados y párrafos quedan en bloques separados."""
+        text = convert(md_to_html("# Title\n\nSome **bold** text"))
+        
+        assert text == "Title\n\nSome bold text\n"
+    
+    def test_lists_have_markers(self):
+        """Test que las listas conservan viñetas y numeración."""
+        text = convert(md_to_html("- a\n- b\n\n1. x\n2. y"))
+        
+        assert "- a\n- b" in text
+        assert "1. x\n2. y" in text
+    
+    def test_code_block_is_preserved(self):
+        """Test que los bloques de código mantienen espacios y saltos."""
+        text = convert(md_to_html("```\ndef f():\n    pass\n```"))
+        
+        assert "def f():\n    pass" in text
+    
+    def test_table_cells_are_tab_separated(self):
+        """Test que las celdas de tabla se separan con tabulaciones."""
+        text = convert(md_to_html("| A | B |\n|---|---|\n| 1 | 2 |"))
+        
+        assert "A\tB\n1\t2" in text
+    
+    def test_entities_are_decoded(self):
+        """Test que las entidades HTML se decodifican."""
+        assert convert("<p>a &amp; b &lt;c&gt;</p>") == "a & b <c>\n"
+    
+    def test_empty_html_raises_error(self):
+        """Test que HTML vacío genera error."""
+        with pytest.raises(ValueError):
+            convert("   ")
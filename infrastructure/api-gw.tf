@@ -3,9 +3,10 @@ resource "aws_apigatewayv2_api" "rsrc-api-md-converter" {
   protocol_type = "HTTP"
 
   cors_configuration {
-    allow_origins = ["*"]
-    allow_methods = ["POST", "OPTIONS"]
-    allow_headers = ["Content-Type"]
+    allow_origins  = ["*"]
+    allow_methods  = ["POST", "OPTIONS"]
+    allow_headers  = ["Content-Type", "If-None-Match"]
+    expose_headers = ["ETag"]
   }
 
   tags = {
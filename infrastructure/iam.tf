@@ -32,12 +32,27 @@ data "aws_iam_policy_document" "s3-access-policy" {
       "s3:PutObject",
       "s3:GetObject",
       "s3:DeleteObject",
+      "s3:DeleteObjectVersion",
+      "s3:AbortMultipartUpload",
     ]
 
     resources = [
       "${aws_s3_bucket.rsrc-docx-bucket.arn}/*"
     ]
   }
+
+  # Versioned deletes (S3_DELETE_ALL_VERSIONS) list every version of a key
+  statement {
+    effect = "Allow"
+
+    actions = [
+      "s3:ListBucketVersions",
+    ]
+
+    resources = [
+      aws_s3_bucket.rsrc-docx-bucket.arn
+    ]
+  }
 }
 
 resource "aws_iam_role_policy" "rsrc-s3-access" {
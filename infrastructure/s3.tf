@@ -21,6 +21,17 @@ resource "aws_s3_bucket_lifecycle_configuration" "rsrc-cleanup" {
       days = 3
     }
   }
+
+  # Parts of aborted or failed pipelined uploads (UPLOAD_PIPELINE)
+  rule {
+    id     = "abort-incomplete-multipart"
+    status = "Enabled"
+    filter {}
+
+    abort_incomplete_multipart_upload {
+      days_after_initiation = 1
+    }
+  }
 }
 
 resource "aws_s3_bucket_public_access_block" "rsrc-docx-public-access" {